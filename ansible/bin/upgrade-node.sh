@@ -6,15 +6,27 @@ set -e
 # Biyachain 节点升级脚本（使用 Cosmovisor）
 # ==========================================
 
+# 解析参数（--tree: 树形分发，控制机只上传到种子主机，其余主机经内网拉取）
+TREE_DIST=false
+POSITIONAL=()
+for arg in "$@"; do
+    if [ "$arg" == "--tree" ]; then
+        TREE_DIST=true
+    else
+        POSITIONAL+=("$arg")
+    fi
+done
+
 # 配置区域
-UPGRADE_NAME="${1}"
-DOWNLOAD_URL="${2}"
-CHECKSUM="${3:-}"
+UPGRADE_NAME="${POSITIONAL[0]}"
+DOWNLOAD_URL="${POSITIONAL[1]}"
+CHECKSUM="${POSITIONAL[2]:-}"
 
 if [ -z "$UPGRADE_NAME" ] || [ -z "$DOWNLOAD_URL" ]; then
-    echo "用法: $0 <upgrade_name> <download_url> [checksum]"
+    echo "用法: $0 <upgrade_name> <download_url> [checksum] [--tree]"
     echo "示例："
     echo "  $0 v1.17.2 https://github.com/InjectiveLabs/testnet/releases/download/v1.17.2-beta-1765406497/linux-amd64.zip"
+    echo "  $0 v1.17.2 <download_url> --tree    # 树形分发（需要各主机之间可以互相 SSH 登录）"
     echo ""
     exit 1
 fi
@@ -41,20 +53,55 @@ if [ ! -f "playbooks/upgrade-node.yml" ]; then
     exit 1
 fi
 
-# 执行 Ansible
-ansible-playbook -i inventory.yml playbooks/upgrade-node.yml \
-    -e "upgrade_name=$UPGRADE_NAME" \
-    -e "download_url=$DOWNLOAD_URL" \
-    -e "checksum=$CHECKSUM" \
-    -e "wasmvm_version=$WASMVM_VERSION" \
-    -e "build_output_dir=$(pwd)/$BUILD_OUTPUT_DIR" \
+PLAYBOOK_ARGS=(
+    -e "upgrade_name=$UPGRADE_NAME"
+    -e "download_url=$DOWNLOAD_URL"
+    -e "checksum=$CHECKSUM"
+    -e "wasmvm_version=$WASMVM_VERSION"
+    -e "build_output_dir=$(pwd)/$BUILD_OUTPUT_DIR"
     -e "upgrade_binary_dir=$(pwd)/$BUILD_OUTPUT_DIR"
+)
 
-if [ $? -eq 0 ]; then
-    echo ""
-    echo "✓ 升级部署完成: $UPGRADE_NAME"
-else
-    echo ""
-    echo "✗ 升级部署失败"
-    exit 1
+PIPELINE="$ANSIBLE_DIR/../scripts/upgrade_pipeline.py"
+READINESS_REPORT="$(pwd)/$BUILD_OUTPUT_DIR/readiness.json"
+
+# 树形分发：先在本地下载，再由 upgrade_pipeline.py 预置到各主机并校验；
+# 所有主机（包括 sentry）都分发成功且就绪时跳过 Ansible 部署，
+# 否则由 Ansible 只向就绪报告中 pending 的主机补传（远程文件校验和一致时不重复上传）
+STAGED=false
+LIMIT_ARGS=()
+if [ "$TREE_DIST" == true ]; then
+    ansible-playbook -i inventory.yml playbooks/upgrade-node.yml --tags download "${PLAYBOOK_ARGS[@]}"
+    rm -f "$READINESS_REPORT"
+    if python3 "$PIPELINE" stage "$UPGRADE_NAME" "$(pwd)/$BUILD_OUTPUT_DIR" all -i inventory.yml \
+        --report "$READINESS_REPORT"; then
+        STAGED=true
+    else
+        PENDING=$(python3 -c 'import json, sys; print(",".join(json.load(open(sys.argv[1])).get("pending", [])))' \
+            "$READINESS_REPORT" 2>/dev/null || true)
+        if [ -n "$PENDING" ]; then
+            echo "⚠️  树形分发未就绪的主机将由 Ansible 上传: $PENDING"
+            LIMIT_ARGS=(--limit "localhost,$PENDING")
+        else
+            echo "⚠️  树形分发失败，所有主机将由 Ansible 上传"
+        fi
+    fi
 fi
+
+# 执行 Ansible
+if [ "$STAGED" != true ]; then
+    ansible-playbook -i inventory.yml playbooks/upgrade-node.yml "${LIMIT_ARGS[@]}" "${PLAYBOOK_ARGS[@]}"
+
+    # 就绪检查：所有节点（包括 sentry）文件校验和与本地一致，且 biyachaind version 可以执行
+    if ! python3 "$PIPELINE" check "$UPGRADE_NAME" "$(pwd)/$BUILD_OUTPUT_DIR" all -i inventory.yml \
+        --strict --report "$READINESS_REPORT"; then
+        echo ""
+        echo "✗ 升级部署未就绪: $UPGRADE_NAME（报告: $READINESS_REPORT）"
+        exit 1
+    fi
+fi
+
+echo ""
+echo "✓ 升级部署完成: $UPGRADE_NAME"
+echo "  就绪报告: $READINESS_REPORT"
+echo "  提交提案后监控恢复: python3 scripts/upgrade_pipeline.py watch $UPGRADE_NAME --height <升级高度>"
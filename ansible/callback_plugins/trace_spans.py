@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Ansible 回调插件：把 playbook、play 和每个主机上的每个任务记录为 span
+格式与 scripts/tracing.py 相同，设置 DEPLOY_TRACE=<文件> 时启用，未设置时不做任何事
+
+- 任务 span 名称为 "<role> : <任务名>"（无 role 时只有任务名），主机为 inventory 主机名
+- exit：成功 0，失败为模块的 rc（没有 rc 时为 1），不可达为 255；跳过的任务记为 skipped
+- bytes_out：模块返回的 size（copy/template 等）或 stdout 长度
+- playbook span 的父 span 来自 DEPLOY_TRACE_PARENT（由 node-control.sh 等 shell 脚本传入）
+
+分析：python3 scripts/tracing.py report <文件>
+"""
+
+import os
+import sys
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts'))
+import tracing  # noqa: E402
+
+DOCUMENTATION = '''
+    name: trace_spans
+    type: aggregate
+    short_description: 以 JSON lines span 记录每个任务的耗时（DEPLOY_TRACE）
+    description:
+      - 设置 DEPLOY_TRACE 环境变量时，把 playbook、play 和每个主机的任务耗时追加到该文件
+    requirements:
+      - 在 ansible.cfg 中启用（callbacks_enabled）
+'''
+
+
+class _Open:
+    """进行中的 span"""
+
+    def __init__(self, name, host, parent, **attrs):
+        self.id = tracing.new_id()
+        self.parent = parent
+        self.name = name
+        self.host = host
+        self.attrs = {k: v for k, v in attrs.items() if v}
+        self.start = time.time()
+        self.clock = time.perf_counter()
+
+    def finish(self, exit_code, bytes_out=0, **attrs):
+        self.attrs.update({k: v for k, v in attrs.items() if v is not None})
+        tracing.emit({
+            'id': self.id, 'parent': self.parent, 'name': self.name, 'host': self.host,
+            'pid': os.getpid(), 'start': round(self.start, 6),
+            'duration': round(time.perf_counter() - self.clock, 6),
+            'exit': exit_code, 'bytes_in': 0, 'bytes_out': bytes_out,
+            'source': 'ansible', 'attrs': self.attrs,
+        })
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'trace_spans'
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self):
+        super(CallbackModule, self).__init__()
+        self.active = tracing.enabled()
+        self.playbook = None
+        self.play = None
+        # (task uuid, 主机) -> 进行中的任务 span
+        self.tasks = {}
+
+    # ---------- playbook / play ----------
+
+    def v2_playbook_on_start(self, playbook):
+        if self.active:
+            name = os.path.basename(getattr(playbook, '_file_name', '') or 'playbook')
+            self.playbook = _Open(f"playbook {name}", tracing.LOCAL_HOST, tracing.current_parent())
+
+    def v2_playbook_on_play_start(self, play):
+        if not self.active:
+            return
+        self._finish_play(0)
+        parent = self.playbook.id if self.playbook else tracing.current_parent()
+        self.play = _Open(f"play {play.get_name().strip()}", tracing.LOCAL_HOST, parent)
+
+    def v2_playbook_on_stats(self, stats):
+        if not self.active:
+            return
+        failed = any(stats.failures.values()) or any(stats.dark.values())
+        # 仍未结束的任务（例如 free 策略下被中断）按失败记录
+        for task in self.tasks.values():
+            task.finish(1, status='interrupted')
+        self.tasks = {}
+        self._finish_play(1 if failed else 0)
+        if self.playbook:
+            self.playbook.finish(1 if failed else 0, hosts=len(stats.processed))
+            self.playbook = None
+
+    def _finish_play(self, exit_code):
+        if self.play:
+            self.play.finish(exit_code)
+            self.play = None
+
+    # ---------- 任务 ----------
+
+    def v2_runner_on_start(self, host, task):
+        if not self.active:
+            return
+        role = task._role.get_name() if task._role else None
+        name = task.get_name().strip()
+        label = name if not role or name.startswith(f"{role} : ") else f"{role} : {name}"
+        parent = self.play.id if self.play else tracing.current_parent()
+        self.tasks[(task._uuid, host.get_name())] = _Open(
+            label, host.get_name(), parent, role=role, action=task.action)
+
+    def _finish_task(self, result, exit_code, status):
+        if not self.active:
+            return
+        current = self.tasks.pop((result._task._uuid, result._host.get_name()), None)
+        if current is None:
+            return
+        data = result._result or {}
+        size = data.get('size')
+        if not isinstance(size, int):
+            size = len(data.get('stdout') or '')
+        current.finish(exit_code, size, status=status, changed=bool(data.get('changed')))
+
+    def v2_runner_on_ok(self, result):
+        self._finish_task(result, 0, 'ok')
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        rc = (result._result or {}).get('rc')
+        self._finish_task(result, rc if isinstance(rc, int) and rc else 1,
+                          'ignored' if ignore_errors else 'failed')
+
+    def v2_runner_on_skipped(self, result):
+        self._finish_task(result, 0, 'skipped')
+
+    def v2_runner_on_unreachable(self, result):
+        self._finish_task(result, 255, 'unreachable')
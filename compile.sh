@@ -23,6 +23,9 @@ SOURCE_DIR="$SCRIPT_DIR/build/biyachain"
 BUILD_DIR="$SCRIPT_DIR/build"
 GO_CACHE_DIR="$BUILD_DIR/go"
 OUTPUT_BIN_DIR="$BUILD_DIR/bin"
+# 编译产物缓存（按提交和工具链索引，超过上限时按 LRU 淘汰）
+BUILD_CACHE_DIR="$BUILD_DIR/cache"
+BUILD_CACHE_MAX_SIZE="10G"
 
 # Ansible 目录
 ANSIBLE_DIR="$SCRIPT_DIR/ansible"
@@ -60,18 +63,27 @@ echo "使用 Ansible: $ANSIBLE_PLAYBOOK"
 echo "检查编译环境并自动安装缺失的工具..."
 if ! ANSIBLE_CONFIG=$ANSIBLE_DIR/ansible.cfg $ANSIBLE_PLAYBOOK $ANSIBLE_DIR/playbooks/check-build-env.yml \
     -e "go_required_version=$GO_REQUIRED_VERSION" \
-    -e "go_min_version=$GO_MIN_VERSION" > /dev/null 2>&1; then
+    -e "go_min_version=$GO_MIN_VERSION" \
+    -e "injective_build_dir=$SOURCE_DIR" \
+    -e "injective_version=$INJECTIVE_VERSION" \
+    -e "build_cache_dir=$BUILD_CACHE_DIR" > /dev/null 2>&1; then
     
     echo ""
     echo "环境检查失败，正在显示详细信息..."
     echo ""
     ANSIBLE_CONFIG=$ANSIBLE_DIR/ansible.cfg $ANSIBLE_PLAYBOOK $ANSIBLE_DIR/playbooks/check-build-env.yml \
         -e "go_required_version=$GO_REQUIRED_VERSION" \
-        -e "go_min_version=$GO_MIN_VERSION"
+        -e "go_min_version=$GO_MIN_VERSION" \
+        -e "injective_build_dir=$SOURCE_DIR" \
+        -e "injective_version=$INJECTIVE_VERSION" \
+        -e "build_cache_dir=$BUILD_CACHE_DIR"
     exit 1
 fi
 
 echo "✓ 环境检查通过"
+# 编译缓存状态（与 check-build-env.yml 报告的相同）
+python3 "$SCRIPT_DIR/scripts/build_cache.py" status "$BUILD_CACHE_DIR" \
+    --repo "$SOURCE_DIR" --ref "$INJECTIVE_VERSION" || true
 
 # 检查 playbook
 if [ ! -f "$ANSIBLE_DIR/playbooks/build-local.yml" ]; then
@@ -89,6 +101,8 @@ ANSIBLE_CONFIG=$ANSIBLE_DIR/ansible.cfg $ANSIBLE_PLAYBOOK -i $ANSIBLE_DIR/invent
     -e "injective_build_dir=$SOURCE_DIR" \
     -e "injective_binary_output_dir=$OUTPUT_BIN_DIR" \
     -e "go_cache_dir=$GO_CACHE_DIR" \
+    -e "build_cache_dir=$BUILD_CACHE_DIR" \
+    -e "build_cache_max_size=$BUILD_CACHE_MAX_SIZE" \
     -e "libwasmvm_download_url=$LIBWASMVM_DOWNLOAD_URL" \
     -e "libwasmvm_version=$LIBWASMVM_VERSION" \
     -e "cosmovisor_version=$COSMOVISOR_VERSION" \
@@ -8,6 +8,8 @@ CLEAN_DATA=true     # 默认清空数据（完全重新部署）
 NODES_ONLY=false    # 仅部署节点
 PEGGO_ONLY=false    # 仅部署跨链桥
 REGISTER_ONLY=false # 仅执行注册（跳过部署）
+TREE_DIST=false     # 树形分发二进制文件
+STATE_SYNC=false    # 新节点从快照状态同步
 
 while [[ $# -gt 0 ]]; do
     case $1 in
@@ -36,6 +38,14 @@ while [[ $# -gt 0 ]]; do
             REGISTER_ONLY=true
             shift
             ;;
+        --tree)
+            TREE_DIST=true
+            shift
+            ;;
+        --state-sync)
+            STATE_SYNC=true
+            shift
+            ;;
         --help)
             echo "用法: $0 [选项]"
             echo ""
@@ -47,6 +57,10 @@ while [[ $# -gt 0 ]]; do
             echo "  --register-only    仅执行 orchestrator 注册（跳过节点和 Peggo 部署）"
             echo "  --no-clean         不清空数据（仅更新二进制和配置）"
             echo "                     默认会清空 /data/biyachain 完全重新部署"
+            echo "  --tree             树形分发二进制文件：控制机只上传到种子主机，其余主机经内网拉取"
+            echo "                     （需要 SSH 公钥认证，且各主机之间可以互相登录）"
+            echo "  --state-sync       与 --host 一起使用：新节点从快照节点状态同步，不从创世区块重放"
+            echo "                     （trust_height/trust_hash 从 node_config.yml 的 state_sync.snapshot_nodes 查询）"
             echo "  --help             显示帮助信息"
             echo ""
             echo "示例:"
@@ -54,6 +68,7 @@ while [[ $# -gt 0 ]]; do
             echo "  $0 --node               仅部署所有节点"
             echo "  $0 --peggo              仅部署 Peggo 跨链桥"
             echo "  $0 --host validator-0   仅部署 validator-0 节点"
+            echo "  $0 --host sentry-2 --state-sync   新增 sentry-2，从快照同步"
             echo "  $0 --register-only      仅注册 orchestrator"
             echo ""
             echo "⚠️  注意："
@@ -127,6 +142,35 @@ if [ ! -d "$CONFIG_DIR_ABS" ]; then
     exit 1
 fi
 
+# 状态同步引导：查询快照节点的可信高度和哈希，写入新节点 config.toml 的 statesync 段
+if [ "$STATE_SYNC" == true ]; then
+    if [ -z "$LIMIT_HOST" ]; then
+        echo "错误: --state-sync 需要与 --host 一起使用（只有新增节点从快照同步）"
+        exit 1
+    fi
+    if [ "$CLEAN_DATA" != true ]; then
+        echo "错误: --state-sync 需要清空节点数据，不能与 --no-clean 一起使用"
+        exit 1
+    fi
+    echo "配置状态同步: $LIMIT_HOST"
+    if ! python3 "$SCRIPT_DIR/scripts/state_sync.py" -i inventory.yml -c "$SCRIPT_DIR/node_config.yml" \
+        bootstrap "$CONFIG_DIR_ABS" "$LIMIT_HOST"; then
+        echo "错误: 状态同步配置失败（可去掉 --state-sync 从创世区块同步）"
+        exit 1
+    fi
+    echo ""
+fi
+
+# 共享文件存入内容寻址存储：各节点目录 bin/ 下为硬链接，manifest.sha256 记录哈希
+# 部署时远程文件哈希与清单一致则跳过上传（未变化的文件哈希有缓存，不重复计算）
+for binary in biyachaind peggo libwasmvm.x86_64.so; do
+    if ! python3 "$SCRIPT_DIR/scripts/artifact_store.py" share "$CONFIG_DIR_ABS" \
+        "bin/$binary" --from "$BINARY_DIR_ABS/$binary" > /dev/null; then
+        echo "错误: 无法将 $binary 存入共享存储"
+        exit 1
+    fi
+done
+
 echo ""
 echo "=========================================="
 echo "           节点部署脚本"
@@ -266,27 +310,8 @@ if [ -n "$LIMIT_HOST" ]; then
     HOSTS="$LIMIT_HOST"
 else
     # 否则获取所有主机
-    HOSTS=$(python3 -c "
-import sys
-try:
-    import yaml
-    with open('inventory.yml') as f:
-        inv = yaml.safe_load(f)
-    hosts = []
-    for group in ['validators', 'sentries']:
-        if group in inv.get('all', {}).get('children', {}):
-            hosts_dict = inv['all']['children'][group].get('hosts', {})
-            hosts.extend(hosts_dict.keys())
-    if hosts:
-        hosts.sort(key=lambda x: (0 if x.startswith('validator') else 1, int(x.split('-')[1])))
-        print(' '.join(hosts))
-except:
-    pass
-" 2>/dev/null)
-
-    if [ -z "$HOSTS" ]; then
-        HOSTS=$(grep -E '^\s+(validator|sentry)-[0-9]+:' inventory.yml | sed 's/.*\(\(validator\|sentry\)-[0-9]*\):.*/\1/' | sort -t- -k1,1 -k2,2n)
-    fi
+    HOSTS=$(python3 "$SCRIPT_DIR/scripts/inventory.py" -i inventory.yml list nodes 2>/dev/null | tr '\n' ' ')
+    HOSTS="${HOSTS% }"
 fi
 
 # 提取 validator 主机列表（用于注册和 Peggo 部署）
@@ -412,9 +437,27 @@ if [ "$SKIP_TO_REGISTER" == false ] && [ "$SKIP_TO_PEGGO" == false ]; then
     echo "=========================================="
     echo ""
 
+# 树形分发：二进制文件预先分发到各主机，部署角色比较哈希后跳过上传
+if [ "$TREE_DIST" == true ]; then
+    if [ "$NEED_PASSWORD" == true ]; then
+        echo "⚠️  树形分发需要 SSH 公钥认证，改为由 Ansible 逐个主机上传"
+    else
+        echo "树形分发二进制文件..."
+        GENESIS_BIN="{node_home_base}/cosmovisor/genesis/bin"
+        if ! python3 "$SCRIPT_DIR/scripts/tree_distribute.py" -i inventory.yml "${HOSTS// /,}" \
+            "$BINARY_DIR_ABS/cosmovisor:{gopath}/bin/cosmovisor:755" \
+            "$BINARY_DIR_ABS/biyachaind:$GENESIS_BIN/biyachaind:755" \
+            "$BINARY_DIR_ABS/libwasmvm.x86_64.so:$GENESIS_BIN/libwasmvm.x86_64.so:644" \
+            "$BINARY_DIR_ABS/peggo:{binary_dir}/peggo:755"; then
+            echo "⚠️  树形分发存在失败主机，这些主机将由 Ansible 上传"
+        fi
+        echo ""
+    fi
+fi
+
 for host in $HOSTS; do
     # 获取服务器IP
-    HOST_IP=$(grep -A 3 "^[[:space:]]*${host}:" inventory.yml | grep "ansible_host:" | awk '{print $2}' | tr -d '"' || echo "未知")
+    HOST_IP=$(python3 "$SCRIPT_DIR/scripts/inventory.py" -i inventory.yml get "$host" ip 2>/dev/null || echo "未知")
     
     if echo "$host" | grep -q "validator"; then
         NODE_TYPE_DESC="共识节点"
@@ -558,7 +601,7 @@ if [ "$SKIP_TO_REGISTER" == false ] && [ "$SKIP_TO_PEGGO" == false ]; then
     echo "检查节点状态..."
     FIRST_VALIDATOR=$(echo "$VALIDATOR_HOSTS" | tr ' ' '\n' | head -n1)
     if [ -n "$FIRST_VALIDATOR" ]; then
-        FIRST_IP=$(grep -A 3 "^[[:space:]]*${FIRST_VALIDATOR}:" inventory.yml | grep "ansible_host:" | awk '{print $2}' | tr -d '"' || echo "")
+        FIRST_IP=$(python3 "$SCRIPT_DIR/scripts/inventory.py" -i inventory.yml get "$FIRST_VALIDATOR" ip 2>/dev/null || echo "")
         if [ -n "$FIRST_IP" ]; then
             echo "正在检查 $FIRST_VALIDATOR ($FIRST_IP) 的 RPC 状态..."
             for i in {1..10}; do
@@ -597,7 +640,7 @@ if [ -z "$FIRST_VALIDATOR" ]; then
     exit 1
 fi
 
-FIRST_IP=$(grep -A 3 "^[[:space:]]*${FIRST_VALIDATOR}:" inventory.yml | grep "ansible_host:" | awk '{print $2}' | tr -d '"' || echo "")
+FIRST_IP=$(python3 "$SCRIPT_DIR/scripts/inventory.py" -i inventory.yml get "$FIRST_VALIDATOR" ip 2>/dev/null || echo "")
 if [ -z "$FIRST_IP" ]; then
     echo "错误: 无法获取节点 IP"
     exit 1
@@ -669,7 +712,7 @@ if [ "$SKIP_TO_REGISTER" == false ]; then
     echo ""
 
 for host in $VALIDATOR_HOSTS; do
-    HOST_IP=$(grep -A 3 "^[[:space:]]*${host}:" inventory.yml | grep "ansible_host:" | awk '{print $2}' | tr -d '"' || echo "未知")
+    HOST_IP=$(python3 "$SCRIPT_DIR/scripts/inventory.py" -i inventory.yml get "$host" ip 2>/dev/null || echo "未知")
     
     echo ""
     echo "=========================================="
@@ -752,7 +795,7 @@ echo ""
 echo "清理敏感密钥文件..."
 
 for host in $HOSTS; do
-    HOST_IP=$(grep -A 3 "^[[:space:]]*${host}:" inventory.yml | grep "ansible_host:" | awk '{print $2}' | tr -d '"' || echo "")
+    HOST_IP=$(python3 "$SCRIPT_DIR/scripts/inventory.py" -i inventory.yml get "$host" ip 2>/dev/null || echo "")
     if [ -n "$HOST_IP" ]; then
         echo "正在清理 $host ($HOST_IP)..."
         
@@ -1,11 +1,20 @@
 #!/bin/bash
 # Biyachain 多节点配置生成脚本
 # 
+# 用法：
+#   ./generate_config.sh               按依赖关系并行生成（scripts/config_pipeline.py，任务日志在 build/pipeline）
+#   ./generate_config.sh --sequential  按固定顺序逐阶段生成
+#   ./generate_config.sh --incremental [--plan] [--allow-genesis-change]
+#                                      增量生成：保留已有密钥，只重建输入有变化的节点（先输出变更计划）
+#   其余参数原样传给 scripts/config_pipeline.py（--sequential 不记录增量生成所需的状态文件）
+#   DEPLOY_TRACE=<文件> ./generate_config.sh
+#                                      记录各阶段和每次链二进制调用的耗时（python3 scripts/tracing.py report <文件>）
+#
 # 功能：
 #   1. 从 inventory.yml 读取节点列表
 #   2. 为每个节点生成独立的配置（包含独立的私钥）
 #   3. 在主节点生成包含所有验证者的 genesis.json
-#   4. 分发 genesis.json 到所有节点
+#   4. 分发 genesis.json 到所有节点（内容寻址存储 + 硬链接，不重复占用磁盘）
 #   5. 配置 persistent_peers（P2P 连接）
 #   6. 应用节点配置（config.toml 和 app.toml）
 #
@@ -21,15 +30,31 @@ MONIKER="biyachain"
 # 创世账号余额
 ORCHESTRATOR_BALANCE="1000000000000000000000000inj"
 VALIDATOR_BALANCE="1000000000000000000000000inj"
+# gentx 质押数量
+VALIDATOR_STAKE="1000000000000000000000inj"
+# 零地址账户（同时作为批量添加账户时的账户类型模板）
+ZERO_ACCOUNT="inj1qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqe2hm49"
+# 以上参数也是 scripts/config_pipeline.py 单独运行时的默认值
 
-CHAIN_BINARY="injectived"
+# 以下路径均可用环境变量覆盖（test/bench/run-bench.py 用存根二进制和合成 inventory 计时）
+CHAIN_BINARY="${CHAIN_BINARY:-injectived}"
 
 # 脚本目录
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+# 结构化计时（设置 DEPLOY_TRACE=<文件> 时记录各阶段 span）
+source "$SCRIPT_DIR/scripts/tracing.sh"
 # Ansible 目录
 ANSIBLE_DIR="$SCRIPT_DIR/ansible"
 # 输出目录
-BASE_DIR="$SCRIPT_DIR/chain-deploy-config"
+BASE_DIR="${BASE_DIR:-$SCRIPT_DIR/chain-deploy-config}"
+# 节点清单
+INVENTORY_FILE="${INVENTORY_FILE:-$ANSIBLE_DIR/inventory.yml}"
+# 节点配置参数
+NODE_CONFIG_FILE="${NODE_CONFIG_FILE:-$SCRIPT_DIR/node_config.yml}"
+# Genesis 账户清单目录
+ACCOUNTS_DIR="$BASE_DIR/genesis-accounts"
+# 主节点（用于生成 genesis.json）
+MASTER_HOME="$BASE_DIR/master"
 
 # 验证者节点配置 - 从 inventory.yml 读取
 declare -A VALIDATORS=()
@@ -38,7 +63,7 @@ declare -A SENTRY_NODES=()
 # 从 inventory.yml 读取节点列表
 load_inventory() {
     # 读取 inventory.yml 配置
-    local inventory_file="$ANSIBLE_DIR/inventory.yml"
+    local inventory_file="$INVENTORY_FILE"
     if [ ! -f "$inventory_file" ]; then
         echo "未找到 inventory.yml: $inventory_file"
         exit 1
@@ -72,14 +97,11 @@ clean_old_data() {
         rm -rf "$BASE_DIR"
     fi
     mkdir -p "$BASE_DIR"
+    mkdir -p "$ACCOUNTS_DIR"
 }
 
-# 初始化主节点（用于生成 genesis.json）
-init_master_node() {
-    MASTER_HOME="$BASE_DIR/master"
-    CONFIG_FILE="$MASTER_HOME/config/config.toml"
-    APP_FILE="$MASTER_HOME/config/app.toml"
-
+# 初始化主节点并合并 genesis_config.yml
+prepare_master_genesis() {
     mkdir -p $MASTER_HOME
     mkdir -p $MASTER_HOME/keyring-test  # 所有钱包使用 test 模式
     mkdir -p $MASTER_HOME/config/gentx
@@ -98,27 +120,32 @@ init_master_node() {
         exit 1
     fi
 
-    # zero address account
-    $CHAIN_BINARY add-genesis-account --chain-id $CHAINID --home $MASTER_HOME inj1qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqe2hm49 1inj
+    # zero address account（同时作为批量添加账户时的账户类型模板）
+    $CHAIN_BINARY add-genesis-account --chain-id $CHAINID --home $MASTER_HOME $ZERO_ACCOUNT 1inj
+}
 
+# 汇总各 validator 的钱包和 gentx，批量添加 Genesis 账户
+add_master_genesis_accounts() {
     for name in $(echo "${!VALIDATORS[@]}" | tr ' ' '\n' | sort); do
         local node_home="$BASE_DIR/$name"
         
         # 复制 validator 和 orchestrator 钱包到 master
         cp -r $node_home/keyring-test/* $MASTER_HOME/keyring-test/
         
-        # 将 validator 账户添加到 genesis.json
-        local validator_addr=$($CHAIN_BINARY keys show $name -a --home $MASTER_HOME --keyring-backend test 2>/dev/null)
-        $CHAIN_BINARY add-genesis-account --chain-id $CHAINID --home $MASTER_HOME $validator_addr $VALIDATOR_BALANCE > /dev/null 2>&1
-        
-        # 将 orchestrator 账户添加到 genesis.json
-        local orch_addr=$($CHAIN_BINARY keys show orchestrator-$name -a --home $MASTER_HOME --keyring-backend test 2>/dev/null)
-        $CHAIN_BINARY add-genesis-account --chain-id $CHAINID --home $MASTER_HOME $orch_addr $ORCHESTRATOR_BALANCE > /dev/null 2>&1
-        
         # 移动 gentx 到 master
         mv $node_home/config/gentx/gentx-*.json $MASTER_HOME/config/gentx/
     done
     
+    # 一次性添加所有 validator 和 orchestrator 账户（清单由 generate_validator_config 生成）
+    # 额外的账户清单（如空投 CSV）可放入 $ACCOUNTS_DIR 一并导入
+    echo "添加 Genesis 账户..."
+    python3 $SCRIPT_DIR/scripts/add_genesis_accounts.py \
+        $MASTER_HOME/config/genesis.json \
+        $ACCOUNTS_DIR/*.csv
+}
+
+# 收集所有 gentx 并校验 genesis.json
+collect_gentxs() {
     # 收集所有 gentx
     echo "Collecting gentx..."
     $CHAIN_BINARY genesis collect-gentxs --home $MASTER_HOME > /dev/null 2>&1
@@ -126,6 +153,13 @@ init_master_node() {
     $CHAIN_BINARY genesis validate --home $MASTER_HOME
 }
 
+# 初始化主节点（用于生成 genesis.json）
+init_master_node() {
+    prepare_master_genesis
+    add_master_genesis_accounts
+    collect_gentxs
+}
+
 generate_validator_config(){
     local name=$1
     local node_home="$BASE_DIR/$name"
@@ -143,8 +177,14 @@ generate_validator_config(){
     local addr=$($CHAIN_BINARY keys show $name -a --home $node_home --keyring-backend test 2>/dev/null)
     $CHAIN_BINARY add-genesis-account --chain-id $CHAINID --home $node_home $addr $VALIDATOR_BALANCE > /dev/null 2>&1
     
+    # 记录主节点 genesis 需要的账户清单（address,amount）
+    local orch_addr=$($CHAIN_BINARY keys show orchestrator-$name -a --home $node_home --keyring-backend test 2>/dev/null)
+    printf '%s,%s\n%s,%s\n' \
+        "$addr" "$VALIDATOR_BALANCE" \
+        "$orch_addr" "$ORCHESTRATOR_BALANCE" > "$ACCOUNTS_DIR/$name.csv"
+    
     # 生成gentx
-    $CHAIN_BINARY genesis gentx $name 1000000000000000000000inj \
+    $CHAIN_BINARY genesis gentx $name $VALIDATOR_STAKE \
             --chain-id $CHAINID \
             --home $node_home \
             --keyring-backend test > /dev/null 2>&1
@@ -156,36 +196,30 @@ generate_sentry_config(){
     
     # 生成配置文件
     $CHAIN_BINARY init $name --chain-id $CHAINID --home $node_home > /dev/null 2>&1
-    # 删除rpc节点不需要的配置
+    # 删除rpc节点不需要的配置（数据目录为空：链已运行时用 deploy-node.sh --state-sync 从快照同步）
     rm -rf $node_home/config/priv_validator_key.json
     rm -rf $node_home/data
 }
 
+# 分发 genesis.json：存入内容寻址存储（$BASE_DIR/.store），各节点目录为硬链接，并写入 manifest.sha256
 copy_genesis(){
-    for name in $(echo "${!VALIDATORS[@]}" | tr ' ' '\n' | sort); do
-        cp $MASTER_HOME/config/genesis.json $BASE_DIR/$name/config/genesis.json
-    done
-    
-    for name in $(echo "${!SENTRY_NODES[@]}" | tr ' ' '\n' | sort); do
-        cp $MASTER_HOME/config/genesis.json $BASE_DIR/$name/config/genesis.json
-    done
+    python3 $SCRIPT_DIR/scripts/artifact_store.py share \
+        $BASE_DIR \
+        config/genesis.json \
+        --from $MASTER_HOME/config/genesis.json
 }
 
 # 生成 orchestrator 密钥文件（在节点根目录，部署时不上传）
 generate_orchestrator_keys(){
     echo "生成 Orchestrator 密钥文件..."
-    for name in $(echo "${!VALIDATORS[@]}" | tr ' ' '\n' | sort); do
-        local node_home="$BASE_DIR/$name"
-        # 从节点的 keyring-test 读取，输出到节点根目录（不在 config/ 下）
-        python3 $SCRIPT_DIR/scripts/generate_orchestrator_keys.py \
-            "$CHAIN_BINARY" \
-            "$node_home" \
-            "$node_home" \
-            "test" \
-            "[\"$name\"]" \
-            "peggo_evm_key.json" > /dev/null 2>&1 &
-    done
-    wait
+    local names=$(printf '"%s",' $(echo "${!VALIDATORS[@]}" | tr ' ' '\n' | sort))
+    # 单进程读取每个节点的 keyring-test，输出到各节点根目录（不在 config/ 下）
+    python3 $SCRIPT_DIR/scripts/generate_orchestrator_keys.py --base-dir \
+        "$CHAIN_BINARY" \
+        "$BASE_DIR" \
+        "test" \
+        "[${names%,}]" \
+        "peggo_evm_key.json" > /dev/null
     echo "✓ Orchestrator 密钥文件生成完成"
 }
 
@@ -196,8 +230,8 @@ configure_persistent_peers(){
     python3 $SCRIPT_DIR/scripts/configure_peers.py \
         $CHAIN_BINARY \
         $BASE_DIR \
-        $SCRIPT_DIR/node_config.yml \
-        $ANSIBLE_DIR/inventory.yml
+        $NODE_CONFIG_FILE \
+        $INVENTORY_FILE
     
     if [ $? -ne 0 ]; then
         echo "✗ P2P 连接配置失败"
@@ -205,61 +239,83 @@ configure_persistent_peers(){
     fi
 }
 
-# 应用节点配置（并行执行 - 使用 Python 脚本）
+# 应用节点配置（批量模式：只加载一次 node_config.yml，进程池并行处理所有节点）
 apply_node_configs(){
-    # 应用验证者节点配置（后台并行）
+    local node_specs=()
     for name in $(echo "${!VALIDATORS[@]}" | tr ' ' '\n' | sort); do
-        python3 $SCRIPT_DIR/scripts/apply_node_config_fast.py \
-            $SCRIPT_DIR/node_config.yml \
-            $BASE_DIR/$name \
-            $name \
-            validator > /dev/null 2>&1 &
+        node_specs+=("$name:validator")
     done
-    
-    # 应用 Sentry 节点配置（后台并行）
     for name in $(echo "${!SENTRY_NODES[@]}" | tr ' ' '\n' | sort); do
-        python3 $SCRIPT_DIR/scripts/apply_node_config_fast.py \
-            $SCRIPT_DIR/node_config.yml \
-            $BASE_DIR/$name \
-            $name \
-            sentry > /dev/null 2>&1 &
+        node_specs+=("$name:sentry")
     done
     
-    # 等待所有配置任务完成
-    wait
+    python3 $SCRIPT_DIR/scripts/apply_node_config_fast.py --batch \
+        $NODE_CONFIG_FILE \
+        $BASE_DIR \
+        "${node_specs[@]}" > /dev/null
     
     echo "✓ 节点配置应用完成"
 }
 
+# 并行生成所有节点的配置和密钥
+generate_node_configs() {
+    for name in $(echo "${!VALIDATORS[@]}" | tr ' ' '\n' | sort); do
+        trace_span -H "$name" generate_validator_config generate_validator_config "$name" &
+    done
+    
+    for name in $(echo "${!SENTRY_NODES[@]}" | tr ' ' '\n' | sort); do
+        trace_span -H "$name" generate_sentry_config generate_sentry_config "$name" &
+    done
+    
+    wait  # 等待所有节点配置生成完成
+}
+
+# 并行流水线：按节点拆分任务，依赖就绪即执行，失败立即停止并输出任务日志
+run_pipeline() {
+    python3 $SCRIPT_DIR/scripts/config_pipeline.py \
+        --binary "$CHAIN_BINARY" \
+        --chain-id "$CHAINID" \
+        --moniker "$MONIKER" \
+        --validator-balance "$VALIDATOR_BALANCE" \
+        --orchestrator-balance "$ORCHESTRATOR_BALANCE" \
+        --stake "$VALIDATOR_STAKE" \
+        --base-dir "$BASE_DIR" \
+        --inventory "$INVENTORY_FILE" \
+        --config "$NODE_CONFIG_FILE" \
+        --genesis-config "$SCRIPT_DIR/genesis_config.yml" \
+        ${PIPELINE_JOBS:+--jobs "$PIPELINE_JOBS"} \
+        "$@"
+}
+
 # 主流程
 main() {
+    if [ "$1" != "--sequential" ]; then
+        trace_span run_pipeline run_pipeline "$@"
+        return
+    fi
+
     # 从 inventory.yml 读取节点列表
     load_inventory
     
     # 执行生成流程
-    clean_old_data
+    trace_span clean_old_data clean_old_data
     echo ""
     
-    for name in $(echo "${!VALIDATORS[@]}" | tr ' ' '\n' | sort); do
-        generate_validator_config "$name" &
-    done
-    
-    for name in $(echo "${!SENTRY_NODES[@]}" | tr ' ' '\n' | sort); do
-        generate_sentry_config "$name" &
-    done
-    
-    wait  # 等待所有节点配置生成完成
+    trace_span generate_node_configs generate_node_configs
 
-    init_master_node
+    trace_span init_master_node init_master_node
     echo ""
     
-    generate_orchestrator_keys  # 生成 orchestrator 密钥文件
+    trace_span generate_orchestrator_keys generate_orchestrator_keys  # 生成 orchestrator 密钥文件
     echo ""
 
-    copy_genesis
-    configure_persistent_peers
-    apply_node_configs
+    trace_span copy_genesis copy_genesis
+    trace_span configure_persistent_peers configure_persistent_peers
+    trace_span apply_node_configs apply_node_configs
 
 }
 
-main
\ No newline at end of file
+# 被 source 时只加载函数（基准测试按阶段调用），直接执行时运行主流程
+if [ "${BASH_SOURCE[0]}" == "$0" ]; then
+    trace_span generate_config main "$@"
+fi
@@ -1,5 +1,5 @@
 #!/bin/bash
-# 查看节点日志脚本（支持节点和 Peggo 日志）
+# 查看节点日志脚本（支持节点和 Peggo 日志，支持多主机合并查看）
 
 set -e
 
@@ -7,23 +7,40 @@ set -e
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 # Ansible 目录
 ANSIBLE_DIR="$SCRIPT_DIR/ansible"
+# 调用者目录（归档文件的相对路径以此为准）
+CALLER_DIR="$(pwd)"
+
+# 查询归档：直接交给 log_stream.py
+if [ "$1" == "query" ]; then
+    shift
+    exec python3 "$SCRIPT_DIR/scripts/log_stream.py" query "$@"
+fi
+
 cd "$ANSIBLE_DIR"
 
 # 解析参数
 HOST_NAME=""
 FOLLOW=false
 LINES=50
-SERVICE_TYPE="node"  # 默认查询节点日志，使用 --peggo 时改为 peggo
-NEED_PASSWORD=""  # 自动检测
+SERVICE_TYPE="node"  # 默认查询节点日志，使用 --peggo 时改为 peggo，--all-services 时两者都查
+STREAM_ARGS=()
 
 show_usage() {
     echo "用法: $0 --host HOST [选项]"
+    echo "      $0 query ARCHIVE [--host h] [--service node|peggo] [--grep regex] [--since t] [--until t]"
     echo ""
     echo "选项:"
-    echo "  --host HOST              查看指定主机日志（必需，如: validator-0, sentry-0）"
-    echo "  --peggo                  查询 Peggo 日志（默认查询节点日志）"
+    echo "  --host HOST               查看指定主机日志（必需，如: validator-0, sentry-0）"
+    echo "                            多个主机用逗号分隔，all 表示全部节点，日志按时间合并显示"
+    echo "  --peggo                   查询 Peggo 日志（默认查询节点日志）"
+    echo "  --all-services            同时查询节点和 Peggo 日志"
     echo "  --follow, -f              实时跟踪日志（类似 tail -f）"
-    echo "  --lines N, -n N           显示最近 N 行日志（默认: 50）"
+    echo "  --lines N, -n N           每个主机显示最近 N 行日志（默认: 50）"
+    echo "  --since TIME              只显示指定时间之后的日志（如: \"10 min ago\"）"
+    echo "  --level LEVEL             只显示该级别及以上: debug | info | warn | error"
+    echo "  --module M1,M2            只显示指定模块（如: consensus,p2p）"
+    echo "  --grep REGEX              按正则过滤（在远程过滤，可重复）"
+    echo "  --archive FILE            同时写入 gzip 压缩的 JSON Lines 归档，之后用 query 查询"
     echo "  --help, -h                显示此帮助信息"
     echo ""
     echo "示例:"
@@ -32,6 +49,9 @@ show_usage() {
     echo "  $0 --host validator-0 -f          实时查看 validator-0 的节点日志"
     echo "  $0 --host validator-0 --peggo -f  实时查看 validator-0 的 Peggo 日志"
     echo "  $0 --host sentry-0 -n 100          查看 sentry-0 最近100行节点日志"
+    echo "  $0 --host all -f --level error     实时查看所有节点的错误日志"
+    echo "  $0 --host validator-0,validator-1 --module consensus --archive /tmp/consensus.jsonl.gz"
+    echo "  $0 query /tmp/consensus.jsonl.gz --host validator-1 --grep 'height=100'"
 }
 
 # 解析命令行参数
@@ -45,6 +65,10 @@ while [[ $# -gt 0 ]]; do
             SERVICE_TYPE="peggo"
             shift
             ;;
+        --all-services)
+            SERVICE_TYPE="all"
+            shift
+            ;;
         --follow|-f)
             FOLLOW=true
             shift
@@ -53,6 +77,18 @@ while [[ $# -gt 0 ]]; do
             LINES="$2"
             shift 2
             ;;
+        --since|--level|--module|--grep)
+            STREAM_ARGS+=("$1" "$2")
+            shift 2
+            ;;
+        --archive)
+            if [[ "$2" == /* ]]; then
+                STREAM_ARGS+=("$1" "$2")
+            else
+                STREAM_ARGS+=("$1" "$CALLER_DIR/$2")
+            fi
+            shift 2
+            ;;
         --help|-h)
             show_usage
             exit 0
@@ -73,100 +109,37 @@ if [ -z "$HOST_NAME" ]; then
     exit 1
 fi
 
-# 确定要查询的主机
-LIMIT_HOST="$HOST_NAME"
-HOST_DESC="$HOST_NAME"
-
-# 确定服务名称模式
-if [ "$SERVICE_TYPE" == "peggo" ]; then
-    SERVICE_PATTERN="peggo"
-    SERVICE_DESC="Peggo 日志"
-else
-    SERVICE_PATTERN="biyachaind"
-    SERVICE_DESC="节点日志"
-fi
-
-# 检测是否需要密码认证
-if [ -z "$NEED_PASSWORD" ]; then
-    # 尝试无密码连接目标主机
-    ansible $LIMIT_HOST -i inventory.yml -m ping -o &>/dev/null
-    if [ $? -eq 0 ]; then
-        NEED_PASSWORD=false
-    else
-        NEED_PASSWORD=true
-    fi
-fi
+# 确定服务描述
+case $SERVICE_TYPE in
+    peggo)
+        SERVICE_PATTERN="peggo"
+        SERVICE_DESC="Peggo 日志"
+        ;;
+    all)
+        SERVICE_PATTERN="biyachaind, peggo"
+        SERVICE_DESC="节点和 Peggo 日志"
+        ;;
+    *)
+        SERVICE_PATTERN="biyachaind"
+        SERVICE_DESC="节点日志"
+        ;;
+esac
 
 # 获取主机信息用于显示
 echo "=========================================="
 echo "查看 $SERVICE_DESC"
 echo "=========================================="
-echo "目标: $HOST_DESC"
+echo "目标: $HOST_NAME"
 echo "服务: $SERVICE_PATTERN"
 if [ "$FOLLOW" == true ]; then
     echo "模式: 实时跟踪（按 Ctrl+C 退出）"
+    STREAM_ARGS+=("--follow")
 else
     echo "模式: 显示最近 $LINES 行"
 fi
 echo "=========================================="
 echo ""
 
-# 构建 ansible 命令
-if [ "$FOLLOW" == true ]; then
-    # 实时跟踪模式：直接跟踪最新日志
-    echo "正在连接服务器并开始实时跟踪日志..."
-    echo ""
-    
-    # 获取服务器IP和用户名
-    SERVER_INFO=$(ansible-inventory -i inventory.yml --host "$LIMIT_HOST" 2>/dev/null | python3 -c "
-import sys, json
-try:
-    data = json.load(sys.stdin)
-    ansible_host = data.get('ansible_host', '')
-    ansible_user = data.get('ansible_user', 'ubuntu')
-    print(f'{ansible_host}|{ansible_user}')
-except:
-    print('')
-" 2>/dev/null)
-    
-    if [ -n "$SERVER_INFO" ] && [ "$SERVER_INFO" != "|" ]; then
-        SERVER_IP=$(echo "$SERVER_INFO" | cut -d'|' -f1)
-        SERVER_USER=$(echo "$SERVER_INFO" | cut -d'|' -f2)
-        
-        if [ -n "$SERVER_IP" ] && [ -n "$SERVER_USER" ]; then
-            # 直接使用 SSH 连接，避免 Ansible 的输出缓冲问题
-            echo "连接到: $SERVER_USER@$SERVER_IP"
-            if [ "$NEED_PASSWORD" == true ]; then
-                echo "提示: 请输入 SSH 密码"
-            fi
-            echo ""
-            ssh -o StrictHostKeyChecking=no \
-                -o UserKnownHostsFile=/dev/null \
-                "$SERVER_USER@$SERVER_IP" \
-                "sudo journalctl -u $SERVICE_PATTERN -f --no-pager"
-            exit $?
-        fi
-    fi
-    
-    # 备用方法：使用 ansible raw 模块
-    if [ "$NEED_PASSWORD" == true ]; then
-        ansible $LIMIT_HOST -i inventory.yml -m raw \
-            -a "sudo journalctl -u $SERVICE_PATTERN -f --no-pager" \
-            --ask-pass --ask-become-pass
-    else
-        ansible $LIMIT_HOST -i inventory.yml -m raw \
-            -a "sudo journalctl -u $SERVICE_PATTERN -f --no-pager" \
-            --become
-    fi
-else
-    # 显示最近N行日志
-    if [ "$NEED_PASSWORD" == true ]; then
-        ansible $LIMIT_HOST -i inventory.yml -m shell \
-            -a "sudo journalctl -u $SERVICE_PATTERN -n $LINES --no-pager" \
-            --ask-pass --ask-become-pass
-    else
-        ansible $LIMIT_HOST -i inventory.yml -m shell \
-            -a "sudo journalctl -u $SERVICE_PATTERN -n $LINES --no-pager" \
-            --become
-    fi
-fi
+# 通过复用的 SSH 连接并发读取各主机日志，按时间戳合并输出
+exec python3 "$SCRIPT_DIR/scripts/log_stream.py" -i inventory.yml \
+    --service "$SERVICE_TYPE" -n "$LINES" "${STREAM_ARGS[@]}" "$HOST_NAME"
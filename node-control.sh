@@ -8,6 +8,8 @@
 # 配置
 # 脚本目录
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+# 结构化计时（设置 DEPLOY_TRACE=<文件> 时记录每个操作的 span，见 scripts/tracing.sh）
+source "$SCRIPT_DIR/scripts/tracing.sh"
 # Ansible 目录
 ANSIBLE_DIR="$SCRIPT_DIR/ansible"
 cd "$ANSIBLE_DIR"
@@ -22,6 +24,11 @@ YELLOW='\033[1;33m'
 BLUE='\033[0;34m'
 NC='\033[0m' # No Color
 
+# 查询 inventory（使用缓存索引，见 scripts/inventory.py）
+inventory_query() {
+    python3 "$SCRIPT_DIR/scripts/inventory.py" -i "$INVENTORY_FILE" "$@"
+}
+
 # 打印函数
 log_info() {
     echo -e "${BLUE}[INFO]${NC} $1"
@@ -48,16 +55,21 @@ show_usage() {
 
 用法:
     $0 <action> <service> <node> [options]
+    $0 health [node|all] [--watch [秒]] [--json] [--ssh-tunnel]
+    $0 drift [node|all] [--fix] [--ignore <键>] [--json]
 
 参数:
     action          操作类型 ( start | stop | restart | status )
     service         服务类型 ( node | peggo | all )
-    node            节点名称 ( validator-0 | sentry-0 | all )
+    node            节点名称 ( validator-0 | sentry-0 | validator-0,sentry-0 | all )
 
 选项:
     --sync-keys     启动前同步私钥文件 (默认启用)
     --no-sync-keys  启动前不同步私钥文件
     --force         强制停止 (使用 kill -9)
+    --parallel N    多节点操作时的最大并发主机数 (默认 10)
+    --rolling N     滚动模式: 每批 N 个节点，等待出块后再处理下一批
+    --wait-timeout S  滚动模式等待出块的超时秒数 (默认 180)
 
 服务说明:
     node            仅操作区块链节点服务 (biyachaind)
@@ -82,8 +94,8 @@ get_node_info() {
         return 1
     fi
     
-    # 从 inventory.yml 获取 IP 地址 (支持不同缩进级别)
-    NODE_IP=$(grep -A 5 "$node:" "$INVENTORY_FILE" | grep "ansible_host:" | awk '{print $2}' | head -1 || echo "")
+    # 从 inventory 索引获取 IP 地址
+    NODE_IP=$(inventory_query get "$node" ip 2>/dev/null || echo "")
     
     if [ -z "$NODE_IP" ]; then
         log_error "无法从 inventory.yml 中找到节点 $node 的 IP 地址"
@@ -106,45 +118,19 @@ get_node_info() {
 }
 
 # 同步节点私钥文件到目标服务器
+# 比较远程哈希后只发送有变化的文件（单个归档流），见 scripts/secret_sync.py
+# 私钥文件启动后保留在主机上（与 deploy-node 相同），未变化时不再发送
 sync_node_keys() {
     local node=$1
     
     log_info "同步节点私钥文件到 $node ($NODE_IP)..."
     
-    # 检查必需的文件
-    local node_key="$CONFIG_PATH/node_key.json"
-    
-    if [ ! -f "$node_key" ]; then
-        log_error "node_key.json 不存在: $node_key"
+    trace_span -H "$node" "secret_sync node" \
+        python3 "$SCRIPT_DIR/scripts/secret_sync.py" -i "$INVENTORY_FILE" --config-dir "$CONFIG_DIR" \
+        --only node "$node" || {
+        log_error "节点私钥文件同步失败"
         return 1
-    fi
-    
-    # 复制 node_key.json
-    log_info "  - 复制 node_key.json"
-    scp -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null \
-        "$node_key" ubuntu@$NODE_IP:/tmp/node_key.json.tmp || return 1
-    
-    ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null \
-        ubuntu@$NODE_IP "sudo mv /tmp/node_key.json.tmp /data/biyachain/config/node_key.json && \
-        sudo chmod 644 /data/biyachain/config/node_key.json" || return 1
-    
-    # 如果是 validator，还需要复制 priv_validator_key.json
-    if [ "$NODE_TYPE" == "validator" ]; then
-        local priv_validator_key="$CONFIG_PATH/priv_validator_key.json"
-        
-        if [ ! -f "$priv_validator_key" ]; then
-            log_error "priv_validator_key.json 不存在: $priv_validator_key"
-            return 1
-        fi
-        
-        log_info "  - 复制 priv_validator_key.json"
-        scp -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null \
-            "$priv_validator_key" ubuntu@$NODE_IP:/tmp/priv_validator_key.json.tmp || return 1
-        
-        ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null \
-            ubuntu@$NODE_IP "sudo mv /tmp/priv_validator_key.json.tmp /data/biyachain/config/priv_validator_key.json && \
-            sudo chmod 600 /data/biyachain/config/priv_validator_key.json" || return 1
-    fi
+    }
     
     log_success "节点私钥文件同步完成"
     return 0
@@ -171,21 +157,10 @@ sync_peggo_keys() {
         return 1
     fi
     
-    log_info "  - 上传 .env 文件"
-    
-    # 上传 .env 文件到远程服务器
-    scp -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null \
-        "$env_file" ubuntu@$NODE_IP:/tmp/peggo.env.tmp || {
-        log_error "上传 .env 文件失败"
-        return 1
-    }
-    
-    # 创建 peggo 目录并移动文件
-    ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null \
-        ubuntu@$NODE_IP "mkdir -p $PEGGO_HOME && \
-        mv /tmp/peggo.env.tmp $PEGGO_HOME/.env && \
-        chmod 600 $PEGGO_HOME/.env" || {
-        log_error "配置 .env 文件失败"
+    trace_span -H "$node" "secret_sync peggo" \
+        python3 "$SCRIPT_DIR/scripts/secret_sync.py" -i "$INVENTORY_FILE" --config-dir "$CONFIG_DIR" \
+        --only peggo "$node" || {
+        log_error "Peggo 配置文件同步失败"
         return 1
     }
     
@@ -269,16 +244,6 @@ start_node() {
         local height=$(ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null \
             ubuntu@$NODE_IP "curl -s http://localhost:26757/status 2>/dev/null | jq -r '.result.sync_info.latest_block_height' 2>/dev/null" || echo "N/A")
         log_info "当前区块高度: $height"
-        
-        # 等待节点稳定后删除敏感文件
-        if [ "$sync_keys_flag" == "true" ]; then
-            log_info "等待节点稳定 (5秒)..."
-            sleep 5
-            log_info "删除远程敏感密钥文件..."
-            ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null \
-                ubuntu@$NODE_IP "rm -f /data/biyachain/config/node_key.json /data/biyachain/config/priv_validator_key.json" 2>/dev/null || true
-            log_success "敏感文件已删除"
-        fi
     else
         log_error "节点启动失败，状态: $status"
         log_info "查看日志: ssh ubuntu@$NODE_IP 'sudo journalctl -u biyachaind -n 50'"
@@ -370,16 +335,6 @@ start_peggo() {
     
     if [ "$status" == "active" ]; then
         log_success "Peggo 已启动"
-        
-        # 等待 Peggo 完成初始化后删除 .env 文件
-        if [ "$sync_keys_flag" == "true" ]; then
-            log_info "等待 Peggo 完成初始化 (10秒)..."
-            sleep 10
-            log_info "删除远程 .env 文件..."
-            ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null \
-                ubuntu@$NODE_IP "rm -f $PEGGO_HOME/.env" 2>/dev/null || true
-            log_success ".env 文件已删除"
-        fi
     else
         log_error "Peggo 启动失败，状态: $status"
         log_info "查看日志: ssh ubuntu@$NODE_IP 'sudo journalctl -u peggo -n 50'"
@@ -500,14 +455,33 @@ status_node() {
     return 0
 }
 
+# 对当前节点执行一个操作并记录 span（名称为函数名，主机为节点名）
+node_op() {
+    trace_span -H "$NODE" "$1" "$@"
+}
+
 # 获取所有节点列表
 get_all_nodes() {
-    # 支持 2 个或 4 个空格的缩进
-    grep -E "^ {2,4}(validator|sentry)-[0-9]+:" "$INVENTORY_FILE" | sed 's/://g' | awk '{print $1}'
+    inventory_query list nodes
 }
 
 # 主函数
 main() {
+    # 链健康状态：并发查询所有节点 RPC（不需要 service 参数）
+    if [ "$1" == "health" ]; then
+        shift
+        trace_span health python3 "$SCRIPT_DIR/scripts/chain_status.py" -i "$INVENTORY_FILE" "$@"
+        exit $?
+    fi
+    
+    # 配置漂移：远程 config.toml / app.toml / genesis / 二进制文件与本地生成的配置比较
+    if [ "$1" == "drift" ]; then
+        shift
+        trace_span drift python3 "$SCRIPT_DIR/scripts/config_drift.py" -i "$INVENTORY_FILE" \
+            --config-dir "$CONFIG_DIR" "$@"
+        exit $?
+    fi
+    
     if [ $# -lt 3 ]; then
         show_usage
         exit 1
@@ -518,6 +492,9 @@ main() {
     NODE=$3
     SYNC_KEYS=true
     FORCE=false
+    PARALLEL=10
+    ROLLING=""
+    WAIT_TIMEOUT=""
     
     # 解析选项
     shift 3
@@ -535,6 +512,18 @@ main() {
                 FORCE=true
                 shift
                 ;;
+            --parallel)
+                PARALLEL=$2
+                shift 2
+                ;;
+            --rolling)
+                ROLLING=$2
+                shift 2
+                ;;
+            --wait-timeout)
+                WAIT_TIMEOUT=$2
+                shift 2
+                ;;
             *)
                 log_error "未知选项: $1"
                 show_usage
@@ -550,161 +539,16 @@ main() {
         exit 1
     fi
     
-    # 处理 all 节点
-    if [ "$NODE" == "all" ]; then
-        log_info "操作所有节点..."
-        ALL_NODES=$(get_all_nodes)
-        
-        if [ -z "$ALL_NODES" ]; then
-            log_error "未找到任何节点"
-            exit 1
-        fi
-        
-        SUCCESS_COUNT=0
-        FAIL_COUNT=0
-        
-        for node in $ALL_NODES; do
-            echo ""
-            log_info "处理节点: $node"
-            
-            if ! get_node_info "$node"; then
-                ((FAIL_COUNT++))
-                continue
-            fi
-            
-            # 根据服务类型执行操作
-            case $SERVICE in
-                node)
-                    case $ACTION in
-                        start)
-                            if start_node "$node" "$SYNC_KEYS"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        stop)
-                            if stop_node "$node" "$FORCE"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        restart)
-                            if restart_node "$node" "$SYNC_KEYS"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        status)
-                            if status_node "$node"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        *)
-                            log_error "未知操作: $ACTION"
-                            show_usage
-                            exit 1
-                            ;;
-                    esac
-                    ;;
-                peggo)
-                    case $ACTION in
-                        start)
-                            if start_peggo "$node" "$SYNC_KEYS"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        stop)
-                            if stop_peggo "$node" "$FORCE"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        restart)
-                            if restart_peggo "$node" "$SYNC_KEYS"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        status)
-                            if status_peggo "$node"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        *)
-                            log_error "未知操作: $ACTION"
-                            show_usage
-                            exit 1
-                            ;;
-                    esac
-                    ;;
-                all)
-                    case $ACTION in
-                        start)
-                            if start_node "$node" "$SYNC_KEYS" && start_peggo "$node" "$SYNC_KEYS"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        stop)
-                            if stop_peggo "$node" "$FORCE" && stop_node "$node" "$FORCE"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        restart)
-                            if restart_node "$node" "$SYNC_KEYS" && restart_peggo "$node" "$SYNC_KEYS"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        status)
-                            if status_node "$node" && status_peggo "$node"; then
-                                ((SUCCESS_COUNT++))
-                            else
-                                ((FAIL_COUNT++))
-                            fi
-                            ;;
-                        *)
-                            log_error "未知操作: $ACTION"
-                            show_usage
-                            exit 1
-                            ;;
-                    esac
-                    ;;
-                *)
-                    log_error "未知服务类型: $SERVICE"
-                    show_usage
-                    exit 1
-                    ;;
-            esac
-            
-            sleep 1
-        done
-        
-        echo ""
-        echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-        log_info "操作完成: 成功 $SUCCESS_COUNT, 失败 $FAIL_COUNT"
-        echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-        
-        if [ $FAIL_COUNT -gt 0 ]; then
-            exit 1
-        fi
+    # 处理 all 节点：交给并发集群控制器（每个主机一条复用 SSH 连接，结果汇总为一张表）
+    if [ "$NODE" == "all" ] || [[ "$NODE" == *,* ]]; then
+        local fleet_args=(-i "$INVENTORY_FILE" --config-dir "$CONFIG_DIR" --parallel "$PARALLEL")
+        [ "$SYNC_KEYS" == "false" ] && fleet_args+=(--no-sync-keys)
+        [ "$FORCE" == "true" ] && fleet_args+=(--force)
+        [ -n "$ROLLING" ] && fleet_args+=(--rolling "$ROLLING")
+        [ -n "$WAIT_TIMEOUT" ] && fleet_args+=(--wait-timeout "$WAIT_TIMEOUT")
         
-        exit 0
+        trace_span "fleet_control $ACTION $SERVICE" python3 "$SCRIPT_DIR/scripts/fleet_control.py" "$ACTION" "$SERVICE" "$NODE" "${fleet_args[@]}"
+        exit $?
     fi
     
     # 处理单个节点
@@ -717,16 +561,16 @@ main() {
         node)
             case $ACTION in
                 start)
-                    start_node "$NODE" "$SYNC_KEYS"
+                    node_op start_node "$NODE" "$SYNC_KEYS"
                     ;;
                 stop)
-                    stop_node "$NODE" "$FORCE"
+                    node_op stop_node "$NODE" "$FORCE"
                     ;;
                 restart)
-                    restart_node "$NODE" "$SYNC_KEYS"
+                    node_op restart_node "$NODE" "$SYNC_KEYS"
                     ;;
                 status)
-                    status_node "$NODE"
+                    node_op status_node "$NODE"
                     ;;
                 *)
                     log_error "未知操作: $ACTION"
@@ -738,16 +582,16 @@ main() {
         peggo)
             case $ACTION in
                 start)
-                    start_peggo "$NODE" "$SYNC_KEYS"
+                    node_op start_peggo "$NODE" "$SYNC_KEYS"
                     ;;
                 stop)
-                    stop_peggo "$NODE" "$FORCE"
+                    node_op stop_peggo "$NODE" "$FORCE"
                     ;;
                 restart)
-                    restart_peggo "$NODE" "$SYNC_KEYS"
+                    node_op restart_peggo "$NODE" "$SYNC_KEYS"
                     ;;
                 status)
-                    status_peggo "$NODE"
+                    node_op status_peggo "$NODE"
                     ;;
                 *)
                     log_error "未知操作: $ACTION"
@@ -759,16 +603,16 @@ main() {
         all)
             case $ACTION in
                 start)
-                    start_node "$NODE" "$SYNC_KEYS" && start_peggo "$NODE" "$SYNC_KEYS"
+                    node_op start_node "$NODE" "$SYNC_KEYS" && node_op start_peggo "$NODE" "$SYNC_KEYS"
                     ;;
                 stop)
-                    stop_peggo "$NODE" "$FORCE" && stop_node "$NODE" "$FORCE"
+                    node_op stop_peggo "$NODE" "$FORCE" && node_op stop_node "$NODE" "$FORCE"
                     ;;
                 restart)
-                    restart_node "$NODE" "$SYNC_KEYS" && restart_peggo "$NODE" "$SYNC_KEYS"
+                    node_op restart_node "$NODE" "$SYNC_KEYS" && node_op restart_peggo "$NODE" "$SYNC_KEYS"
                     ;;
                 status)
-                    status_node "$NODE" && status_peggo "$NODE"
+                    node_op status_node "$NODE" && node_op status_peggo "$NODE"
                     ;;
                 *)
                     log_error "未知操作: $ACTION"
@@ -786,5 +630,5 @@ main() {
 }
 
 # 执行主函数
-main "$@"
+trace_span node-control main "$@"
 
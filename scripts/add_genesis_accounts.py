@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+批量添加 Genesis 账户
+一次性将清单中的地址和余额写入 auth.accounts / bank.balances，
+并同步更新 bank.supply，替代逐个调用 add-genesis-account
+
+清单格式：
+- CSV:       address,amount（多币种用 ";" 分隔，如 "100inj;5usdt"；
+             Cosmos 常用的逗号分隔会被 CSV 拆成多列，须加引号："100inj,5usdt"）
+- YAML/JSON: [{address: ..., amount: ...}] 或 {address: amount}
+"""
+
+import copy
+import csv
+import re
+import sys
+import yaml
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import bech32
+from merge_genesis import atomic_write, dump_json, load_json
+
+
+COIN_RE = re.compile(r'^\s*(\d+)\s*([a-zA-Z][a-zA-Z0-9/:._-]{2,127})\s*$')
+
+# genesis 中没有任何账户时使用的模板
+BASE_ACCOUNT_TEMPLATE = {
+    "@type": "/cosmos.auth.v1beta1.BaseAccount",
+    "address": "",
+    "pub_key": None,
+    "account_number": "0",
+    "sequence": "0",
+}
+
+
+def parse_coins(amount: str) -> Dict[str, int]:
+    """解析 "100inj,5usdt" 或 "100inj;5usdt" 格式的金额"""
+    coins: Dict[str, int] = {}
+    for part in re.split(r'[,;]', str(amount)):
+        if not part.strip():
+            continue
+        m = COIN_RE.match(part)
+        if not m:
+            raise ValueError(f"无效的金额: {part}")
+        value, denom = m.groups()
+        coins[denom] = coins.get(denom, 0) + int(value)
+    return coins
+
+
+def load_manifest(file_path: str) -> List[Tuple[str, str]]:
+    """加载账户清单，返回 [(address, amount)]"""
+    path = Path(file_path)
+    entries = []
+
+    if path.suffix.lower() in ('.yml', '.yaml', '.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or []
+        if isinstance(data, dict):
+            data = [{'address': k, 'amount': v} for k, v in data.items()]
+        for item in data:
+            entries.append((str(item['address']).strip(), str(item['amount']).strip()))
+        return entries
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+                continue
+            if row[0].strip().lower() == 'address':
+                continue
+            if len(row) < 2:
+                raise ValueError(f"{file_path}: 缺少金额列: {row}")
+            if any(cell.strip() for cell in row[2:]):
+                raise ValueError(f"{file_path}: 多余的列: {','.join(row)}"
+                                 f"（多币种用 \";\" 分隔，如 100inj;5usdt，或给金额加引号）")
+            entries.append((row[0].strip(), row[1].strip()))
+    return entries
+
+
+def _account_body(account: Dict) -> Dict:
+    """返回包含 address/account_number 的账户主体（兼容 EthAccount 的 base_account 嵌套）"""
+    if 'address' in account:
+        return account
+    for value in account.values():
+        if isinstance(value, dict) and 'address' in value:
+            return value
+    return account
+
+
+def _address_key(address: str) -> bytes:
+    """与 SDK 一致按地址字节排序"""
+    _, data = bech32.decode(address)
+    return data if data is not None else address.encode()
+
+
+def add_accounts(genesis: Dict, entries: List[Tuple[str, str]]) -> Tuple[int, int]:
+    """
+    将账户写入 genesis（原地修改）
+    已存在的地址只累加余额，不重复创建账户
+    返回 (新增账户数, 更新余额数)
+    """
+    app_state = genesis.setdefault('app_state', {})
+    auth = app_state.setdefault('auth', {})
+    bank = app_state.setdefault('bank', {})
+    accounts = auth.setdefault('accounts', []) or []
+    balances = bank.setdefault('balances', []) or []
+    auth['accounts'] = accounts
+    bank['balances'] = balances
+
+    template = copy.deepcopy(accounts[0]) if accounts else copy.deepcopy(BASE_ACCOUNT_TEMPLATE)
+    template_body = _account_body(template)
+    template_body['pub_key'] = None
+    template_body['sequence'] = "0"
+
+    existing = {_account_body(acc).get('address') for acc in accounts}
+    used_numbers = set()
+    for acc in accounts:
+        try:
+            used_numbers.add(int(_account_body(acc).get('account_number', 0)))
+        except (TypeError, ValueError):
+            pass
+
+    balance_index = {b['address']: b for b in balances}
+    supply = {c['denom']: int(c['amount']) for c in bank.get('supply') or []}
+
+    next_number = 0
+    created = 0
+    updated = 0
+
+    for address, amount in entries:
+        hrp, data = bech32.decode(address)
+        if hrp is None or not data:
+            raise ValueError(f"无效的地址: {address}")
+        coins = parse_coins(amount)
+
+        if address not in existing:
+            while next_number in used_numbers:
+                next_number += 1
+            account = copy.deepcopy(template)
+            body = _account_body(account)
+            body['address'] = address
+            body['account_number'] = str(next_number)
+            used_numbers.add(next_number)
+            accounts.append(account)
+            existing.add(address)
+            created += 1
+
+        balance = balance_index.get(address)
+        if balance is None:
+            balance = {'address': address, 'coins': []}
+            balance_index[address] = balance
+            balances.append(balance)
+        else:
+            updated += 1
+
+        merged = {c['denom']: int(c['amount']) for c in balance.get('coins') or []}
+        for denom, value in coins.items():
+            merged[denom] = merged.get(denom, 0) + value
+            supply[denom] = supply.get(denom, 0) + value
+        balance['coins'] = [{'denom': d, 'amount': str(merged[d])} for d in sorted(merged)]
+
+    accounts.sort(key=lambda acc: int(_account_body(acc).get('account_number', 0) or 0))
+    balances.sort(key=lambda b: _address_key(b['address']))
+    bank['supply'] = [{'denom': d, 'amount': str(supply[d])} for d in sorted(supply)]
+
+    return created, updated
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("用法: add_genesis_accounts.py <genesis.json> <manifest> [manifest ...]")
+        print("")
+        print("清单格式:")
+        print("  CSV:       address,amount（多币种用 \";\" 分隔: inj1...,100inj;5usdt）")
+        print("  YAML/JSON: [{address: ..., amount: ...}] 或 {address: amount}")
+        print("")
+        print("示例: add_genesis_accounts.py config/genesis.json accounts.csv airdrop.csv")
+        sys.exit(1)
+
+    genesis_file = sys.argv[1]
+    manifests = sys.argv[2:]
+
+    for file_path in [genesis_file] + manifests:
+        if not Path(file_path).exists():
+            print(f"错误: 文件不存在: {file_path}", file=sys.stderr)
+            sys.exit(1)
+
+    try:
+        entries = []
+        for manifest in manifests:
+            entries.extend(load_manifest(manifest))
+
+        genesis = load_json(genesis_file)
+        created, updated = add_accounts(genesis, entries)
+        atomic_write(genesis_file, lambda f: f.write(dump_json(genesis).encode('utf-8')))
+    except Exception as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"✓ 已添加 {created} 个 Genesis 账户（更新余额 {updated} 个，共 {len(entries)} 条记录）")
+
+
+if __name__ == "__main__":
+    main()
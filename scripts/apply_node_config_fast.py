@@ -1,12 +1,20 @@
 #!/usr/bin/env python3
 """
-快速应用节点配置 - 单个节点版本
+快速应用节点配置
+- 单节点模式：apply_node_config_fast.py <config.yml> <node_dir> <node_name> <node_type>
+- 批量模式：  apply_node_config_fast.py --batch <config.yml> <base_dir> <node_name:node_type> ...
+  批量模式只加载一次 node_config.yml，并通过进程池并行处理所有节点
 """
 
-import yaml
-import re
+import os
 import sys
+import yaml
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from toml_patch import patch_toml_file
+
 
 def merge_config(base, override):
     result = base.copy() if base else {}
@@ -14,71 +22,148 @@ def merge_config(base, override):
         result.update(override)
     return result
 
+
+def load_node_config(config_file: str) -> Dict:
+    """加载 node_config.yml"""
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def resolve_node_params(config: Dict, node_name: str, node_type: str) -> Tuple[Dict, Dict]:
+    """
+    按 global -> node_type -> specific_nodes 的优先级合并配置，快照节点再叠加 state_sync 段
+    返回 (config_toml 参数, app_toml 参数)
+    """
+    global_cfg = config.get('global') or {}
+    type_cfg = config.get(node_type) or {}
+    specific_cfg = (config.get('specific_nodes') or {}).get(node_name) or {}
+
+    config_toml_params = merge_config(
+        merge_config(global_cfg.get('config_toml'), type_cfg.get('config_toml')),
+        specific_cfg.get('config_toml')
+    )
+
+    app_toml_params = merge_config(
+        merge_config(global_cfg.get('app_toml'), type_cfg.get('app_toml')),
+        specific_cfg.get('app_toml')
+    )
+
+    # state_sync.snapshot_nodes 为新节点提供状态同步快照（见 state_sync.py）
+    state_sync = config.get('state_sync') or {}
+    if node_name in (state_sync.get('snapshot_nodes') or []):
+        app_toml_params['state-sync.snapshot-interval'] = state_sync.get('snapshot_interval', 1000)
+        app_toml_params['state-sync.snapshot-keep-recent'] = state_sync.get('snapshot_keep_recent', 2)
+
+    return config_toml_params, app_toml_params
+
+
 def apply_toml(file_path, params):
-    if not Path(file_path).exists():
-        return
-    
-    with open(file_path, 'r') as f:
-        content = f.read()
-    
-    for key, value in params.items():
-        # 格式化值
-        if isinstance(value, bool):
-            new_value = str(value).lower()
-        elif isinstance(value, (int, float)):
-            new_value = str(value)
-        else:
-            new_value = f'"{value}"'
-        
-        if '.' in key:
-            # 段内参数 (如 api.enable)
-            section, param = key.rsplit('.', 1)
-            # 匹配段标记后的参数，只匹配到行尾（不包括换行符）
-            pattern = rf'(\[{re.escape(section)}\][^\[]*?)({re.escape(param)}\s*=\s*)[^\n]*'
-            replacement = rf'\g<1>\g<2>{new_value}'
-            content = re.sub(pattern, replacement, content, flags=re.DOTALL)
-        else:
-            # 简单参数 - 只匹配该行的值部分（不包括换行符）
-            pattern = rf'^({re.escape(key)}\s*=\s*)[^\n]*'
-            replacement = rf'\g<1>{new_value}'
-            content = re.sub(pattern, replacement, content, flags=re.MULTILINE)
-    
-    with open(file_path, 'w') as f:
-        f.write(content)
+    """一次扫描应用所有参数，返回未找到的参数列表（文件不存在时返回 None）"""
+    return patch_toml_file(file_path, params)
+
+
+def apply_node_config(config: Dict, node_dir: str, node_name: str, node_type: str) -> List[str]:
+    """应用单个节点的配置，返回未找到的参数（带文件前缀）"""
+    config_toml_params, app_toml_params = resolve_node_params(config, node_name, node_type)
+    missing = []
+
+    if config_toml_params:
+        result = apply_toml(f"{node_dir}/config/config.toml", config_toml_params)
+        missing.extend(f"config.toml:{key}" for key in result or [])
+
+    if app_toml_params:
+        result = apply_toml(f"{node_dir}/config/app.toml", app_toml_params)
+        missing.extend(f"app.toml:{key}" for key in result or [])
+
+    return missing
+
+
+# 进程池中各 worker 共享的配置（通过 initializer 设置，避免每个任务重复序列化）
+_WORKER_CONFIG: Optional[Dict] = None
+
+
+def _init_worker(config: Dict):
+    global _WORKER_CONFIG
+    _WORKER_CONFIG = config
+
+
+def _apply_worker(task: Tuple[str, str, str]) -> Tuple[str, Optional[str], List[str]]:
+    node_dir, node_name, node_type = task
+    try:
+        return node_name, None, apply_node_config(_WORKER_CONFIG, node_dir, node_name, node_type)
+    except Exception as e:
+        return node_name, str(e), []
+
+
+def apply_batch(config_file: str, base_dir: str, nodes: List[Tuple[str, str]],
+                workers: Optional[int] = None) -> int:
+    """批量应用所有节点配置，返回失败节点数"""
+    config = load_node_config(config_file)
+    tasks = [(f"{base_dir}/{name}", name, node_type) for name, node_type in nodes]
+
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    if workers <= 1:
+        _init_worker(config)
+        results = [_apply_worker(task) for task in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(config,)) as executor:
+            results = list(executor.map(_apply_worker, tasks, chunksize=chunksize))
+
+    failed = 0
+    for name, error, missing in results:
+        if error:
+            failed += 1
+            print(f"  ✗ {name}: {error}", file=sys.stderr)
+            continue
+        if missing:
+            print(f"  ⚠ {name}: 未找到参数 {', '.join(missing)}", file=sys.stderr)
+        print(f"  ✓ {name}")
+
+    print(f"✓ 已应用 {len(results) - failed}/{len(results)} 个节点配置")
+    return failed
+
+
+def parse_node_specs(specs: List[str]) -> List[Tuple[str, str]]:
+    """解析 node_name:node_type 参数"""
+    nodes = []
+    for spec in specs:
+        if ':' not in spec:
+            print(f"错误: 无效的节点参数（应为 node_name:node_type）: {spec}", file=sys.stderr)
+            sys.exit(1)
+        name, node_type = spec.split(':', 1)
+        nodes.append((name, node_type))
+    return nodes
+
 
 def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == '--batch':
+        if len(sys.argv) < 5:
+            print("用法: apply_node_config_fast.py --batch <config.yml> <base_dir> <node_name:node_type> ...")
+            print("示例: apply_node_config_fast.py --batch node_config.yml ./chain-deploy-config validator-0:validator sentry-0:sentry")
+            sys.exit(1)
+
+        config_file, base_dir = sys.argv[2:4]
+        if not Path(config_file).exists():
+            print(f"错误: 配置文件不存在: {config_file}", file=sys.stderr)
+            sys.exit(1)
+
+        nodes = parse_node_specs(sys.argv[4:])
+        sys.exit(1 if apply_batch(config_file, base_dir, nodes) else 0)
+
     if len(sys.argv) != 5:
         print("用法: apply_node_config_fast.py <config.yml> <node_dir> <node_name> <node_type>")
+        print("      apply_node_config_fast.py --batch <config.yml> <base_dir> <node_name:node_type> ...")
         sys.exit(1)
-    
+
     config_file, node_dir, node_name, node_type = sys.argv[1:5]
-    
+
     # 加载配置
-    with open(config_file, 'r') as f:
-        config = yaml.safe_load(f)
-    
-    # 合并配置
-    global_cfg = config.get('global', {})
-    type_cfg = config.get(node_type, {})
-    specific_cfg = config.get('specific_nodes', {}).get(node_name, {})
-    
-    config_toml_params = merge_config(
-        merge_config(global_cfg.get('config_toml', {}), type_cfg.get('config_toml', {})),
-        specific_cfg.get('config_toml', {})
-    )
-    
-    app_toml_params = merge_config(
-        merge_config(global_cfg.get('app_toml', {}), type_cfg.get('app_toml', {})),
-        specific_cfg.get('app_toml', {})
-    )
-    
-    # 应用配置
-    if config_toml_params:
-        apply_toml(f"{node_dir}/config/config.toml", config_toml_params)
-    
-    if app_toml_params:
-        apply_toml(f"{node_dir}/config/app.toml", app_toml_params)
+    config = load_node_config(config_file)
+
+    # 合并并应用配置
+    apply_node_config(config, node_dir, node_name, node_type)
 
 if __name__ == "__main__":
     main()
-
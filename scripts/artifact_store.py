@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+内容寻址的共享文件存储
+- genesis.json、二进制文件、WASM 库等所有节点相同的文件只在
+  chain-deploy-config/.store/objects/<sha256 前两位>/<sha256> 保存一份
+- 各节点目录中的同名文件是指向存储对象的硬链接，不额外占用磁盘
+- 每个节点目录有一份 manifest.sha256（sha256sum 格式），部署时与远程文件的哈希比较，
+  相同则跳过传输
+- 源文件的哈希按 (大小, mtime, inode) 缓存在 .store/index.json，未变化的大文件不重复计算
+
+存储对象为只读；`jq ... > tmp && mv tmp file` 这类替换写法会断开硬链接，
+之后重新执行 share 即可把相同内容重新合并为一个对象。
+
+命令行:
+    artifact_store.py share <base_dir> <relpath> [--from <file>] [node1,node2|all]
+    artifact_store.py manifest <base_dir> <node> [--json]
+    artifact_store.py verify <base_dir> [node1,node2|all]
+    artifact_store.py gc <base_dir>
+"""
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+STORE_DIR = ".store"
+MANIFEST_NAME = "manifest.sha256"
+NODE_PREFIXES = ("validator-", "sentry-")
+CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def node_dirs(base_dir: Path) -> List[str]:
+    """base_dir 下的节点目录（validator-* / sentry-*）"""
+    return sorted(p.name for p in Path(base_dir).iterdir()
+                  if p.is_dir() and p.name.startswith(NODE_PREFIXES))
+
+
+def read_manifest(node_dir: Path) -> Dict[str, str]:
+    """读取节点清单，返回 {相对路径: sha256}"""
+    path = Path(node_dir) / MANIFEST_NAME
+    entries: Dict[str, str] = {}
+    if not path.exists():
+        return entries
+    for line in path.read_text().splitlines():
+        digest, _, relpath = line.partition('  ')
+        if digest and relpath:
+            entries[relpath] = digest
+    return entries
+
+
+def write_manifest(node_dir: Path, entries: Dict[str, str]):
+    """原子写入节点清单（可直接用 sha256sum -c 校验）"""
+    path = Path(node_dir) / MANIFEST_NAME
+    content = ''.join(f"{entries[k]}  {k}\n" for k in sorted(entries))
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(content)
+    os.replace(tmp, path)
+
+
+class ArtifactStore:
+    """chain-deploy-config 内的内容寻址存储"""
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self.root = self.base_dir / STORE_DIR
+        self.objects = self.root / "objects"
+        self.index_file = self.root / "index.json"
+        self._index: Optional[Dict[str, list]] = None
+
+    # ---------- 哈希缓存 ----------
+
+    def _load_index(self) -> Dict[str, list]:
+        if self._index is None:
+            try:
+                self._index = json.loads(self.index_file.read_text())
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def save_index(self):
+        if self._index is None:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_name(self.index_file.name + '.tmp')
+        tmp.write_text(json.dumps(self._index, sort_keys=True))
+        os.replace(tmp, self.index_file)
+
+    def digest(self, path: Path) -> str:
+        """文件的 sha256；(大小, mtime, inode) 未变化时使用缓存"""
+        path = Path(path).resolve()
+        st = path.stat()
+        key = [st.st_size, st.st_mtime_ns, st.st_ino]
+        index = self._load_index()
+        cached = index.get(str(path))
+        if cached and cached[:3] == key:
+            return cached[3]
+        value = file_sha256(path)
+        index[str(path)] = key + [value]
+        return value
+
+    # ---------- 对象 ----------
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def put(self, path: Path) -> str:
+        """将文件存入存储（已存在则跳过），返回 sha256"""
+        digest = self.digest(path)
+        target = self.object_path(digest)
+        if target.exists():
+            return digest
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix='.tmp-')
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp)
+            # 只读：防止通过硬链接原地修改所有节点的文件
+            mode = stat.S_IMODE(Path(path).stat().st_mode) & ~0o222
+            os.chmod(tmp, mode | stat.S_IRUSR)
+            os.replace(tmp, target)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return digest
+
+    def link(self, digest: str, dest: Path) -> bool:
+        """将 dest 替换为指向存储对象的硬链接，返回是否有变化"""
+        source = self.object_path(digest)
+        dest = Path(dest)
+        if dest.exists() and os.path.samefile(source, dest):
+            return False
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.link-tmp")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(source, tmp)
+        except OSError as e:
+            # 跨文件系统或不支持硬链接时退化为复制
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            shutil.copy2(source, tmp)
+        os.replace(tmp, dest)
+        return True
+
+    def gc(self) -> int:
+        """删除没有任何节点引用（链接数为 1）的对象，返回删除数量"""
+        removed = 0
+        if not self.objects.exists():
+            return removed
+        for obj in self.objects.glob('*/*'):
+            if obj.name.startswith('.tmp-'):
+                obj.unlink()
+            elif obj.stat().st_nlink <= 1:
+                obj.unlink()
+                removed += 1
+        for prefix in self.objects.iterdir():
+            if prefix.is_dir() and not any(prefix.iterdir()):
+                prefix.rmdir()
+        return removed
+
+
+def share(base_dir: Path, relpath: str, nodes: List[str],
+          source: Optional[Path] = None) -> Dict[str, str]:
+    """
+    将 relpath 设为各节点共享的文件并更新清单
+    - 指定 source：所有节点链接到 source 的内容
+    - 未指定：收集各节点现有文件，内容相同的合并为一个对象
+    返回 {节点: sha256}
+    """
+    store = ArtifactStore(base_dir)
+    result: Dict[str, str] = {}
+    shared = store.put(source) if source is not None else None
+    try:
+        for node in nodes:
+            node_dir = Path(base_dir) / node
+            dest = node_dir / relpath
+            if shared is not None:
+                digest = shared
+            elif dest.exists():
+                digest = store.put(dest)
+            else:
+                continue
+            store.link(digest, dest)
+            entries = read_manifest(node_dir)
+            if entries.get(relpath) != digest:
+                entries[relpath] = digest
+                write_manifest(node_dir, entries)
+            result[node] = digest
+    finally:
+        store.save_index()
+    return result
+
+
+def verify(base_dir: Path, nodes: List[str]) -> List[str]:
+    """检查节点文件与清单是否一致，返回问题列表"""
+    store = ArtifactStore(base_dir)
+    problems = []
+    for node in nodes:
+        node_dir = Path(base_dir) / node
+        for relpath, expected in read_manifest(node_dir).items():
+            path = node_dir / relpath
+            if not path.exists():
+                problems.append(f"{node}/{relpath}: 文件缺失")
+            elif store.digest(path) != expected:
+                problems.append(f"{node}/{relpath}: 哈希与清单不一致")
+            elif not store.object_path(expected).exists():
+                problems.append(f"{node}/{relpath}: 存储对象缺失")
+    store.save_index()
+    return problems
+
+
+def show_usage():
+    print("用法: artifact_store.py share <base_dir> <relpath> [--from <file>] [node1,node2|all]")
+    print("      artifact_store.py manifest <base_dir> <node> [--json]")
+    print("      artifact_store.py verify <base_dir> [node1,node2|all]")
+    print("      artifact_store.py gc <base_dir>")
+    print("")
+    print("示例:")
+    print("  artifact_store.py share chain-deploy-config config/genesis.json --from master/config/genesis.json")
+    print("  artifact_store.py share chain-deploy-config config/genesis.json   # 重新合并已修改的 genesis")
+    print("  artifact_store.py manifest chain-deploy-config validator-0 --json")
+
+
+def select_nodes(base_dir: Path, spec: Optional[str]) -> List[str]:
+    available = node_dirs(base_dir)
+    if spec is None or spec == 'all':
+        return available
+    nodes = spec.split(',')
+    unknown = [n for n in nodes if n not in available]
+    if unknown:
+        print(f"错误: 节点目录不存在: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+    return nodes
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ('share', 'manifest', 'verify', 'gc'):
+        show_usage()
+        sys.exit(1)
+
+    command, base_dir, rest = args[0], Path(args[1]), args[2:]
+    if not base_dir.is_dir():
+        print(f"错误: 目录不存在: {base_dir}", file=sys.stderr)
+        sys.exit(1)
+
+    if command == 'share':
+        if not rest:
+            show_usage()
+            sys.exit(1)
+        relpath = rest[0]
+        source = None
+        if '--from' in rest:
+            pos = rest.index('--from')
+            if pos + 1 >= len(rest):
+                print("错误: 选项 --from 需要参数", file=sys.stderr)
+                sys.exit(1)
+            source = Path(rest[pos + 1])
+            rest = rest[:pos] + rest[pos + 2:]
+            if not source.is_file():
+                print(f"错误: 文件不存在: {source}", file=sys.stderr)
+                sys.exit(1)
+        nodes = select_nodes(base_dir, rest[1] if len(rest) > 1 else None)
+        result = share(base_dir, relpath, nodes, source)
+        objects = sorted(set(result.values()))
+        print(f"✓ {relpath}: {len(result)} 个节点共享 {len(objects)} 个对象")
+        if len(objects) > 1:
+            print(f"⚠ {relpath} 在各节点的内容不一致:", file=sys.stderr)
+            for node, digest in result.items():
+                print(f"  {node}: {digest[:16]}", file=sys.stderr)
+
+    elif command == 'manifest':
+        if not rest:
+            show_usage()
+            sys.exit(1)
+        entries = read_manifest(base_dir / rest[0])
+        if '--json' in rest:
+            print(json.dumps(entries, sort_keys=True))
+        else:
+            for relpath in sorted(entries):
+                print(f"{entries[relpath]}  {relpath}")
+
+    elif command == 'verify':
+        nodes = select_nodes(base_dir, rest[0] if rest else None)
+        problems = verify(base_dir, nodes)
+        for problem in problems:
+            print(f"✗ {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+        print(f"✓ {len(nodes)} 个节点的共享文件与清单一致")
+
+    elif command == 'gc':
+        removed = ArtifactStore(base_dir).gc()
+        print(f"✓ 清理 {removed} 个未引用的对象")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Bech32 地址编解码（BIP-173）
+用于在进程内处理 Cosmos 地址，无需调用链二进制
+"""
+
+from typing import List, Optional, Tuple
+
+
+CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_CHARSET_INDEX = {c: i for i, c in enumerate(CHARSET)}
+_GENERATOR = (0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)
+
+
+def _polymod(values: List[int]) -> int:
+    chk = 1
+    for value in values:
+        top = chk >> 25
+        chk = (chk & 0x1ffffff) << 5 ^ value
+        for i in range(5):
+            chk ^= _GENERATOR[i] if ((top >> i) & 1) else 0
+    return chk
+
+
+def _hrp_expand(hrp: str) -> List[int]:
+    return [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+
+
+def convertbits(data, frombits: int, tobits: int, pad: bool = True) -> Optional[List[int]]:
+    """在不同位宽之间转换（8 位字节 <-> 5 位分组）"""
+    acc = 0
+    bits = 0
+    ret = []
+    maxv = (1 << tobits) - 1
+    for value in data:
+        if value < 0 or (value >> frombits):
+            return None
+        acc = (acc << frombits) | value
+        bits += frombits
+        while bits >= tobits:
+            bits -= tobits
+            ret.append((acc >> bits) & maxv)
+    if pad:
+        if bits:
+            ret.append((acc << (tobits - bits)) & maxv)
+    elif bits >= frombits or ((acc << (tobits - bits)) & maxv):
+        return None
+    return ret
+
+
+def encode(hrp: str, data: bytes) -> str:
+    """将原始字节编码为 bech32 地址"""
+    five_bit = convertbits(data, 8, 5)
+    values = _hrp_expand(hrp) + five_bit
+    polymod = _polymod(values + [0] * 6) ^ 1
+    checksum = [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+    return hrp + '1' + ''.join(CHARSET[d] for d in five_bit + checksum)
+
+
+def decode(address: str) -> Tuple[Optional[str], Optional[bytes]]:
+    """解码 bech32 地址，失败时返回 (None, None)"""
+    if address.lower() != address and address.upper() != address:
+        return None, None
+    address = address.lower()
+    pos = address.rfind('1')
+    if pos < 1 or pos + 7 > len(address):
+        return None, None
+
+    hrp = address[:pos]
+    try:
+        data = [_CHARSET_INDEX[c] for c in address[pos + 1:]]
+    except KeyError:
+        return None, None
+    if _polymod(_hrp_expand(hrp) + data) != 1:
+        return None, None
+
+    decoded = convertbits(data[:-6], 5, 8, False)
+    if decoded is None:
+        return None, None
+    return hrp, bytes(decoded)
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+编译产物缓存（build-injective 角色使用）
+- 缓存键 = 仓库提交 + 未提交改动 + Go 版本/平台 + C 编译器 + 编译标签 + ldflags
+- 命中时直接把 injectived/biyachaind/peggo/libwasmvm 恢复到输出目录，跳过编译
+- 未命中时编译完成后存入缓存；总大小超过上限时按最近使用时间（LRU）淘汰
+- 每个条目记录文件的 SHA-256，恢复前校验，损坏的条目视为未命中并删除
+
+缓存目录结构:
+    <cache_dir>/entries/<key>/<文件>
+    <cache_dir>/entries/<key>/entry.json   （文件哈希、大小、创建/最近使用时间、键的组成）
+
+命令行:
+    build_cache.py key     --repo <dir> [--ref <ref>] [--tags <tags>] [--ldflags <flags>]
+    build_cache.py status  <cache_dir> --repo <dir> [--ref <ref>] [...]
+    build_cache.py restore <cache_dir> <key> <output_dir> [--json]
+    build_cache.py store   <cache_dir> <key> <output_dir> [--max-size 10G] [--json]
+    build_cache.py list    <cache_dir>
+    build_cache.py prune   <cache_dir> --max-size <size>
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from artifact_store import file_sha256
+
+
+CACHE_VERSION = 1
+ENTRY_FILE = "entry.json"
+DEFAULT_MAX_SIZE = 10 * 1024 ** 3
+
+# 缓存的编译产物（存在的才会缓存）
+ARTIFACTS = ("injectived", "biyachaind", "peggo", "libwasmvm.x86_64.so")
+
+
+def _output(args: List[str], cwd: Optional[Path] = None) -> str:
+    """执行命令并返回 stdout；命令不存在或失败时返回空字符串"""
+    try:
+        result = subprocess.run(args, cwd=cwd, capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return ''
+    return result.stdout.strip() if result.returncode == 0 else ''
+
+
+def parse_size(text: str) -> int:
+    """解析 10G / 512M / 1024 这类大小"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def key_inputs(repo: Path, ref: str = 'HEAD', tags: str = '', ldflags: str = '') -> Dict[str, str]:
+    """
+    缓存键的组成；仓库或 ref 不存在时 commit 为空
+    工作区有未提交的改动时加入 diff 的哈希，避免复用与源码不一致的产物
+    """
+    commit = _output(['git', 'rev-parse', '--verify', f'{ref}^{{commit}}'], cwd=repo) if repo.is_dir() else ''
+    inputs = {
+        'version': str(CACHE_VERSION),
+        'commit': commit,
+        'go': _output(['go', 'version']),
+        'go_env': _output(['go', 'env', 'GOOS', 'GOARCH', 'CGO_ENABLED']).replace('\n', ' '),
+        'cc': _output(['cc', '--version']).split('\n')[0],
+        'tags': tags,
+        'ldflags': ldflags,
+    }
+    head = _output(['git', 'rev-parse', 'HEAD'], cwd=repo) if commit else ''
+    if commit and commit == head and _output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo):
+        diff = subprocess.run(['git', 'diff', 'HEAD'], cwd=repo, capture_output=True).stdout
+        inputs['dirty'] = hashlib.sha256(diff).hexdigest()
+    return inputs
+
+
+def cache_key(inputs: Dict[str, str]) -> str:
+    encoded = json.dumps(inputs, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+class BuildCache:
+    """按键存放编译产物的 LRU 缓存"""
+
+    def __init__(self, cache_dir: Path):
+        self.root = Path(cache_dir)
+        self.entries = self.root / "entries"
+
+    @contextlib.contextmanager
+    def locked(self) -> Iterator[None]:
+        """同一缓存目录同时只允许一个写入/淘汰操作"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / ".lock", 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def entry_dir(self, key: str) -> Path:
+        return self.entries / key
+
+    def read_entry(self, key: str) -> Optional[Dict]:
+        try:
+            return json.loads((self.entry_dir(key) / ENTRY_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def write_entry(self, key: str, entry: Dict):
+        path = self.entry_dir(key) / ENTRY_FILE
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(json.dumps(entry, indent=2, sort_keys=True))
+        os.replace(tmp, path)
+
+    def all_entries(self) -> Dict[str, Dict]:
+        result = {}
+        if self.entries.is_dir():
+            for path in self.entries.iterdir():
+                if path.name.startswith('.'):
+                    continue
+                entry = self.read_entry(path.name)
+                if entry is not None:
+                    result[path.name] = entry
+        return result
+
+    def remove(self, key: str):
+        shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+
+    # ---------- 恢复 / 存入 ----------
+
+    def restore(self, key: str, output_dir: Path) -> Optional[List[str]]:
+        """命中时恢复产物到 output_dir 并返回文件名列表；未命中或条目损坏时返回 None"""
+        entry = self.read_entry(key)
+        if entry is None:
+            return None
+        source = self.entry_dir(key)
+        files: Dict[str, Dict] = entry.get('files', {})
+        for name, info in files.items():
+            path = source / name
+            if not path.is_file() or path.stat().st_size != info['size'] or file_sha256(path) != info['sha256']:
+                with self.locked():
+                    self.remove(key)
+                return None
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for name in files:
+            # 复制而不是硬链接：输出目录中的文件之后可能被改名或覆盖
+            tmp = output_dir / f".{name}.cache-tmp"
+            shutil.copy2(source / name, tmp)
+            os.replace(tmp, output_dir / name)
+
+        entry['last_used'] = time.time()
+        entry['hits'] = entry.get('hits', 0) + 1
+        with self.locked():
+            if self.entry_dir(key).is_dir():
+                self.write_entry(key, entry)
+        return sorted(files)
+
+    def store(self, key: str, output_dir: Path, inputs: Optional[Dict[str, str]] = None,
+              max_size: int = DEFAULT_MAX_SIZE) -> List[str]:
+        """将 output_dir 中的编译产物存入缓存，返回存入的文件名列表"""
+        names = [n for n in ARTIFACTS if (output_dir / n).is_file()]
+        if not names:
+            return []
+        with self.locked():
+            staging = self.entries / f".{key}.tmp"
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir(parents=True)
+            files = {}
+            for name in names:
+                shutil.copy2(output_dir / name, staging / name)
+                files[name] = {'sha256': file_sha256(staging / name),
+                               'size': (staging / name).stat().st_size}
+            now = time.time()
+            entry = {'files': files, 'inputs': inputs or {}, 'created': now, 'last_used': now, 'hits': 0}
+            (staging / ENTRY_FILE).write_text(json.dumps(entry, indent=2, sort_keys=True))
+            self.remove(key)
+            os.replace(staging, self.entry_dir(key))
+            self._evict(max_size, keep=key)
+        return names
+
+    # ---------- 淘汰 ----------
+
+    @staticmethod
+    def entry_size(entry: Dict) -> int:
+        return sum(info['size'] for info in entry.get('files', {}).values())
+
+    def _evict(self, max_size: int, keep: Optional[str] = None) -> List[str]:
+        entries = self.all_entries()
+        total = sum(self.entry_size(e) for e in entries.values())
+        removed = []
+        for key, entry in sorted(entries.items(), key=lambda kv: kv[1].get('last_used', 0)):
+            if total <= max_size:
+                break
+            if key == keep:
+                continue
+            self.remove(key)
+            total -= self.entry_size(entry)
+            removed.append(key)
+        return removed
+
+    def prune(self, max_size: int) -> List[str]:
+        with self.locked():
+            return self._evict(max_size)
+
+
+def show_usage():
+    print("用法: build_cache.py key     --repo <dir> [--ref <ref>] [--tags <tags>] [--ldflags <flags>]")
+    print("      build_cache.py status  <cache_dir> --repo <dir> [--ref <ref>] [--tags ...] [--ldflags ...]")
+    print("      build_cache.py restore <cache_dir> <key> <output_dir> [--json]")
+    print("      build_cache.py store   <cache_dir> <key> <output_dir> [--max-size 10G] [--json]")
+    print("      build_cache.py list    <cache_dir>")
+    print("      build_cache.py prune   <cache_dir> --max-size <size>")
+
+
+def _human(size: float) -> str:
+    for unit in ('B', 'K', 'M', 'G'):
+        if size < 1024:
+            return f"{size:.1f}{unit}" if unit != 'B' else f"{int(size)}B"
+        size /= 1024
+    return f"{size:.1f}T"
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ('key', 'status', 'restore', 'store', 'list', 'prune'):
+        show_usage()
+        sys.exit(1)
+    command, args = args[0], args[1:]
+
+    options = {'repo': None, 'ref': 'HEAD', 'tags': '', 'ldflags': '', 'max-size': None}
+    as_json = False
+    positional = []
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg.startswith('--') and arg[2:] in options:
+                options[arg[2:]] = args[i + 1]
+                i += 1
+            elif arg == '--json':
+                as_json = True
+            elif arg.startswith('--'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except IndexError:
+        print(f"错误: 选项 {args[i]} 需要参数", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        max_size = parse_size(options['max-size']) if options['max-size'] else DEFAULT_MAX_SIZE
+    except ValueError:
+        print(f"错误: 无效的大小: {options['max-size']}", file=sys.stderr)
+        sys.exit(1)
+
+    if command in ('key', 'status'):
+        if not options['repo'] or (command == 'status' and len(positional) != 1):
+            show_usage()
+            sys.exit(1)
+        inputs = key_inputs(Path(options['repo']), options['ref'], options['tags'], options['ldflags'])
+        if not inputs['commit']:
+            if command == 'key':
+                print(f"错误: 无法解析提交: {options['repo']} {options['ref']}", file=sys.stderr)
+                sys.exit(1)
+            print("构建缓存: 未知（源码尚未获取）")
+            return
+        key = cache_key(inputs)
+        if command == 'key':
+            print(key)
+            return
+        entry = BuildCache(Path(positional[0])).read_entry(key)
+        state = "命中" if entry else "未命中"
+        print(f"构建缓存: {state}（提交 {inputs['commit'][:12]}，{inputs['go'] or 'Go 未安装'}，键 {key[:12]}）")
+        return
+
+    if command == 'restore':
+        if len(positional) != 3:
+            show_usage()
+            sys.exit(1)
+        started = time.monotonic()
+        files = BuildCache(Path(positional[0])).restore(positional[1], Path(positional[2]))
+        elapsed = time.monotonic() - started
+        if as_json:
+            print(json.dumps({'hit': files is not None, 'files': files or [], 'elapsed': round(elapsed, 2)}))
+        elif files is None:
+            print("未命中")
+        else:
+            print(f"✓ 命中，已恢复 {', '.join(files)}（{elapsed:.1f}s）")
+
+    elif command == 'store':
+        if len(positional) != 3:
+            show_usage()
+            sys.exit(1)
+        inputs = key_inputs(Path(options['repo']), options['ref'], options['tags'], options['ldflags']) \
+            if options['repo'] else None
+        files = BuildCache(Path(positional[0])).store(positional[1], Path(positional[2]), inputs, max_size)
+        if as_json:
+            print(json.dumps({'stored': files}))
+        elif files:
+            print(f"✓ 已缓存 {', '.join(files)}")
+        else:
+            print("⚠ 输出目录中没有可缓存的编译产物", file=sys.stderr)
+
+    elif command == 'list':
+        if len(positional) != 1:
+            show_usage()
+            sys.exit(1)
+        entries = BuildCache(Path(positional[0])).all_entries()
+        total = 0
+        for key, entry in sorted(entries.items(), key=lambda kv: -kv[1].get('last_used', 0)):
+            size = BuildCache.entry_size(entry)
+            total += size
+            used = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.get('last_used', 0)))
+            commit = entry.get('inputs', {}).get('commit', '')[:12]
+            print(f"{key[:12]}  {commit:12}  {_human(size):>7}  命中 {entry.get('hits', 0):<3}  最近使用 {used}")
+        print(f"共 {len(entries)} 个条目，{_human(total)}")
+
+    elif command == 'prune':
+        if len(positional) != 1 or not options['max-size']:
+            show_usage()
+            sys.exit(1)
+        removed = BuildCache(Path(positional[0])).prune(max_size)
+        print(f"✓ 淘汰 {len(removed)} 个条目")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+集群链健康状态
+- asyncio 并发查询所有节点 RPC 的 /status、/net_info、/dump_consensus_state
+- 每个节点一条 HTTP keep-alive 连接，所有请求和 watch 刷新复用，带超时
+- 计算各节点相对最高高度的落后块数、最近区块的平均出块时间、peer 数、catching_up
+- 表格或 JSON 输出；--watch 模式增量刷新
+- --ssh-tunnel：RPC 未对外开放时通过 SSH 本地端口转发访问
+
+测试：test/fleet/mock-rpc.py 启动本地模拟 RPC，配合 --endpoint 使用
+"""
+
+import asyncio
+import json
+import socket
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from inventory import load_inventory
+from ssh_session import SSH_OPTIONS, ssh_command
+from table import display_width, pad
+
+
+DEFAULT_RPC_PORT = 26757
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_BLOCKS = 20
+
+# CometBFT RoundStepType
+CONSENSUS_STEPS = {
+    1: 'NewHeight', 2: 'NewRound', 3: 'Propose', 4: 'Prevote',
+    5: 'PrevoteWait', 6: 'Precommit', 7: 'PrecommitWait', 8: 'Commit',
+}
+
+
+class RPCError(Exception):
+    """RPC 请求失败"""
+
+
+class RPCClient:
+    """单个节点的 HTTP/1.1 keep-alive 客户端（请求串行复用同一连接）"""
+
+    def __init__(self, host: str, port: int, timeout: float = DEFAULT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.label = f"{host}:{port}"
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (OSError, asyncio.CancelledError):
+                pass
+        self.reader = self.writer = None
+
+    async def get(self, path: str) -> Dict:
+        """GET 请求，返回 JSON-RPC 的 result 字段；连接被对端关闭时重连一次"""
+        for attempt in (0, 1):
+            try:
+                if self.writer is None:
+                    self.reader, self.writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.timeout)
+                return await asyncio.wait_for(self._request(path), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                await self.close()
+                if attempt:
+                    raise RPCError(f"连接失败: {e}")
+            except asyncio.TimeoutError:
+                await self.close()
+                raise RPCError(f"请求超时（{self.timeout}s）: {path}")
+            except OSError as e:
+                await self.close()
+                raise RPCError(f"连接失败: {e}")
+        raise RPCError("连接失败")
+
+    async def _request(self, path: str) -> Dict:
+        self.writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Accept: application/json\r\nConnection: keep-alive\r\n\r\n".encode('ascii'))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("连接已关闭")
+        parts = status_line.decode('latin-1').split(' ', 2)
+        status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                body += await self.reader.readexactly(size)
+                await self.reader.readexactly(2)
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            await self.close()
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        if status != 200:
+            raise RPCError(f"HTTP {status}: {path}")
+
+        data = json.loads(body)
+        if data.get('error'):
+            raise RPCError(str(data['error']))
+        return data.get('result', data)
+
+
+@dataclass
+class NodeStatus:
+    name: str
+    address: str
+    ok: bool = False
+    error: str = ''
+    height: int = 0
+    lag: int = 0
+    latest_block_time: str = ''
+    catching_up: Optional[bool] = None
+    peers: int = 0
+    inbound: int = 0
+    outbound: int = 0
+    round: Optional[int] = None
+    step: str = ''
+    latency_ms: float = 0.0
+    moniker: str = ''
+
+
+def parse_time(value: str) -> Optional[datetime]:
+    """解析 RFC3339（纳秒精度截断到微秒）"""
+    if not value:
+        return None
+    value = value.rstrip('Z')
+    if '.' in value:
+        head, frac = value.split('.', 1)
+        value = f"{head}.{frac[:6]}"
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def parse_round_state(consensus: Dict) -> Tuple[Optional[int], str]:
+    """从 dump_consensus_state 中提取 (round, step)"""
+    round_state = consensus.get('round_state') or {}
+    hrs = round_state.get('height/round/step')
+    if hrs:
+        _, round_, step = (hrs.split('/') + ['', '', ''])[:3]
+    else:
+        round_, step = round_state.get('round'), round_state.get('step')
+    try:
+        round_value = int(round_) if round_ not in (None, '') else None
+    except (TypeError, ValueError):
+        round_value = None
+    try:
+        step_name = CONSENSUS_STEPS.get(int(step), str(step))
+    except (TypeError, ValueError):
+        step_name = str(step or '')
+    return round_value, step_name
+
+
+async def poll_node(name: str, client: RPCClient) -> NodeStatus:
+    """查询单个节点（三个请求复用同一连接）"""
+    result = NodeStatus(name=name, address=client.label)
+    started = time.monotonic()
+    try:
+        status = await client.get('/status')
+        result.latency_ms = round((time.monotonic() - started) * 1000, 1)
+        sync_info = status.get('sync_info', {})
+        result.height = int(sync_info.get('latest_block_height', 0))
+        result.latest_block_time = sync_info.get('latest_block_time', '')
+        result.catching_up = bool(sync_info.get('catching_up'))
+        result.moniker = status.get('node_info', {}).get('moniker', '')
+
+        net_info = await client.get('/net_info')
+        peers = net_info.get('peers') or []
+        result.peers = int(net_info.get('n_peers', len(peers)))
+        result.outbound = sum(1 for p in peers if p.get('is_outbound'))
+        result.inbound = len(peers) - result.outbound
+
+        result.round, result.step = parse_round_state(await client.get('/dump_consensus_state'))
+        result.ok = True
+    except (RPCError, ValueError, TypeError, AttributeError) as e:
+        result.error = str(e)
+    return result
+
+
+async def average_block_time(client: RPCClient, height: int, blocks: int) -> Optional[float]:
+    """最近 blocks 个区块的平均出块时间（秒）"""
+    if height < 2:
+        return None
+    min_height = max(1, height - blocks + 1)
+    try:
+        chain = await client.get(f'/blockchain?minHeight={min_height}&maxHeight={height}')
+    except RPCError:
+        return None
+    times = sorted(t for t in (parse_time(m.get('header', {}).get('time', ''))
+                               for m in chain.get('block_metas') or []) if t)
+    if len(times) < 2:
+        return None
+    return (times[-1] - times[0]).total_seconds() / (len(times) - 1)
+
+
+class Tunnel:
+    """SSH 本地端口转发：localhost:<local_port> -> 远程 127.0.0.1:<remote_port>"""
+
+    def __init__(self, target: str, remote_port: int):
+        self.target = target
+        self.remote_port = remote_port
+        self.local_port = 0
+        self.process: Optional[asyncio.subprocess.Process] = None
+
+    async def open(self, timeout: float = 15.0):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            self.local_port = s.getsockname()[1]
+        self.process = await asyncio.create_subprocess_exec(
+            *ssh_command(), *SSH_OPTIONS, "-o", "ExitOnForwardFailure=yes", "-N",
+            "-L", f"{self.local_port}:127.0.0.1:{self.remote_port}", self.target,
+            stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL)
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.returncode is not None:
+                raise RPCError(f"SSH 隧道建立失败: {self.target}")
+            try:
+                _, writer = await asyncio.open_connection('127.0.0.1', self.local_port)
+                writer.close()
+                return
+            except OSError:
+                await asyncio.sleep(0.2)
+        raise RPCError(f"SSH 隧道建立超时: {self.target}")
+
+    async def close(self):
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+            await self.process.wait()
+
+
+class StatusEngine:
+    """维护节点连接池并执行轮询"""
+
+    def __init__(self, endpoints: Dict[str, Tuple[str, int]], timeout: float, blocks: int):
+        self.clients = {name: RPCClient(host, port, timeout) for name, (host, port) in endpoints.items()}
+        self.blocks = blocks
+        self.tunnels: List[Tunnel] = []
+        self._block_time: Optional[float] = None
+        self._block_time_height = 0
+
+    @classmethod
+    async def with_tunnels(cls, targets: Dict[str, str], rpc_port: int, timeout: float,
+                           blocks: int) -> Tuple['StatusEngine', Dict[str, str]]:
+        """为每个节点建立 SSH 隧道，返回 (engine, 建立失败的节点 -> 错误)"""
+        tunnels = {name: Tunnel(target, rpc_port) for name, target in targets.items()}
+        results = await asyncio.gather(*(t.open() for t in tunnels.values()), return_exceptions=True)
+        failed = {}
+        endpoints = {}
+        for (name, tunnel), result in zip(tunnels.items(), results):
+            if isinstance(result, Exception):
+                failed[name] = str(result)
+                await tunnel.close()
+            else:
+                endpoints[name] = ('127.0.0.1', tunnel.local_port)
+        engine = cls(endpoints, timeout, blocks)
+        for name, client in engine.clients.items():
+            client.label = f"{targets[name].split('@')[-1]} (ssh:{client.port})"
+        engine.tunnels = [t for name, t in tunnels.items() if name in endpoints]
+        return engine, failed
+
+    async def poll(self) -> Tuple[List[NodeStatus], Optional[float]]:
+        statuses = await asyncio.gather(*(poll_node(name, client)
+                                          for name, client in self.clients.items()))
+        online = [s for s in statuses if s.ok]
+        max_height = max((s.height for s in online), default=0)
+        for s in online:
+            s.lag = max_height - s.height
+
+        # 出块时间只在最高高度变化时重新计算
+        if online and max_height != self._block_time_height:
+            leader = next(s for s in online if s.height == max_height)
+            block_time = await average_block_time(self.clients[leader.name], max_height, self.blocks)
+            if block_time is not None:
+                self._block_time = block_time
+                self._block_time_height = max_height
+        return list(statuses), self._block_time
+
+    async def close(self):
+        await asyncio.gather(*(c.close() for c in self.clients.values()))
+        await asyncio.gather(*(t.close() for t in self.tunnels))
+
+
+def summary(statuses: List[NodeStatus], block_time: Optional[float]) -> Dict:
+    online = [s for s in statuses if s.ok]
+    return {
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'max_height': max((s.height for s in online), default=0),
+        'avg_block_time': round(block_time, 3) if block_time is not None else None,
+        'online': len(online),
+        'total': len(statuses),
+        'catching_up': sum(1 for s in online if s.catching_up),
+        'nodes': [asdict(s) for s in statuses],
+    }
+
+
+def format_table(statuses: List[NodeStatus], block_time: Optional[float],
+                 previous: Optional[Dict[str, int]] = None) -> str:
+    """紧凑表格；previous 为上次刷新的高度，用于显示增量"""
+    headers = ["节点", "地址", "高度", "落后", "同步中", "Peers(入/出)", "轮次/步骤", "延迟", "状态"]
+    rows = []
+    for s in statuses:
+        if not s.ok:
+            rows.append([s.name, s.address, "-", "-", "-", "-", "-", "-", f"✗ {s.error}"])
+            continue
+        height = str(s.height)
+        if previous and s.name in previous:
+            height += f" (+{s.height - previous[s.name]})"
+        state = "⚠ 同步中" if s.catching_up else ("⚠ 落后" if s.lag > 2 else "✓")
+        round_step = f"{s.round}/{s.step}" if s.round is not None else s.step or "-"
+        rows.append([s.name, s.address, height, str(s.lag), "是" if s.catching_up else "否",
+                     f"{s.peers} ({s.inbound}/{s.outbound})", round_step,
+                     f"{s.latency_ms:.0f}ms", state])
+
+    widths = [max(display_width(r[i]) for r in rows + [headers]) for i in range(len(headers))]
+    lines = ["  ".join(pad(c, w) for c, w in zip(headers, widths)).rstrip()]
+    lines += ["  ".join(pad(c, w) for c, w in zip(r, widths)).rstrip() for r in rows]
+
+    info = summary(statuses, block_time)
+    block_text = f"{info['avg_block_time']:.2f}s" if info['avg_block_time'] is not None else "N/A"
+    lines.append("")
+    lines.append(f"最高高度: {info['max_height']}  平均出块时间: {block_text}  "
+                 f"在线: {info['online']}/{info['total']}  同步中: {info['catching_up']}")
+    return '\n'.join(lines)
+
+
+async def run(engine: StatusEngine, as_json: bool, watch: Optional[float],
+              failed: Dict[str, str], order: List[str]) -> bool:
+    previous: Optional[Dict[str, int]] = None
+    try:
+        while True:
+            statuses, block_time = await engine.poll()
+            statuses += [NodeStatus(name=n, address='-', error=e) for n, e in failed.items()]
+            statuses.sort(key=lambda s: order.index(s.name) if s.name in order else len(order))
+
+            if as_json:
+                print(json.dumps(summary(statuses, block_time), ensure_ascii=False,
+                                 indent=None if watch else 2), flush=True)
+            else:
+                if watch:
+                    # 清屏并回到左上角，原位刷新
+                    print("\033[2J\033[H", end='')
+                    print(f"链健康状态（每 {watch:g}s 刷新，Ctrl+C 退出）  "
+                          f"{datetime.now().strftime('%H:%M:%S')}\n")
+                print(format_table(statuses, block_time, previous), flush=True)
+
+            if not watch:
+                return all(s.ok for s in statuses)
+            previous = {s.name: s.height for s in statuses if s.ok}
+            await asyncio.sleep(watch)
+    finally:
+        await engine.close()
+
+
+def parse_endpoint(value: str) -> Tuple[str, Tuple[str, int]]:
+    """name=host:port"""
+    name, _, address = value.partition('=')
+    host, _, port = address.rpartition(':')
+    if not name or not host or not port.isdigit():
+        raise ValueError(value)
+    return name, (host, int(port))
+
+
+def show_usage():
+    print("用法: chain_status.py [options] [node|all|node1,node2]")
+    print("")
+    print("选项:")
+    print("  -i <inventory>          inventory 文件（默认 ansible/inventory.yml）")
+    print("  --json                  输出 JSON（watch 模式下每次刷新一行）")
+    print("  --watch [seconds]       持续刷新（默认 5 秒）")
+    print("  --ssh-tunnel            通过 SSH 端口转发访问 RPC")
+    print(f"  --rpc-port <port>       RPC 端口（默认 {DEFAULT_RPC_PORT}）")
+    print(f"  --timeout <seconds>     单个请求超时（默认 {DEFAULT_TIMEOUT:g}）")
+    print(f"  --blocks <N>            计算平均出块时间的区块数（默认 {DEFAULT_BLOCKS}）")
+    print("  --endpoint name=host:port  直接指定 RPC 地址（可重复，忽略 inventory）")
+
+
+def main():
+    args = sys.argv[1:]
+    inventory_file = None
+    as_json = False
+    watch: Optional[float] = None
+    tunnel = False
+    rpc_port = DEFAULT_RPC_PORT
+    timeout = DEFAULT_TIMEOUT
+    blocks = DEFAULT_BLOCKS
+    endpoints: Dict[str, Tuple[str, int]] = {}
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-h', '--help'):
+                show_usage()
+                sys.exit(0)
+            elif arg in ('-i', '--inventory'):
+                inventory_file = args[i + 1]
+                i += 1
+            elif arg == '--json':
+                as_json = True
+            elif arg == '--watch':
+                watch = 5.0
+                if i + 1 < len(args) and args[i + 1].replace('.', '', 1).isdigit():
+                    watch = float(args[i + 1])
+                    i += 1
+            elif arg == '--ssh-tunnel':
+                tunnel = True
+            elif arg == '--rpc-port':
+                rpc_port = int(args[i + 1])
+                i += 1
+            elif arg == '--timeout':
+                timeout = float(args[i + 1])
+                i += 1
+            elif arg == '--blocks':
+                blocks = max(2, int(args[i + 1]))
+                i += 1
+            elif arg == '--endpoint':
+                name, address = parse_endpoint(args[i + 1])
+                endpoints[name] = address
+                i += 1
+            elif arg.startswith('--'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"错误: 选项 {args[i]} 需要有效的参数值", file=sys.stderr)
+        sys.exit(1)
+
+    targets: Dict[str, str] = {}
+    if not endpoints:
+        try:
+            inv = load_inventory(inventory_file)
+        except Exception as e:
+            print(f"错误: 无法加载 inventory: {e}", file=sys.stderr)
+            sys.exit(1)
+        selection = positional[0] if positional else 'all'
+        nodes = inv.hosts('nodes') if selection == 'all' else selection.split(',')
+        unknown = [n for n in nodes if not inv.ip(n)]
+        if unknown:
+            print(f"错误: 无效的节点名称: {', '.join(unknown)}", file=sys.stderr)
+            sys.exit(1)
+        for name in nodes:
+            endpoints[name] = (inv.ip(name), rpc_port)
+            targets[name] = f"{inv.var(name, 'ansible_user', 'ubuntu')}@{inv.ip(name)}"
+
+    async def start() -> bool:
+        failed: Dict[str, str] = {}
+        if tunnel and targets:
+            engine, failed = await StatusEngine.with_tunnels(targets, rpc_port, timeout, blocks)
+        else:
+            engine = StatusEngine(endpoints, timeout, blocks)
+        return await run(engine, as_json, watch, failed, list(endpoints))
+
+    try:
+        ok = asyncio.run(start())
+    except KeyboardInterrupt:
+        ok = True
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
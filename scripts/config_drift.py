@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+远程配置漂移检测
+- 每个主机一条 SSH 命令：远程计算 genesis.json 和二进制文件的 SHA-256，
+  config.toml / app.toml 去掉注释和空行后 gzip 压缩返回（每个主机几 KB）
+- 本地对 generate_config.sh / apply_node_config_fast.py 生成的文件做同样的处理，
+  按 段.键 逐项比较规范化后的值（忽略空白、注释、数组尾逗号和引号风格），输出键级差异
+- genesis.json 和二进制文件与节点目录 manifest.sha256 中的哈希比较（见 artifact_store.py）
+- --fix 只把漂移的键推送到远程（远程用 toml_patch.py 原位替换值，保留注释和格式），
+  修复后重新检查；远程缺失/多出的键、genesis 和二进制文件的漂移需要重新部署
+
+退出码：没有漂移 0，存在漂移或主机检查失败 1
+
+命令行:
+    config_drift.py [-i inventory.yml] [--config-dir <dir>] [node|all|node1,node2]
+                    [--parallel N] [--ignore <键>[,<键>...]] [--json] [--fix]
+"""
+
+import fnmatch
+import gzip
+import hashlib
+import json
+import re
+import shlex
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from artifact_store import file_sha256, read_manifest
+from inventory import Inventory, load_inventory
+from ssh_session import RemoteError, SSHSession, control_directory
+from table import format_bytes, print_rows
+from toml_patch import TomlDocument
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_CONFIG_DIR = SCRIPT_DIR.parent / "chain-deploy-config"
+DEFAULT_NODE_HOME = "/data/biyachain"
+DEFAULT_BINARY_DIR = "/data/biyachain/bin"
+
+TOML_FILES = ('config.toml', 'app.toml')
+
+# 整行注释和空行（与远程 grep -v -E '^[[:space:]]*(#|$)' 一致）
+COMMENT_LINE_RE = re.compile(r'^\s*(#|$)')
+
+# 显示的值超过该长度时截断
+VALUE_WIDTH = 48
+
+
+@dataclass
+class KeyDiff:
+    file: str
+    key: str
+    local: Optional[str]
+    remote: Optional[str]
+
+    @property
+    def fixable(self) -> bool:
+        """远程存在该键，可以原位替换值"""
+        return self.local is not None and self.remote is not None
+
+
+@dataclass
+class HostDrift:
+    node: str
+    ip: str
+    error: str = ''
+    keys: List[KeyDiff] = field(default_factory=list)
+    # 本地与远程哈希不同的文件：名称 -> (本地, 远程)，远程缺失为 "-"
+    artifacts: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    # 远程文件缺失的 TOML
+    missing: List[str] = field(default_factory=list)
+    # TOML 规范化键值摘要：文件名 -> (本地, 远程)
+    digests: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    bytes: int = 0
+    elapsed: float = 0.0
+    fixed: int = 0
+
+    @property
+    def drifted(self) -> bool:
+        return bool(self.keys or self.artifacts or self.missing)
+
+
+# ---------- 规范化 ----------
+
+def normalize_value(raw: str) -> str:
+    """
+    规范化 TOML 值文本：去掉字符串之外的空白和注释、数组尾逗号，
+    不含引号和反斜杠的字面量字符串 'x' 统一为 "x"
+    """
+    out = []
+    i, n = 0, len(raw)
+    while i < n:
+        c = raw[i]
+        if raw.startswith('"""', i) or raw.startswith("'''", i):
+            end = raw.find(raw[i:i + 3], i + 3)
+            end = n if end == -1 else end + 3
+            out.append(raw[i:end])
+            i = end
+        elif c == '"':
+            j = i + 1
+            while j < n and raw[j] != '"':
+                j += 2 if raw[j] == '\\' else 1
+            out.append(raw[i:j + 1])
+            i = j + 1
+        elif c == "'":
+            end = raw.find("'", i + 1)
+            end = n if end == -1 else end
+            text = raw[i + 1:end]
+            out.append(f'"{text}"' if '"' not in text and '\\' not in text else raw[i:end + 1])
+            i = end + 1
+        elif c == '#':
+            end = raw.find('\n', i)
+            i = n if end == -1 else end
+        elif c in ' \t\r\n':
+            i += 1
+        else:
+            if c in ']}' and out and out[-1] == ',':
+                out.pop()
+            out.append(c)
+            i += 1
+    return ''.join(out)
+
+
+def strip_comments(text: str) -> str:
+    return '\n'.join(line for line in text.splitlines() if not COMMENT_LINE_RE.match(line))
+
+
+def toml_values(text: str) -> Dict[str, Tuple[str, str]]:
+    """段.键 -> (规范化值, 原始值)，重复的键取第一个"""
+    values: Dict[str, Tuple[str, str]] = {}
+    for section, key, raw in TomlDocument(strip_comments(text)).items():
+        name = f"{section}.{key}" if section else key
+        values.setdefault(name, (normalize_value(raw), raw.strip()))
+    return values
+
+
+def toml_digest(values: Dict[str, Tuple[str, str]]) -> str:
+    """规范化键值的摘要（键排序，与格式和注释无关；--ignore 的键不参与）"""
+    digest = hashlib.sha256()
+    for key in sorted(values):
+        digest.update(f"{key}={values[key][0]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def without_ignored(values: Dict[str, Tuple[str, str]], ignore: List[str]) -> Dict[str, Tuple[str, str]]:
+    return {k: v for k, v in values.items() if not any(fnmatch.fnmatchcase(k, p) for p in ignore)}
+
+
+def diff_values(file: str, local: Dict[str, Tuple[str, str]],
+                remote: Dict[str, Tuple[str, str]]) -> List[KeyDiff]:
+    diffs = []
+    for key in sorted(set(local) | set(remote)):
+        lv, rv = local.get(key), remote.get(key)
+        if lv is not None and rv is not None and lv[0] == rv[0]:
+            continue
+        diffs.append(KeyDiff(file, key, lv[1] if lv else None, rv[1] if rv else None))
+    return diffs
+
+
+# ---------- 本地与远程 ----------
+
+def remote_paths(node: str, inv: Inventory) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """远程文件路径：(共享文件清单相对路径 -> 远程路径, TOML 文件名 -> 远程路径)"""
+    home = str(inv.var(node, 'node_home_base', DEFAULT_NODE_HOME)).rstrip('/')
+    binary_dir = str(inv.var(node, 'binary_dir', DEFAULT_BINARY_DIR)).rstrip('/')
+    artifacts = {
+        'config/genesis.json': f"{home}/config/genesis.json",
+        'bin/biyachaind': f"{home}/cosmovisor/genesis/bin/biyachaind",
+        'bin/libwasmvm.x86_64.so': f"{home}/cosmovisor/genesis/bin/libwasmvm.x86_64.so",
+        'bin/peggo': f"{binary_dir}/peggo",
+    }
+    return artifacts, {name: f"{home}/config/{name}" for name in TOML_FILES}
+
+
+def local_artifacts(node_dir: Path, names: List[str]) -> Dict[str, str]:
+    """期望的哈希：manifest.sha256 优先，没有记录时计算节点目录中的文件；都没有的不比较"""
+    manifest = read_manifest(node_dir)
+    expected = {}
+    for name in names:
+        if name in manifest:
+            expected[name] = manifest[name]
+        elif (node_dir / name).is_file():
+            expected[name] = file_sha256(node_dir / name)
+    return expected
+
+
+def gather_command(artifacts: Dict[str, str], tomls: Dict[str, str]) -> str:
+    """一次往返：文件哈希（@ 名称 哈希）+ 去掉注释的 TOML（== 名称），整体 gzip"""
+    lines = [
+        "_h() { if test -f \"$2\"; then echo \"@ $1 $(sha256sum \"$2\" | cut -d' ' -f1)\"; "
+        "else echo \"@ $1 -\"; fi; }",
+        "_t() { echo \"== $1\"; if test -f \"$2\"; then grep -v -E '^[[:space:]]*(#|$)' \"$2\"; "
+        "else echo '!missing'; fi; }",
+        "{",
+    ]
+    lines += [f"_h {shlex.quote(name)} {shlex.quote(path)}" for name, path in artifacts.items()]
+    lines += [f"_t {shlex.quote(name)} {shlex.quote(path)}" for name, path in tomls.items()]
+    lines.append("} | gzip -c")
+    return '\n'.join(lines)
+
+
+def parse_gather(output: bytes) -> Tuple[Dict[str, str], Dict[str, Optional[str]]]:
+    """解析远程输出：(名称 -> 哈希或 "-", TOML 文件名 -> 文本或 None)"""
+    hashes: Dict[str, str] = {}
+    tomls: Dict[str, List[str]] = {}
+    current: Optional[List[str]] = None
+    for line in gzip.decompress(output).decode('utf-8', errors='replace').splitlines():
+        if current is None and line.startswith('@ '):
+            _, name, digest = line.split(' ', 2)
+            hashes[name] = digest.strip()
+        elif line.startswith('== '):
+            current = tomls.setdefault(line[3:].strip(), [])
+        elif current is not None:
+            current.append(line)
+    texts = {name: (None if lines == ['!missing'] else '\n'.join(lines)) for name, lines in tomls.items()}
+    return hashes, texts
+
+
+def check_host(node: str, inv: Inventory, config_dir: Path, control_dir: str,
+               ignore: List[str]) -> HostDrift:
+    result = HostDrift(node=node, ip=inv.ip(node))
+    node_dir = Path(config_dir) / node
+    artifacts, tomls = remote_paths(node, inv)
+    try:
+        local_tomls = {name: without_ignored(toml_values((node_dir / "config" / name).read_text(
+            encoding='utf-8')), ignore) for name in TOML_FILES}
+    except OSError as e:
+        result.error = f"本地配置不存在: {e.filename}"
+        return result
+    expected = local_artifacts(node_dir, list(artifacts))
+    artifacts = {name: path for name, path in artifacts.items() if name in expected}
+
+    command = gather_command(artifacts, tomls)
+    session = SSHSession(result.ip, str(inv.var(node, 'ansible_user', 'ubuntu')), control_dir)
+    start = time.time()
+    try:
+        result.bytes = len(command)
+        output = session.run(command, timeout=120)
+        result.bytes += len(output.stdout)
+        if output.returncode != 0:
+            detail = output.stderr.decode(errors='replace').strip().splitlines()
+            raise RemoteError(f"读取远程配置失败: {detail[-1]}" if detail else "读取远程配置失败")
+        hashes, texts = parse_gather(output.stdout)
+    except (RemoteError, OSError, ValueError, EOFError) as e:
+        result.error = str(e)
+        return result
+    finally:
+        session.close()
+        result.elapsed = time.time() - start
+
+    for name, digest in expected.items():
+        remote = hashes.get(name, '-')
+        if remote != digest:
+            result.artifacts[name] = (digest, remote)
+    for name in TOML_FILES:
+        text = texts.get(name)
+        if text is None:
+            result.missing.append(name)
+            continue
+        remote = without_ignored(toml_values(text), ignore)
+        result.digests[name] = (toml_digest(local_tomls[name]), toml_digest(remote))
+        result.keys += diff_values(name, local_tomls[name], remote)
+    return result
+
+
+# ---------- 修复 ----------
+
+PATCH_DRIVER = '''
+
+def _apply_drift_fix(base, edits):
+    import os
+    for name, params in edits.items():
+        path = os.path.join(base, name)
+        doc = TomlDocument.load(path)
+        text, missing = doc.patch(params, raw=True)
+        if text != doc.text:
+            tmp = path + '.drift-tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+            os.replace(tmp, path)
+        print(name, len(params) - len(missing))
+
+
+_apply_drift_fix(sys.argv[1], json.loads({edits!r}))
+'''
+
+
+def fix_command(node: str, inv: Inventory, base: str) -> str:
+    """远程以部署用户执行从标准输入读取的补丁程序（gzip 压缩的 toml_patch.py + 修改清单）"""
+    user = str(inv.var(node, 'deploy_user', 'ubuntu'))
+    return f"gzip -dc | sudo -u {shlex.quote(user)} python3 - {shlex.quote(base)}"
+
+
+def fix_program(diffs: List[KeyDiff]) -> bytes:
+    edits: Dict[str, Dict[str, str]] = {}
+    for d in diffs:
+        if d.fixable:
+            edits.setdefault(d.file, {})[d.key] = d.local
+    source = (SCRIPT_DIR / "toml_patch.py").read_text(encoding='utf-8')
+    program = source + "\nimport json\nimport sys\n" + PATCH_DRIVER.format(
+        edits=json.dumps(edits, ensure_ascii=False))
+    return gzip.compress(program.encode('utf-8'))
+
+
+def fix_host(result: HostDrift, inv: Inventory, control_dir: str) -> HostDrift:
+    """只推送远程存在且值不同的键"""
+    fixable = [d for d in result.keys if d.fixable]
+    if not fixable:
+        return result
+    home = str(inv.var(result.node, 'node_home_base', DEFAULT_NODE_HOME)).rstrip('/')
+    program = fix_program(fixable)
+    session = SSHSession(result.ip, str(inv.var(result.node, 'ansible_user', 'ubuntu')), control_dir)
+    try:
+        output = session.check(fix_command(result.node, inv, f"{home}/config"), "推送配置失败",
+                               stdin=program, timeout=60)
+        result.fixed = sum(int(line.split()[1]) for line in output.splitlines() if len(line.split()) == 2)
+        result.bytes += len(program)
+    except (RemoteError, ValueError) as e:
+        result.error = str(e)
+    finally:
+        session.close()
+    return result
+
+
+# ---------- 输出 ----------
+
+def _short(value: Optional[str]) -> str:
+    if value is None:
+        return "(缺失)"
+    value = ' '.join(value.split())
+    return value if len(value) <= VALUE_WIDTH else value[:VALUE_WIDTH - 1] + "…"
+
+
+def print_results(results: List[HostDrift], title: str):
+    rows = [["节点", "IP", "结果", "config.toml", "app.toml", "genesis", "二进制", "传输", "耗时"]]
+    for r in results:
+        if r.error:
+            rows.append([r.node, r.ip, "✗ 失败", "", "", "", "", format_bytes(r.bytes), f"{r.elapsed:.1f}s"])
+            continue
+        per_file = []
+        for name in TOML_FILES:
+            count = sum(1 for d in r.keys if d.file == name)
+            per_file.append("缺失" if name in r.missing else (f"{count} 项" if count else "✓"))
+        binaries = [n.split('/', 1)[1] for n in r.artifacts if n.startswith('bin/')]
+        rows.append([
+            r.node, r.ip, "⚠ 漂移" if r.drifted else "✓ 一致", *per_file,
+            "不一致" if 'config/genesis.json' in r.artifacts else "✓",
+            ', '.join(binaries) or "✓", format_bytes(r.bytes), f"{r.elapsed:.1f}s",
+        ])
+    print_rows(title, rows)
+
+    diff_rows = [["节点", "文件", "键", "本地", "远程"]]
+    for r in results:
+        for d in r.keys:
+            diff_rows.append([r.node, d.file, d.key, _short(d.local), _short(d.remote)])
+        for name, (local, remote) in r.artifacts.items():
+            diff_rows.append([r.node, name, "sha256", local[:16], "(缺失)" if remote == '-' else remote[:16]])
+    if len(diff_rows) > 1:
+        print_rows("差异", diff_rows)
+
+    for r in results:
+        if r.error:
+            print(f"✗ {r.node}: {r.error}", file=sys.stderr)
+
+
+def print_hints(results: List[HostDrift], fixed: bool):
+    redeploy = sorted(r.node for r in results
+                      if r.artifacts or r.missing or any(not d.fixable for d in r.keys))
+    restart = sorted(r.node for r in results if r.fixed)
+    fixable = sorted(r.node for r in results if not r.fixed and any(d.fixable for d in r.keys))
+    if fixable and not fixed:
+        print(f"只推送漂移的键: python3 scripts/config_drift.py {','.join(fixable)} --fix")
+    if restart:
+        print(f"配置已更新，重启后生效: ./node-control.sh restart node {','.join(restart)}")
+    if redeploy:
+        print("genesis/二进制文件不一致或键缺失/多出（--fix 不处理），需要重新部署（保留数据）:")
+        for node in redeploy:
+            print(f"  ./deploy-node.sh --host {node} --no-clean")
+
+
+def show_usage():
+    print("用法: config_drift.py [options] [node|all|node1,node2]")
+    print("")
+    print("选项:")
+    print("  -i <inventory>      inventory 文件（默认 ansible/inventory.yml）")
+    print("  --config-dir <dir>  本地配置目录（默认 chain-deploy-config）")
+    print("  --parallel <N>      最大并发主机数（默认 20）")
+    print("  --ignore <键>       忽略的键，逗号分隔，支持通配符（如 p2p.external_address,statesync.*）")
+    print("  --json              输出 JSON")
+    print("  --fix               只把漂移的键推送到远程，然后重新检查")
+
+
+def main():
+    args = sys.argv[1:]
+    inventory_file: Optional[str] = None
+    config_dir = DEFAULT_CONFIG_DIR
+    parallel = 20
+    ignore: List[str] = []
+    as_json = False
+    fix = False
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-h', '--help'):
+                show_usage()
+                sys.exit(0)
+            elif arg in ('-i', '--inventory'):
+                inventory_file = args[i + 1]
+                i += 1
+            elif arg == '--config-dir':
+                config_dir = Path(args[i + 1])
+                i += 1
+            elif arg == '--parallel':
+                parallel = int(args[i + 1])
+                i += 1
+            elif arg == '--ignore':
+                ignore += [p for p in args[i + 1].split(',') if p]
+                i += 1
+            elif arg == '--json':
+                as_json = True
+            elif arg == '--fix':
+                fix = True
+            elif arg.startswith('--'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"错误: 选项 {args[i]} 需要有效的参数值", file=sys.stderr)
+        sys.exit(1)
+
+    if len(positional) > 1:
+        show_usage()
+        sys.exit(1)
+
+    try:
+        inv = load_inventory(inventory_file)
+    except Exception as e:
+        print(f"错误: 无法加载 inventory: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    spec = positional[0] if positional else 'all'
+    nodes = inv.hosts('nodes') if spec == 'all' else spec.split(',')
+    unknown = [n for n in nodes if inv.node_type(n) is None]
+    if unknown or not nodes:
+        print(f"错误: 无效的节点名称: {', '.join(unknown) or spec}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.time()
+    with control_directory() as control_dir:
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+            results = list(pool.map(lambda n: check_host(n, inv, config_dir, control_dir, ignore), nodes))
+            if fix:
+                targets = [r for r in results if not r.error and any(d.fixable for d in r.keys)]
+                list(pool.map(lambda r: fix_host(r, inv, control_dir), targets))
+                # 修复后重新检查，保留推送的键数，传输量累计
+                done = [r for r in targets if not r.error]
+                rechecked = pool.map(lambda r: check_host(r.node, inv, config_dir, control_dir, ignore), done)
+                for before, after in zip(done, rechecked):
+                    after.fixed, after.bytes = before.fixed, before.bytes + after.bytes
+                    results[results.index(before)] = after
+    elapsed = time.time() - start
+
+    if as_json:
+        print(json.dumps([dict(asdict(r), drifted=r.drifted) for r in results], indent=2, ensure_ascii=False))
+    else:
+        drifted = sum(1 for r in results if r.drifted)
+        failed = sum(1 for r in results if r.error)
+        print_results(results, f"配置漂移检查: {len(results)} 个节点，漂移 {drifted}，失败 {failed}，"
+                               f"耗时 {elapsed:.1f}s")
+        print_hints(results, fix)
+
+    sys.exit(1 if any(r.drifted or r.error for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
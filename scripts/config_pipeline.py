@@ -0,0 +1,840 @@
+#!/usr/bin/env python3
+"""
+配置生成流水线（DAG 调度）
+将 generate_config.sh 的生成流程拆成按节点的任务，在有界进程池中按依赖关系并行执行：
+
+    init:<节点>          链二进制 init（sentry 删除 priv_validator_key.json 和 data/）
+    keys:<validator>     keys add <validator>、orchestrator-<validator>（与 init 并行）
+    account:<validator>  节点 genesis 添加验证者账户，写入 genesis-accounts/<validator>.csv
+    gentx:<validator>    genesis gentx
+    master               主节点 init + merge_genesis.py + 零地址账户（不依赖任何节点）
+    genesis-accounts     批量添加所有 validator/orchestrator 账户（依赖 master、account:*）
+    collect-gentxs       汇总钱包和 gentx，collect-gentxs + validate（依赖 genesis-accounts、gentx:*）
+    orchestrator:<validator>  导出 peggo_evm_key.json（只依赖 keys:<validator>）
+    peggo-env:<validator>     渲染 Peggo .env（与 generate-peggo-env.sh 共用 peggo_env.py）
+    genesis-share        genesis.json 存入内容寻址存储并硬链接到各节点
+    peers                规划拓扑并写入所有节点的 p2p 参数（依赖 init:*、gentx:*）
+    toml:<节点>          应用 node_config.yml（依赖 peers，保持与原流程相同的覆盖顺序）
+
+- 任务一旦依赖就绪即提交，同时就绪的任务按下游最长链优先
+- 每个任务的输出（包括链二进制的 stdout/stderr）写入独立日志 <log_dir>/<任务>.log
+- 任一任务失败即停止提交新任务，等待在运行的任务结束后输出失败日志并退出
+- 结束后输出关键路径和各阶段耗时，任务时间线写入 <log_dir>/summary.json
+- chain-deploy-config 的目录结构与 generate_config.sh 原流程一致
+- 生成完成后写入状态文件 chain-deploy-config/.pipeline_state.json（见 config_state.py）
+
+增量模式（--incremental）不清空 chain-deploy-config，按状态文件与当前输入的差异只重建受影响的输出，
+执行前输出变更计划，结束后列出输出文件实际变化的节点：
+
+    remove:<节点>        删除已从 inventory 移除（或角色变更）的节点目录
+    init/keys/...        新节点与完整流程相同的任务；新增 sentry 沿用已有 genesis
+    reset-genesis:<validator>  链 ID 或质押数量变更时为已有 validator 重建节点 genesis（密钥不变）
+    template:<节点>      node_config.yml 参数变化时用全新 init 的 config.toml/app.toml 替换
+                         （删除的参数不会残留），密钥不变
+    master               genesis 输入变化时重新生成主节点 genesis，保留未失效的 gentx
+    p2p                  只写入 peer 列表变化的节点（沿用状态中的 peer 图时新增 sentry 不影响其他节点）
+    toml:<节点>          重写 p2p 或模板的节点重新应用 node_config.yml
+
+命令行:
+    python3 scripts/config_pipeline.py [--jobs N] [--binary injectived] [--base-dir chain-deploy-config]
+                                       [-i ansible/inventory.yml] [-c node_config.yml]
+                                       [--genesis-config genesis_config.yml] [--log-dir build/pipeline]
+                                       [--no-peggo-env] [--plan]
+                                       [--incremental [--replan] [--allow-genesis-change]] [--adopt]
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from add_genesis_accounts import add_accounts, load_manifest
+from apply_node_config_fast import apply_node_config, load_node_config
+from artifact_store import ArtifactStore, node_dirs, share
+from config_state import (
+    ChangePlan, build_state, collect_inputs, diff_state, load_state, output_changes,
+    plan_graph, print_change_plan, print_output_changes, save_state, topology_plan,
+)
+from configure_peers import (
+    collect_node_ids, configure_persistent_peers, get_p2p_port, update_p2p_settings,
+)
+from generate_orchestrator_keys import export_key_info, write_key_info
+from inventory import load_inventory
+from keyring_reader import read_address
+from merge_genesis import atomic_write, dump_json, load_json
+from peer_topology import load_topology_options, p2p_settings
+from peggo_env import PEGGO_ENV_DEFAULTS, write_peggo_env
+from table import print_rows
+import tracing
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_LOG_DIR = ROOT_DIR / "build" / "pipeline"
+
+# 链 ID、moniker、余额、质押数量和零地址账户的默认值只在 generate_config.sh 的配置参数段定义
+GENERATE_CONFIG_SCRIPT = ROOT_DIR / "generate_config.sh"
+SCRIPT_PARAMS = {
+    'CHAINID': 'chain_id',
+    'MONIKER': 'moniker',
+    'VALIDATOR_BALANCE': 'validator_balance',
+    'ORCHESTRATOR_BALANCE': 'orchestrator_balance',
+    'VALIDATOR_STAKE': 'stake',
+    'ZERO_ACCOUNT': 'zero_account',
+}
+# 增量模式用全新 init 的文件替换的节点配置
+TEMPLATE_FILES = ("config.toml", "app.toml", "client.toml")
+
+
+def load_script_defaults(script: Path = GENERATE_CONFIG_SCRIPT) -> Dict[str, str]:
+    """读取 generate_config.sh 中 NAME="value" 形式的配置参数"""
+    defaults = {}
+    for line in script.read_text(encoding='utf-8').splitlines():
+        match = re.match(r'^([A-Z_]+)="([^"$]*)"$', line)
+        if match and match.group(1) in SCRIPT_PARAMS:
+            defaults[SCRIPT_PARAMS[match.group(1)]] = match.group(2)
+    missing = [name for name, key in SCRIPT_PARAMS.items() if key not in defaults]
+    if missing:
+        raise ValueError(f"{script.name} 缺少配置参数: {', '.join(missing)}")
+    return defaults
+
+
+class TaskError(Exception):
+    """任务执行失败（详细输出在任务日志中）"""
+
+
+@dataclass
+class Settings:
+    binary: str
+    chain_id: str
+    moniker: str
+    base_dir: str
+    inventory_file: str
+    node_config_file: str
+    genesis_config_file: str
+    validator_balance: str
+    orchestrator_balance: str
+    stake: str
+    zero_account: str
+    validators: List[str] = field(default_factory=list)
+    sentries: List[str] = field(default_factory=list)
+
+    @property
+    def master_home(self) -> str:
+        return f"{self.base_dir}/master"
+
+    @property
+    def accounts_dir(self) -> str:
+        return f"{self.base_dir}/genesis-accounts"
+
+    def home(self, name: str) -> str:
+        return f"{self.base_dir}/{name}"
+
+
+@dataclass
+class Task:
+    name: str
+    stage: str
+    func: Callable
+    args: Tuple
+    deps: List[str] = field(default_factory=list)
+    # 运行结果（相对流水线开始的秒数）
+    start: Optional[float] = None
+    end: Optional[float] = None
+    status: str = "pending"
+    error: str = ""
+
+    @property
+    def duration(self) -> float:
+        return (self.end or 0) - (self.start or 0)
+
+
+# ---------- 任务实现（在进程池 worker 中执行，输出已重定向到任务日志） ----------
+
+def command(args: List[str]) -> str:
+    """执行命令，输出写入任务日志，失败时抛出 TaskError"""
+    print(f"$ {' '.join(args)}", flush=True)
+    # span 名称：程序名 + 子命令（keys add、genesis gentx）或脚本名
+    sub = args[1:3] if args[1] in ('keys', 'genesis', 'tendermint') else [Path(args[1]).name]
+    result = tracing.run(args, name=' '.join([Path(args[0]).name] + sub),
+                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    sys.stdout.write(result.stdout)
+    sys.stdout.flush()
+    if result.returncode != 0:
+        detail = result.stdout.strip().splitlines()
+        raise TaskError(f"{Path(args[0]).name} {' '.join(args[1:3])} 退出码 {result.returncode}"
+                        + (f": {detail[-1]}" if detail else ""))
+    return result.stdout
+
+
+def key_address(s: Settings, home: str, key_name: str) -> str:
+    """优先直接读取 keyring，失败时回退到 keys show"""
+    return read_address(home, key_name) or command(
+        [s.binary, 'keys', 'show', key_name, '-a', '--home', home, '--keyring-backend', 'test']).strip()
+
+
+def task_init(s: Settings, name: str, role: str):
+    home = s.home(name)
+    command([s.binary, 'init', name, '--chain-id', s.chain_id, '--home', home])
+    if role == 'sentry':
+        # 删除 rpc 节点不需要的配置（数据目录为空：链已运行时用 deploy-node.sh --state-sync 从快照同步）
+        Path(home, 'config', 'priv_validator_key.json').unlink(missing_ok=True)
+        shutil.rmtree(Path(home, 'data'), ignore_errors=True)
+
+
+def task_keys(s: Settings, name: str):
+    home = s.home(name)
+    for key_name in (name, f"orchestrator-{name}"):
+        command([s.binary, 'keys', 'add', key_name, '--home', home, '--keyring-backend', 'test'])
+
+
+def write_account_manifest(s: Settings, name: str) -> str:
+    """写入主节点 genesis 需要的账户清单（address,amount），返回验证者地址"""
+    home = s.home(name)
+    address = key_address(s, home, name)
+    orchestrator = key_address(s, home, f"orchestrator-{name}")
+    Path(s.accounts_dir, f"{name}.csv").write_text(
+        f"{address},{s.validator_balance}\n{orchestrator},{s.orchestrator_balance}\n", encoding='utf-8')
+    return address
+
+
+def task_account(s: Settings, name: str):
+    address = write_account_manifest(s, name)
+    command([s.binary, 'add-genesis-account', '--chain-id', s.chain_id, '--home', s.home(name),
+             address, s.validator_balance])
+
+
+def task_gentx(s: Settings, name: str):
+    command([s.binary, 'genesis', 'gentx', name, s.stake, '--chain-id', s.chain_id,
+             '--home', s.home(name), '--keyring-backend', 'test'])
+
+
+def task_master(s: Settings):
+    home = s.master_home
+    Path(home, 'keyring-test').mkdir(parents=True, exist_ok=True)
+    Path(home, 'config', 'gentx').mkdir(parents=True, exist_ok=True)
+    command([s.binary, 'init', s.moniker, '--chain-id', s.chain_id, '--home', home])
+    command([sys.executable, str(ROOT_DIR / "scripts" / "merge_genesis.py"),
+             s.genesis_config_file, f"{home}/config/genesis.json"])
+    # zero address account（同时作为批量添加账户时的账户类型模板）
+    command([s.binary, 'add-genesis-account', '--chain-id', s.chain_id, '--home', home, s.zero_account, '1inj'])
+
+
+def task_genesis_accounts(s: Settings, refresh: Tuple[str, ...] = ()):
+    genesis_file = f"{s.master_home}/config/genesis.json"
+    # 增量模式：未重新生成的 validator 按当前余额重写清单
+    for name in refresh:
+        write_account_manifest(s, name)
+    # 额外的账户清单（如空投 CSV）可放入 genesis-accounts 一并导入
+    entries = []
+    for manifest in sorted(Path(s.accounts_dir).glob('*.csv')):
+        entries.extend(load_manifest(str(manifest)))
+    genesis = load_json(genesis_file)
+    created, updated = add_accounts(genesis, entries)
+    atomic_write(genesis_file, lambda f: f.write(dump_json(genesis).encode('utf-8')))
+    print(f"✓ 已添加 {created} 个 Genesis 账户（更新余额 {updated} 个，共 {len(entries)} 条记录）")
+
+
+def task_collect_gentxs(s: Settings):
+    master = Path(s.master_home)
+    for name in s.validators:
+        node_home = Path(s.home(name))
+        # 复制 validator 和 orchestrator 钱包到 master
+        shutil.copytree(node_home / 'keyring-test', master / 'keyring-test', dirs_exist_ok=True)
+        # 移动 gentx 到 master
+        for gentx in (node_home / 'config' / 'gentx').glob('gentx-*.json'):
+            shutil.move(str(gentx), str(master / 'config' / 'gentx' / gentx.name))
+    command([s.binary, 'genesis', 'collect-gentxs', '--home', s.master_home])
+    command([s.binary, 'genesis', 'validate', '--home', s.master_home])
+
+
+def task_orchestrator(s: Settings, name: str):
+    key_info = export_key_info(name, s.binary, s.home(name), 'test')
+    if not key_info:
+        raise TaskError(f"无法导出 orchestrator-{name} 的密钥")
+    write_key_info(Path(s.home(name), 'peggo_evm_key.json'), key_info)
+    print(f"✓ {name}: {key_info['cosmos_address']} (EVM: 0x{key_info['evm_address']})")
+
+
+def task_peggo_env(s: Settings, name: str):
+    write_peggo_env(Path(s.home(name)), load_inventory(s.inventory_file).group_vars)
+
+
+def task_genesis_share(s: Settings, nodes: Optional[List[str]] = None):
+    share(Path(s.base_dir), 'config/genesis.json', nodes or node_dirs(Path(s.base_dir)),
+          source=Path(s.master_home, 'config', 'genesis.json'))
+
+
+def task_peers(s: Settings):
+    configure_persistent_peers(s.binary, s.base_dir, s.node_config_file, s.inventory_file)
+
+
+# ---------- 增量模式任务 ----------
+
+def init_template(s: Settings, name: str, tmp: str) -> Path:
+    """在临时目录执行 init，返回其 config 目录（节点自身的密钥不受影响）"""
+    home = Path(tmp, name)
+    command([s.binary, 'init', name, '--chain-id', s.chain_id, '--home', str(home)])
+    return home / 'config'
+
+
+def task_remove(s: Settings, name: str):
+    shutil.rmtree(s.home(name), ignore_errors=True)
+    Path(s.accounts_dir, f"{name}.csv").unlink(missing_ok=True)
+    print(f"✓ 已删除 {s.home(name)}")
+
+
+def task_reset_genesis(s: Settings, name: str):
+    genesis_file = Path(s.home(name), 'config', 'genesis.json')
+    with tempfile.TemporaryDirectory(prefix='config-pipeline-') as tmp:
+        template = init_template(s, name, tmp)
+        # 原文件是指向共享存储的只读硬链接，先断开再写入
+        genesis_file.unlink(missing_ok=True)
+        shutil.copyfile(template / 'genesis.json', genesis_file)
+    shutil.rmtree(Path(s.home(name), 'config', 'gentx'), ignore_errors=True)
+
+
+def task_template(s: Settings, name: str):
+    config_dir = Path(s.home(name), 'config')
+    with tempfile.TemporaryDirectory(prefix='config-pipeline-') as tmp:
+        template = init_template(s, name, tmp)
+        for filename in TEMPLATE_FILES:
+            if (template / filename).exists():
+                shutil.copyfile(template / filename, config_dir / filename)
+
+
+def task_master_rebuild(s: Settings, stale_gentx: Tuple[str, ...], all_gentx: bool):
+    """重新生成主节点 genesis；保留仍然有效的 gentx，钱包由 collect-gentxs 重新复制"""
+    master = Path(s.master_home)
+    Path(master, 'config', 'genesis.json').unlink(missing_ok=True)
+    shutil.rmtree(master / 'keyring-test', ignore_errors=True)
+    for gentx in Path(master, 'config', 'gentx').glob('gentx-*.json'):
+        if all_gentx or gentx.name in stale_gentx:
+            gentx.unlink()
+            print(f"删除 {gentx.name}")
+    task_master(s)
+
+
+def task_p2p(s: Settings, graph: Dict[str, List[str]], targets: Tuple[str, ...]):
+    inv = load_inventory(s.inventory_file)
+    plan = topology_plan(inv, graph, load_topology_options(s.node_config_file))
+    node_ids = collect_node_ids(s.binary, s.base_dir, {name: '' for name in graph})
+    missing = [name for name in graph if name not in node_ids]
+    if missing:
+        raise TaskError(f"无法获取 node_id: {', '.join(missing)}")
+    settings = p2p_settings(plan, node_ids, get_p2p_port(s.node_config_file))
+    for name in targets:
+        if not update_p2p_settings(f"{s.home(name)}/config/config.toml", settings[name]):
+            raise TaskError(f"{name} 配置文件不存在")
+        print(f"  ✓ {name} -> {len(graph[name])} 个 peer")
+
+
+# 各 worker 进程缓存的 node_config.yml
+_NODE_CONFIG: Dict[str, Dict] = {}
+
+
+def task_toml(s: Settings, name: str, role: str):
+    config = _NODE_CONFIG.get(s.node_config_file)
+    if config is None:
+        config = _NODE_CONFIG[s.node_config_file] = load_node_config(s.node_config_file)
+    missing = apply_node_config(config, s.home(name), name, role)
+    if missing:
+        print(f"⚠ 未找到参数 {', '.join(missing)}")
+
+
+# ---------- DAG ----------
+
+def build_tasks(s: Settings, peggo_env: bool = True) -> Dict[str, Task]:
+    tasks: Dict[str, Task] = {}
+
+    def add(name: str, stage: str, func: Callable, args: Tuple, deps: List[str]):
+        tasks[name] = Task(name, stage, func, args, deps)
+
+    nodes = [(n, 'validator') for n in s.validators] + [(n, 'sentry') for n in s.sentries]
+    for name, role in nodes:
+        add(f"init:{name}", 'init', task_init, (s, name, role), [])
+    for name in s.validators:
+        add(f"keys:{name}", 'keys', task_keys, (s, name), [])
+        add(f"account:{name}", 'account', task_account, (s, name), [f"init:{name}", f"keys:{name}"])
+        add(f"gentx:{name}", 'gentx', task_gentx, (s, name), [f"account:{name}"])
+        add(f"orchestrator:{name}", 'orchestrator', task_orchestrator, (s, name), [f"keys:{name}"])
+        if peggo_env:
+            add(f"peggo-env:{name}", 'peggo-env', task_peggo_env, (s, name), [f"orchestrator:{name}"])
+
+    add('master', 'master', task_master, (s,), [])
+    add('genesis-accounts', 'genesis-accounts', task_genesis_accounts, (s,),
+        ['master'] + [f"account:{n}" for n in s.validators])
+    add('collect-gentxs', 'collect-gentxs', task_collect_gentxs, (s,),
+        ['genesis-accounts'] + [f"gentx:{n}" for n in s.validators])
+    add('genesis-share', 'genesis-share', task_genesis_share, (s,),
+        ['collect-gentxs'] + [f"init:{n}" for n, _ in nodes])
+    # gentx 读取节点 config.toml，peers/toml 在其之后修改
+    add('peers', 'peers', task_peers, (s,),
+        [f"init:{n}" for n, _ in nodes] + [f"gentx:{n}" for n in s.validators])
+    for name, role in nodes:
+        add(f"toml:{name}", 'toml', task_toml, (s, name, role), ['peers'])
+    return tasks
+
+
+def build_incremental_tasks(s: Settings, plan: ChangePlan, peggo_env: bool = True) -> Dict[str, Task]:
+    """按变更计划生成任务；依赖关系与完整流程一致，只包含受影响的节点"""
+    tasks: Dict[str, Task] = {}
+
+    def add(name: str, stage: str, func: Callable, args: Tuple, deps: List[str]):
+        tasks[name] = Task(name, stage, func, args, deps)
+
+    roles = {name: 'validator' for name in s.validators}
+    roles.update({name: 'sentry' for name in s.sentries})
+    removed = [f"remove:{n}" for n in plan.removed]
+    for name in plan.removed:
+        add(f"remove:{name}", 'remove', task_remove, (s, name), [])
+
+    for name in plan.created:
+        pre = [f"remove:{name}"] if name in plan.removed else []
+        add(f"init:{name}", 'init', task_init, (s, name, roles[name]), pre)
+        if roles[name] != 'validator':
+            continue
+        add(f"keys:{name}", 'keys', task_keys, (s, name), pre)
+        add(f"account:{name}", 'account', task_account, (s, name), [f"init:{name}", f"keys:{name}"])
+        add(f"gentx:{name}", 'gentx', task_gentx, (s, name), [f"account:{name}"])
+        add(f"orchestrator:{name}", 'orchestrator', task_orchestrator, (s, name), [f"keys:{name}"])
+        if peggo_env:
+            add(f"peggo-env:{name}", 'peggo-env', task_peggo_env, (s, name), [f"orchestrator:{name}"])
+    for name in plan.regentx:
+        add(f"reset-genesis:{name}", 'reset-genesis', task_reset_genesis, (s, name), [])
+        add(f"account:{name}", 'account', task_account, (s, name), [f"reset-genesis:{name}"])
+        add(f"gentx:{name}", 'gentx', task_gentx, (s, name), [f"account:{name}"])
+    for name in plan.peggo_env:
+        add(f"peggo-env:{name}", 'peggo-env', task_peggo_env, (s, name), [])
+
+    inits = [t for t in tasks if t.startswith('init:')]
+    gentxs = [t for t in tasks if t.startswith('gentx:')]
+    if plan.genesis:
+        refresh = tuple(n for n in s.validators if n not in plan.created and n not in plan.regentx)
+        add('master', 'master', task_master_rebuild, (s, tuple(plan.removed_gentx), bool(plan.regentx)), [])
+        add('genesis-accounts', 'genesis-accounts', task_genesis_accounts, (s, refresh),
+            ['master'] + [t for t in tasks if t.startswith('account:')] + removed)
+        add('collect-gentxs', 'collect-gentxs', task_collect_gentxs, (s,), ['genesis-accounts'] + gentxs)
+    if plan.genesis or plan.created:
+        # genesis 不变时只把已有 genesis 链接到新节点
+        add('genesis-share', 'genesis-share', task_genesis_share,
+            (s, None if plan.genesis else sorted(plan.created)),
+            (['collect-gentxs'] if plan.genesis else []) + inits + removed)
+
+    for name in plan.config:
+        add(f"template:{name}", 'template', task_template, (s, name), [])
+    targets = sorted(set(plan.created) | set(plan.config) | set(plan.p2p))
+    if targets:
+        add('p2p', 'p2p', task_p2p, (s, plan.graph, tuple(targets)),
+            inits + [t for t in tasks if t.startswith('template:')] + gentxs + removed)
+        for name in targets:
+            add(f"toml:{name}", 'toml', task_toml, (s, name, roles[name]), ['p2p'])
+    return tasks
+
+
+def downstream_depth(tasks: Dict[str, Task]) -> Dict[str, int]:
+    """每个任务到终点的最长链长度（就绪任务的提交优先级）"""
+    children: Dict[str, List[str]] = {name: [] for name in tasks}
+    for task in tasks.values():
+        for dep in task.deps:
+            children[dep].append(task.name)
+
+    depth: Dict[str, int] = {}
+
+    def visit(name: str) -> int:
+        if name not in depth:
+            depth[name] = 1 + max((visit(c) for c in children[name]), default=0)
+        return depth[name]
+
+    for name in tasks:
+        visit(name)
+    return depth
+
+
+def _execute(func: Callable, args: Tuple, log_file: str, name: str,
+             parent: Optional[str]) -> Tuple[float, float]:
+    """在 worker 中执行任务，stdout/stderr（含子进程）重定向到任务日志"""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    fd = os.open(log_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    saved = os.dup(1), os.dup(2)
+    os.dup2(fd, 1)
+    os.dup2(fd, 2)
+    start = time.time()
+    # 节点任务（init:validator-0）以节点名为主机，全局任务记为本地
+    host = name.partition(':')[2] or tracing.LOCAL_HOST
+    try:
+        with tracing.span(name, host=host, parent=parent, stage=name.partition(':')[0]):
+            func(*args)
+    except TaskError:
+        raise
+    except SystemExit as e:
+        raise TaskError(f"退出码 {e.code}")
+    except Exception as e:
+        traceback.print_exc()
+        raise TaskError(f"{type(e).__name__}: {e}")
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for f in (fd,) + saved:
+            os.close(f)
+    return start, time.time()
+
+
+def run_dag(tasks: Dict[str, Task], jobs: int, log_dir: Path) -> bool:
+    """按依赖调度任务，任一失败即停止提交；返回是否全部成功"""
+    log_dir.mkdir(parents=True, exist_ok=True)
+    depth = downstream_depth(tasks)
+    waiting = {name: set(task.deps) for name, task in tasks.items()}
+    dependents: Dict[str, List[str]] = {name: [] for name in tasks}
+    for task in tasks.values():
+        for dep in task.deps:
+            dependents[dep].append(task.name)
+    stage_total: Dict[str, int] = {}
+    stage_done: Dict[str, int] = {}
+    for task in tasks.values():
+        stage_total[task.stage] = stage_total.get(task.stage, 0) + 1
+
+    ready = [name for name, deps in waiting.items() if not deps]
+    running = {}
+    failed: Optional[Task] = None
+    origin = time.time()
+    # worker 进程不继承 contextvars，显式传递父 span
+    parent = tracing.current_parent()
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        while ready or running:
+            if failed is None:
+                ready.sort(key=lambda n: (-depth[n], n))
+                while ready and len(running) < jobs:
+                    task = tasks[ready.pop(0)]
+                    task.status = "running"
+                    future = executor.submit(_execute, task.func, task.args,
+                                             str(log_dir / f"{task.name.replace(':', '_')}.log"),
+                                             task.name, parent)
+                    running[future] = task
+            elif not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                try:
+                    start, end = future.result()
+                    task.start, task.end, task.status = start - origin, end - origin, "done"
+                except Exception as e:
+                    task.status, task.error, task.end = "failed", str(e), time.time() - origin
+                    print(f"  ✗ {task.name}: {task.error}", file=sys.stderr, flush=True)
+                    failed = failed or task
+                    continue
+
+                stage_done[task.stage] = stage_done.get(task.stage, 0) + 1
+                if stage_done[task.stage] == stage_total[task.stage]:
+                    print(f"  ✓ {task.stage} ({stage_total[task.stage]}) {task.end:.1f}s", flush=True)
+                for child in dependents[task.name]:
+                    waiting[child].discard(task.name)
+                    if not waiting[child]:
+                        ready.append(child)
+
+    if failed:
+        skipped = sum(1 for t in tasks.values() if t.status == "pending")
+        log_file = log_dir / f"{failed.name.replace(':', '_')}.log"
+        print(f"\n✗ 任务 {failed.name} 失败，跳过 {skipped} 个未开始的任务", file=sys.stderr)
+        print(f"  日志: {log_file}", file=sys.stderr)
+        try:
+            for line in log_file.read_text(encoding='utf-8', errors='replace').splitlines()[-20:]:
+                print(f"    {line}", file=sys.stderr)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+# ---------- 汇总 ----------
+
+def critical_path(tasks: Dict[str, Task]) -> List[Task]:
+    """从最后结束的任务沿"最晚结束的依赖"回溯"""
+    finished = [t for t in tasks.values() if t.status == "done"]
+    if not finished:
+        return []
+    path = [max(finished, key=lambda t: t.end)]
+    while path[-1].deps:
+        path.append(max((tasks[d] for d in path[-1].deps), key=lambda t: t.end))
+    return list(reversed(path))
+
+
+def summarize(tasks: Dict[str, Task], wall: float, jobs: int, ok: bool) -> Dict:
+    """输出关键路径（仅全部成功时）和各阶段耗时，返回 summary.json 内容"""
+    path = critical_path(tasks) if ok else []
+    busy = sum(t.duration for t in tasks.values() if t.status == "done")
+
+    if path:
+        rows = [["任务", "开始(s)", "耗时(s)", "等待(s)"]]
+        previous_end = 0.0
+        for task in path:
+            rows.append([task.name, f"{task.start:.2f}", f"{task.duration:.2f}",
+                         f"{max(0.0, task.start - previous_end):.2f}"])
+            previous_end = task.end
+        print_rows("关键路径", rows)
+
+    stages: Dict[str, List[Task]] = {}
+    for task in tasks.values():
+        if task.status == "done":
+            stages.setdefault(task.stage, []).append(task)
+    rows = [["阶段", "任务数", "合计(s)", "最长(s)", "结束于(s)"]]
+    for stage, items in sorted(stages.items(), key=lambda kv: max(t.end for t in kv[1])):
+        longest = max(items, key=lambda t: t.duration)
+        rows.append([stage, str(len(items)), f"{sum(t.duration for t in items):.2f}",
+                     f"{longest.duration:.2f}", f"{max(t.end for t in items):.2f}"])
+    print_rows("阶段耗时", rows)
+
+    print(f"总耗时 {wall:.2f}s，任务耗时合计 {busy:.2f}s，平均并行度 {busy / wall if wall else 0:.1f}"
+          f"（{jobs} 个 worker）")
+    if path:
+        path_time = sum(t.duration for t in path)
+        print(f"关键路径 {len(path)} 个任务，执行 {path_time:.2f}s，调度等待 {max(0.0, wall - path_time):.2f}s")
+
+    return {
+        'wall': round(wall, 3),
+        'busy': round(busy, 3),
+        'jobs': jobs,
+        'critical_path': [t.name for t in path],
+        'tasks': [{'name': t.name, 'stage': t.stage, 'deps': t.deps, 'status': t.status,
+                   'start': None if t.start is None else round(t.start, 3),
+                   'end': None if t.end is None else round(t.end, 3), 'error': t.error}
+                  for t in tasks.values()],
+    }
+
+
+def print_plan(tasks: Dict[str, Task]):
+    depth = downstream_depth(tasks)
+    rows = [["任务", "阶段", "优先级", "依赖"]]
+    for task in sorted(tasks.values(), key=lambda t: (-depth[t.name], t.name)):
+        deps = ', '.join(task.deps[:3]) + (f" 等 {len(task.deps)} 个" if len(task.deps) > 3 else '')
+        rows.append([task.name, task.stage, str(depth[task.name]), deps or '-'])
+    print_rows(f"任务图（{len(tasks)} 个任务）", rows)
+
+
+# ---------- 命令 ----------
+
+def clean_old_data(s: Settings):
+    base_dir = Path(s.base_dir)
+    if base_dir.exists():
+        shutil.rmtree(base_dir)
+    Path(s.accounts_dir).mkdir(parents=True)
+
+
+def show_usage():
+    print("用法: config_pipeline.py [options]")
+    print("")
+    print("按依赖关系并行生成 chain-deploy-config（与 generate_config.sh 的输出一致）")
+    print("")
+    print("选项:")
+    print("  -j, --jobs <N>             并行 worker 数（默认 CPU 核数）")
+    print("  --binary <path>            链二进制（默认 injectived）")
+    print("  --chain-id <id>            链 ID（默认值及以下余额、质押数量见 generate_config.sh 的配置参数）")
+    print("  --moniker <name>           主节点 moniker")
+    print("  --base-dir <dir>           输出目录（默认 chain-deploy-config）")
+    print("  -i, --inventory <file>     inventory 文件（默认 ansible/inventory.yml）")
+    print("  -c, --config <file>        node_config.yml")
+    print("  --genesis-config <file>    genesis_config.yml")
+    print("  --validator-balance <c>    验证者账户余额")
+    print("  --orchestrator-balance <c> Orchestrator 账户余额")
+    print("  --stake <coins>            gentx 质押数量")
+    print(f"  --log-dir <dir>            任务日志目录（默认 {DEFAULT_LOG_DIR.relative_to(ROOT_DIR)}）")
+    print("  --no-peggo-env             不生成 Peggo .env")
+    print("  --plan                     只输出任务图（增量模式为变更计划），不执行")
+    print("  --incremental              增量模式：按状态文件只重建受影响的输出，保留已有密钥")
+    print("  --replan                   增量模式下重新规划整个 P2P 拓扑（默认沿用已有 peer 图）")
+    print("  --allow-genesis-change     增量模式下允许重新生成 genesis（链需从新 genesis 重启）")
+    print("  --adopt                    为已有的 chain-deploy-config 记录当前输入作为状态（不修改文件）")
+    print("")
+    print("示例:")
+    print("  config_pipeline.py --jobs 8")
+    print("  config_pipeline.py --plan -i /tmp/inventory-128.yml")
+    print("  config_pipeline.py --incremental --plan")
+
+
+def write_state(s: Settings, inv, inputs: Dict, graph: Dict[str, List[str]]) -> Dict:
+    """记录本次生成的输入和输出摘要"""
+    node_ids = collect_node_ids(s.binary, s.base_dir, {name: '' for name in inputs['nodes']})
+    plan = topology_plan(inv, graph, load_topology_options(s.node_config_file))
+    state = build_state(inputs, inv, graph, plan, node_ids, get_p2p_port(s.node_config_file), s.base_dir)
+    save_state(s.base_dir, state)
+    return state
+
+
+def current_inputs(s: Settings, inv, peggo_env: bool) -> Dict:
+    return collect_inputs(s, inv, load_node_config(s.node_config_file), get_p2p_port(s.node_config_file),
+                          PEGGO_ENV_DEFAULTS if peggo_env else None)
+
+
+def run_tasks(s: Settings, tasks: Dict[str, Task], jobs: int, log_dir: Path) -> bool:
+    start = time.time()
+    ok = run_dag(tasks, jobs, log_dir)
+    summary = summarize(tasks, time.time() - start, jobs, ok)
+    summary['settings'] = {k: v for k, v in asdict(s).items() if k not in ('validators', 'sentries')}
+    (log_dir / "summary.json").write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding='utf-8')
+    return ok
+
+
+def run_incremental(s: Settings, inv, options: Dict):
+    """增量模式：输出变更计划，只执行受影响的任务"""
+    previous = load_state(s.base_dir)
+    inputs = current_inputs(s, inv, options['peggo_env'])
+    topology = load_topology_options(s.node_config_file)
+
+    if options['adopt']:
+        if not Path(s.base_dir, 'master').is_dir():
+            print(f"错误: 未找到已生成的配置: {s.base_dir}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            graph, _ = plan_graph(inv, topology, inputs, None)
+        except ValueError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            sys.exit(1)
+        write_state(s, inv, inputs, graph)
+        print(f"✓ 已记录 {len(inputs['nodes'])} 个节点的当前状态: {s.base_dir}")
+        return
+
+    if previous is None:
+        print(f"错误: 未找到状态文件 {s.base_dir}/.pipeline_state.json", file=sys.stderr)
+        print("  先完整生成一次，或对现有配置执行 --adopt", file=sys.stderr)
+        sys.exit(1)
+    try:
+        plan = diff_state(previous, inputs, inv, topology, get_p2p_port(s.node_config_file),
+                          options['replan'])
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print_change_plan(plan, previous, inputs)
+    if plan.empty:
+        print("✓ 配置已是最新，无需变更")
+        return
+    if plan.genesis and not options['allow_genesis_change']:
+        print("错误: 变更需要重新生成 genesis，确认后加 --allow-genesis-change 执行", file=sys.stderr)
+        sys.exit(1)
+    if options['plan_only']:
+        return
+
+    tasks = build_incremental_tasks(s, plan, options['peggo_env'])
+    print(f"\n执行 {len(tasks)} 个任务（{options['jobs']} 个 worker，日志 {options['log_dir']}）")
+    if not run_tasks(s, tasks, options['jobs'], options['log_dir']):
+        sys.exit(1)
+
+    # 删除的 validator 清单已移除，重新计算输入再记录
+    state = write_state(s, inv, current_inputs(s, inv, options['peggo_env']), plan.graph)
+    ArtifactStore(Path(s.base_dir)).gc()
+    print("")
+    print_output_changes(output_changes(previous, state),
+                         {name: entry['role'] for name, entry in state['nodes'].items()})
+
+
+def main():
+    args = sys.argv[1:]
+    options = {
+        'binary': 'injectived',
+        'base_dir': str(ROOT_DIR / "chain-deploy-config"),
+        'inventory_file': str(ROOT_DIR / "ansible" / "inventory.yml"),
+        'node_config_file': str(ROOT_DIR / "node_config.yml"),
+        'genesis_config_file': str(ROOT_DIR / "genesis_config.yml"),
+        **load_script_defaults(),
+    }
+    value_options = {
+        '--binary': 'binary', '--chain-id': 'chain_id', '--moniker': 'moniker',
+        '--base-dir': 'base_dir', '-i': 'inventory_file', '--inventory': 'inventory_file',
+        '-c': 'node_config_file', '--config': 'node_config_file',
+        '--genesis-config': 'genesis_config_file', '--validator-balance': 'validator_balance',
+        '--orchestrator-balance': 'orchestrator_balance', '--stake': 'stake',
+    }
+    jobs = os.cpu_count() or 1
+    log_dir = DEFAULT_LOG_DIR
+    peggo_env = True
+    plan_only = False
+    incremental = False
+    flags = {'--replan': 'replan', '--allow-genesis-change': 'allow_genesis_change', '--adopt': 'adopt'}
+    modes = dict.fromkeys(flags.values(), False)
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-h', '--help'):
+                show_usage()
+                sys.exit(0)
+            elif arg in value_options:
+                options[value_options[arg]] = args[i + 1]
+                i += 1
+            elif arg in ('-j', '--jobs'):
+                jobs = max(1, int(args[i + 1]))
+                i += 1
+            elif arg == '--log-dir':
+                log_dir = Path(args[i + 1])
+                i += 1
+            elif arg == '--no-peggo-env':
+                peggo_env = False
+            elif arg == '--plan':
+                plan_only = True
+            elif arg == '--incremental':
+                incremental = True
+            elif arg in flags:
+                modes[flags[arg]] = True
+            else:
+                print(f"未知参数: {arg}", file=sys.stderr)
+                show_usage()
+                sys.exit(1)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"参数错误: {' '.join(args[i:i + 2])}", file=sys.stderr)
+        sys.exit(1)
+
+    for key in ('inventory_file', 'node_config_file', 'genesis_config_file'):
+        if not Path(options[key]).exists():
+            print(f"错误: 文件不存在: {options[key]}", file=sys.stderr)
+            sys.exit(1)
+
+    inv = load_inventory(options['inventory_file'])
+    settings = Settings(**options, validators=sorted(inv.validators()), sentries=sorted(inv.sentries()))
+    settings.base_dir = str(Path(settings.base_dir).resolve())
+    if not settings.validators:
+        print("未读取到任何 validator 节点", file=sys.stderr)
+        sys.exit(1)
+
+    if incremental or modes['adopt']:
+        print(f"✓ 读取到 {len(settings.validators)} 个验证者, {len(settings.sentries)} 个 Sentry 节点")
+        run_incremental(settings, inv, dict(modes, jobs=jobs, log_dir=log_dir, peggo_env=peggo_env,
+                                            plan_only=plan_only))
+        return
+
+    tasks = build_tasks(settings, peggo_env)
+    if plan_only:
+        print_plan(tasks)
+        return
+
+    print(f"✓ 读取到 {len(settings.validators)} 个验证者, {len(settings.sentries)} 个 Sentry 节点")
+    print(f"执行 {len(tasks)} 个任务（{jobs} 个 worker，日志 {log_dir}）")
+    clean_old_data(settings)
+
+    if not run_tasks(settings, tasks, jobs, log_dir):
+        sys.exit(1)
+    # 与 configure_peers.py 相同的拓扑规划，作为之后增量生成的基准
+    inputs = current_inputs(settings, inv, peggo_env)
+    graph, _ = plan_graph(inv, load_topology_options(settings.node_config_file), inputs, None)
+    write_state(settings, inv, inputs, graph)
+    print(f"\n✓ 配置生成完成: {settings.base_dir}")
+
+
+if __name__ == "__main__":
+    with tracing.span("config_pipeline"):
+        main()
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+配置生成状态（增量重新生成）
+记录每次生成时的输入哈希和输出摘要，保存在 chain-deploy-config/.pipeline_state.json：
+
+    genesis    genesis_config.yml、链 ID、余额、质押数量和 validator 集合
+    peggo      inventory 中的 peggo_* 变量
+    topology   node_config.yml 的 topology 段和 P2P 端口
+    nodes      每个节点的角色、inventory 主机变量、node_config.yml 合并后的参数、
+               node_id、peer 列表、p2p 参数和输出文件的 sha256
+
+config_pipeline.py --incremental 将当前输入与状态比较生成变更计划，只重建受影响的输出：
+- 已有节点的密钥（node_key、priv_validator_key、keyring）保持不变
+- 拓扑参数和已有节点不变时沿用状态中的 peer 图，新增的 sentry 只向已有 sentry 建立连接，
+  不修改 validator 和其他节点的配置
+- genesis 输入变化（含增删 validator）需要重新生成 genesis，链必须从新 genesis 重启
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from apply_node_config_fast import resolve_node_params
+from artifact_store import file_sha256
+from inventory import Inventory
+from peer_topology import (
+    Node, TopologyPlan, _node_sort_key, load_topology_options, nodes_from_inventory,
+    p2p_settings, plan_topology, topology_report,
+)
+from table import print_rows
+
+
+STATE_FILE = ".pipeline_state.json"
+STATE_VERSION = 1
+
+# 参与比较的输出文件（相对节点目录），keyring-test 下的文件另外加入
+OUTPUT_FILES = (
+    "config/config.toml",
+    "config/app.toml",
+    "config/client.toml",
+    "config/genesis.json",
+    "config/node_key.json",
+    "config/priv_validator_key.json",
+    "peggo_evm_key.json",
+    ".env",
+)
+
+# genesis 输入项 -> 计划中显示的原因
+GENESIS_REASONS = {
+    'genesis_config': "genesis_config.yml 变更",
+    'chain_id': "链 ID 变更",
+    'moniker': "moniker 变更",
+    'validator_balance': "验证者余额变更",
+    'orchestrator_balance': "Orchestrator 余额变更",
+    'stake': "质押数量变更",
+    'validators': "validator 集合变更",
+    'extra_accounts': "额外 genesis 账户清单变更",
+}
+
+# 这些输入变化后已有的 gentx 失效，所有 validator 重新生成 gentx
+GENTX_INPUTS = ('chain_id', 'stake')
+
+
+def digest(value) -> str:
+    """任意 JSON 值的短哈希"""
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def load_state(base_dir: str) -> Optional[Dict]:
+    try:
+        state = json.loads((Path(base_dir) / STATE_FILE).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    return state if state.get('version') == STATE_VERSION else None
+
+
+def save_state(base_dir: str, state: Dict):
+    path = Path(base_dir) / STATE_FILE
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+# ---------- 输入 ----------
+
+def genesis_inputs(s, genesis_config_file: str) -> Dict[str, str]:
+    """genesis 相关输入（s 为 config_pipeline.Settings）"""
+    accounts_dir = Path(s.accounts_dir)
+    own = {f"{name}.csv" for name in s.validators}
+    extra = {p.name: file_sha256(p) for p in sorted(accounts_dir.glob('*.csv')) if p.name not in own}
+    return {
+        'genesis_config': file_sha256(Path(genesis_config_file)),
+        'chain_id': s.chain_id,
+        'moniker': s.moniker,
+        'validator_balance': s.validator_balance,
+        'orchestrator_balance': s.orchestrator_balance,
+        'stake': s.stake,
+        'validators': digest(sorted(s.validators)),
+        'extra_accounts': digest(extra),
+    }
+
+
+def peggo_inputs(group_vars: Dict, defaults: Dict) -> str:
+    return digest({key: group_vars.get(key, default) for key, default in defaults.items()})
+
+
+def topology_inputs(node_config_file: str, p2p_port: str) -> str:
+    return digest({'options': load_topology_options(node_config_file), 'p2p_port': p2p_port})
+
+
+def node_inputs(inv: Inventory, node_config: Dict, name: str, role: str, chain_id: str) -> Dict:
+    config_toml, app_toml = resolve_node_params(node_config, name, role)
+    return {
+        'role': role,
+        'inventory': digest(inv.host_vars(name)),
+        'config': digest({'config_toml': config_toml, 'app_toml': app_toml, 'chain_id': chain_id}),
+    }
+
+
+def collect_inputs(s, inv: Inventory, node_config: Dict, p2p_port: str,
+                   peggo_defaults: Optional[Dict]) -> Dict:
+    """当前输入；peggo_defaults 为 None 时不生成 Peggo .env"""
+    nodes = {}
+    for name in s.validators:
+        nodes[name] = node_inputs(inv, node_config, name, 'validator', s.chain_id)
+    for name in s.sentries:
+        nodes[name] = node_inputs(inv, node_config, name, 'sentry', s.chain_id)
+    return {
+        'genesis': genesis_inputs(s, s.genesis_config_file),
+        'peggo': peggo_inputs(inv.group_vars, peggo_defaults) if peggo_defaults is not None else None,
+        'topology': topology_inputs(s.node_config_file, p2p_port),
+        'nodes': nodes,
+    }
+
+
+# ---------- 拓扑 ----------
+
+def topology_plan(inv: Inventory, graph: Dict[str, List[str]], options: Dict) -> TopologyPlan:
+    """由 peer 列表（可以是单向的）还原 TopologyPlan，用于生成 p2p 参数"""
+    nodes = {n.name: n for n in nodes_from_inventory(inv) if n.name in graph}
+    validators = [n for n in nodes.values() if n.role == 'validator']
+    sentries_of = {}
+    if any(n.role == 'sentry' for n in nodes.values()):
+        sentries_of = {v.name: [p for p in graph[v.name] if nodes[p].role == 'sentry'] for v in validators}
+    return TopologyPlan(nodes=nodes, graph={name: set(peers) for name, peers in graph.items()},
+                        sentries_of=sentries_of, options=options)
+
+
+def attach_sentry(graph: Dict[str, List[str]], nodes: Dict[str, Node], sentry: Node, degree: int):
+    """新增 sentry 只连接已有的 sentry（同 zone、同 region 优先，其次被连接次数最少）"""
+    inbound = {name: 0 for name in graph}
+    for peers in graph.values():
+        for peer in peers:
+            inbound[peer] += 1
+
+    def score(candidate: Node) -> Tuple:
+        if sentry.zone and candidate.zone == sentry.zone:
+            locality = 0
+        elif sentry.region and candidate.region == sentry.region:
+            locality = 1
+        else:
+            locality = 2
+        return (locality, inbound[candidate.name], _node_sort_key(candidate))
+
+    candidates = [nodes[name] for name in graph if nodes[name].role == 'sentry']
+    graph[sentry.name] = sorted(c.name for c in sorted(candidates, key=score)[:degree])
+
+
+def plan_graph(inv: Inventory, options: Dict, inputs: Dict, previous: Optional[Dict],
+               replan: bool = False) -> Tuple[Dict[str, List[str]], str]:
+    """
+    返回 (peer 图, 说明)
+    满足以下条件时沿用状态中的 peer 图，只为新增的 sentry 添加单向连接：
+    拓扑参数不变、没有删除或新增 validator、已有节点的角色和 region/zone 不变、已有至少一个 sentry
+    否则重新规划（与 configure_peers.py 相同）
+    """
+    nodes = {n.name: n for n in nodes_from_inventory(inv)}
+    reason = ""
+    if replan:
+        reason = "指定 --replan"
+    elif previous is None:
+        reason = "首次生成"
+    else:
+        old = previous['nodes']
+        placement = {name: [nodes[name].role, nodes[name].region, nodes[name].zone] for name in nodes}
+        if previous.get('topology') != inputs['topology']:
+            reason = "拓扑参数变更"
+        elif any(name not in nodes for name in old):
+            reason = "删除节点"
+        elif any(name not in old and n.role == 'validator' for name, n in nodes.items()):
+            reason = "新增 validator"
+        elif any(old[name].get('placement') != placement[name] for name in old):
+            reason = "节点角色或 region/zone 变更"
+        elif not any(entry['role'] == 'sentry' for entry in old.values()):
+            reason = "原拓扑没有 sentry"
+
+    if reason:
+        plan = plan_topology(list(nodes.values()), options)
+        violations = topology_report(plan)['violations']
+        if violations:
+            raise ValueError(f"拓扑不满足约束: {'; '.join(violations)}")
+        return {name: sorted(peers) for name, peers in plan.graph.items()}, f"重新规划（{reason}）"
+
+    graph = {name: list(entry['peers']) for name, entry in previous['nodes'].items()}
+    added = sorted((n for name, n in nodes.items() if name not in graph), key=_node_sort_key)
+    degree = min(int(options['sentry_mesh_degree']), int(options['max_degree']))
+    for sentry in added:
+        attach_sentry(graph, nodes, sentry, degree)
+    if added:
+        return graph, f"沿用已有 peer 图，新增 {len(added)} 个 sentry"
+    return graph, "沿用已有 peer 图"
+
+
+def p2p_digests(plan: TopologyPlan, node_ids: Dict[str, str], p2p_port: str) -> Dict[str, str]:
+    return {name: digest(params) for name, params in p2p_settings(plan, node_ids, p2p_port).items()}
+
+
+# ---------- 输出 ----------
+
+class OutputHasher:
+    """输出文件的 sha256；genesis.json 等硬链接文件按 inode 只计算一次"""
+
+    def __init__(self):
+        self._cache: Dict[Tuple, str] = {}
+
+    def file(self, path: Path) -> str:
+        st = path.stat()
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        if key not in self._cache:
+            self._cache[key] = file_sha256(path)
+        return self._cache[key]
+
+    def node(self, node_dir: Path) -> Dict[str, str]:
+        paths = [node_dir / rel for rel in OUTPUT_FILES]
+        keyring = node_dir / 'keyring-test'
+        if keyring.is_dir():
+            paths.extend(sorted(keyring.iterdir()))
+        return {str(p.relative_to(node_dir)): self.file(p) for p in paths if p.is_file()}
+
+
+def build_state(inputs: Dict, inv: Inventory, graph: Dict[str, List[str]], plan: TopologyPlan,
+                node_ids: Dict[str, str], p2p_port: str, base_dir: str) -> Dict:
+    """生成完成后的状态"""
+    placement = {n.name: [n.role, n.region, n.zone] for n in nodes_from_inventory(inv)}
+    p2p = p2p_digests(plan, node_ids, p2p_port)
+    hasher = OutputHasher()
+    nodes = {}
+    for name, entry in inputs['nodes'].items():
+        nodes[name] = dict(entry, placement=placement[name], node_id=node_ids.get(name, ''),
+                           peers=sorted(graph.get(name, [])), p2p=p2p.get(name, ''),
+                           outputs=hasher.node(Path(base_dir) / name))
+    return {
+        'version': STATE_VERSION,
+        'updated': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'genesis': inputs['genesis'],
+        'peggo': inputs['peggo'],
+        'topology': inputs['topology'],
+        'nodes': nodes,
+    }
+
+
+def output_changes(previous: Optional[Dict], state: Dict) -> Dict[str, List[str]]:
+    """两次状态之间输出文件有变化的节点 -> 变化的文件（新增节点为 ["*"]，删除节点为 ["-"]）"""
+    old = (previous or {}).get('nodes', {})
+    changes = {}
+    for name, entry in state['nodes'].items():
+        if name not in old:
+            changes[name] = ["*"]
+            continue
+        before, after = old[name].get('outputs', {}), entry['outputs']
+        changed = sorted(rel for rel in set(before) | set(after) if before.get(rel) != after.get(rel))
+        if changed:
+            changes[name] = changed
+    for name in old:
+        if name not in state['nodes']:
+            changes[name] = ["-"]
+    return changes
+
+
+# ---------- 变更计划 ----------
+
+@dataclass
+class ChangePlan:
+    created: List[str] = field(default_factory=list)         # 新建（含角色变更后重建）
+    removed: List[str] = field(default_factory=list)         # 删除节点目录（含角色变更）
+    config: List[str] = field(default_factory=list)          # 重新生成 config.toml/app.toml
+    p2p: List[str] = field(default_factory=list)             # 重写 p2p 参数
+    regentx: List[str] = field(default_factory=list)         # 已有 validator 重新生成 gentx
+    peggo_env: List[str] = field(default_factory=list)       # 已有 validator 重新渲染 .env
+    genesis: List[str] = field(default_factory=list)         # 重新生成 genesis 的原因
+    removed_gentx: List[str] = field(default_factory=list)   # 需从 master 删除的 gentx 文件
+    graph: Dict[str, List[str]] = field(default_factory=dict)
+    topology: str = ""
+    reasons: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.created or self.removed or self.config or self.p2p
+                    or self.regentx or self.peggo_env or self.genesis)
+
+    def note(self, name: str, reason: str):
+        self.reasons.setdefault(name, [])
+        if reason not in self.reasons[name]:
+            self.reasons[name].append(reason)
+
+
+def diff_state(previous: Dict, inputs: Dict, inv: Inventory, options: Dict, p2p_port: str,
+               replan: bool = False) -> ChangePlan:
+    """比较状态与当前输入，生成变更计划"""
+    plan = ChangePlan()
+    old, new = previous['nodes'], inputs['nodes']
+
+    for name, entry in new.items():
+        if name not in old:
+            plan.created.append(name)
+            plan.note(name, "新节点")
+        elif old[name]['role'] != entry['role']:
+            plan.removed.append(name)
+            plan.created.append(name)
+            plan.note(name, f"角色变更 {old[name]['role']} -> {entry['role']}")
+    for name in old:
+        if name not in new:
+            plan.removed.append(name)
+            plan.note(name, "已从 inventory 删除")
+    for name in plan.removed:
+        if old[name]['role'] == 'validator' and old[name].get('node_id'):
+            plan.removed_gentx.append(f"gentx-{old[name]['node_id']}.json")
+
+    kept = [name for name in new if name not in plan.created]
+
+    # genesis
+    changed = [key for key, value in inputs['genesis'].items() if previous['genesis'].get(key) != value]
+    plan.genesis = [GENESIS_REASONS.get(key, key) for key in changed]
+    if plan.genesis:
+        for name in kept:
+            plan.note(name, "genesis 重新生成")
+    if any(key in GENTX_INPUTS for key in changed):
+        plan.regentx = [name for name in kept if new[name]['role'] == 'validator']
+        for name in plan.regentx:
+            plan.note(name, "gentx 失效（链 ID 或质押数量变更）")
+
+    # node_config.yml
+    for name in kept:
+        if old[name]['config'] != new[name]['config']:
+            plan.config.append(name)
+            plan.note(name, "node_config.yml 参数或链 ID 变更")
+
+    # Peggo .env
+    if inputs['peggo'] is not None and previous.get('peggo') != inputs['peggo']:
+        plan.peggo_env = [name for name in kept if new[name]['role'] == 'validator']
+        for name in plan.peggo_env:
+            plan.note(name, "peggo_* 变量变更")
+
+    # P2P：新节点的 node_id 未知，用占位值参与比较
+    plan.graph, plan.topology = plan_graph(inv, options, inputs, previous, replan)
+    node_ids = {name: old[name].get('node_id', '') for name in kept}
+    node_ids.update({name: f"new-{name}" for name in plan.created})
+    expected = p2p_digests(topology_plan(inv, plan.graph, options), node_ids, p2p_port)
+    replanned = plan.topology.startswith("重新规划")
+    for name in kept:
+        if old[name].get('p2p') != expected.get(name):
+            plan.p2p.append(name)
+            if old[name]['inventory'] != new[name]['inventory']:
+                plan.note(name, "inventory 主机变量变更")
+            elif replanned:
+                plan.note(name, "拓扑重新规划")
+            else:
+                plan.note(name, "peer 地址变更")
+    return plan
+
+
+def print_change_plan(plan: ChangePlan, previous: Dict, inputs: Dict):
+    """输出变更计划（节点 / 操作 / 原因）"""
+    roles = {name: entry['role'] for name, entry in previous['nodes'].items()}
+    roles.update({name: entry['role'] for name, entry in inputs['nodes'].items()})
+    all_nodes = sorted(set(previous['nodes']) | set(inputs['nodes']))
+
+    rows = [["节点", "角色", "操作", "原因"]]
+    for name in all_nodes:
+        actions = []
+        if name in plan.removed:
+            actions.append("删除" if name not in plan.created else "重建")
+        elif name in plan.created:
+            actions.append("新建")
+        if name in plan.config:
+            actions.append("重新生成 TOML")
+        if name in plan.p2p:
+            actions.append("更新 P2P")
+        if name in plan.regentx:
+            actions.append("重新生成 gentx")
+        if name in plan.peggo_env:
+            actions.append("更新 .env")
+        if plan.genesis and name in inputs['nodes'] and name not in plan.created:
+            actions.append("更新 genesis")
+        if actions:
+            rows.append([name, roles[name], ', '.join(actions), '; '.join(plan.reasons.get(name, [])) or '-'])
+
+    print(f"状态文件记录于 {previous.get('updated', '?')}，拓扑: {plan.topology}")
+    if plan.genesis:
+        print(f"⚠ 需要重新生成 genesis: {', '.join(plan.genesis)}")
+        print("  所有节点的 genesis.json 都会变化，链必须从新 genesis 重启")
+    if len(rows) > 1:
+        print_rows(f"变更计划（{len(rows) - 1}/{len(all_nodes)} 个节点）", rows)
+    unchanged = len([n for n in inputs['nodes'] if n not in {r[0] for r in rows[1:]}])
+    if unchanged:
+        print(f"其余 {unchanged} 个节点不变")
+
+
+def print_output_changes(changes: Dict[str, List[str]], roles: Dict[str, str]):
+    """输出实际变化的节点和文件，以及对应的部署命令"""
+    if not changes:
+        print("✓ 所有节点的输出文件均未变化，无需重新部署")
+        return
+    rows = [["节点", "变化的文件"]]
+    for name in sorted(changes):
+        files = changes[name]
+        rows.append([name, "全部（新节点）" if files == ["*"] else "已删除" if files == ["-"] else ', '.join(files)])
+    print_rows(f"需要重新部署的节点（{len(changes)} 个）", rows)
+
+    created = [n for n, files in changes.items() if files == ["*"]]
+    updated = [n for n, files in changes.items() if files not in (["*"], ["-"])]
+    if any("config/genesis.json" in changes[n] for n in updated):
+        # genesis 变化后链从新 genesis 启动，所有节点清空数据重新部署
+        print("  ./deploy-node.sh")
+        return
+    for name in sorted(updated):
+        print(f"  ./deploy-node.sh --host {name} --no-clean")
+    for name in sorted(created):
+        suffix = " --state-sync" if roles.get(name) == 'sentry' else ""
+        print(f"  ./deploy-node.sh --host {name}{suffix}")
+    sys.stdout.flush()
@@ -2,14 +2,32 @@
 """
 配置节点的 persistent_peers
 根据节点类型自动配置 P2P 连接
+默认使用 peer_topology 规划有界度数的拓扑，--full-mesh 保留旧的全连接模式
 """
 
+import base64
+import hashlib
+import json
 import yaml
-import re
 import sys
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Optional
+
+from inventory import load_inventory
+from peer_topology import (
+    load_topology_options, nodes_from_inventory, p2p_settings,
+    plan_topology, print_report, topology_report,
+)
+from toml_patch import patch_toml_file
+import tracing
+
+# node_id 缓存文件（位于 base_dir 下，按 node_key.json 内容哈希索引）
+NODE_ID_CACHE_FILE = ".node_id_cache.json"
+
+# Tendermint/CometBFT ed25519 私钥类型
+ED25519_KEY_TYPES = ("tendermint/PrivKeyEd25519", "cometbft/PrivKeyEd25519")
 
 
 def load_yaml(file_path: str) -> dict:
@@ -38,7 +56,7 @@ def get_p2p_port(node_config_file: str) -> str:
 def get_node_id(chain_binary: str, node_home: str) -> str:
     """获取节点的 node_id"""
     try:
-        result = subprocess.run(
+        result = tracing.run(
             [chain_binary, 'tendermint', 'show-node-id', '--home', node_home],
             capture_output=True,
             text=True,
@@ -49,14 +67,88 @@ def get_node_id(chain_binary: str, node_home: str) -> str:
         return ""
 
 
+def derive_node_id(node_key_data: bytes) -> Optional[str]:
+    """
+    从 node_key.json 内容直接推导 node_id
+    node_id = hex(sha256(ed25519 公钥)[:20])，私钥 value 为 64 字节（seed + 公钥）
+    非 ed25519 类型返回 None，由调用方回退到链二进制
+    """
+    try:
+        priv_key = json.loads(node_key_data).get('priv_key', {})
+        if priv_key.get('type') not in ED25519_KEY_TYPES:
+            return None
+        raw = base64.b64decode(priv_key.get('value', ''))
+    except (ValueError, AttributeError):
+        return None
+
+    if len(raw) != 64:
+        return None
+    return hashlib.sha256(raw[32:]).digest()[:20].hex()
+
+
+def load_node_id_cache(base_dir: str) -> Dict[str, str]:
+    """加载 node_id 缓存（内容哈希 -> node_id）"""
+    cache_file = Path(base_dir) / NODE_ID_CACHE_FILE
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_node_id_cache(base_dir: str, cache: Dict[str, str]):
+    """保存 node_id 缓存"""
+    cache_file = Path(base_dir) / NODE_ID_CACHE_FILE
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+    except OSError as e:
+        print(f"警告: 无法写入 node_id 缓存: {e}", file=sys.stderr)
+
+
 def collect_node_ids(chain_binary: str, base_dir: str, nodes: Dict[str, str]) -> Dict[str, str]:
-    """收集所有节点的 node_id"""
+    """
+    收集所有节点的 node_id
+    1. 按 node_key.json 内容哈希查缓存
+    2. ed25519 密钥直接在进程内推导
+    3. 其余节点并发调用链二进制回退
+    """
+    cache = load_node_id_cache(base_dir)
     node_ids = {}
+    fallback = {}
+    digests = {}
+
     for name in sorted(nodes.keys()):
-        node_home = f"{base_dir}/{name}"
-        node_id = get_node_id(chain_binary, node_home)
+        node_key_file = Path(base_dir) / name / 'config' / 'node_key.json'
+        try:
+            data = node_key_file.read_bytes()
+        except OSError:
+            fallback[name] = None
+            continue
+
+        digest = hashlib.sha256(data).hexdigest()
+        digests[name] = digest
+        node_id = cache.get(digest) or derive_node_id(data)
         if node_id:
             node_ids[name] = node_id
+        else:
+            fallback[name] = digest
+
+    if fallback:
+        print(f"  {len(fallback)} 个节点无法直接推导 node_id，回退到 {chain_binary}")
+        names = sorted(fallback.keys())
+        with ThreadPoolExecutor(max_workers=min(len(names), 16)) as executor:
+            results = executor.map(lambda n: get_node_id(chain_binary, f"{base_dir}/{n}"), names)
+            for name, node_id in zip(names, results):
+                if node_id:
+                    node_ids[name] = node_id
+
+    updated = {digests[name]: node_id for name, node_id in node_ids.items() if name in digests}
+    if any(cache.get(digest) != node_id for digest, node_id in updated.items()):
+        cache.update(updated)
+        save_node_id_cache(base_dir, cache)
+
     return node_ids
 
 
@@ -74,30 +166,57 @@ def build_peers(node_ids: Dict[str, str], nodes: Dict[str, str], exclude: str, p
 
 def update_config_toml(config_file: str, peers: str):
     """更新 config.toml 中的 persistent_peers"""
-    if not Path(config_file).exists():
+    return update_p2p_settings(config_file, {'p2p.persistent_peers': peers})
+
+
+def update_p2p_settings(config_file: str, params: Dict) -> bool:
+    """一次性写入 config.toml 中的 p2p 参数"""
+    if patch_toml_file(config_file, params) is None:
         print(f"警告: 配置文件不存在: {config_file}", file=sys.stderr)
         return False
-    
-    with open(config_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # 使用正则表达式替换 persistent_peers
-    pattern = r'^persistent_peers = .*'
-    replacement = f'persistent_peers = "{peers}"'
-    
-    new_content = re.sub(pattern, replacement, content, flags=re.MULTILINE)
-    
-    with open(config_file, 'w', encoding='utf-8') as f:
-        f.write(new_content)
-    
     return True
 
 
+def load_nodes(inventory_file: str):
+    """从 inventory.yml 读取节点列表，返回 (节点列表, validators, sentries)"""
+    inv = load_inventory(inventory_file)
+    return nodes_from_inventory(inv), inv.validators(), inv.sentries()
+
+
+def configure_full_mesh(base_dir: str, node_ids: Dict[str, str], validators: Dict[str, str],
+                        sentries: Dict[str, str], p2p_port: str):
+    """全连接模式：validator 连接其他所有 validator，sentry 连接所有 validator"""
+    # 配置 validator 节点：连接到其他所有 validator
+    print("\n配置 Validator 节点:")
+    for name in sorted(validators.keys()):
+        peers = build_peers(node_ids, validators, name, p2p_port)
+        config_file = f"{base_dir}/{name}/config/config.toml"
+        
+        if update_config_toml(config_file, peers):
+            print(f"  ✓ {name} -> {peers if peers else '无'}")
+        else:
+            print(f"  ✗ {name} 配置失败", file=sys.stderr)
+    
+    # 配置 sentry 节点：只连接所有 validator
+    if sentries:
+        print("\n配置 Sentry 节点:")
+        for name in sorted(sentries.keys()):
+            peers = build_peers(node_ids, validators, "", p2p_port)  # 不排除任何节点
+            config_file = f"{base_dir}/{name}/config/config.toml"
+            
+            if update_config_toml(config_file, peers):
+                print(f"  ✓ {name} -> {peers if peers else '无'}")
+            else:
+                print(f"  ✗ {name} 配置失败", file=sys.stderr)
+
+
 def configure_persistent_peers(
     chain_binary: str,
     base_dir: str,
     node_config_file: str,
-    inventory_file: str
+    inventory_file: str,
+    full_mesh: bool = False,
+    dry_run: bool = False
 ):
     """配置所有节点的 persistent_peers"""
     
@@ -106,18 +225,7 @@ def configure_persistent_peers(
     print(f"使用 P2P 端口: {p2p_port}")
     
     # 2. 从 inventory.yml 读取节点列表
-    inventory = load_yaml(inventory_file)
-    hosts = inventory.get('all', {}).get('hosts', {})
-    
-    validators = {}
-    sentries = {}
-    
-    for name, config in hosts.items():
-        ip = config.get('ansible_host', '')
-        if name.startswith('validator-') and ip:
-            validators[name] = ip
-        elif name.startswith('sentry-') and ip:
-            sentries[name] = ip
+    nodes, validators, sentries = load_nodes(inventory_file)
     
     if not validators:
         print("错误: 未找到任何 validator 节点", file=sys.stderr)
@@ -125,7 +233,22 @@ def configure_persistent_peers(
     
     print(f"找到 {len(validators)} 个 validator, {len(sentries)} 个 sentry 节点")
     
-    # 3. 收集所有节点的 node_id
+    # 3. 规划拓扑（全连接模式跳过）
+    plan = None
+    if not full_mesh:
+        plan = plan_topology(nodes, load_topology_options(node_config_file))
+        report = topology_report(plan)
+        print("\n拓扑规划:")
+        print_report(report)
+        if report['violations']:
+            print("错误: 拓扑不满足约束，请调整 node_config.yml 的 topology 参数", file=sys.stderr)
+            sys.exit(1)
+    
+    if dry_run:
+        print("\n（dry-run 模式，未修改任何文件）")
+        return
+    
+    # 4. 收集所有节点的 node_id
     all_nodes = {**validators, **sentries}
     node_ids = collect_node_ids(chain_binary, base_dir, all_nodes)
     
@@ -133,42 +256,42 @@ def configure_persistent_peers(
         print("错误: 无法获取任何节点的 node_id", file=sys.stderr)
         sys.exit(1)
     
-    # 4. 配置 validator 节点：连接到其他所有 validator
-    print("\n配置 Validator 节点:")
-    for name in sorted(validators.keys()):
-        peers = build_peers(node_ids, validators, name, p2p_port)
+    if full_mesh:
+        configure_full_mesh(base_dir, node_ids, validators, sentries, p2p_port)
+        print("\n✓ P2P 连接配置完成")
+        return
+    
+    # 5. 按规划写入每个节点的 p2p 参数
+    print("\n配置节点 P2P 参数:")
+    for name, params in p2p_settings(plan, node_ids, p2p_port).items():
         config_file = f"{base_dir}/{name}/config/config.toml"
+        peer_count = len(plan.graph[name])
         
-        if update_config_toml(config_file, peers):
-            print(f"  ✓ {name} -> {peers if peers else '无'}")
+        if update_p2p_settings(config_file, params):
+            print(f"  ✓ {name} -> {peer_count} 个 peer")
         else:
             print(f"  ✗ {name} 配置失败", file=sys.stderr)
     
-    # 5. 配置 sentry 节点：只连接所有 validator
-    if sentries:
-        print("\n配置 Sentry 节点:")
-        for name in sorted(sentries.keys()):
-            peers = build_peers(node_ids, validators, "", p2p_port)  # 不排除任何节点
-            config_file = f"{base_dir}/{name}/config/config.toml"
-            
-            if update_config_toml(config_file, peers):
-                print(f"  ✓ {name} -> {peers if peers else '无'}")
-            else:
-                print(f"  ✗ {name} 配置失败", file=sys.stderr)
-    
     print("\n✓ P2P 连接配置完成")
 
 
 def main():
-    if len(sys.argv) != 5:
-        print("用法: configure_peers.py <chain_binary> <base_dir> <node_config.yml> <inventory.yml>")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    flags = [a for a in sys.argv[1:] if a.startswith('--')]
+    
+    unknown = [f for f in flags if f not in ('--full-mesh', '--dry-run')]
+    if len(args) != 4 or unknown:
+        print("用法: configure_peers.py <chain_binary> <base_dir> <node_config.yml> <inventory.yml> [--full-mesh] [--dry-run]")
         print("示例: configure_peers.py injectived ./chain-deploy-config node_config.yml ansible/inventory.yml")
+        print("")
+        print("选项:")
+        print("  --full-mesh   使用旧的全连接模式（validator 两两互连）")
+        print("  --dry-run     仅输出拓扑报告（度数、直径、边数），不修改文件")
         sys.exit(1)
     
-    chain_binary = sys.argv[1]
-    base_dir = sys.argv[2]
-    node_config_file = sys.argv[3]
-    inventory_file = sys.argv[4]
+    chain_binary, base_dir, node_config_file, inventory_file = args
+    full_mesh = '--full-mesh' in flags
+    dry_run = '--dry-run' in flags
     
     # 检查文件是否存在
     if not Path(node_config_file).exists():
@@ -179,12 +302,13 @@ def main():
         print(f"错误: Inventory 文件不存在: {inventory_file}", file=sys.stderr)
         sys.exit(1)
     
-    if not Path(base_dir).exists():
+    if not dry_run and not Path(base_dir).exists():
         print(f"错误: 基础目录不存在: {base_dir}", file=sys.stderr)
         sys.exit(1)
     
     try:
-        configure_persistent_peers(chain_binary, base_dir, node_config_file, inventory_file)
+        configure_persistent_peers(chain_binary, base_dir, node_config_file, inventory_file,
+                                   full_mesh=full_mesh, dry_run=dry_run)
     except Exception as e:
         print(f"错误: {e}", file=sys.stderr)
         sys.exit(1)
@@ -192,4 +316,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
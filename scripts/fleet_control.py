@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+节点集群控制器
+与 node-control.sh 相同的 action/service/node 接口，但：
+- 多个主机并发执行（--parallel 限制并发数）
+- 每个主机只建立一条 SSH 复用连接（ControlMaster），所有命令共用
+- 支持滚动模式（--rolling N：每批 N 个主机，等待出块后再继续下一批）
+- 结束时输出汇总结果表
+
+SSH 命令可通过 FLEET_SSH 环境变量替换（例如 test/fleet/fake-ssh.sh），便于本地测试
+"""
+
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from inventory import Inventory, load_inventory
+from secret_sync import build_manifest, sync_files
+from ssh_session import RemoteError, SSHSession, control_directory, ssh_command
+from table import display_width, pad
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_CONFIG_DIR = SCRIPT_DIR.parent / "chain-deploy-config"
+
+RPC_STATUS_URL = "http://localhost:26757/status"
+
+NODE_SERVICE = "biyachaind"
+PEGGO_SERVICE = "peggo"
+
+ACTIONS = ('start', 'stop', 'restart', 'status')
+SERVICES = ('node', 'peggo', 'all')
+
+_print_lock = threading.Lock()
+
+
+def log(node: str, message: str):
+    """带节点前缀的线程安全输出"""
+    with _print_lock:
+        print(f"  [{node}] {message}", flush=True)
+
+
+@dataclass
+class HostResult:
+    node: str
+    ip: str
+    ok: bool = True
+    state: str = ''
+    height: str = ''
+    message: str = ''
+    elapsed: float = 0.0
+    skipped: bool = False
+
+
+@dataclass
+class Options:
+    action: str
+    service: str
+    sync_keys: bool = True
+    force: bool = False
+    parallel: int = 10
+    rolling: int = 0
+    wait_timeout: int = 180
+    config_dir: Path = DEFAULT_CONFIG_DIR
+    ssh_command: List[str] = field(default_factory=ssh_command)
+
+
+def parse_status(output: str) -> Tuple[str, Optional[int], Optional[bool]]:
+    """
+    解析 "is-active 输出 + /status JSON" 组合输出
+    返回 (服务状态, 区块高度, catching_up)
+    """
+    lines = output.strip().splitlines()
+    state = lines[0].strip() if lines else 'unknown'
+    try:
+        sync_info = json.loads('\n'.join(lines[1:]))['result']['sync_info']
+        return state, int(sync_info['latest_block_height']), bool(sync_info['catching_up'])
+    except (ValueError, KeyError, TypeError):
+        return state, None, None
+
+
+def node_status_command() -> str:
+    return (f"sudo systemctl is-active {NODE_SERVICE} 2>/dev/null || true; "
+            f"curl -s --max-time 5 {RPC_STATUS_URL} 2>/dev/null || true")
+
+
+def stop_service(session: SSHSession, service: str, force: bool):
+    """停止服务；若进程未退出则强制终止（单条远程命令完成）"""
+    kill = f"; sudo pkill -9 {service} || true" if force else ""
+    session.check(
+        f"sudo systemctl stop {service}{kill} || exit 1; sleep 2; "
+        f"if pgrep -x {service} > /dev/null; then sudo pkill -9 {service} || true; sleep 1; fi",
+        f"停止 {service} 失败")
+
+
+def start_node(session: SSHSession, result: HostResult):
+    # 启动、检查状态、读取高度（私钥文件保留在主机上，下次启动时哈希一致即不再发送）
+    output = session.check(
+        f"sudo systemctl start {NODE_SERVICE} || exit 1; sleep 3; "
+        f"sudo systemctl is-active {NODE_SERVICE} || true; sleep 2; "
+        f"curl -s --max-time 5 {RPC_STATUS_URL} 2>/dev/null || true",
+        "启动节点失败")
+
+    state, height, _ = parse_status(output)
+    result.state = state
+    result.height = '' if height is None else str(height)
+    if state != 'active':
+        raise RemoteError(f"节点启动失败，状态: {state}")
+
+
+def start_peggo(session: SSHSession):
+    output = session.check(
+        f"sudo systemctl start {PEGGO_SERVICE} || exit 1; sleep 3; "
+        f"sudo systemctl is-active {PEGGO_SERVICE} || true",
+        "启动 Peggo 失败")
+
+    state = output.strip().splitlines()[0] if output.strip() else 'unknown'
+    if state != 'active':
+        raise RemoteError(f"Peggo 启动失败，状态: {state}")
+
+
+def node_status(session: SSHSession, result: HostResult):
+    state, height, catching_up = parse_status(
+        session.check(node_status_command(), "查询节点状态失败"))
+    result.state = state
+    result.height = '' if height is None else str(height)
+    if height is None:
+        result.message = "RPC 不可用"
+    elif catching_up:
+        result.message = "同步中"
+
+
+def peggo_status(session: SSHSession) -> str:
+    output = session.check(
+        f"sudo systemctl is-active {PEGGO_SERVICE} 2>/dev/null || true",
+        "查询 Peggo 状态失败")
+    return output.strip() or 'unknown'
+
+
+def run_host(node: str, inv: Inventory, opts: Options, session: Optional[SSHSession]) -> HostResult:
+    """在单个主机上执行操作（所有远程命令共用该主机的复用连接）"""
+    ip = inv.ip(node)
+    result = HostResult(node=node, ip=ip)
+    started = time.monotonic()
+    node_dir = opts.config_dir / node
+    is_validator = inv.node_type(node) == 'validator'
+    do_node = opts.service in ('node', 'all')
+    do_peggo = opts.service in ('peggo', 'all') and is_validator
+
+    if opts.service == 'peggo' and not is_validator:
+        result.skipped = True
+        result.message = "Peggo 仅在 validator 节点上运行"
+        return result
+
+    if session is None:
+        result.ok = False
+        result.message = "inventory 中没有 IP 地址"
+        return result
+    if not (node_dir / "config").is_dir():
+        result.ok = False
+        result.message = f"配置目录不存在: {node_dir / 'config'}"
+        return result
+
+    try:
+        if opts.action in ('stop', 'restart'):
+            if do_peggo and opts.action == 'stop':
+                stop_service(session, PEGGO_SERVICE, opts.force)
+            if do_node:
+                stop_service(session, NODE_SERVICE, opts.force and opts.action == 'stop')
+                log(node, "✓ 节点已停止")
+                result.state = 'inactive'
+
+        if opts.action in ('start', 'restart'):
+            if opts.sync_keys:
+                # 节点私钥和 Peggo .env 合并为一次比较 + 一个归档流
+                scopes = [scope for scope, enabled in (('node', do_node), ('peggo', do_peggo)) if enabled]
+                changed = sync_files(session, build_manifest(node, inv, opts.config_dir, scopes))
+                log(node, f"✓ 已同步 {len(changed)} 个文件" if changed else "✓ 私钥文件无变化")
+            if do_node:
+                start_node(session, result)
+                log(node, f"✓ 节点已启动，区块高度: {result.height or 'N/A'}")
+            if do_peggo:
+                if opts.action == 'restart':
+                    stop_service(session, PEGGO_SERVICE, False)
+                start_peggo(session)
+                log(node, "✓ Peggo 已启动")
+
+        if opts.action == 'status':
+            if do_node:
+                node_status(session, result)
+            if do_peggo:
+                state = peggo_status(session)
+                result.message = ', '.join(m for m in (result.message, f"peggo: {state}") if m)
+                if not do_node:
+                    result.state = state
+
+        if do_peggo and opts.action == 'stop' and not do_node:
+            result.state = 'inactive'
+            log(node, "✓ Peggo 已停止")
+
+    except (RemoteError, OSError) as e:
+        result.ok = False
+        result.message = str(e)
+        log(node, f"✗ {e}")
+    finally:
+        result.elapsed = time.monotonic() - started
+
+    return result
+
+
+def wait_for_blocks(node: str, opts: Options, session: SSHSession, result: HostResult) -> bool:
+    """等待节点出块：catching_up 为 false 且区块高度比首次观测值增长"""
+    deadline = time.monotonic() + opts.wait_timeout
+    first_height = None
+    while time.monotonic() < deadline:
+        try:
+            _, height, catching_up = parse_status(
+                session.check(node_status_command(), "查询节点状态失败", timeout=15))
+        except RemoteError:
+            height, catching_up = None, None
+        if height is not None:
+            if first_height is None:
+                first_height = height
+            elif height > first_height and catching_up is False:
+                result.height = str(height)
+                log(node, f"✓ 节点正在出块，区块高度: {height}")
+                return True
+        time.sleep(2)
+
+    result.ok = False
+    result.message = f"等待出块超时（{opts.wait_timeout}s）"
+    log(node, f"✗ {result.message}")
+    return False
+
+
+def run_batches(nodes: List[str], inv: Inventory, opts: Options, runner: Callable,
+                sessions: Dict[str, SSHSession], results: Dict[str, HostResult]):
+    if opts.rolling > 0:
+        wait_blocks = opts.action in ('start', 'restart') and opts.service in ('node', 'all')
+        batches = [nodes[i:i + opts.rolling] for i in range(0, len(nodes), opts.rolling)]
+        for number, batch in enumerate(batches, 1):
+            print(f"滚动批次 {number}/{len(batches)}: {', '.join(batch)}", flush=True)
+            with ThreadPoolExecutor(max_workers=len(batch)) as pool:
+                batch_results = list(pool.map(
+                    lambda n: runner(n, inv, opts, sessions.get(n)), batch))
+            if wait_blocks:
+                with ThreadPoolExecutor(max_workers=len(batch)) as pool:
+                    list(pool.map(
+                        lambda r: wait_for_blocks(r.node, opts, sessions[r.node], r),
+                        [r for r in batch_results if r.ok and not r.skipped]))
+            for r in batch_results:
+                results[r.node] = r
+            if not all(r.ok for r in batch_results):
+                print("✗ 当前批次存在失败节点，停止滚动操作", file=sys.stderr)
+                break
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, opts.parallel)) as pool:
+            for r in pool.map(lambda n: runner(n, inv, opts, sessions.get(n)), nodes):
+                results[r.node] = r
+
+
+def run_fleet(nodes: List[str], inv: Inventory, opts: Options,
+              runner: Callable = run_host) -> List[HostResult]:
+    """
+    并发或滚动执行，返回按输入顺序排列的结果
+    每个主机一个 SSHSession，操作、等待出块等所有步骤共用，全部结束后统一关闭主连接
+    """
+    results: Dict[str, HostResult] = {}
+    with control_directory() as control_dir:
+        sessions = {node: SSHSession(inv.ip(node), str(inv.var(node, 'ansible_user', 'ubuntu')),
+                                     control_dir, opts.ssh_command)
+                    for node in nodes if inv.ip(node)}
+        try:
+            run_batches(nodes, inv, opts, runner, sessions, results)
+        finally:
+            for session in sessions.values():
+                session.close()
+
+    ordered = []
+    for node in nodes:
+        ordered.append(results.get(node) or HostResult(
+            node=node, ip=inv.ip(node), ok=False, skipped=True, message="滚动操作已中止"))
+    return ordered
+
+
+def print_results(results: List[HostResult], opts: Options, total: float):
+    """打印汇总结果表"""
+    headers = ["节点", "IP", "结果", "状态", "区块高度", "耗时", "说明"]
+    rows = []
+    for r in results:
+        if r.skipped:
+            outcome = "跳过" if r.ok else "未执行"
+        else:
+            outcome = "✓ 成功" if r.ok else "✗ 失败"
+        rows.append([r.node, r.ip, outcome, r.state, r.height, f"{r.elapsed:.1f}s", r.message])
+
+    widths = [max(display_width(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    line = "━" * (sum(widths) + 2 * (len(widths) - 1))
+
+    print("")
+    print(line)
+    print(f"操作: {opts.action} {opts.service}")
+    print(line)
+    print("  ".join(pad(h, w) for h, w in zip(headers, widths)).rstrip())
+    for row in rows:
+        print("  ".join(pad(c, w) for c, w in zip(row, widths)).rstrip())
+    print(line)
+
+    success = sum(1 for r in results if r.ok and not r.skipped)
+    failed = sum(1 for r in results if not r.ok and not r.skipped)
+    skipped = sum(1 for r in results if r.skipped)
+    print(f"操作完成: 成功 {success}, 失败 {failed}, 跳过/未执行 {skipped}, 总耗时 {total:.1f}s")
+    print(line)
+
+
+def show_usage():
+    print("用法: fleet_control.py <action> <service> <node|all|node1,node2> [options]")
+    print("")
+    print("参数:")
+    print("  action          start | stop | restart | status")
+    print("  service         node | peggo | all")
+    print("  node            节点名称、逗号分隔的节点列表或 all")
+    print("")
+    print("选项:")
+    print("  -i <inventory>      inventory 文件（默认 ansible/inventory.yml）")
+    print("  --config-dir <dir>  本地配置目录（默认 chain-deploy-config）")
+    print("  --no-sync-keys      启动前不同步私钥文件")
+    print("  --force             强制停止 (使用 kill -9)")
+    print("  --parallel <N>      最大并发主机数（默认 10）")
+    print("  --rolling <N>       滚动模式：每批 N 个主机，等待出块后再继续")
+    print("  --wait-timeout <S>  滚动模式等待出块的超时秒数（默认 180）")
+    print("")
+    print("环境变量:")
+    print("  FLEET_SSH           替换 ssh 命令（如 test/fleet/fake-ssh.sh）")
+
+
+def main():
+    args = sys.argv[1:]
+    positional = []
+    inventory_file = None
+    opts_kwargs = {}
+    sync_keys = True
+    force = False
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-i', '--inventory'):
+                inventory_file = args[i + 1]
+                i += 1
+            elif arg == '--config-dir':
+                opts_kwargs['config_dir'] = Path(args[i + 1])
+                i += 1
+            elif arg == '--parallel':
+                opts_kwargs['parallel'] = int(args[i + 1])
+                i += 1
+            elif arg == '--rolling':
+                opts_kwargs['rolling'] = int(args[i + 1])
+                i += 1
+            elif arg == '--wait-timeout':
+                opts_kwargs['wait_timeout'] = int(args[i + 1])
+                i += 1
+            elif arg == '--sync-keys':
+                sync_keys = True
+            elif arg == '--no-sync-keys':
+                sync_keys = False
+            elif arg == '--force':
+                force = True
+            elif arg.startswith('--'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                show_usage()
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"错误: 选项 {args[i]} 需要有效的参数值", file=sys.stderr)
+        sys.exit(1)
+
+    if len(positional) != 3:
+        show_usage()
+        sys.exit(1)
+
+    action, service, node_arg = positional
+    if action not in ACTIONS:
+        print(f"错误: 未知操作: {action}", file=sys.stderr)
+        sys.exit(1)
+    if service not in SERVICES:
+        print(f"错误: 未知服务类型: {service}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        inv = load_inventory(inventory_file)
+    except Exception as e:
+        print(f"错误: 无法加载 inventory: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if node_arg == 'all':
+        nodes = inv.hosts('nodes')
+    else:
+        nodes = [n for n in node_arg.split(',') if n]
+        unknown = [n for n in nodes if inv.node_type(n) is None]
+        if unknown:
+            print(f"错误: 无效的节点名称: {', '.join(unknown)}", file=sys.stderr)
+            sys.exit(1)
+    if not nodes:
+        print("错误: 未找到任何节点", file=sys.stderr)
+        sys.exit(1)
+
+    opts = Options(action=action, service=service, sync_keys=sync_keys, force=force,
+                   **opts_kwargs)
+
+    mode = f"滚动模式，每批 {opts.rolling} 个" if opts.rolling > 0 else f"并发 {opts.parallel}"
+    print(f"操作 {len(nodes)} 个节点: {action} {service}（{mode}）", flush=True)
+
+    started = time.monotonic()
+    results = run_fleet(nodes, inv, opts)
+    print_results(results, opts, time.monotonic() - started)
+
+    sys.exit(0 if all(r.ok for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,25 @@
 - Cosmos 地址（从已生成的 keyring 读取）
 - EVM 地址（从私钥推导）
 - 共享私钥（secp256k1，同时兼容 Cosmos 和以太坊）
+
+test 后端优先在进程内直接读取 keyring（见 keyring_reader.py），失败时回退到链二进制
+所有 validator 在一个进程内通过线程池并行处理
 """
 
 import json
 import sys
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
-from eth_account import Account
+from typing import Dict, List, Optional, Tuple
+
+from keyring_reader import KeyringError, read_key
+import tracing
 
 
 def run_command(cmd: list, input_text: str = None) -> tuple:
     """执行命令并返回输出"""
     try:
-        result = subprocess.run(
+        result = tracing.run(
             cmd,
             input=input_text if input_text else None,
             capture_output=True,
@@ -39,7 +44,8 @@ def derive_evm_address(private_key: str) -> Optional[str]:
         if len(private_key) != 64:
             return None
         
-        # 使用 eth_account 推导地址
+        # 使用 eth_account 推导地址（延迟导入，仅回退路径需要）
+        from eth_account import Account
         account = Account.from_key(bytes.fromhex(private_key))
         # 返回不带 0x 前缀的小写地址
         return account.address.lower().replace('0x', '')
@@ -101,6 +107,11 @@ def get_orchestrator_key_info(
         print(f"✗ 推导 EVM 地址失败: {key_name}", file=sys.stderr)
         return None
     
+    return build_key_info(validator_name, cosmos_addr, private_key, evm_addr)
+
+
+def build_key_info(validator_name: str, cosmos_addr: str, private_key: str, evm_addr: str) -> Dict:
+    """组装输出的密钥信息"""
     return {
         "validator_name": validator_name,
         "cosmos_address": cosmos_addr,
@@ -111,20 +122,58 @@ def get_orchestrator_key_info(
     }
 
 
-def main():
-    if len(sys.argv) < 6 or len(sys.argv) > 7:
-        print("用法: generate_orchestrator_keys.py <chain_binary> <master_home> <output_dir> <keyring_backend> <validator_names_json> [output_filename]")
-        print("示例: generate_orchestrator_keys.py biyachaind /path/to/master /path/to/output 'test' '[\"validator-0\",\"validator-1\"]'")
-        print("      generate_orchestrator_keys.py biyachaind /path/to/master /path/to/output 'test' '[\"validator-0\"]' 'peggo_evm_key.json'")
-        sys.exit(1)
-    
-    chain_binary = sys.argv[1]
-    master_home = sys.argv[2]
-    output_dir = sys.argv[3]
-    keyring_backend = sys.argv[4]  # "test" 或 "file"
-    validator_names_str = sys.argv[5]
-    output_filename = sys.argv[6] if len(sys.argv) == 7 else None  # 可选的自定义文件名
-    
+def export_key_info(
+    validator_name: str,
+    chain_binary: str,
+    home: str,
+    keyring_backend: str = "test"
+) -> Optional[Dict]:
+    """优先直接读取 keyring，失败时回退到链二进制"""
+    key_name = f"orchestrator-{validator_name}"
+    try:
+        key = read_key(home, key_name, keyring_backend)
+        return build_key_info(validator_name, key['cosmos_address'], key['private_key'], key['evm_address'])
+    except KeyringError:
+        return get_orchestrator_key_info(validator_name, chain_binary, home, keyring_backend)
+
+
+def write_key_info(output_file: Path, key_info: Dict):
+    """写入密钥文件并设置权限为 600（仅所有者可读写）"""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(key_info, f, indent=2, ensure_ascii=False)
+    output_file.chmod(0o600)
+
+
+def export_all(
+    tasks: List[Tuple[str, str, Path]],
+    chain_binary: str,
+    keyring_backend: str
+) -> List[str]:
+    """
+    并行导出所有 validator 的密钥
+    tasks: [(validator_name, keyring_home, output_file)]
+    返回失败的 validator 列表
+    """
+    def run(task):
+        validator_name, home, output_file = task
+        return task, export_key_info(validator_name, chain_binary, home, keyring_backend)
+
+    failed_validators = []
+    workers = max(1, min(len(tasks), 32))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (validator_name, _, output_file), key_info in executor.map(run, tasks):
+            if key_info:
+                write_key_info(output_file, key_info)
+                print(f"  ✓ {validator_name}: {key_info['cosmos_address']} (EVM: 0x{key_info['evm_address']})")
+            else:
+                failed_validators.append(validator_name)
+                print(f"  ✗ {validator_name}: 导出失败", file=sys.stderr)
+
+    return failed_validators
+
+
+def parse_validator_names(validator_names_str: str) -> List[str]:
+    """解析 validator 名称 JSON 数组"""
     try:
         validator_names = json.loads(validator_names_str)
     except json.JSONDecodeError as e:
@@ -134,44 +183,54 @@ def main():
     if not isinstance(validator_names, list):
         print("错误: validator_names 必须是数组", file=sys.stderr)
         sys.exit(1)
-    
-    # 确保输出目录存在
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
+
+    return validator_names
+
+
+def main():
+    # 多节点模式：每个 validator 使用自己的 home（<base_dir>/<validator>），输出到同一目录
+    if len(sys.argv) >= 2 and sys.argv[1] == '--base-dir':
+        if len(sys.argv) != 7:
+            print("用法: generate_orchestrator_keys.py --base-dir <chain_binary> <base_dir> <keyring_backend> <validator_names_json> <output_filename>")
+            print("示例: generate_orchestrator_keys.py --base-dir injectived ./chain-deploy-config test '[\"validator-0\",\"validator-1\"]' peggo_evm_key.json")
+            sys.exit(1)
+
+        chain_binary, base_dir, keyring_backend, validator_names_str, output_filename = sys.argv[2:7]
+        validator_names = parse_validator_names(validator_names_str)
+        tasks = [
+            (name, f"{base_dir}/{name}", Path(base_dir) / name / output_filename)
+            for name in sorted(validator_names)
+        ]
+    else:
+        if len(sys.argv) < 6 or len(sys.argv) > 7:
+            print("用法: generate_orchestrator_keys.py <chain_binary> <master_home> <output_dir> <keyring_backend> <validator_names_json> [output_filename]")
+            print("      generate_orchestrator_keys.py --base-dir <chain_binary> <base_dir> <keyring_backend> <validator_names_json> <output_filename>")
+            print("示例: generate_orchestrator_keys.py biyachaind /path/to/master /path/to/output 'test' '[\"validator-0\",\"validator-1\"]'")
+            print("      generate_orchestrator_keys.py biyachaind /path/to/master /path/to/output 'test' '[\"validator-0\"]' 'peggo_evm_key.json'")
+            sys.exit(1)
+        
+        chain_binary = sys.argv[1]
+        master_home = sys.argv[2]
+        output_dir = sys.argv[3]
+        keyring_backend = sys.argv[4]  # "test" 或 "file"
+        validator_names = parse_validator_names(sys.argv[5])
+        output_filename = sys.argv[6] if len(sys.argv) == 7 else None  # 可选的自定义文件名
+        
+        # 确保输出目录存在
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        
+        # 根据是否提供自定义文件名，决定输出文件路径
+        tasks = [
+            (name, master_home,
+             output_path / (output_filename or f"{name}_orchestrator_key.json"))
+            for name in sorted(validator_names)
+        ]
     
     print("导出 Orchestrator 密钥信息...")
     
-    success_count = 0
-    failed_validators = []
-    
-    for validator_name in sorted(validator_names):
-        key_info = get_orchestrator_key_info(
-            validator_name,
-            chain_binary,
-            master_home,
-            keyring_backend
-        )
-        
-        if key_info:
-            # 根据是否提供自定义文件名，决定输出文件路径
-            if output_filename:
-                # 使用自定义文件名（不带 validator 名称前缀）
-                output_file = output_path / output_filename
-            else:
-                # 使用默认文件名格式
-                output_file = output_path / f"{validator_name}_orchestrator_key.json"
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(key_info, f, indent=2, ensure_ascii=False)
-            
-            # 设置文件权限为 600（仅所有者可读写）
-            output_file.chmod(0o600)
-            
-            success_count += 1
-            print(f"  ✓ {validator_name}: {key_info['cosmos_address']} (EVM: 0x{key_info['evm_address']})")
-        else:
-            failed_validators.append(validator_name)
-            print(f"  ✗ {validator_name}: 导出失败", file=sys.stderr)
+    failed_validators = export_all(tasks, chain_binary, keyring_backend)
+    success_count = len(validator_names) - len(failed_validators)
     
     print(f"\n✓ 成功导出 {success_count}/{len(validator_names)} 个 Orchestrator 密钥")
     
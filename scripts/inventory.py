@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Ansible inventory 索引库
+- 使用 C 版 YAML 解析器（可用时）加载 inventory.yml
+- 一次性合并组变量和主机变量，按角色、IP、索引建立索引
+- 索引缓存到 inventory 同目录的 .<文件名>.cache.json，按 mtime 和内容哈希失效
+- 命中缓存时不导入 yaml，命令行查询只需读取一个 JSON 文件
+
+命令行:
+    inventory.py [-i inventory.yml] list [validators|sentries|nodes|all]
+    inventory.py [-i inventory.yml] get <host> [ip|type|index|<var>]
+    inventory.py [-i inventory.yml] var <name>
+    inventory.py [-i inventory.yml] dump
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+CACHE_VERSION = 1
+
+# 默认 inventory 路径（可通过 -i 或 INVENTORY_FILE 环境变量覆盖）
+DEFAULT_INVENTORY = Path(__file__).resolve().parent.parent / "ansible" / "inventory.yml"
+
+# 节点角色 -> 主机名前缀
+ROLE_PREFIXES = {
+    'validator': 'validator-',
+    'sentry': 'sentry-',
+}
+
+
+def _yaml_load(content: str) -> Dict:
+    """优先使用 libyaml 的 CSafeLoader"""
+    import yaml
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(content, Loader=loader) or {}
+
+
+def _collect_hosts(group: Dict, inherited: Dict, groups: List[str],
+                   hosts: Dict[str, Dict], host_groups: Dict[str, List[str]]):
+    """递归展开组，合并组变量（子组覆盖父组，主机变量覆盖组变量）"""
+    group = group or {}
+    group_vars = {**inherited, **(group.get('vars') or {})}
+
+    for name, host_vars in (group.get('hosts') or {}).items():
+        merged = {**hosts.get(name, {}), **group_vars, **(host_vars or {})}
+        hosts[name] = merged
+        host_groups.setdefault(name, [])
+        for g in groups:
+            if g not in host_groups[name]:
+                host_groups[name].append(g)
+
+    for child_name, child in (group.get('children') or {}).items():
+        _collect_hosts(child, group_vars, groups + [child_name], hosts, host_groups)
+
+
+def _host_role(name: str, host_vars: Dict) -> Optional[str]:
+    node_type = host_vars.get('node_type')
+    if node_type in ROLE_PREFIXES:
+        return node_type
+    for role, prefix in ROLE_PREFIXES.items():
+        if name.startswith(prefix):
+            return role
+    return None
+
+
+def _host_index(name: str, host_vars: Dict) -> int:
+    index = host_vars.get('node_index')
+    if index is None:
+        index = name.rsplit('-', 1)[-1]
+    try:
+        return int(index)
+    except (TypeError, ValueError):
+        return 0
+
+
+def compile_inventory(raw: Dict) -> Dict:
+    """将原始 inventory 编译为索引结构"""
+    all_group = raw.get('all') or {}
+    hosts: Dict[str, Dict] = {}
+    host_groups: Dict[str, List[str]] = {}
+    _collect_hosts(all_group, {}, ['all'], hosts, host_groups)
+
+    roles: Dict[str, List[str]] = {role: [] for role in ROLE_PREFIXES}
+    by_ip: Dict[str, str] = {}
+    meta: Dict[str, Dict] = {}
+
+    for name, host_vars in hosts.items():
+        ip = str(host_vars.get('ansible_host', '') or '')
+        role = _host_role(name, host_vars)
+        index = _host_index(name, host_vars)
+        meta[name] = {'ip': ip, 'type': role, 'index': index, 'groups': host_groups.get(name, [])}
+        if ip:
+            by_ip.setdefault(ip, name)
+        if role and ip:
+            roles[role].append(name)
+
+    for role in roles:
+        roles[role].sort(key=lambda n: (meta[n]['index'], n))
+
+    return {
+        'version': CACHE_VERSION,
+        'group_vars': all_group.get('vars') or {},
+        'hosts': hosts,
+        'meta': meta,
+        'roles': roles,
+        'by_ip': by_ip,
+    }
+
+
+class Inventory:
+    """已编译的 inventory 索引"""
+
+    def __init__(self, index: Dict, path: Optional[str] = None):
+        self.index = index
+        self.path = path
+
+    @property
+    def group_vars(self) -> Dict:
+        return self.index['group_vars']
+
+    def hosts(self, role: Optional[str] = None) -> List[str]:
+        """按角色列出主机；role 为 nodes 时返回所有 validator 和 sentry"""
+        roles = self.index['roles']
+        if role in roles:
+            return list(roles[role])
+        if role == 'nodes':
+            return [name for r in ROLE_PREFIXES for name in roles[r]]
+        return sorted(self.index['hosts'])
+
+    def validators(self) -> Dict[str, str]:
+        """validator 名称 -> IP"""
+        return {name: self.ip(name) for name in self.hosts('validator')}
+
+    def sentries(self) -> Dict[str, str]:
+        """sentry 名称 -> IP"""
+        return {name: self.ip(name) for name in self.hosts('sentry')}
+
+    def has_host(self, name: str) -> bool:
+        return name in self.index['hosts']
+
+    def host_vars(self, name: str) -> Dict:
+        """主机的完整变量（已合并组变量）"""
+        return self.index['hosts'].get(name, {})
+
+    def ip(self, name: str) -> str:
+        return self.index['meta'].get(name, {}).get('ip', '')
+
+    def node_type(self, name: str) -> Optional[str]:
+        return self.index['meta'].get(name, {}).get('type')
+
+    def node_index(self, name: str) -> int:
+        return self.index['meta'].get(name, {}).get('index', 0)
+
+    def host_by_ip(self, ip: str) -> Optional[str]:
+        return self.index['by_ip'].get(ip)
+
+    def var(self, name: str, key: str, default: Any = None) -> Any:
+        """主机变量（包含继承的组变量）"""
+        return self.host_vars(name).get(key, default)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """all 组变量"""
+        return self.group_vars.get(key, default)
+
+
+def _cache_path(inventory_file: Path) -> Path:
+    return inventory_file.parent / f".{inventory_file.name}.cache.json"
+
+
+def _write_cache(cache_file: Path, index: Dict):
+    tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, default=str)
+        os.replace(tmp, cache_file)
+    except OSError:
+        # 缓存写入失败不影响查询（如只读目录）
+        if tmp.exists():
+            tmp.unlink()
+
+
+def load_inventory(inventory_file: Optional[str] = None, use_cache: bool = True) -> Inventory:
+    """
+    加载 inventory 索引
+    1. mtime 和大小与缓存一致 -> 直接使用缓存
+    2. 内容哈希与缓存一致 -> 更新缓存中的 mtime 后使用
+    3. 否则重新解析 YAML 并写入缓存
+    """
+    path = Path(inventory_file or os.environ.get('INVENTORY_FILE') or DEFAULT_INVENTORY)
+    stat = path.stat()
+    cache_file = _cache_path(path)
+
+    cached = None
+    if use_cache:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('version') != CACHE_VERSION:
+                cached = None
+        except (OSError, ValueError):
+            cached = None
+
+    if cached and cached.get('mtime_ns') == stat.st_mtime_ns and cached.get('size') == stat.st_size:
+        return Inventory(cached, str(path))
+
+    content = path.read_bytes()
+    digest = hashlib.sha256(content).hexdigest()
+
+    if cached and cached.get('sha256') == digest:
+        index = cached
+    else:
+        index = compile_inventory(_yaml_load(content.decode('utf-8')))
+        index['sha256'] = digest
+
+    index['mtime_ns'] = stat.st_mtime_ns
+    index['size'] = stat.st_size
+    if use_cache:
+        _write_cache(cache_file, index)
+    return Inventory(index, str(path))
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return '' if value is None else str(value)
+
+
+def show_usage():
+    print("用法: inventory.py [-i inventory.yml] <command> [args]")
+    print("")
+    print("命令:")
+    print("  list [validators|sentries|nodes|all]   列出主机（默认 nodes）")
+    print("  get <host> [ip|type|index|<var>]       查询主机信息（默认 ip）")
+    print("  var <name>                             查询 all 组变量")
+    print("  dump                                   输出完整索引（JSON）")
+    print("")
+    print("示例:")
+    print("  inventory.py get validator-0 ip")
+    print("  inventory.py list validators")
+    print("  inventory.py var peggo_eth_rpc")
+
+
+def main():
+    args = sys.argv[1:]
+    inventory_file = None
+    if len(args) >= 2 and args[0] in ('-i', '--inventory'):
+        inventory_file = args[1]
+        args = args[2:]
+
+    if not args:
+        show_usage()
+        sys.exit(1)
+
+    try:
+        inv = load_inventory(inventory_file)
+    except OSError as e:
+        print(f"错误: 无法读取 inventory 文件: {e}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"错误: 无法解析 inventory 文件: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    command = args[0]
+
+    if command == 'list':
+        role = args[1] if len(args) > 1 else 'nodes'
+        aliases = {'validators': 'validator', 'sentries': 'sentry'}
+        for name in inv.hosts(aliases.get(role, role)):
+            print(name)
+
+    elif command == 'get' and len(args) >= 2:
+        host = args[1]
+        field = args[2] if len(args) > 2 else 'ip'
+        if not inv.has_host(host):
+            print(f"错误: 主机不存在: {host}", file=sys.stderr)
+            sys.exit(1)
+        if field == 'ip':
+            value = inv.ip(host)
+        elif field == 'type':
+            value = inv.node_type(host)
+        elif field == 'index':
+            value = inv.node_index(host)
+        elif field in inv.host_vars(host):
+            value = inv.var(host, field)
+        else:
+            sys.exit(1)
+        print(_format(value))
+
+    elif command == 'var' and len(args) == 2:
+        if args[1] not in inv.group_vars:
+            sys.exit(1)
+        print(_format(inv.get(args[1])))
+
+    elif command == 'dump':
+        print(json.dumps(inv.index, indent=2, ensure_ascii=False, default=str))
+
+    else:
+        show_usage()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+直接读取 keyring-test 后端（无需调用链二进制）
+- 解密 <name>.info / <hex>.address（JWE: PBES2-HS256+A128KW / A256GCM，密码为 "test"）
+- 明文是 json.Marshal(keyring.Item)：{"Key": ..., "Data": "<base64>", ...}，
+  .info 的 Data 是 cosmos.crypto.keyring.v1.Record protobuf，.address 的 Data 是 "<name>.info"
+- 解析 Record protobuf
+- 在进程内推导 bech32 地址和 EVM 地址
+
+依赖 pycryptodome（eth_account 的间接依赖），在首次解密时才导入
+"""
+
+import base64
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import bech32
+
+
+KEYRING_TEST_PASSWORD = "test"
+
+# secp256k1 曲线参数（用于解压公钥）
+_SECP256K1_P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+
+
+class KeyringError(Exception):
+    """keyring 文件无法在进程内解析（调用方应回退到链二进制）"""
+
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _aes_key_unwrap(kek: bytes, wrapped: bytes) -> bytes:
+    """RFC 3394 AES Key Unwrap"""
+    from Crypto.Cipher import AES
+
+    cipher = AES.new(kek, AES.MODE_ECB)
+    n = len(wrapped) // 8 - 1
+    a = wrapped[:8]
+    r = [wrapped[8 * (i + 1):8 * (i + 2)] for i in range(n)]
+    for j in range(5, -1, -1):
+        for i in range(n, 0, -1):
+            t = (n * j + i).to_bytes(8, 'big')
+            b = cipher.decrypt(bytes(x ^ y for x, y in zip(a, t)) + r[i - 1])
+            a, r[i - 1] = b[:8], b[8:]
+    if a != b'\xa6' * 8:
+        raise KeyringError("密钥解包失败（密码错误或文件损坏）")
+    return b''.join(r)
+
+
+def decrypt_jwe(token: str, password: str = KEYRING_TEST_PASSWORD) -> bytes:
+    """解密 99designs/keyring file 后端使用的 JWE compact 格式"""
+    try:
+        from Crypto.Cipher import AES
+    except ImportError as e:
+        raise KeyringError(f"缺少 pycryptodome: {e}")
+
+    parts = token.strip().split('.')
+    if len(parts) != 5:
+        raise KeyringError("不是 JWE compact 格式")
+
+    header_b64, wrapped_b64, iv_b64, ciphertext_b64, tag_b64 = parts
+    header = json.loads(_b64url_decode(header_b64))
+    alg = header.get('alg')
+    if alg != 'PBES2-HS256+A128KW' or header.get('enc') != 'A256GCM':
+        raise KeyringError(f"不支持的加密算法: {alg}/{header.get('enc')}")
+
+    salt = alg.encode() + b'\x00' + _b64url_decode(header['p2s'])
+    kek = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, int(header['p2c']), 16)
+    cek = _aes_key_unwrap(kek, _b64url_decode(wrapped_b64))
+
+    cipher = AES.new(cek, AES.MODE_GCM, nonce=_b64url_decode(iv_b64))
+    cipher.update(header_b64.encode('ascii'))
+    try:
+        return cipher.decrypt_and_verify(_b64url_decode(ciphertext_b64), _b64url_decode(tag_b64))
+    except ValueError:
+        raise KeyringError("JWE 校验失败（密码错误或文件损坏）")
+
+
+def decrypt_item(token: str, password: str = KEYRING_TEST_PASSWORD) -> Tuple[str, bytes]:
+    """解密 keyring 文件，返回 keyring.Item 的 (Key, Data)"""
+    try:
+        item = json.loads(decrypt_jwe(token, password))
+        # Go 的 []byte 序列化为标准 base64，nil 为 null
+        return item['Key'], base64.b64decode(item['Data'] or '', validate=True)
+    except (ValueError, KeyError, TypeError) as e:
+        raise KeyringError(f"不是 keyring.Item JSON: {e}")
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise KeyringError("protobuf 数据截断")
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def parse_proto(data: bytes) -> Dict[int, bytes]:
+    """解析 protobuf 消息中的长度前缀字段（字段号 -> 首个值）"""
+    fields: Dict[int, bytes] = {}
+    pos = 0
+    while pos < len(data):
+        tag, pos = _read_varint(data, pos)
+        field, wire_type = tag >> 3, tag & 7
+        if wire_type == 0:
+            _, pos = _read_varint(data, pos)
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            fields.setdefault(field, data[pos:pos + length])
+            pos += length
+        elif wire_type == 1:
+            pos += 8
+        elif wire_type == 5:
+            pos += 4
+        else:
+            raise KeyringError(f"不支持的 protobuf wire type: {wire_type}")
+    return fields
+
+
+def _parse_any(data: bytes) -> Tuple[str, bytes]:
+    """解析 google.protobuf.Any，返回 (type_url, 内部 key 字节)"""
+    any_fields = parse_proto(data)
+    type_url = any_fields.get(1, b'').decode()
+    key = parse_proto(any_fields.get(2, b'')).get(1, b'')
+    return type_url, key
+
+
+def parse_record(data: bytes) -> Dict:
+    """解析 keyring Record，返回名称、公钥和私钥"""
+    fields = parse_proto(data)
+    if 3 not in fields:
+        raise KeyringError("不是本地密钥（ledger/offline/multi）")
+
+    pub_type, pub_key = _parse_any(fields[2]) if 2 in fields else ('', b'')
+    priv_type, priv_key = _parse_any(parse_proto(fields[3]).get(1, b''))
+    if len(priv_key) != 32:
+        raise KeyringError(f"不支持的私钥类型: {priv_type}")
+
+    return {
+        'name': fields.get(1, b'').decode(),
+        'pub_key_type': pub_type,
+        'pub_key': pub_key,
+        'priv_key_type': priv_type,
+        'priv_key': priv_key,
+    }
+
+
+def keccak256(data: bytes) -> bytes:
+    from Crypto.Hash import keccak
+    return keccak.new(digest_bits=256, data=data).digest()
+
+
+def decompress_pubkey(pub_key: bytes) -> bytes:
+    """将 33 字节压缩公钥解压为 64 字节 (x||y)"""
+    if len(pub_key) == 65 and pub_key[0] == 4:
+        return pub_key[1:]
+    if len(pub_key) != 33 or pub_key[0] not in (2, 3):
+        raise KeyringError("无效的 secp256k1 公钥")
+    p = _SECP256K1_P
+    x = int.from_bytes(pub_key[1:], 'big')
+    y = pow((pow(x, 3, p) + 7) % p, (p + 1) // 4, p)
+    if (y & 1) != (pub_key[0] & 1):
+        y = p - y
+    return x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+
+
+def derive_addresses(record: Dict, hrp: str = "inj") -> Tuple[str, str]:
+    """
+    推导 (bech32 地址, EVM 地址)
+    EVM 地址 = keccak256(未压缩公钥)[12:]；eth_secp256k1 密钥的 Cosmos 地址使用相同字节
+    """
+    if not record['pub_key']:
+        raise KeyringError("Record 中缺少公钥")
+
+    evm_bytes = keccak256(decompress_pubkey(record['pub_key']))[12:]
+    if 'ethsecp256k1' in record['pub_key_type']:
+        cosmos_bytes = evm_bytes
+    else:
+        from Crypto.Hash import RIPEMD160
+        sha = hashlib.sha256(record['pub_key']).digest()
+        cosmos_bytes = RIPEMD160.new(sha).digest()
+
+    return bech32.encode(hrp, cosmos_bytes), evm_bytes.hex()
+
+
+def read_item(home: str, item_key: str, keyring_backend: str = "test") -> bytes:
+    """读取 <home>/keyring-test/<item_key> 并返回 Item.Data"""
+    if keyring_backend != "test":
+        raise KeyringError(f"仅支持 test 后端: {keyring_backend}")
+
+    item_file = Path(home) / f"keyring-{keyring_backend}" / item_key
+    try:
+        token = item_file.read_text(encoding='utf-8')
+    except OSError as e:
+        raise KeyringError(f"无法读取 {item_file}: {e}")
+
+    key, data = decrypt_item(token)
+    if key != item_key:
+        raise KeyringError(f"{item_file} 中的 Item.Key 不匹配: {key}")
+    return data
+
+
+def read_key_name(home: str, address: bytes, keyring_backend: str = "test") -> str:
+    """按地址字节读取 <hex>.address，返回密钥名称"""
+    data = read_item(home, f"{address.hex()}.address", keyring_backend).decode()
+    if not data.endswith('.info'):
+        raise KeyringError(f"无效的 address 条目: {data}")
+    return data[:-len('.info')]
+
+
+def read_key(home: str, key_name: str, keyring_backend: str = "test", hrp: str = "inj") -> Dict:
+    """
+    从 <home>/keyring-test/<key_name>.info 读取密钥
+    返回 cosmos_address / evm_address / private_key（hex，不带 0x）
+    """
+    record = parse_record(read_item(home, f"{key_name}.info", keyring_backend))
+    cosmos_address, evm_address = derive_addresses(record, hrp)
+    return {
+        'cosmos_address': cosmos_address,
+        'evm_address': evm_address,
+        'private_key': record['priv_key'].hex(),
+    }
+
+
+def read_address(home: str, key_name: str, keyring_backend: str = "test",
+                 hrp: str = "inj") -> Optional[str]:
+    """读取密钥的 bech32 地址，失败时返回 None"""
+    try:
+        return read_key(home, key_name, keyring_backend, hrp)['cosmos_address']
+    except (KeyringError, ValueError, KeyError):
+        return None
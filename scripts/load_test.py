@@ -0,0 +1,727 @@
+#!/usr/bin/env python3
+"""
+交易压测：测量当前 node_config.yml 参数下网络的 TPS 和确认延迟
+- fund: 创建 N 个发送账户（独立 keyring），用一笔 multi-send 交易从 validator 账户注资
+- run:  按账户查询 sequence，离线预签名全部交易（每个账户一次 sign-batch），再按目标速率
+        （开环：发送时刻固定，不等待确认）或闭环（每个账户等上一笔上链后再发下一笔）
+        发送到 sentry 的 RPC；同一账户固定发往同一个 RPC，避免 sequence 乱序
+- 后台线程轮询新区块并读取 block / block_results：记录每笔交易首次出现在区块中的本地时间，
+  计算提交到上链的延迟分位数、持续 TPS、拒绝率和 mempool 已满比例
+- 结果写入 JSON 报告（包含 node_config.yml 的共识/mempool 参数），compare 对比两次报告
+
+命令行:
+    load_test.py fund <config_dir> --senders N [--funder validator-0] [--amount 10000000000000000000inj]
+                 --rpc host:port [--rest url]
+    load_test.py run [--txs 1000 | --duration 60] [--rate 100] [--closed-loop]
+                 [--rpc host:port ...] [--rest url] [--label text] [--report file] [--json]
+    load_test.py compare <base.json> <new.json>
+
+通用选项: [-i inventory.yml] [-c node_config.yml] [--binary build/bin/biyachaind] [--chain-id biyachain-888]
+未指定 --rpc 时 run 使用 inventory 中所有 sentry 的 RPC（端口取自 node_config.yml 的 rpc.laddr）
+
+测试：test/fleet/mock-chain.py 模拟 RPC，test/fleet/fake-biyachaind.py 模拟签名
+"""
+
+import base64
+import hashlib
+import json
+import math
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from chain_status import parse_time
+from inventory import load_inventory
+from keyring_reader import read_address
+from register_orchestrators import (DEFAULT_BINARY, DEFAULT_CHAIN_ID, DEFAULT_GAS_PRICES, ChainError,
+                                    latest_height, query_account, rest_from_rpc, rpc_batch, run_binary)
+from state_sync import parse_rpc, rpc_port_from_config
+from table import print_rows
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_CONFIG = ROOT_DIR / "node_config.yml"
+WORK_DIR = ROOT_DIR / "build" / "loadtest"
+SENDERS_FILE = WORK_DIR / "senders.json"
+
+DEFAULT_FUND_AMOUNT = "10000000000000000000inj"   # 每个发送账户 10 INJ
+DEFAULT_SEND_AMOUNT = "1inj"
+DEFAULT_GAS = 100000
+SENDER_PREFIX = "loadtest"
+
+# sdkerrors.ErrMempoolIsFull；CometBFT 的 mempool 已满以 RPC 错误返回
+CODE_MEMPOOL_FULL = 20
+MEMPOOL_FULL_TEXT = "mempool is full"
+MEMPOOL_FULL_RETRIES = 20
+MEMPOOL_FULL_BACKOFF = 0.2
+
+# 区块轮询间隔（也是延迟测量的分辨率）
+WATCH_INTERVAL = 0.1
+# 单次批量读取的最大区块数
+SCAN_BATCH = 20
+
+# 报告中记录的 node_config.yml 参数（匹配键名中的片段）
+TUNING_KEYS = ('timeout_', 'mempool', 'max_txs_bytes', 'max_tx_bytes', 'minimum-gas-prices',
+               'send_rate', 'recv_rate', 'iavl-cache-size')
+
+
+@dataclass
+class LoadTx:
+    index: int
+    sender: str
+    sequence: int
+    tx_bytes: str
+    tx_hash: str
+    endpoint: str = ''
+    scheduled: float = 0.0
+    submitted: Optional[float] = None
+    code: Optional[int] = None
+    error: str = ''
+    mempool_full: int = 0
+    height: Optional[int] = None
+    seen: Optional[float] = None
+    exec_code: Optional[int] = None
+    included: threading.Event = field(default_factory=threading.Event, repr=False)
+
+
+class BlockWatcher:
+    """轮询新区块，记录压测交易首次出现在区块中的本地时间和执行结果"""
+
+    def __init__(self, rpc: str, start_height: int, txs: Dict[str, LoadTx]):
+        self.rpc = rpc
+        self.next_height = start_height + 1
+        self.txs = txs
+        self.blocks: Dict[int, Dict] = {}
+        self.errors = 0
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def close(self):
+        self.stop.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stop.is_set():
+            try:
+                latest = latest_height(self.rpc)
+                seen = time.monotonic()
+                while self.next_height <= latest:
+                    end = min(latest, self.next_height + SCAN_BATCH - 1)
+                    self.scan(self.next_height, end, seen)
+                    self.next_height = end + 1
+            except (ChainError, KeyError, ValueError, TypeError):
+                self.errors += 1
+            self.stop.wait(WATCH_INTERVAL)
+
+    def scan(self, start: int, end: int, seen: float):
+        heights = list(range(start, end + 1))
+        responses = rpc_batch(self.rpc, [(method, {'height': str(h)}) for h in heights
+                                         for method in ('block', 'block_results')])
+        for index, height in enumerate(heights):
+            block, results = responses[2 * index], responses[2 * index + 1]
+            if block.get('error') or results.get('error'):
+                raise ChainError(f"高度 {height}: {block.get('error') or results.get('error')}")
+            data = block['result']['block']
+            txs = (data.get('data') or {}).get('txs') or []
+            tx_results = results['result'].get('txs_results') or []
+            ours = 0
+            for position, raw in enumerate(txs):
+                tx = self.txs.get(hashlib.sha256(base64.b64decode(raw)).hexdigest().upper())
+                if tx is None or tx.included.is_set():
+                    continue
+                result = tx_results[position] if position < len(tx_results) else {}
+                tx.height, tx.seen = height, seen
+                tx.exec_code = int(result.get('code', 0))
+                tx.included.set()
+                ours += 1
+            self.blocks[height] = {'time': data['header']['time'], 'txs': len(txs), 'ours': ours}
+
+
+# ---------- 配置 ----------
+
+def tuning_snapshot(node_config_file: str) -> Dict:
+    """node_config.yml 中影响吞吐的参数（global 和 sentry 段），用于对比不同调优的报告"""
+    try:
+        with open(node_config_file, 'rb') as f:
+            content = f.read()
+        config = yaml.safe_load(content) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+    snapshot = {'node_config_sha256': hashlib.sha256(content).hexdigest()[:16]}
+    for section in ('global', 'sentry'):
+        for file_key in ('config_toml', 'app_toml'):
+            for key, value in ((config.get(section) or {}).get(file_key) or {}).items():
+                if any(part in key for part in TUNING_KEYS):
+                    snapshot[f"{section}.{key}"] = value
+    return snapshot
+
+
+def default_endpoints(inventory_file: Optional[str], config_file: str) -> List[str]:
+    inv = load_inventory(inventory_file)
+    port = rpc_port_from_config(config_file)
+    return [f"http://{inv.ip(name)}:{port}" for name in inv.hosts('sentry')]
+
+
+def load_senders() -> Dict:
+    if not SENDERS_FILE.exists():
+        raise ChainError(f"{SENDERS_FILE} 不存在，请先执行 load_test.py fund")
+    return json.loads(SENDERS_FILE.read_text(encoding='utf-8'))
+
+
+# ---------- 签名 ----------
+
+def encode(binary: str, signed_json: str) -> str:
+    with tempfile.NamedTemporaryFile('w', suffix='.json', prefix='loadtest-') as f:
+        f.write(signed_json)
+        f.flush()
+        return run_binary([binary, 'tx', 'encode', f.name]).strip()
+
+
+def presign(binary: str, chain_id: str, home: str, name: str, receiver: str, account: Tuple[int, int],
+            count: int, gas: int, gas_prices: str, amount: str) -> List[str]:
+    """一个账户的 count 笔交易：生成一次未签名交易，sign-batch 按 sequence 依次签名"""
+    common = [f'--chain-id={chain_id}', '--keyring-backend=test', f'--home={home}']
+    unsigned = json.loads(run_binary([binary, 'tx', 'bank', 'send', name, receiver, amount,
+                                      '--generate-only', f'--gas={gas}', f'--gas-prices={gas_prices}']
+                                     + common))
+    with tempfile.NamedTemporaryFile('w', suffix='.json', prefix='loadtest-') as f:
+        f.write((json.dumps(unsigned, separators=(',', ':')) + '\n') * count)
+        f.flush()
+        output = run_binary([binary, 'tx', 'sign-batch', f.name, f'--from={name}', '--offline',
+                             f'--account-number={account[0]}', f'--sequence={account[1]}'] + common,
+                            timeout=600)
+    return [line for line in output.splitlines() if line.strip()]
+
+
+def prepare(senders: Dict, endpoints: List[str], rest: Optional[str], binary: str, chain_id: str,
+            total: int, gas: int, gas_prices: str, amount: str, parallel: int) -> List[LoadTx]:
+    """查询账户并离线预签名 total 笔交易，第 i 笔由账户 i % N 发送"""
+    accounts = senders['senders']
+    home = senders['home']
+    per_sender = [total // len(accounts) + (1 if s < total % len(accounts) else 0)
+                  for s in range(len(accounts))]
+    active = [s for s in range(len(accounts)) if per_sender[s]]
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        infos = dict(zip(active, pool.map(
+            lambda s: query_account(rest, binary, endpoints[0], accounts[s]['address']), active)))
+        signed = dict(zip(active, pool.map(
+            lambda s: presign(binary, chain_id, home, accounts[s]['name'],
+                              accounts[(s + 1) % len(accounts)]['address'], infos[s],
+                              per_sender[s], gas, gas_prices, amount), active)))
+        jobs = [(s, k, line) for s in active for k, line in enumerate(signed[s])]
+        encoded = list(pool.map(lambda job: encode(binary, job[2]), jobs))
+
+    by_sender: Dict[int, List[str]] = {}
+    for (s, _, _), tx_bytes in zip(jobs, encoded):
+        by_sender.setdefault(s, []).append(tx_bytes)
+    txs = []
+    for index in range(total):
+        s = index % len(accounts)
+        k = index // len(accounts)
+        tx_bytes = by_sender[s][k]
+        txs.append(LoadTx(index=index, sender=accounts[s]['name'], sequence=infos[s][1] + k,
+                          tx_bytes=tx_bytes,
+                          tx_hash=hashlib.sha256(base64.b64decode(tx_bytes)).hexdigest().upper(),
+                          endpoint=endpoints[s % len(endpoints)]))
+    return txs
+
+
+# ---------- 发送 ----------
+
+def send_tx(tx: LoadTx):
+    """broadcast_tx_sync；mempool 已满时退避重发同一笔交易（保持 sequence 顺序）"""
+    # 延迟从第一次提交开始计算（包含 mempool 已满的重试）
+    tx.submitted = time.monotonic()
+    for attempt in range(MEMPOOL_FULL_RETRIES + 1):
+        try:
+            response = rpc_batch(tx.endpoint, [('broadcast_tx_sync', {'tx': tx.tx_bytes})])[0]
+        except ChainError as e:
+            tx.error = str(e)
+            return
+        error = response.get('error')
+        result = response.get('result') or {}
+        full = (error and MEMPOOL_FULL_TEXT in str(error.get('data', ''))) or \
+            int(result.get('code', 0)) == CODE_MEMPOOL_FULL
+        if full:
+            tx.mempool_full += 1
+            if attempt < MEMPOOL_FULL_RETRIES:
+                time.sleep(MEMPOOL_FULL_BACKOFF)
+                continue
+        if error:
+            tx.error = str(error.get('data') or error.get('message'))
+        else:
+            tx.code = int(result.get('code', 0))
+            if tx.code != 0:
+                tx.error = str(result.get('log', ''))
+        return
+
+
+def run_sender(txs: List[LoadTx], closed_loop: bool, drain: float):
+    """一个账户的交易按顺序发送；被拒绝后该账户后续的 sequence 都会失效，停止发送"""
+    for position, tx in enumerate(txs):
+        if closed_loop and position:
+            txs[position - 1].included.wait(drain)
+        delay = tx.scheduled - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        send_tx(tx)
+        if tx.code != 0:
+            return
+
+
+def run_load(txs: List[LoadTx], rate: float, closed_loop: bool, drain: float) -> Tuple[float, float]:
+    """开环：第 i 笔的发送时刻为 start + i / rate（rate 为 0 时全部立即发送）"""
+    start = time.monotonic() + 0.5
+    for tx in txs:
+        tx.scheduled = start + (tx.index / rate if rate > 0 else 0)
+    by_sender: Dict[str, List[LoadTx]] = {}
+    for tx in txs:
+        by_sender.setdefault(tx.sender, []).append(tx)
+    threads = [threading.Thread(target=run_sender, args=(sender_txs, closed_loop, drain), daemon=True)
+               for sender_txs in by_sender.values()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return start, time.monotonic()
+
+
+def wait_drain(txs: List[LoadTx], drain: float):
+    deadline = time.monotonic() + drain
+    for tx in txs:
+        if tx.code == 0:
+            tx.included.wait(max(0.0, deadline - time.monotonic()))
+
+
+# ---------- 统计 ----------
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(txs: List[LoadTx], blocks: Dict[int, Dict], send_start: float, send_end: float) -> Dict:
+    sent = [tx for tx in txs if tx.submitted is not None]
+    accepted = [tx for tx in sent if tx.code == 0]
+    included = [tx for tx in accepted if tx.included.is_set()]
+    latencies = [tx.seen - tx.submitted for tx in included]
+    rejected: Dict[str, int] = {}
+    for tx in sent:
+        if tx.code != 0:
+            key = f"code {tx.code}" if tx.code is not None else (
+                'mempool_full' if MEMPOOL_FULL_TEXT in tx.error else 'rpc_error')
+            rejected[key] = rejected.get(key, 0) + 1
+    attempts = sum(1 + tx.mempool_full for tx in sent)
+
+    # 持续 TPS：首个包含压测交易的区块的上一个区块时间 → 最后一个包含压测交易的区块时间
+    ours = sorted(h for h, b in blocks.items() if b['ours'])
+    window = {}
+    if ours:
+        first, last = ours[0], ours[-1]
+        begin = parse_time(blocks.get(first - 1, blocks[first])['time'])
+        end = parse_time(blocks[last]['time'])
+        span = (end - begin).total_seconds() if begin and end else 0
+        heights = [h for h in range(first, last + 1) if h in blocks]
+        intervals = [(parse_time(blocks[h]['time']) - parse_time(blocks[h - 1]['time'])).total_seconds()
+                     for h in heights if h - 1 in blocks]
+        window = {
+            'first_height': first, 'last_height': last, 'span_seconds': round(span, 3),
+            'blocks': len(heights),
+            'mean_block_interval': round(sum(intervals) / len(intervals), 3) if intervals else None,
+            'max_block_txs': max(blocks[h]['txs'] for h in heights),
+            'mean_block_txs': round(sum(blocks[h]['txs'] for h in heights) / len(heights), 1),
+        }
+    send_seconds = max(send_end - send_start, 1e-9)
+
+    def ratio(n: int, d: int) -> Optional[float]:
+        return round(n / d, 4) if d else None
+
+    return {
+        'planned': len(txs),
+        'sent': len(sent),
+        'accepted': len(accepted),
+        'included': len(included),
+        'included_ok': sum(1 for tx in included if tx.exec_code == 0),
+        'included_failed': sum(1 for tx in included if tx.exec_code != 0),
+        'not_included': len(accepted) - len(included),
+        'not_sent': len(txs) - len(sent),
+        'rejected': rejected,
+        'rejection_rate': ratio(len(sent) - len(accepted), len(sent)),
+        'mempool_full_events': sum(tx.mempool_full for tx in sent),
+        'mempool_full_rate': ratio(sum(tx.mempool_full for tx in sent), attempts),
+        'send_seconds': round(send_seconds, 3),
+        'offered_tps': round(len(sent) / send_seconds, 2),
+        'sustained_tps': round(len(included) / window['span_seconds'], 2)
+        if window.get('span_seconds') else None,
+        'latency': {
+            'p50': _round(percentile(latencies, 50)),
+            'p90': _round(percentile(latencies, 90)),
+            'p95': _round(percentile(latencies, 95)),
+            'p99': _round(percentile(latencies, 99)),
+            'max': _round(max(latencies) if latencies else None),
+            'mean': _round(sum(latencies) / len(latencies) if latencies else None),
+            'resolution': WATCH_INTERVAL,
+        },
+        'blocks': window,
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 3)
+
+
+# ---------- 输出 ----------
+
+def _fmt(value) -> str:
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def print_report(report: Dict):
+    s = report['results']
+    latency = s['latency']
+    blocks = s['blocks']
+    run = report['run']
+    rows = [
+        ["模式", f"{'闭环' if run['closed_loop'] else '开环'}，目标速率 "
+                 f"{_fmt(run['rate']) + ' tx/s' if run['rate'] else '不限'}，账户 {run['senders']}，"
+                 f"RPC {len(run['endpoints'])} 个"],
+        ["交易", f"计划 {s['planned']}，发送 {s['sent']}，接受 {s['accepted']}，"
+                 f"上链 {s['included']}（执行失败 {s['included_failed']}），未上链 {s['not_included']}"],
+        ["拒绝", f"{_fmt(s['rejection_rate'])}  {json.dumps(s['rejected'], ensure_ascii=False)}"],
+        ["mempool 已满", f"{s['mempool_full_events']} 次（{_fmt(s['mempool_full_rate'])}）"],
+        ["发送速率", f"{_fmt(s['offered_tps'])} tx/s（{_fmt(s['send_seconds'])}s）"],
+        ["持续 TPS", f"{_fmt(s['sustained_tps'])} tx/s"],
+        ["延迟", f"p50 {_fmt(latency['p50'])}s  p90 {_fmt(latency['p90'])}s  p99 {_fmt(latency['p99'])}s  "
+                 f"max {_fmt(latency['max'])}s"],
+    ]
+    if blocks:
+        rows.append(["区块", f"{blocks['first_height']}-{blocks['last_height']}（{blocks['blocks']} 个），"
+                             f"平均间隔 {_fmt(blocks['mean_block_interval'])}s，"
+                             f"每块最多 {blocks['max_block_txs']} 笔，平均 {_fmt(blocks['mean_block_txs'])} 笔"])
+    print_rows(f"压测结果 {run['label'] or ''}".rstrip(), rows)
+
+
+COMPARE_KEYS = [
+    ('sustained_tps', '持续 TPS'), ('offered_tps', '发送速率'),
+    ('latency.p50', '延迟 p50'), ('latency.p90', '延迟 p90'), ('latency.p99', '延迟 p99'),
+    ('latency.max', '延迟 max'), ('rejection_rate', '拒绝率'), ('mempool_full_rate', 'mempool 已满'),
+    ('included', '上链'), ('blocks.mean_block_interval', '出块间隔'), ('blocks.max_block_txs', '每块最多'),
+]
+
+
+def _lookup(data: Dict, path: str):
+    for part in path.split('.'):
+        data = (data or {}).get(part)
+    return data
+
+
+def compare(base: Dict, new: Dict):
+    rows = [["指标", base['run']['label'] or 'base', new['run']['label'] or 'new', "变化"]]
+    for path, title in COMPARE_KEYS:
+        a, b = _lookup(base['results'], path), _lookup(new['results'], path)
+        delta = '-'
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)) and a:
+            delta = f"{(b - a) / a * 100:+.1f}%"
+        rows.append([title, _fmt(a), _fmt(b), delta])
+    tuning = sorted(set(base.get('tuning', {})) | set(new.get('tuning', {})))
+    for key in tuning:
+        a, b = base.get('tuning', {}).get(key), new.get('tuning', {}).get(key)
+        if a != b:
+            rows.append([key, _fmt(a), _fmt(b), '参数变化'])
+    print_rows("压测对比", rows)
+
+
+# ---------- 命令 ----------
+
+def fund(config_dir: Path, count: int, funder: str, amount: str, rpc: str, rest: Optional[str],
+         binary: str, chain_id: str, gas_prices: str, timeout: float) -> Dict:
+    """创建发送账户并用一笔 multi-send 注资，已有的账户只补充注资"""
+    home = str(WORK_DIR / "keyring")
+    existing = json.loads(SENDERS_FILE.read_text(encoding='utf-8'))['senders'] \
+        if SENDERS_FILE.exists() else []
+    senders = existing[:count]
+    for index in range(len(senders), count):
+        name = f"{SENDER_PREFIX}-{index}"
+        key = json.loads(run_binary([binary, 'keys', 'add', name, '--keyring-backend=test',
+                                     f'--home={home}', '--output=json']))
+        senders.append({'name': name, 'address': key['address']})
+
+    funder_home = config_dir / funder
+    funder_address = read_address(str(funder_home), funder) or run_binary(
+        [binary, 'keys', 'show', funder, '-a', '--keyring-backend=test', f'--home={funder_home}']).strip()
+    account = query_account(rest, binary, rpc, funder_address)
+    common = [f'--chain-id={chain_id}', '--keyring-backend=test', f'--home={funder_home}']
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+        unsigned, signed = Path(tmp) / "unsigned.json", Path(tmp) / "signed.json"
+        unsigned.write_text(run_binary(
+            [binary, 'tx', 'bank', 'multi-send', funder] + [s['address'] for s in senders] +
+            [amount, f'--from={funder}', '--generate-only', f'--gas={60000 + 30000 * len(senders)}',
+             f'--gas-prices={gas_prices}'] + common))
+        signed.write_text(run_binary(
+            [binary, 'tx', 'sign', str(unsigned), f'--from={funder}', '--offline',
+             f'--account-number={account[0]}', f'--sequence={account[1]}'] + common))
+        tx_bytes = run_binary([binary, 'tx', 'encode', str(signed)]).strip()
+
+    tx = LoadTx(index=0, sender=funder, sequence=account[1], tx_bytes=tx_bytes,
+                tx_hash=hashlib.sha256(base64.b64decode(tx_bytes)).hexdigest().upper(), endpoint=rpc)
+    watcher = BlockWatcher(rpc, latest_height(rpc), {tx.tx_hash: tx})
+    watcher.start()
+    try:
+        send_tx(tx)
+        if tx.code != 0:
+            raise ChainError(f"注资交易被拒绝: {tx.error}")
+        if not tx.included.wait(timeout):
+            raise ChainError(f"注资交易 {tx.tx_hash} 在 {timeout:g}s 内未上链")
+        if tx.exec_code != 0:
+            raise ChainError(f"注资交易执行失败（code {tx.exec_code}）")
+    finally:
+        watcher.close()
+
+    WORK_DIR.mkdir(parents=True, exist_ok=True)
+    data = {'home': home, 'funder': funder, 'amount': amount, 'senders': senders}
+    SENDERS_FILE.write_text(json.dumps(data, indent=2), encoding='utf-8')
+    return data
+
+
+def show_usage():
+    print("用法: load_test.py [options] <fund|run|compare> ...")
+    print("")
+    print("命令:")
+    print("  fund <config_dir> --senders N   创建并注资 N 个发送账户（写入 build/loadtest/senders.json）")
+    print("  run                             预签名并发送交易，输出 TPS/延迟报告")
+    print("  compare <base.json> <new.json>  对比两次压测报告")
+    print("")
+    print("选项:")
+    print("  -i, --inventory <file>  inventory 文件（run 默认使用所有 sentry 的 RPC）")
+    print("  -c, --config <file>     node_config.yml（RPC 端口、报告中的调优参数）")
+    print("  --rpc <host:port>       RPC 地址（可重复；同一账户固定发往同一个 RPC）")
+    print("  --rest <url>            REST API（查询账户；默认第一个 RPC 主机 + api.address 端口）")
+    print(f"  --binary <path>         链二进制（默认 {DEFAULT_BINARY.relative_to(ROOT_DIR)}）")
+    print(f"  --chain-id <id>         链 ID（默认 {DEFAULT_CHAIN_ID}）")
+    print(f"  --gas-prices <value>    Gas 价格（默认 {DEFAULT_GAS_PRICES}）")
+    print("  --senders <N>           发送账户数（fund）")
+    print("  --funder <key>          注资账户（config_dir 下的 validator 目录名，默认 validator-0）")
+    print(f"  --amount <coins>        每个账户的注资金额（默认 {DEFAULT_FUND_AMOUNT}）")
+    print("  --txs <N>               交易总数（run，默认 1000）")
+    print("  --duration <seconds>    按速率计算交易总数（txs = rate × duration）")
+    print("  --rate <tx/s>           目标发送速率，开环（默认 100；0 表示不限速）")
+    print("  --closed-loop           闭环：每个账户等上一笔交易上链后再发送下一笔")
+    print("  --drain <seconds>       发送结束后等待上链的时间（默认 30）")
+    print("  --parallel <N>          预签名并发数（默认 8）")
+    print("  --label <text>          报告标签（如调优参数说明）")
+    print("  --report <file>         报告路径（默认 build/loadtest/report-<时间>.json）")
+    print("  --json                  输出 JSON 报告")
+    print("")
+    print("示例:")
+    print("  load_test.py fund chain-deploy-config --senders 20 --rpc 10.8.21.50:26757")
+    print("  load_test.py run --rate 200 --duration 60 --label timeout_commit=1.5s")
+    print("  load_test.py compare build/loadtest/report-a.json build/loadtest/report-b.json")
+
+
+def main():
+    args = sys.argv[1:]
+    inventory_file = None
+    config_file = str(DEFAULT_CONFIG)
+    rpcs: List[str] = []
+    rest = None
+    binary = str(DEFAULT_BINARY)
+    chain_id = DEFAULT_CHAIN_ID
+    gas_prices = DEFAULT_GAS_PRICES
+    senders_count = None
+    funder = "validator-0"
+    amount = DEFAULT_FUND_AMOUNT
+    total = None
+    duration = None
+    rate = 100.0
+    closed_loop = False
+    drain = 30.0
+    parallel = 8
+    label = ''
+    report_file = None
+    as_json = False
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-h', '--help'):
+                show_usage()
+                sys.exit(0)
+            elif arg in ('-i', '--inventory'):
+                inventory_file = args[i + 1]
+                i += 1
+            elif arg in ('-c', '--config'):
+                config_file = args[i + 1]
+                i += 1
+            elif arg == '--rpc':
+                host, port = parse_rpc(args[i + 1])
+                rpcs.append(f"http://{host}:{port}")
+                i += 1
+            elif arg == '--rest':
+                rest = args[i + 1].rstrip('/')
+                i += 1
+            elif arg == '--binary':
+                binary = args[i + 1]
+                i += 1
+            elif arg == '--chain-id':
+                chain_id = args[i + 1]
+                i += 1
+            elif arg == '--gas-prices':
+                gas_prices = args[i + 1]
+                i += 1
+            elif arg == '--senders':
+                senders_count = int(args[i + 1])
+                i += 1
+            elif arg == '--funder':
+                funder = args[i + 1]
+                i += 1
+            elif arg == '--amount':
+                amount = args[i + 1]
+                i += 1
+            elif arg == '--txs':
+                total = int(args[i + 1])
+                i += 1
+            elif arg == '--duration':
+                duration = float(args[i + 1])
+                i += 1
+            elif arg == '--rate':
+                rate = float(args[i + 1])
+                i += 1
+            elif arg == '--closed-loop':
+                closed_loop = True
+            elif arg == '--drain':
+                drain = float(args[i + 1])
+                i += 1
+            elif arg == '--parallel':
+                parallel = int(args[i + 1])
+                i += 1
+            elif arg == '--label':
+                label = args[i + 1]
+                i += 1
+            elif arg == '--report':
+                report_file = args[i + 1]
+                i += 1
+            elif arg == '--json':
+                as_json = True
+            elif arg.startswith('-'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError) as e:
+        print(f"错误: 选项 {args[i]} 需要有效的参数值: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    command = positional[0] if positional else None
+    if command == 'compare':
+        if len(positional) != 3:
+            show_usage()
+            sys.exit(1)
+        try:
+            reports = [json.loads(Path(p).read_text(encoding='utf-8')) for p in positional[1:]]
+        except (OSError, ValueError) as e:
+            print(f"错误: 无法读取报告: {e}", file=sys.stderr)
+            sys.exit(1)
+        compare(*reports)
+        return
+
+    if command not in ('fund', 'run') or (command == 'fund' and (len(positional) != 2 or not senders_count)):
+        show_usage()
+        sys.exit(1)
+
+    if not rpcs:
+        if command == 'fund':
+            print("错误: fund 需要 --rpc", file=sys.stderr)
+            sys.exit(1)
+        try:
+            rpcs = default_endpoints(inventory_file, config_file)
+        except Exception as e:
+            print(f"错误: 无法加载 inventory: {e}", file=sys.stderr)
+            sys.exit(1)
+        if not rpcs:
+            print("错误: inventory 中没有 sentry 节点，请使用 --rpc 指定", file=sys.stderr)
+            sys.exit(1)
+    rest = rest or rest_from_rpc(rpcs[0])
+
+    if command == 'fund':
+        try:
+            data = fund(Path(positional[1]), senders_count, funder, amount, rpcs[0], rest,
+                        binary, chain_id, gas_prices, drain)
+        except (ChainError, OSError, ValueError, KeyError) as e:
+            print(f"✗ 注资失败: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"✓ {len(data['senders'])} 个发送账户已注资（每个 {amount}），记录于 {SENDERS_FILE}")
+        return
+
+    if total is None:
+        total = int(rate * duration) if duration and rate > 0 else 1000
+    try:
+        senders = load_senders()
+        print(f"预签名 {total} 笔交易（{len(senders['senders'])} 个账户）...", file=sys.stderr, flush=True)
+        started = time.monotonic()
+        txs = prepare(senders, rpcs, rest, binary, chain_id, total, DEFAULT_GAS, gas_prices,
+                      DEFAULT_SEND_AMOUNT, parallel)
+        presign_seconds = time.monotonic() - started
+
+        watcher = BlockWatcher(rpcs[0], latest_height(rpcs[0]), {tx.tx_hash: tx for tx in txs})
+    except (ChainError, OSError, ValueError, KeyError) as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"发送中（{'闭环' if closed_loop else '开环'}，"
+          f"{f'{rate:g} tx/s' if rate > 0 else '不限速'}，RPC: {', '.join(rpcs)}）...",
+          file=sys.stderr, flush=True)
+    watcher.start()
+    try:
+        send_start, send_end = run_load(txs, rate, closed_loop, drain)
+        wait_drain(txs, drain)
+        # 多轮询一次，确保最后一个区块已读取
+        time.sleep(WATCH_INTERVAL * 2)
+    finally:
+        watcher.close()
+
+    report = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'run': {'label': label, 'senders': len({tx.sender for tx in txs}), 'txs': total,
+                'rate': rate, 'closed_loop': closed_loop, 'endpoints': rpcs,
+                'presign_seconds': round(presign_seconds, 3)},
+        'tuning': tuning_snapshot(config_file),
+        'results': summarize(txs, watcher.blocks, send_start, send_end),
+    }
+    if watcher.errors:
+        report['results']['watch_errors'] = watcher.errors
+
+    path = Path(report_file) if report_file else \
+        WORK_DIR / f"report-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    if as_json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+        print(f"报告: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+多主机日志聚合
+- 并发读取多个主机、多个服务（biyachaind / peggo）的 journald 日志
+- 在远程按级别、模块、正则过滤（grep --line-buffered），只有匹配的行经过网络
+- 按时间戳合并为单一视图：低水位（所有活跃流的最新时间戳）之前的行立即输出，
+  其余行最多在有界重排缓冲区中停留 --window 秒
+- follow 模式下读取队列有界，输出跟不上时暂停读取 ssh 管道（反压传递到远程）
+- 可选写入 gzip 压缩的 JSON Lines 归档，之后用 query 子命令查询
+
+命令行:
+    log_stream.py [options] <node|all|node1,node2>
+    log_stream.py query <archive.jsonl.gz> [--host h] [--service s] [--grep re] [--since t] [--until t]
+"""
+
+import asyncio
+import contextlib
+import gzip
+import heapq
+import json
+import os
+import re
+import shlex
+import signal
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from inventory import load_inventory
+from ssh_session import SSHSession, control_directory
+
+
+SERVICES = {
+    'node': 'biyachaind',
+    'peggo': 'peggo',
+}
+
+# 级别从低到高；过滤时包含指定级别及以上
+LEVELS = ['debug', 'info', 'warn', 'error']
+LEVEL_TOKENS = {
+    'debug': ('DBG', 'debug'),
+    'info': ('INF', 'info'),
+    'warn': ('WRN', 'warn|warning'),
+    'error': ('ERR', 'error|fatal|panic'),
+}
+
+DEFAULT_WINDOW = 2.0
+DEFAULT_BUFFER = 10000
+QUEUE_SIZE = 2000
+
+JOURNAL_TS_RE = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?[+-]\d{4})\s+(.*)$')
+JOURNAL_PREFIX_RE = re.compile(r'^\S+\s+[^:\s]+(?:\[\d+\])?:\s?')
+
+
+@dataclass(order=True)
+class LogRecord:
+    ts: float
+    seq: int
+    host: str = field(compare=False)
+    service: str = field(compare=False)
+    message: str = field(compare=False)
+
+    def format(self) -> str:
+        stamp = datetime.fromtimestamp(self.ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')
+        return f"{stamp} [{self.host}/{self.service}] {self.message}"
+
+    def to_json(self) -> str:
+        return json.dumps({'ts': self.ts, 'host': self.host, 'service': self.service,
+                           'message': self.message}, ensure_ascii=False)
+
+
+def level_regex(level: str) -> str:
+    """匹配 level 及以上级别（cosmos 的 INF/ERR 与 logrus/zerolog 的 level=info）"""
+    chosen = LEVELS[LEVELS.index(level):]
+    short = '|'.join(LEVEL_TOKENS[lv][0] for lv in chosen)
+    long = '|'.join(LEVEL_TOKENS[lv][1] for lv in chosen)
+    return (f'(^|[[:space:]])({short})([[:space:]]|$)|'
+            f'level=({long})([[:space:]]|$)|"level":"({long})"')
+
+
+def remote_command(service: str, lines: int, follow: bool, since: Optional[str],
+                   filters: List[str]) -> str:
+    """journalctl + 远程 grep 过滤管道"""
+    parts = [f"sudo journalctl -u {shlex.quote(service)} -o short-iso-precise --no-pager -n {lines}"]
+    if follow:
+        parts[0] += " -f"
+    if since:
+        parts[0] += f" --since {shlex.quote(since)}"
+    for pattern in filters:
+        parts.append(f"grep --line-buffered -E {shlex.quote(pattern)}")
+    # grep 没有匹配时返回 1，不视为错误
+    return ' | '.join(parts) + '; true'
+
+
+def parse_line(line: str, last_ts: float) -> Tuple[float, str]:
+    """解析 short-iso-precise 行，返回 (时间戳, 去掉主机/进程前缀的消息)"""
+    m = JOURNAL_TS_RE.match(line)
+    if not m:
+        return last_ts, line
+    try:
+        ts = datetime.strptime(m.group(1), '%Y-%m-%dT%H:%M:%S.%f%z').timestamp()
+    except ValueError:
+        try:
+            ts = datetime.strptime(m.group(1), '%Y-%m-%dT%H:%M:%S%z').timestamp()
+        except ValueError:
+            return last_ts, line
+    return ts, JOURNAL_PREFIX_RE.sub('', m.group(2), count=1)
+
+
+class MergeBuffer:
+    """
+    有界重排缓冲区
+    - 低水位 = 所有未结束流中最新时间戳的最小值，之前的记录已不可能被更早的记录超越
+    - 在缓冲区中停留超过 window 秒，或缓冲区超过 max_size 时强制输出最早的记录
+    """
+
+    def __init__(self, streams: List[str], window: float, max_size: int):
+        self.window = window
+        self.max_size = max_size
+        self.last_ts: Dict[str, float] = {s: float('-inf') for s in streams}
+        self.heap: List[Tuple[LogRecord, float]] = []
+
+    def push(self, stream: str, record: LogRecord):
+        self.last_ts[stream] = max(self.last_ts.get(stream, float('-inf')), record.ts)
+        heapq.heappush(self.heap, (record, time.monotonic()))
+
+    def close(self, stream: str):
+        self.last_ts.pop(stream, None)
+
+    def pop_ready(self) -> List[LogRecord]:
+        watermark = min(self.last_ts.values(), default=float('inf'))
+        deadline = time.monotonic() - self.window
+        ready = []
+        while self.heap:
+            record, arrived = self.heap[0]
+            if record.ts <= watermark or arrived <= deadline or len(self.heap) > self.max_size:
+                heapq.heappop(self.heap)
+                ready.append(record)
+            else:
+                break
+        return ready
+
+    def drain(self) -> List[LogRecord]:
+        records = [r for r, _ in sorted(self.heap)]
+        self.heap = []
+        return records
+
+
+@dataclass
+class StreamSpec:
+    host: str
+    service: str
+    session: SSHSession
+    command: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.host}/{self.service}"
+
+
+async def read_stream(spec: StreamSpec, queue: asyncio.Queue, seq: List[int]):
+    """读取单个 ssh 流；queue 满时 put 阻塞，停止读取管道即形成反压"""
+    # 独立进程组：Ctrl-C 只由本进程处理，退出时整组结束，不残留子进程
+    process = await asyncio.create_subprocess_exec(
+        *spec.session.args(spec.command),
+        stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE, limit=1 << 20, start_new_session=True)
+    last_ts = 0.0
+    cancelled = False
+    try:
+        while True:
+            raw = await process.stdout.readline()
+            if not raw:
+                break
+            line = raw.decode('utf-8', errors='replace').rstrip('\n')
+            if not line or line.startswith('-- '):
+                continue
+            last_ts, message = parse_line(line, last_ts)
+            seq[0] += 1
+            await queue.put((spec.key, LogRecord(last_ts, seq[0], spec.host, spec.service, message)))
+        await process.wait()
+        if process.returncode == 255:
+            error = (await process.stderr.read()).decode(errors='replace').strip()
+            print(f"✗ {spec.key}: SSH 连接失败 {error}", file=sys.stderr, flush=True)
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    finally:
+        if process.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(process.pid, signal.SIGTERM)
+            await process.wait()
+        if cancelled:
+            # 被 stream_logs 取消时消费者已停止读取，队列满时不能等待（否则 gather 永远不返回）
+            with contextlib.suppress(asyncio.QueueFull):
+                queue.put_nowait((spec.key, None))
+        else:
+            await queue.put((spec.key, None))
+
+
+async def stream_logs(specs: List[StreamSpec], window: float, max_buffer: int,
+                      out: TextIO, archive: Optional[TextIO] = None) -> int:
+    """并发读取并按时间戳合并输出，返回输出行数"""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    buffer = MergeBuffer([s.key for s in specs], window, max_buffer)
+    seq = [0]
+    readers = [asyncio.create_task(read_stream(s, queue, seq)) for s in specs]
+    active = len(specs)
+    written = 0
+
+    def emit(records: List[LogRecord]):
+        nonlocal written
+        for record in records:
+            out.write(record.format() + '\n')
+            if archive is not None:
+                archive.write(record.to_json() + '\n')
+        if records:
+            out.flush()
+            written += len(records)
+
+    # Ctrl-C / SIGTERM：停止读取，输出缓冲区中剩余的行后正常退出
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    try:
+        while active and not stopping.is_set():
+            try:
+                key, record = await asyncio.wait_for(queue.get(), timeout=min(0.5, window or 0.5))
+            except asyncio.TimeoutError:
+                emit(buffer.pop_ready())
+                continue
+            if record is None:
+                buffer.close(key)
+                active -= 1
+            else:
+                buffer.push(key, record)
+            emit(buffer.pop_ready())
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        for task in readers:
+            task.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+    emit(buffer.drain())
+    return written
+
+
+def query_archive(path: str, host: Optional[str], service: Optional[str],
+                  pattern: Optional[str], since: Optional[float], until: Optional[float]) -> int:
+    """查询归档文件，返回匹配行数"""
+    regex = re.compile(pattern) if pattern else None
+    count = 0
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            if host and data['host'] != host:
+                continue
+            if service and data['service'] != service:
+                continue
+            if since is not None and data['ts'] < since:
+                continue
+            if until is not None and data['ts'] > until:
+                continue
+            if regex and not regex.search(data['message']):
+                continue
+            record = LogRecord(data['ts'], 0, data['host'], data['service'], data['message'])
+            print(record.format())
+            count += 1
+    return count
+
+
+def parse_time_arg(value: str) -> float:
+    """ISO 时间（无时区视为 UTC）"""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def show_usage():
+    print("用法: log_stream.py [options] <node|all|node1,node2>")
+    print("      log_stream.py query <archive.jsonl.gz> [--host h] [--service node|peggo]")
+    print("                          [--grep regex] [--since time] [--until time]")
+    print("")
+    print("选项:")
+    print("  -i <inventory>        inventory 文件（默认 ansible/inventory.yml）")
+    print("  --service <s>         node | peggo | all（默认 node）")
+    print("  -f, --follow          实时跟踪")
+    print("  -n, --lines <N>       每个流读取最近 N 行（默认 50）")
+    print("  --since <time>        journalctl --since（如 \"10 min ago\"）")
+    print("  --level <level>       只保留该级别及以上: debug | info | warn | error")
+    print("  --module <m1,m2>      只保留指定模块（module=consensus 等）")
+    print("  --grep <regex>        远程 grep -E 过滤（可重复，按顺序叠加）")
+    print(f"  --window <seconds>    合并重排窗口（默认 {DEFAULT_WINDOW:g}）")
+    print(f"  --buffer <N>          重排缓冲区最大行数（默认 {DEFAULT_BUFFER}）")
+    print("  --archive <file>      同时写入 gzip 压缩的 JSON Lines 归档（追加）")
+
+
+def run_query(args: List[str]):
+    if not args:
+        show_usage()
+        sys.exit(1)
+    path = args[0]
+    opts: Dict[str, Optional[str]] = {'--host': None, '--service': None, '--grep': None,
+                                      '--since': None, '--until': None}
+    i = 1
+    while i < len(args):
+        if args[i] not in opts or i + 1 >= len(args):
+            print(f"错误: 未知选项: {args[i]}", file=sys.stderr)
+            sys.exit(1)
+        opts[args[i]] = args[i + 1]
+        i += 2
+
+    service = opts['--service']
+    try:
+        count = query_archive(
+            path, opts['--host'], SERVICES.get(service, service) if service else None,
+            opts['--grep'],
+            parse_time_arg(opts['--since']) if opts['--since'] else None,
+            parse_time_arg(opts['--until']) if opts['--until'] else None)
+    except (OSError, ValueError, re.error) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✓ 匹配 {count} 行", file=sys.stderr)
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == 'query':
+        run_query(args[1:])
+        return
+
+    inventory_file = None
+    service_arg = 'node'
+    follow = False
+    lines = 50
+    since = None
+    filters: List[str] = []
+    window = DEFAULT_WINDOW
+    max_buffer = DEFAULT_BUFFER
+    archive_path = None
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-h', '--help'):
+                show_usage()
+                sys.exit(0)
+            elif arg in ('-i', '--inventory'):
+                inventory_file = args[i + 1]
+                i += 1
+            elif arg == '--service':
+                service_arg = args[i + 1]
+                if service_arg not in ('node', 'peggo', 'all'):
+                    raise ValueError(service_arg)
+                i += 1
+            elif arg in ('-f', '--follow'):
+                follow = True
+            elif arg in ('-n', '--lines'):
+                lines = int(args[i + 1])
+                i += 1
+            elif arg == '--since':
+                since = args[i + 1]
+                i += 1
+            elif arg == '--level':
+                if args[i + 1] not in LEVELS:
+                    raise ValueError(args[i + 1])
+                filters.append(level_regex(args[i + 1]))
+                i += 1
+            elif arg == '--module':
+                modules = '|'.join(re.escape(m) for m in args[i + 1].split(',') if m)
+                filters.append(f'module=({modules})([[:space:]]|$)')
+                i += 1
+            elif arg == '--grep':
+                filters.append(args[i + 1])
+                i += 1
+            elif arg == '--window':
+                window = float(args[i + 1])
+                i += 1
+            elif arg == '--buffer':
+                max_buffer = int(args[i + 1])
+                i += 1
+            elif arg == '--archive':
+                archive_path = args[i + 1]
+                i += 1
+            elif arg.startswith('-'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"错误: 选项 {args[i]} 需要有效的参数值", file=sys.stderr)
+        sys.exit(1)
+
+    if len(positional) != 1:
+        show_usage()
+        sys.exit(1)
+
+    try:
+        inv = load_inventory(inventory_file)
+    except Exception as e:
+        print(f"错误: 无法加载 inventory: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    nodes = inv.hosts('nodes') if positional[0] == 'all' else positional[0].split(',')
+    unknown = [n for n in nodes if not inv.ip(n)]
+    if unknown:
+        print(f"错误: 无效的节点名称: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+
+    services = list(SERVICES) if service_arg == 'all' else [service_arg]
+
+    with control_directory() as control_dir:
+        specs = []
+        sessions = []
+        for node in nodes:
+            session = SSHSession(inv.ip(node), str(inv.var(node, 'ansible_user', 'ubuntu')), control_dir)
+            sessions.append(session)
+            for service in services:
+                # Peggo 只在 validator 节点上运行
+                if service == 'peggo' and inv.node_type(node) != 'validator':
+                    continue
+                specs.append(StreamSpec(node, SERVICES[service], session,
+                                        remote_command(SERVICES[service], lines, follow, since, filters)))
+        if not specs:
+            print("错误: 没有可读取的日志流", file=sys.stderr)
+            sys.exit(1)
+
+        archive = gzip.open(archive_path, 'at', encoding='utf-8') if archive_path else None
+        try:
+            asyncio.run(stream_logs(specs, window, max_buffer, sys.stdout, archive))
+        except BrokenPipeError:
+            # 输出被关闭（如管道到 head），不视为错误
+            sys.stdout = open(os.devnull, 'w')
+        finally:
+            if archive is not None:
+                archive.close()
+            for session in sessions:
+                session.close()
+
+
+if __name__ == "__main__":
+    main()
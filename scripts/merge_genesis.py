@@ -2,31 +2,98 @@
 """
 Genesis.json 智能合并工具
 自动将 genesis_config.yml 的配置递归合并到 genesis.json
+
+两种模式：
+- 内存模式：完整加载 genesis.json 后合并（小文件默认）
+- 流式模式：增量扫描 genesis.json，只解析 genesis_config.yml 涉及的子树，
+  其余部分按字节原样输出，内存占用与 genesis 大小无关（大文件自动启用）
+
+列表操作（键名后缀）：
+- key[field]: 按 field 更新或插入列表元素，如 min_deposit[denom]
+- key[+]:     追加列表元素
 """
 
 import json
-import yaml
+import os
+import re
+import shutil
 import sys
+import tempfile
+import yaml
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 
-def deep_merge(base: Dict, updates: Dict) -> Dict:
+# 超过该大小自动使用流式模式
+STREAM_THRESHOLD = 64 * 1024 * 1024
+
+# 列表操作键名：name[field] 或 name[+]
+LIST_OP_RE = re.compile(r'^(.+)\[([A-Za-z0-9_\-]+|\+)\]$')
+
+Entry = Tuple[str, Any, Optional[str]]
+
+
+def build_plan(updates: Dict) -> Dict[str, Entry]:
     """
-    深度合并两个字典
-    updates 中的值会覆盖 base 中的值
+    将配置转换为合并计划：键名 -> (操作, 值, 匹配字段)
+    操作: merge（字典递归合并）| set（直接覆盖）| upsert | append
     """
-    result = base.copy()
-    
+    plan = {}
     for key, value in updates.items():
-        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-            # 递归合并嵌套字典
-            result[key] = deep_merge(result[key], value)
+        m = LIST_OP_RE.match(str(key))
+        if m:
+            name, field = m.groups()
+            if not isinstance(value, list):
+                value = [value]
+            if field == '+':
+                plan[name] = ('append', value, None)
+            else:
+                plan[name] = ('upsert', value, field)
+        elif isinstance(value, dict):
+            plan[key] = ('merge', value, None)
         else:
-            # 直接覆盖值
-            result[key] = value
-    
-    return result
+            plan[key] = ('set', value, None)
+    return plan
+
+
+def upsert_list(items: List, updates: List, field: str) -> List:
+    """按 field 更新或追加列表元素（元素为字典时合并）"""
+    positions = {}
+    for i, item in enumerate(items):
+        if isinstance(item, dict) and field in item:
+            positions[item[field]] = i
+
+    for update in updates:
+        match = update.get(field) if isinstance(update, dict) else None
+        if match is not None and match in positions:
+            i = positions[match]
+            items[i] = deep_merge(items[i], update)
+        else:
+            positions[match] = len(items)
+            items.append(update)
+    return items
+
+
+def apply_entry(value: Any, entry: Entry) -> Any:
+    """对单个值执行合并计划"""
+    kind, update, field = entry
+    if kind == 'merge':
+        return deep_merge(value if isinstance(value, dict) else {}, update)
+    if kind == 'upsert':
+        return upsert_list(value if isinstance(value, list) else [], update, field)
+    if kind == 'append':
+        return (value if isinstance(value, list) else []) + update
+    return update
+
+
+def deep_merge(base: Dict, updates: Dict) -> Dict:
+    """
+    深度合并两个字典（原地修改 base，不复制未修改的层级）
+    updates 中的值会覆盖 base 中的值
+    """
+    for key, entry in build_plan(updates).items():
+        base[key] = apply_entry(base.get(key), entry)
+    return base
 
 
 def load_yaml(file_path: str) -> Dict:
@@ -41,51 +108,280 @@ def load_json(file_path: str) -> Dict:
         return json.load(f)
 
 
-def save_json(file_path: str, data: Dict):
-    """保存 JSON 文件（格式化）"""
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+def dump_json(data: Any, compact: bool = False, depth: int = 0) -> str:
+    """序列化 JSON，depth 用于缩进嵌入位置的子树"""
+    if compact:
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+    text = json.dumps(data, indent=2, ensure_ascii=False)
+    return text.replace('\n', '\n' + '  ' * depth) if depth else text
+
+
+def atomic_write(file_path: str, writer: Callable):
+    """写入同目录临时文件后原子替换，保留原文件权限"""
+    target = Path(file_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{target.name}.", dir=target.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            writer(f)
+        if target.exists():
+            shutil.copymode(target, tmp_path)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def save_json(file_path: str, data: Dict, compact: bool = False):
+    """保存 JSON 文件（默认格式化）"""
+    atomic_write(file_path, lambda f: f.write(dump_json(data, compact).encode('utf-8')))
+
+
+# ==========================================
+# 流式合并
+# ==========================================
+
+_CONTAINER_SPECIAL = re.compile(rb'["\[\]{}]')
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_WHITESPACE = re.compile(rb'[ \t\r\n]*')
+_SCALAR = re.compile(rb'[^,\]}\s]*')
+
+
+class StreamReader:
+    """按块读取的 JSON 字节流，支持原样拷贝整个值而不解析"""
+
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = b''
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        data = self.f.read(self.CHUNK_SIZE)
+        if not data:
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> bytes:
+        while self.pos >= len(self.buf):
+            if not self._fill():
+                return b''
+        return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, ch: bytes):
+        if self.peek() != ch:
+            raise ValueError(f"JSON 格式错误: 期望 {ch!r}，实际 {self.peek()!r}")
+        self.pos += 1
+
+    def read_ws(self) -> bytes:
+        parts = []
+        while True:
+            m = _WHITESPACE.match(self.buf, self.pos)
+            parts.append(m.group())
+            self.pos = m.end()
+            if self.pos < len(self.buf) or not self._fill():
+                return b''.join(parts)
+
+    def copy_string(self, sink: Callable):
+        self.expect(b'"')
+        sink(b'"')
+        while True:
+            m = _STRING_SPECIAL.search(self.buf, self.pos)
+            if not m:
+                sink(self.buf[self.pos:])
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("JSON 格式错误: 字符串未结束")
+                continue
+            i = m.start()
+            if self.buf[i:i + 1] == b'\\':
+                if i + 1 >= len(self.buf):
+                    sink(self.buf[self.pos:i])
+                    self.pos = i
+                    if not self._fill():
+                        raise ValueError("JSON 格式错误: 字符串未结束")
+                    continue
+                sink(self.buf[self.pos:i + 2])
+                self.pos = i + 2
+                continue
+            sink(self.buf[self.pos:i + 1])
+            self.pos = i + 1
+            return
+
+    def copy_value(self, sink: Callable):
+        c = self.peek()
+        if c == b'"':
+            self.copy_string(sink)
+            return
+        if c not in (b'{', b'['):
+            while True:
+                m = _SCALAR.match(self.buf, self.pos)
+                sink(m.group())
+                self.pos = m.end()
+                if self.pos < len(self.buf) or not self._fill():
+                    return
+
+        depth = 0
+        while True:
+            m = _CONTAINER_SPECIAL.search(self.buf, self.pos)
+            if not m:
+                sink(self.buf[self.pos:])
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("JSON 格式错误: 容器未结束")
+                continue
+            i = m.start()
+            ch = self.buf[i:i + 1]
+            if ch == b'"':
+                sink(self.buf[self.pos:i])
+                self.pos = i
+                self.copy_string(sink)
+                continue
+            depth += 1 if ch in (b'{', b'[') else -1
+            sink(self.buf[self.pos:i + 1])
+            self.pos = i + 1
+            if depth == 0:
+                return
+
+    def read_value(self) -> bytes:
+        parts = []
+        self.copy_value(parts.append)
+        return b''.join(parts)
+
+
+def _stream_object(reader: StreamReader, out: Callable, plan: Dict[str, Entry],
+                   depth: int, compact: bool):
+    """流式处理一个对象：命中计划的键才解析，其余原样拷贝"""
+    reader.expect(b'{')
+    out(b'{')
+    seen = set()
+    empty = True
+
+    while True:
+        ws = reader.read_ws()
+        c = reader.peek()
+
+        if c == b'}':
+            pending = [k for k in plan if k not in seen]
+            if pending:
+                indent = '' if compact else '\n' + '  ' * (depth + 1)
+                sep = ': ' if not compact else ':'
+                entries = []
+                for key in pending:
+                    value = apply_entry(None, plan[key])
+                    entries.append(f"{indent}{json.dumps(key, ensure_ascii=False)}{sep}"
+                                   f"{dump_json(value, compact, depth + 1)}")
+                out((',' if not empty else '').encode('utf-8'))
+                out(','.join(entries).encode('utf-8'))
+                ws = b'' if compact else ('\n' + '  ' * depth).encode('utf-8')
+            out(ws)
+            reader.expect(b'}')
+            out(b'}')
+            return
+
+        if c == b',':
+            out(ws + b',')
+            reader.expect(b',')
+            continue
+
+        if c != b'"':
+            raise ValueError(f"JSON 格式错误: 期望键名，实际 {c!r}")
+
+        key_raw = []
+        reader.copy_string(key_raw.append)
+        key_raw = b''.join(key_raw)
+        key = json.loads(key_raw)
+        out(ws + key_raw)
+
+        ws = reader.read_ws()
+        reader.expect(b':')
+        out(ws + b':' + reader.read_ws())
+
+        entry = plan.get(key)
+        if entry is None:
+            reader.copy_value(out)
+        elif entry[0] == 'merge' and reader.peek() == b'{':
+            _stream_object(reader, out, build_plan(entry[1]), depth + 1, compact)
+        else:
+            value = json.loads(reader.read_value())
+            out(dump_json(apply_entry(value, entry), compact, depth + 1).encode('utf-8'))
+
+        seen.add(key)
+        empty = False
+
+
+def stream_merge(genesis_file: str, updates: Dict, compact: bool = False):
+    """流式合并 genesis.json，原子写回"""
+    def writer(dst):
+        with open(genesis_file, 'rb') as src:
+            reader = StreamReader(src)
+            dst.write(reader.read_ws())
+            if reader.peek() != b'{':
+                raise ValueError("Genesis 顶层必须是 JSON 对象")
+            _stream_object(reader, dst.write, build_plan(updates), 0, compact)
+            dst.write(reader.read_ws())
+            if reader.peek():
+                raise ValueError("JSON 格式错误: 顶层对象之后存在多余内容")
+
+    atomic_write(genesis_file, writer)
 
 
 def main():
-    if len(sys.argv) != 3:
-        print("用法: merge_genesis.py <genesis_config.yml> <genesis.json>")
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    flags = [a for a in sys.argv[1:] if a.startswith('--')]
+
+    if len(args) != 2 or any(f not in ('--stream', '--compact') for f in flags):
+        print("用法: merge_genesis.py <genesis_config.yml> <genesis.json> [--stream] [--compact]")
+        print("")
+        print("选项:")
+        print(f"  --stream    强制使用流式模式（超过 {STREAM_THRESHOLD // 1024 // 1024}MB 自动启用）")
+        print("  --compact   输出紧凑 JSON（流式模式下只影响被修改的子树）")
         sys.exit(1)
-    
-    config_file = sys.argv[1]
-    genesis_file = sys.argv[2]
-    
+
+    config_file, genesis_file = args
+    compact = '--compact' in flags
+
     # 检查文件是否存在
     if not Path(config_file).exists():
         print(f"错误: 配置文件不存在: {config_file}")
         sys.exit(1)
-    
+
     if not Path(genesis_file).exists():
         print(f"错误: Genesis 文件不存在: {genesis_file}")
         sys.exit(1)
-    
+
+    stream = '--stream' in flags or Path(genesis_file).stat().st_size > STREAM_THRESHOLD
+
     try:
-        # 加载配置和 genesis
+        # 加载配置
         print(f"加载配置: {config_file}")
         config = load_yaml(config_file)
-        
-        print(f"加载 Genesis: {genesis_file}")
-        genesis = load_json(genesis_file)
-        
-        # 深度合并
-        print("合并配置到 Genesis...")
-        merged = deep_merge(genesis, config)
-        
-        # 保存结果
-        print(f"保存 Genesis: {genesis_file}")
-        save_json(genesis_file, merged)
-        
+
+        if stream:
+            # 流式合并
+            print(f"流式合并到 Genesis: {genesis_file}")
+            stream_merge(genesis_file, config, compact)
+        else:
+            print(f"加载 Genesis: {genesis_file}")
+            genesis = load_json(genesis_file)
+
+            # 深度合并
+            print("合并配置到 Genesis...")
+            merged = deep_merge(genesis, config)
+
+            # 保存结果
+            print(f"保存 Genesis: {genesis_file}")
+            save_json(genesis_file, merged, compact)
+
         print("✓ Genesis 配置合并完成")
-        
+
         # 显示修改的字段
         print("\n已应用的配置:")
         print_changes(config, prefix="  ")
-        
+
     except Exception as e:
         print(f"错误: {e}")
         sys.exit(1)
@@ -95,7 +391,7 @@ def print_changes(data: Any, prefix: str = "", max_depth: int = 3, current_depth
     """打印配置变更（限制深度避免输出过多）"""
     if current_depth >= max_depth:
         return
-    
+
     if isinstance(data, dict):
         for key, value in data.items():
             if isinstance(value, dict):
@@ -109,4 +405,3 @@ def print_changes(data: Any, prefix: str = "", max_depth: int = 3, current_depth
 
 if __name__ == "__main__":
     main()
-
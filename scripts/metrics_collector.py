@@ -0,0 +1,683 @@
+#!/usr/bin/env python3
+"""
+轻量级共识指标采集（代替完整的 Prometheus）
+- 并发抓取所有节点的 Prometheus 接口（node_config.yml 的 instrumentation.prometheus_listen_addr），
+  按行增量解析文本格式，只处理需要的指标
+- 每个节点的指标保存在定长数组环形缓冲区中：原始精度（抓取间隔）保留最近 1 小时，
+  降采样（默认 60 秒一个点）保留 24 小时；6 个节点一天的数据约 1 MB
+- 指标：已提交高度、轮次、轮次耗时、出块间隔、mempool 大小、peer 数、缺失 validator 数、
+  validator 漏块数和最后签名高度（轮次耗时/出块间隔由直方图 _sum/_count 的增量计算）
+- 查询：slow <height> 列出各节点到达该高度的时间差、轮次和签名情况；export 导出 CSV
+
+命令行:
+    metrics_collector.py [-i inventory.yml] [-c node_config.yml] [--store file] collect
+                         [--interval 5] [--duration S] [--ssh-tunnel] [--endpoint name=host:port ...]
+    metrics_collector.py [--store file] show
+    metrics_collector.py [--store file] slow <height>
+    metrics_collector.py [--store file] export [--downsampled] [--node name] [-o file.csv]
+
+测试：test/fleet/mock-rpc.py 的每个节点也提供 /metrics，配合 --endpoint 使用
+"""
+
+import asyncio
+import csv
+import json
+import math
+import os
+import sys
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import yaml
+
+from chain_status import Tunnel, parse_endpoint
+from inventory import load_inventory
+from table import display_width, pad
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_CONFIG = ROOT_DIR / "node_config.yml"
+DEFAULT_STORE = ROOT_DIR / "build" / "metrics" / "fleet-metrics.bin"
+DEFAULT_PROMETHEUS_PORT = 26760
+DEFAULT_INTERVAL = 5.0
+DEFAULT_TIMEOUT = 3.0
+RAW_RETENTION = 3600            # 原始精度保留时长（秒）
+DOWNSAMPLE_STEP = 60            # 降采样间隔（秒）
+DOWNSAMPLE_RETENTION = 86400    # 降采样保留时长（秒）
+SAVE_EVERY = 12                 # 每抓取 N 次写一次文件
+STORE_VERSION = 1
+
+NAMESPACES = ('cometbft_', 'tendermint_')
+
+# 列名 -> 降采样聚合方式
+COLUMNS = [
+    ('height', 'last'),
+    ('rounds', 'max'),
+    ('round_duration', 'mean'),
+    ('block_interval', 'mean'),
+    ('mempool_size', 'max'),
+    ('peers', 'min'),
+    ('missing_validators', 'max'),
+    ('missed_blocks', 'last'),
+    ('last_signed_height', 'last'),
+    ('scrape_ms', 'mean'),
+]
+COLUMN_INDEX = {name: i for i, (name, _) in enumerate(COLUMNS)}
+
+# Prometheus 指标（去掉命名空间）-> 列
+GAUGES = {
+    'consensus_height': 'height',
+    'consensus_rounds': 'rounds',
+    'mempool_size': 'mempool_size',
+    'p2p_peers': 'peers',
+    'consensus_missing_validators': 'missing_validators',
+    'consensus_validator_missed_blocks': 'missed_blocks',
+    'consensus_validator_last_signed_height': 'last_signed_height',
+}
+HISTOGRAMS = {
+    'consensus_round_duration_seconds': 'round_duration',
+    'consensus_block_interval_seconds': 'block_interval',
+}
+
+NAN = float('nan')
+
+
+class ScrapeError(Exception):
+    """抓取失败"""
+
+
+# ---------- 环形缓冲区 ----------
+
+class Ring:
+    """定长环形缓冲区：times[capacity] 和 values[capacity × width]，均为 array('d')"""
+
+    def __init__(self, capacity: int, width: int):
+        self.capacity = capacity
+        self.width = width
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', [NAN]) * (capacity * width)
+        self.head = 0
+        self.count = 0
+
+    def append(self, t: float, row: List[float]):
+        i = self.head
+        self.times[i] = t
+        self.values[i * self.width:(i + 1) * self.width] = array('d', row)
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def rows(self) -> Iterator[Tuple[float, array]]:
+        start = (self.head - self.count) % self.capacity
+        for k in range(self.count):
+            i = (start + k) % self.capacity
+            yield self.times[i], self.values[i * self.width:(i + 1) * self.width]
+
+    def last(self) -> Optional[Tuple[float, array]]:
+        if not self.count:
+            return None
+        i = (self.head - 1) % self.capacity
+        return self.times[i], self.values[i * self.width:(i + 1) * self.width]
+
+    def nbytes(self) -> int:
+        return (len(self.times) + len(self.values)) * 8
+
+
+class Downsampler:
+    """把原始样本按 step 秒聚合为一行（聚合方式见 COLUMNS）"""
+
+    def __init__(self, step: int):
+        self.step = step
+        self.bucket: Optional[float] = None
+        self.reset()
+
+    def reset(self):
+        self.sums = [0.0] * len(COLUMNS)
+        self.counts = [0] * len(COLUMNS)
+        self.values: List[float] = [NAN] * len(COLUMNS)
+
+    def add(self, t: float, row: List[float]) -> Optional[Tuple[float, List[float]]]:
+        """加入一个样本；跨入新的时间段时返回上一段的聚合结果"""
+        bucket = t - t % self.step
+        flushed = None
+        if self.bucket is not None and bucket != self.bucket:
+            flushed = (self.bucket, self.flush())
+        self.bucket = bucket
+        for i, (_, mode) in enumerate(COLUMNS):
+            value = row[i]
+            if math.isnan(value):
+                continue
+            self.counts[i] += 1
+            if mode == 'mean':
+                self.sums[i] += value
+            elif mode == 'last' or math.isnan(self.values[i]) or \
+                    (mode == 'max' and value > self.values[i]) or (mode == 'min' and value < self.values[i]):
+                self.values[i] = value
+        return flushed
+
+    def flush(self) -> List[float]:
+        row = [self.sums[i] / self.counts[i] if mode == 'mean' and self.counts[i] else self.values[i]
+               for i, (_, mode) in enumerate(COLUMNS)]
+        self.reset()
+        return row
+
+
+class NodeSeries:
+    def __init__(self, raw_capacity: int, coarse_capacity: int, step: int):
+        self.raw = Ring(raw_capacity, len(COLUMNS))
+        self.coarse = Ring(coarse_capacity, len(COLUMNS))
+        self.downsampler = Downsampler(step)
+        # 直方图上一次的 (sum, count)，用于计算增量
+        self.previous: Dict[str, Tuple[float, float]] = {}
+
+    def append(self, t: float, row: List[float]):
+        self.raw.append(t, row)
+        flushed = self.downsampler.add(t, row)
+        if flushed:
+            self.coarse.append(*flushed)
+
+
+class Store:
+    """所有节点的缓冲区，持久化为 JSON 头 + 原始数组字节"""
+
+    def __init__(self, raw_step: float = DEFAULT_INTERVAL, step: int = DOWNSAMPLE_STEP,
+                 raw_retention: int = RAW_RETENTION, retention: int = DOWNSAMPLE_RETENTION):
+        self.raw_step = raw_step
+        self.step = step
+        self.raw_capacity = max(1, int(raw_retention / raw_step))
+        self.coarse_capacity = max(1, int(retention / step))
+        self.nodes: Dict[str, NodeSeries] = {}
+
+    def node(self, name: str) -> NodeSeries:
+        if name not in self.nodes:
+            self.nodes[name] = NodeSeries(self.raw_capacity, self.coarse_capacity, self.step)
+        return self.nodes[name]
+
+    def nbytes(self) -> int:
+        return sum(s.raw.nbytes() + s.coarse.nbytes() for s in self.nodes.values())
+
+    def save(self, path: Path):
+        header = {
+            'version': STORE_VERSION, 'columns': [c for c, _ in COLUMNS],
+            'raw_step': self.raw_step, 'step': self.step,
+            'raw_capacity': self.raw_capacity, 'coarse_capacity': self.coarse_capacity,
+            'nodes': {name: {'raw': [s.raw.head, s.raw.count], 'coarse': [s.coarse.head, s.coarse.count]}
+                      for name, s in self.nodes.items()},
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(json.dumps(header).encode() + b'\n')
+            for s in self.nodes.values():
+                for ring in (s.raw, s.coarse):
+                    ring.times.tofile(f)
+                    ring.values.tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'Store':
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            if header.get('version') != STORE_VERSION or header.get('columns') != [c for c, _ in COLUMNS]:
+                raise ValueError(f"{path} 的格式与当前版本不兼容")
+            store = cls(header['raw_step'], header['step'])
+            store.raw_capacity = header['raw_capacity']
+            store.coarse_capacity = header['coarse_capacity']
+            for name, positions in header['nodes'].items():
+                s = store.node(name)
+                for ring, (head, count) in ((s.raw, positions['raw']), (s.coarse, positions['coarse'])):
+                    ring.times = array('d')
+                    ring.times.fromfile(f, ring.capacity)
+                    ring.values = array('d')
+                    ring.values.fromfile(f, ring.capacity * ring.width)
+                    ring.head, ring.count = head, count
+        return store
+
+
+# ---------- 抓取 ----------
+
+def wanted_metrics(namespaces=NAMESPACES) -> Dict[bytes, Tuple[str, str]]:
+    """完整指标名 -> (列, 类型)；类型为 gauge、sum 或 count"""
+    wanted = {}
+    for ns in namespaces:
+        for metric, column in GAUGES.items():
+            wanted[f"{ns}{metric}".encode()] = (column, 'gauge')
+        for metric, column in HISTOGRAMS.items():
+            wanted[f"{ns}{metric}_sum".encode()] = (column, 'sum')
+            wanted[f"{ns}{metric}_count".encode()] = (column, 'count')
+    return wanted
+
+
+WANTED = wanted_metrics()
+
+
+def parse_line(line: bytes) -> Optional[Tuple[str, str, float]]:
+    """解析一行文本格式，不需要的指标返回 None（同名多组标签的值由调用方累加）"""
+    if not line or line[0] == 0x23:   # '#'
+        return None
+    end = len(line)
+    for sep in (b'{', b' '):
+        position = line.find(sep)
+        if 0 <= position < end:
+            end = position
+    target = WANTED.get(line[:end])
+    if target is None:
+        return None
+    rest = line[line.rfind(b'}') + 1:] if line[end:end + 1] == b'{' else line[end:]
+    try:
+        return target[0], target[1], float(rest.split()[0])
+    except (IndexError, ValueError):
+        return None
+
+
+async def scrape(host: str, port: int, timeout: float) -> Dict[Tuple[str, str], float]:
+    """抓取 /metrics，边读边解析（HTTP/1.0，读到连接关闭为止）"""
+    async def fetch() -> Dict[Tuple[str, str], float]:
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(f"GET /metrics HTTP/1.0\r\nHost: {host}:{port}\r\n\r\n".encode('ascii'))
+            await writer.drain()
+            status = (await reader.readline()).split(b' ', 2)
+            if len(status) < 2 or status[1] != b'200':
+                raise ScrapeError(f"HTTP {status[1].decode() if len(status) > 1 else '?'}")
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            values: Dict[Tuple[str, str], float] = {}
+            async for line in reader:
+                parsed = parse_line(line.rstrip())
+                if parsed:
+                    key = (parsed[0], parsed[1])
+                    values[key] = values.get(key, 0.0) + parsed[2]
+            return values
+        finally:
+            writer.close()
+
+    try:
+        return await asyncio.wait_for(fetch(), timeout)
+    except asyncio.TimeoutError:
+        raise ScrapeError(f"超时（{timeout:g}s）")
+    except OSError as e:
+        raise ScrapeError(f"连接失败: {e}")
+
+
+def to_row(series: NodeSeries, values: Dict[Tuple[str, str], float], scrape_ms: float) -> List[float]:
+    row = [NAN] * len(COLUMNS)
+    for (column, kind), value in values.items():
+        if kind == 'gauge':
+            row[COLUMN_INDEX[column]] = value
+    # consensus_height 是正在共识的高度，保存为最新已提交的高度
+    row[COLUMN_INDEX['height']] -= 1
+    for column in HISTOGRAMS.values():
+        total, count = values.get((column, 'sum')), values.get((column, 'count'))
+        if total is None or count is None:
+            continue
+        previous = series.previous.get(column)
+        series.previous[column] = (total, count)
+        # 第一次抓取或计数器重置（节点重启）时没有增量
+        if previous and count > previous[1] and total >= previous[0]:
+            row[COLUMN_INDEX[column]] = (total - previous[0]) / (count - previous[1])
+    row[COLUMN_INDEX['scrape_ms']] = scrape_ms
+    return row
+
+
+async def scrape_all(store: Store, endpoints: Dict[str, Tuple[str, int]], timeout: float) -> Dict[str, str]:
+    """并发抓取所有节点并写入缓冲区，返回失败节点 -> 错误"""
+    async def one(name: str, host: str, port: int):
+        started = time.monotonic()
+        values = await scrape(host, port, timeout)
+        return values, (time.monotonic() - started) * 1000
+
+    names = list(endpoints)
+    results = await asyncio.gather(*(one(n, *endpoints[n]) for n in names), return_exceptions=True)
+    now = time.time()
+    failed = {}
+    for name, result in zip(names, results):
+        series = store.node(name)
+        if isinstance(result, Exception):
+            failed[name] = str(result)
+            series.append(now, [NAN] * len(COLUMNS))
+        else:
+            series.append(now, to_row(series, *result))
+    return failed
+
+
+async def collect(store: Store, path: Path, endpoints: Dict[str, Tuple[str, int]], interval: float,
+                  duration: Optional[float], timeout: float):
+    deadline = time.monotonic() + duration if duration else None
+    scrapes = 0
+    last_failed: Dict[str, str] = {}
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            started = time.monotonic()
+            failed = await scrape_all(store, endpoints, min(timeout, interval))
+            for name, error in failed.items():
+                if last_failed.get(name) != error:
+                    print(f"  ⚠ {name}: {error}", file=sys.stderr, flush=True)
+            for name in set(last_failed) - set(failed):
+                print(f"  ✓ {name}: 已恢复", file=sys.stderr, flush=True)
+            last_failed = failed
+            scrapes += 1
+            if scrapes % SAVE_EVERY == 0:
+                store.save(path)
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        store.save(path)
+
+
+# ---------- 查询 ----------
+
+def _value(row, column: str) -> float:
+    return row[COLUMN_INDEX[column]]
+
+
+def reach_time(rows: List[Tuple[float, array]], height: int) -> Optional[Tuple[float, array, Optional[array]]]:
+    """第一次观察到高度 >= height 的样本；与上一个样本之间按高度线性插值估计到达时间"""
+    previous = None
+    for t, row in rows:
+        h = _value(row, 'height')
+        if math.isnan(h):
+            continue
+        if h >= height:
+            estimate = t
+            if previous is not None:
+                t0, h0 = previous[0], _value(previous[1], 'height')
+                if h > h0:
+                    estimate = t0 + (height - h0) / (h - h0) * (t - t0)
+            return estimate, row, previous[1] if previous else None
+        previous = (t, row)
+    return None
+
+
+def slow_report(store: Store, height: int) -> List[Dict]:
+    """各节点到达 height 的时间，按落后时间从大到小排序"""
+    results = []
+    for name, series in store.nodes.items():
+        found = None
+        for ring in (series.raw, series.coarse):
+            rows = list(ring.rows())
+            first = next((_value(r, 'height') for _, r in rows if not math.isnan(_value(r, 'height'))), None)
+            if first is not None and first < height:
+                found = reach_time(rows, height)
+                if found:
+                    break
+        if not found:
+            results.append({'node': name, 'reached': None})
+            continue
+        reached, row, previous = found
+        signed = _value(row, 'last_signed_height')
+        missed = _value(row, 'missed_blocks')
+        missed_before = _value(previous, 'missed_blocks') if previous is not None else NAN
+        missed_delta = None if math.isnan(missed) or math.isnan(missed_before) else missed - missed_before
+        # 样本之间可能跨越多个高度：最后签名高度低于 H 时确定未签名，期间漏块数增加时只能判断可能漏签
+        if math.isnan(signed):
+            signed_state = None
+        elif signed < height:
+            signed_state = 'missed'
+        elif missed_delta:
+            signed_state = 'maybe'
+        else:
+            signed_state = 'signed'
+        results.append({
+            'node': name, 'reached': reached,
+            'rounds': _value(row, 'rounds'),
+            'round_duration': _value(row, 'round_duration'),
+            'block_interval': _value(row, 'block_interval'),
+            'peers': _value(row, 'peers'),
+            'signed': signed_state,
+            'missed_delta': missed_delta,
+        })
+    earliest = min((r['reached'] for r in results if r['reached'] is not None), default=None)
+    for r in results:
+        r['lag'] = r['reached'] - earliest if r['reached'] is not None else None
+    results.sort(key=lambda r: (r['lag'] is None, -(r['lag'] or 0)))
+    return results
+
+
+def _num(value, fmt: str = '{:g}') -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return '-'
+    return fmt.format(value)
+
+
+def print_table(title: str, headers: List[str], rows: List[List[str]], footer: str = ''):
+    widths = [max(display_width(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    line = "━" * (sum(widths) + 2 * (len(widths) - 1))
+    print("")
+    print(line)
+    print(title)
+    print(line)
+    print("  ".join(pad(h, w) for h, w in zip(headers, widths)).rstrip())
+    for row in rows:
+        print("  ".join(pad(c, w) for c, w in zip(row, widths)).rstrip())
+    print(line)
+    if footer:
+        print(footer)
+        print(line)
+
+
+def print_slow(store: Store, height: int, results: List[Dict]):
+    rows = []
+    for index, r in enumerate(results):
+        if r['reached'] is None:
+            rows.append([r['node'], '无数据', '', '', '', '', '', ''])
+            continue
+        signed = {None: '-', 'signed': '✓', 'missed': '✗ 未签名', 'maybe': '? 可能漏签'}[r['signed']]
+        mark = '⚠ 最慢' if index == 0 and len(results) > 1 and r['lag'] and r['lag'] > 0 else ''
+        rows.append([r['node'], datetime.fromtimestamp(r['reached']).strftime('%H:%M:%S.%f')[:-5],
+                     _num(r['lag'], '+{:.1f}s'), _num(r['rounds'], '{:.0f}'),
+                     _num(r['round_duration'], '{:.2f}s'), signed,
+                     _num(r['missed_delta'], '{:+.0f}'), mark])
+    print_table(f"高度 {height} 各节点到达时间", ["节点", "到达", "落后", "轮次", "轮次耗时", "签名", "漏块", ""],
+                rows, f"时间精度约为抓取间隔（{store.raw_step:g}s，降采样数据为 {store.step}s）")
+
+
+def print_show(store: Store):
+    headers = ["节点", "时间", "高度"] + [c for c, _ in COLUMNS[1:]]
+    rows = []
+    for name, series in store.nodes.items():
+        last = series.raw.last()
+        if last is None:
+            continue
+        t, row = last
+        rows.append([name, datetime.fromtimestamp(t).strftime('%H:%M:%S')] +
+                    [_num(v, '{:.3g}' if i in (2, 3) else '{:.0f}') for i, v in enumerate(row)])
+    coverage = [s.raw.count * store.raw_step for s in store.nodes.values()]
+    coarse = [s.coarse.count * store.step for s in store.nodes.values()]
+    print_table("最新样本", headers, rows,
+                f"缓冲区 {store.nbytes() / 1024:.0f} KiB，原始精度 {max(coverage, default=0) / 60:.0f} 分钟，"
+                f"降采样 {max(coarse, default=0) / 3600:.1f} 小时")
+
+
+def export_csv(store: Store, output, downsampled: bool, nodes: Optional[List[str]]) -> int:
+    writer = csv.writer(output)
+    writer.writerow(['time', 'node'] + [c for c, _ in COLUMNS])
+    count = 0
+    for name, series in store.nodes.items():
+        if nodes and name not in nodes:
+            continue
+        for t, row in (series.coarse if downsampled else series.raw).rows():
+            writer.writerow([datetime.fromtimestamp(t).isoformat(timespec='milliseconds'), name] +
+                            ['' if math.isnan(v) else f"{v:g}" for v in row])
+            count += 1
+    return count
+
+
+def prometheus_port(node_config_file: str) -> int:
+    """node_config.yml 中 instrumentation.prometheus_listen_addr 的端口"""
+    try:
+        with open(node_config_file, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        address = config['global']['config_toml']['instrumentation.prometheus_listen_addr']
+        return int(str(address).rsplit(':', 1)[1])
+    except (OSError, KeyError, TypeError, ValueError, IndexError):
+        return DEFAULT_PROMETHEUS_PORT
+
+
+def show_usage():
+    print("用法: metrics_collector.py [options] <collect|show|slow|export> ...")
+    print("")
+    print("命令:")
+    print("  collect            并发抓取所有节点的指标并写入缓冲区文件（Ctrl+C 结束）")
+    print("  show               各节点最新样本和缓冲区占用")
+    print("  slow <height>      各节点到达该高度的时间差、轮次、签名情况")
+    print("  export             导出 CSV")
+    print("")
+    print("选项:")
+    print("  -i, --inventory <file>      inventory 文件")
+    print("  -c, --config <file>         node_config.yml（Prometheus 端口）")
+    print(f"  --store <file>              缓冲区文件（默认 {DEFAULT_STORE.relative_to(ROOT_DIR)}）")
+    print(f"  --interval <seconds>        抓取间隔（默认 {DEFAULT_INTERVAL:g}）")
+    print("  --duration <seconds>        采集时长（默认一直运行）")
+    print(f"  --timeout <seconds>         单次抓取超时（默认 {DEFAULT_TIMEOUT:g}）")
+    print("  --ssh-tunnel                Prometheus 端口未对外开放时通过 SSH 端口转发访问")
+    print("  --endpoint name=host:port   直接指定抓取地址（可重复，忽略 inventory）")
+    print("  --downsampled               export 导出降采样数据（默认原始精度）")
+    print("  --node <name>               export 只导出指定节点（可重复）")
+    print("  -o, --output <file>         export 输出文件（默认标准输出）")
+
+
+def main():
+    args = sys.argv[1:]
+    inventory_file = None
+    config_file = str(DEFAULT_CONFIG)
+    store_file = DEFAULT_STORE
+    interval = DEFAULT_INTERVAL
+    duration = None
+    timeout = DEFAULT_TIMEOUT
+    tunnel = False
+    endpoints: Dict[str, Tuple[str, int]] = {}
+    downsampled = False
+    export_nodes: List[str] = []
+    output = None
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-h', '--help'):
+                show_usage()
+                sys.exit(0)
+            elif arg in ('-i', '--inventory'):
+                inventory_file = args[i + 1]
+                i += 1
+            elif arg in ('-c', '--config'):
+                config_file = args[i + 1]
+                i += 1
+            elif arg == '--store':
+                store_file = Path(args[i + 1])
+                i += 1
+            elif arg == '--interval':
+                interval = float(args[i + 1])
+                i += 1
+            elif arg == '--duration':
+                duration = float(args[i + 1])
+                i += 1
+            elif arg == '--timeout':
+                timeout = float(args[i + 1])
+                i += 1
+            elif arg == '--ssh-tunnel':
+                tunnel = True
+            elif arg == '--endpoint':
+                name, address = parse_endpoint(args[i + 1])
+                endpoints[name] = address
+                i += 1
+            elif arg == '--downsampled':
+                downsampled = True
+            elif arg == '--node':
+                export_nodes.append(args[i + 1])
+                i += 1
+            elif arg in ('-o', '--output'):
+                output = args[i + 1]
+                i += 1
+            elif arg.startswith('-'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"错误: 选项 {args[i]} 需要有效的参数值", file=sys.stderr)
+        sys.exit(1)
+
+    command = positional[0] if positional else None
+    if command not in ('collect', 'show', 'slow', 'export') or \
+            (command == 'slow' and (len(positional) != 2 or not positional[1].isdigit())):
+        show_usage()
+        sys.exit(1)
+
+    if command != 'collect':
+        try:
+            store = Store.load(store_file)
+        except (OSError, ValueError) as e:
+            print(f"错误: 无法读取缓冲区文件: {e}", file=sys.stderr)
+            sys.exit(1)
+        if command == 'show':
+            print_show(store)
+        elif command == 'slow':
+            print_slow(store, int(positional[1]), slow_report(store, int(positional[1])))
+        else:
+            if output:
+                with open(output, 'w', newline='', encoding='utf-8') as f:
+                    count = export_csv(store, f, downsampled, export_nodes)
+                print(f"✓ 导出 {count} 行到 {output}", file=sys.stderr)
+            else:
+                try:
+                    export_csv(store, sys.stdout, downsampled, export_nodes)
+                except BrokenPipeError:
+                    pass
+        return
+
+    targets: Dict[str, str] = {}
+    if not endpoints:
+        try:
+            inv = load_inventory(inventory_file)
+        except Exception as e:
+            print(f"错误: 无法加载 inventory: {e}", file=sys.stderr)
+            sys.exit(1)
+        port = prometheus_port(config_file)
+        for name in inv.hosts('nodes'):
+            endpoints[name] = (inv.ip(name), port)
+            targets[name] = f"{inv.var(name, 'ansible_user', 'ubuntu')}@{inv.ip(name)}"
+
+    store = Store(interval)
+    if store_file.exists():
+        try:
+            loaded = Store.load(store_file)
+            if loaded.raw_step == interval:
+                store = loaded
+            else:
+                print(f"⚠ 抓取间隔与已有缓冲区（{loaded.raw_step:g}s）不同，重新开始", file=sys.stderr)
+        except (OSError, ValueError) as e:
+            print(f"⚠ 忽略无法读取的缓冲区文件: {e}", file=sys.stderr)
+
+    async def start():
+        tunnels = []
+        try:
+            if tunnel and targets:
+                opened = {name: Tunnel(target, endpoints[name][1]) for name, target in targets.items()}
+                results = await asyncio.gather(*(t.open() for t in opened.values()), return_exceptions=True)
+                for (name, t), result in zip(opened.items(), results):
+                    if isinstance(result, Exception):
+                        print(f"  ⚠ {name}: {result}", file=sys.stderr)
+                        await t.close()
+                        del endpoints[name]
+                    else:
+                        tunnels.append(t)
+                        endpoints[name] = ('127.0.0.1', t.local_port)
+            await collect(store, store_file, endpoints, interval, duration, timeout)
+        finally:
+            await asyncio.gather(*(t.close() for t in tunnels))
+
+    print(f"采集 {len(endpoints)} 个节点的指标（每 {interval:g}s），写入 {store_file}", file=sys.stderr, flush=True)
+    try:
+        asyncio.run(start())
+    except KeyboardInterrupt:
+        pass
+    print(f"✓ 缓冲区 {store.nbytes() / 1024:.0f} KiB 已保存到 {store_file}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,692 @@
+#!/usr/bin/env python3
+"""
+主机感知的节点性能配置生成器
+- 主机信息（CPU 核数、内存、磁盘类型）来自 inventory 主机变量 cpu_cores / memory_gb / disk_type，
+  或通过 --gather 经 SSH 并发采集
+- 节点角色：validator / sentry / archive（主机变量 node_profile，或当前配置为 pruning: nothing 的节点）
+- 按角色和主机规格生成 config_toml / app_toml 性能参数，按 global -> node_type -> specific_nodes
+  的层级写回 node_config.yml（取各层出现最多的值，只把不同的值下放到下一层）
+- 只在原文件上逐行修改 PROFILE_KEYS 中的参数，端口、gas 价格、topology 等其他配置、注释和格式保持不变；
+  参数上移到其他层时，行尾注释随值相同的参数一起移动
+- specific_nodes 中手工设置的参数（例如归档节点的 min-retain-blocks）保留并优先于生成值；
+  生成器写入 specific_nodes 的参数带有行尾注释 "# node_profile 生成"，重新生成时才会被替换
+- 写入前校验每个节点的最终配置，拒绝互相冲突或超出主机内存的组合
+
+命令行:
+    node_profile.py [-i inventory.yml] [-c node_config.yml] facts [--gather] [--json]
+    node_profile.py [-i inventory.yml] [-c node_config.yml] diff [--gather] [--unified]
+    node_profile.py [-i inventory.yml] [-c node_config.yml] generate [--gather] [-o <file> | --write]
+    node_profile.py [-i inventory.yml] [-c node_config.yml] validate [--gather]
+"""
+
+import difflib
+import json
+import re
+import shlex
+import shutil
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import yaml
+
+from apply_node_config_fast import load_node_config, resolve_node_params
+from inventory import Inventory, load_inventory
+from ssh_session import RemoteError, SSHSession, control_directory
+
+
+DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "node_config.yml"
+
+# 生成器管理的参数；其余参数保留 node_config.yml 中的原值
+PROFILE_KEYS = {
+    'config_toml': (
+        'db_backend', 'mempool.size', 'mempool.cache_size', 'mempool.max_txs_bytes',
+        'p2p.send_rate', 'p2p.recv_rate', 'tx_index.indexer',
+    ),
+    'app_toml': (
+        'app-db-backend', 'iavl-cache-size', 'pruning', 'pruning-keep-recent', 'pruning-interval',
+        'min-retain-blocks', 'state-sync.snapshot-interval', 'state-sync.snapshot-keep-recent',
+    ),
+}
+
+ROLES = ('validator', 'sentry', 'archive')
+DISK_TYPES = ('nvme', 'ssd', 'hdd')
+
+# 未提供主机信息时的默认规格
+DEFAULT_FACTS = {'cpus': 4, 'memory_gb': 16.0, 'disk': 'ssd'}
+
+# 粗略估算：所有 IAVL store 的节点缓存合计每个节点约 1 KiB
+IAVL_NODE_BYTES = 1024
+# CometBFT 默认的单笔交易上限（mempool.max_tx_bytes）
+DEFAULT_MAX_TX_BYTES = 1048576
+# SDK 对 custom 裁剪的下限
+MIN_PRUNING_INTERVAL = 10
+MIN_PRUNING_KEEP_RECENT = 2
+
+MIB = 1024 * 1024
+GIB = 1024 * MIB
+
+
+# ---------- 主机信息 ----------
+
+@dataclass
+class HostFacts:
+    node: str
+    node_type: str
+    role: str
+    cpus: int
+    memory_gb: float
+    disk: str
+    source: str
+
+
+def _role_for(node: str, inv: Inventory, config: Dict) -> str:
+    """node_profile 主机变量优先；当前配置不裁剪状态的节点视为归档节点"""
+    role = inv.var(node, 'node_profile')
+    if role in ROLES:
+        return role
+    node_type = inv.node_type(node) or 'sentry'
+    _, app = resolve_node_params(config, node, node_type)
+    return 'archive' if app.get('pruning') == 'nothing' else node_type
+
+
+def inventory_facts(node: str, inv: Inventory, config: Dict) -> HostFacts:
+    cpus = inv.var(node, 'cpu_cores')
+    memory = inv.var(node, 'memory_gb')
+    disk = inv.var(node, 'disk_type')
+    known = cpus is not None and memory is not None and disk in DISK_TYPES
+    return HostFacts(
+        node=node, node_type=inv.node_type(node) or 'sentry', role=_role_for(node, inv, config),
+        cpus=int(cpus if cpus is not None else DEFAULT_FACTS['cpus']),
+        memory_gb=float(memory if memory is not None else DEFAULT_FACTS['memory_gb']),
+        disk=disk if disk in DISK_TYPES else DEFAULT_FACTS['disk'],
+        source='inventory' if known else '默认',
+    )
+
+
+def gather_command(home: str) -> str:
+    """一次往返：CPU 核数、内存（KiB）、节点主目录所在磁盘类型"""
+    h = shlex.quote(home)
+    return ("nproc; awk '/MemTotal/ {print $2}' /proc/meminfo; "
+            f"src=$(df --output=source {h} 2>/dev/null | tail -1); "
+            "case \"$src\" in *nvme*) echo nvme ;; "
+            "*) [ \"$(lsblk -ndo ROTA \"$src\" 2>/dev/null | head -1 | tr -d ' ')\" = 1 ] "
+            "&& echo hdd || echo ssd ;; esac")
+
+
+def gather_facts(nodes: List[str], inv: Inventory, config: Dict,
+                 parallel: int = 20) -> List[HostFacts]:
+    """经 SSH 并发采集主机规格，失败的主机回退到 inventory/默认值"""
+    def gather(node: str, control_dir: str) -> HostFacts:
+        facts = inventory_facts(node, inv, config)
+        session = SSHSession(inv.ip(node), str(inv.var(node, 'ansible_user', 'ubuntu')), control_dir)
+        try:
+            lines = session.check(gather_command(str(inv.var(node, 'node_home_base', '/'))),
+                                  "采集主机信息失败", timeout=30).split()
+            facts.cpus = int(lines[0])
+            facts.memory_gb = round(int(lines[1]) / (1024 * 1024), 1)
+            facts.disk = lines[2] if lines[2] in DISK_TYPES else facts.disk
+            facts.source = 'ssh'
+        except (RemoteError, OSError, ValueError, IndexError) as e:
+            print(f"  ⚠ {node}: {e}，使用 {facts.source} 规格", file=sys.stderr)
+        finally:
+            session.close()
+        return facts
+
+    with control_directory() as control_dir:
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+            return list(pool.map(lambda n: gather(n, control_dir), nodes))
+
+
+# ---------- 性能参数 ----------
+
+def _tier(value: float, steps: List[Tuple[float, Any]]) -> Any:
+    """按阈值分档：返回第一个 value < 阈值 的档位值，超出所有阈值时返回最后一档"""
+    for limit, result in steps:
+        if value < limit:
+            return result
+    return steps[-1][1]
+
+
+def profile_params(facts: HostFacts, db_backend: str) -> Tuple[Dict, Dict]:
+    """按角色和主机规格生成 (config_toml, app_toml) 参数"""
+    mem, cpus, role = facts.memory_gb, facts.cpus, facts.role
+    fast_disk = facts.disk != 'hdd'
+
+    # IAVL 缓存：按内存分档，HDD 上更依赖缓存但受内存限制，档位不变
+    iavl_cache = _tier(mem, [(8, 250000), (16, 781250), (32, 1562500), (float('inf'), 3125000)])
+
+    # mempool：sentry 承接外部交易，按核数放大；总字节数不超过内存的 1/16
+    mempool_size = 5000 if role == 'validator' else _tier(cpus, [(8, 5000), (16, 10000), (float('inf'), 20000)])
+    max_txs_bytes = min(GIB, int(mem * GIB / 16) // MIB * MIB)
+
+    # p2p 限速（字节/秒）：validator 只连接少量可信节点，sentry 需要向外部广播
+    if role == 'validator':
+        rate = 10240000 if cpus >= 4 else 5120000
+    else:
+        rate = _tier(cpus, [(4, 5120000), (8, 10240000), (float('inf'), 20480000)])
+
+    config_toml = {
+        'db_backend': db_backend,
+        'mempool.size': mempool_size,
+        'mempool.cache_size': mempool_size * 2,
+        'mempool.max_txs_bytes': max_txs_bytes,
+        'p2p.send_rate': rate,
+        'p2p.recv_rate': rate,
+        'tx_index.indexer': 'null' if role == 'validator' else 'kv',
+    }
+
+    app_toml: Dict[str, Any] = {'app-db-backend': db_backend, 'iavl-cache-size': iavl_cache}
+    if role == 'archive':
+        # 归档节点：不裁剪状态和区块，提供快照供新节点状态同步
+        app_toml.update({'pruning': 'nothing', 'min-retain-blocks': 0,
+                         'state-sync.snapshot-interval': 1000, 'state-sync.snapshot-keep-recent': 2})
+    elif role == 'validator':
+        # validator：只保留最近状态，裁剪间隔在 HDD 上拉长以减少随机写
+        app_toml.update({'pruning': 'custom', 'pruning-keep-recent': 100,
+                         'pruning-interval': 10 if fast_disk else 50, 'min-retain-blocks': 10000,
+                         'state-sync.snapshot-interval': 0, 'state-sync.snapshot-keep-recent': 2})
+    else:
+        # sentry：保留足够的状态供查询，并提供状态同步快照
+        app_toml.update({'pruning': 'custom', 'pruning-keep-recent': 10000 if fast_disk else 2000,
+                         'pruning-interval': 10 if fast_disk else 50, 'min-retain-blocks': 10000,
+                         'state-sync.snapshot-interval': 1000, 'state-sync.snapshot-keep-recent': 2})
+    return config_toml, app_toml
+
+
+def _mode(values: List[Any], preferred: List[Any]) -> Any:
+    """出现次数最多的值；并列时优先取 preferred 中出现较多的值，再取先出现的"""
+    counts = Counter(json.dumps(v, sort_keys=True) for v in values)
+    bonus = Counter(json.dumps(v, sort_keys=True) for v in preferred)
+    return json.loads(max(counts, key=lambda v: (counts[v], bonus[v])))
+
+
+def layer_params(per_node: Dict[str, Dict], node_types: Dict[str, str],
+                 roles: Dict[str, str]) -> Tuple[Dict, Dict, Dict]:
+    """
+    把每个节点的参数拆成 global / node_type / specific_nodes 三层
+    每层取出现最多的值，与上一层不同的值才写入下一层
+    并列时优先采用角色与 node_type 相同的节点（归档节点的参数下放到 specific_nodes）
+    """
+    global_params: Dict[str, Any] = {}
+    type_params: Dict[str, Dict] = {}
+    node_params: Dict[str, Dict] = {}
+    keys = sorted({k for params in per_node.values() for k in params})
+
+    for key in keys:
+        nodes = [n for n in per_node if key in per_node[n]]
+        typical = [per_node[n][key] for n in nodes if roles[n] == node_types[n]]
+        global_value = _mode([per_node[n][key] for n in nodes], typical)
+        global_params[key] = global_value
+        for node_type in sorted(set(node_types[n] for n in nodes)):
+            members = [n for n in nodes if node_types[n] == node_type]
+            type_value = _mode([per_node[n][key] for n in members],
+                               [per_node[n][key] for n in members if roles[n] == node_type])
+            if type_value != global_value:
+                type_params.setdefault(node_type, {})[key] = type_value
+            for n in members:
+                if per_node[n][key] != type_value:
+                    node_params.setdefault(n, {})[key] = per_node[n][key]
+    return global_params, type_params, node_params
+
+
+def build_config(config: Dict, facts: List[HostFacts], db_backend: str,
+                 generated: Optional[Set[Tuple]] = None) -> Tuple[Dict, Set[Tuple]]:
+    """
+    在当前 node_config.yml 的基础上替换性能参数，保留其他配置
+    generated: 原文件中由生成器写入 specific_nodes 的参数路径；其余 specific_nodes 参数为手工覆盖，
+    保持原值且不参与分层统计
+    返回 (新配置, 本次写入 specific_nodes 的参数路径)
+    """
+    result = json.loads(json.dumps(config))
+    generated = generated or set()
+    node_types = {f.node: f.node_type for f in facts}
+    roles = {f.node: f.role for f in facts}
+
+    for node_type in ('global', 'validator', 'sentry'):
+        section = result.get(node_type) or {}
+        for file_key, keys in PROFILE_KEYS.items():
+            params = section.get(file_key)
+            if params:
+                for key in keys:
+                    params.pop(key, None)
+
+    pinned: Set[Tuple[str, str, str]] = set()
+    for node, entry in (result.get('specific_nodes') or {}).items():
+        for file_key, keys in PROFILE_KEYS.items():
+            params = (entry or {}).get(file_key) or {}
+            for key in [k for k in keys if k in params]:
+                if ('specific_nodes', node, file_key, key) in generated:
+                    del params[key]
+                else:
+                    pinned.add((node, file_key, key))
+
+    marked: Set[Tuple] = set()
+    generated_params = {f.node: profile_params(f, db_backend) for f in facts}
+    for index, file_key in enumerate(PROFILE_KEYS):
+        per_node = {node: {k: v for k, v in params[index].items() if (node, file_key, k) not in pinned}
+                    for node, params in generated_params.items()}
+        global_params, type_params, node_params = layer_params(per_node, node_types, roles)
+
+        result['global'] = result.get('global') or {}
+        result['global'][file_key] = {**(result['global'].get(file_key) or {}), **global_params}
+        for node_type, params in type_params.items():
+            result[node_type] = result.get(node_type) or {}
+            result[node_type][file_key] = {**(result[node_type].get(file_key) or {}), **params}
+        if node_params:
+            specific = result.get('specific_nodes') or {}
+            for node, params in node_params.items():
+                entry = specific.get(node) or {}
+                entry[file_key] = {**(entry.get(file_key) or {}), **params}
+                specific[node] = entry
+                marked.update(('specific_nodes', node, file_key, key) for key in params)
+            result['specific_nodes'] = specific
+
+    # 删除替换后没有任何参数的特定节点配置
+    specific = result.get('specific_nodes') or {}
+    for node in [n for n, entry in specific.items() if not any((entry or {}).values())]:
+        del specific[node]
+    return result, marked
+
+
+# ---------- 校验 ----------
+
+def _int(params: Dict, key: str, default: int = 0) -> int:
+    try:
+        return int(params.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def validate_node(facts: HostFacts, config_params: Dict, app_params: Dict) -> Tuple[List[str], List[str]]:
+    """校验单个节点的最终配置，返回 (错误, 警告)"""
+    errors: List[str] = []
+    warnings: List[str] = []
+    pruning = app_params.get('pruning', 'default')
+    keep_recent = _int(app_params, 'pruning-keep-recent')
+    interval = _int(app_params, 'pruning-interval')
+    min_retain = _int(app_params, 'min-retain-blocks')
+    snapshot_interval = _int(app_params, 'state-sync.snapshot-interval')
+
+    if pruning == 'custom':
+        if interval < MIN_PRUNING_INTERVAL:
+            errors.append(f"pruning-interval={interval} 小于 {MIN_PRUNING_INTERVAL}，节点无法启动")
+        if keep_recent < MIN_PRUNING_KEEP_RECENT:
+            errors.append(f"pruning-keep-recent={keep_recent} 小于 {MIN_PRUNING_KEEP_RECENT}，节点无法启动")
+    if pruning == 'everything' and snapshot_interval > 0:
+        errors.append("pruning=everything 时不能生成状态同步快照（state-sync.snapshot-interval 必须为 0）")
+    if pruning == 'nothing' and min_retain > 0:
+        errors.append(f"pruning=nothing 与 min-retain-blocks={min_retain} 冲突：状态不裁剪但区块会被裁剪")
+
+    db_backend = config_params.get('db_backend')
+    app_db_backend = app_params.get('app-db-backend')
+    if db_backend and app_db_backend and db_backend != app_db_backend:
+        errors.append(f"db_backend={db_backend} 与 app-db-backend={app_db_backend} 不一致")
+
+    max_txs_bytes = _int(config_params, 'mempool.max_txs_bytes', GIB)
+    max_tx_bytes = _int(config_params, 'mempool.max_tx_bytes', DEFAULT_MAX_TX_BYTES)
+    if max_txs_bytes < max_tx_bytes:
+        errors.append(f"mempool.max_txs_bytes={max_txs_bytes} 小于单笔交易上限 {max_tx_bytes}")
+    for key in ('p2p.send_rate', 'p2p.recv_rate'):
+        if key in config_params and _int(config_params, key) <= 0:
+            errors.append(f"{key} 必须大于 0")
+
+    # 内存预算只在主机规格已知时检查
+    if facts.source != '默认':
+        memory = facts.memory_gb * GIB
+        cache = _int(app_params, 'iavl-cache-size', 781250) * IAVL_NODE_BYTES
+        if cache + max_txs_bytes > memory / 2:
+            errors.append(f"IAVL 缓存约 {cache / GIB:.1f} GiB + mempool {max_txs_bytes / GIB:.1f} GiB "
+                          f"超过内存 {facts.memory_gb:g} GiB 的一半")
+
+    if facts.role == 'validator':
+        if pruning == 'nothing':
+            warnings.append("validator 不裁剪状态，磁盘占用持续增长")
+        if config_params.get('tx_index.indexer') not in (None, 'null'):
+            warnings.append("validator 启用了交易索引，增加出块路径上的磁盘写入")
+        if facts.disk == 'hdd':
+            warnings.append("validator 使用机械硬盘，可能跟不上出块")
+    elif facts.role == 'sentry' and snapshot_interval == 0:
+        warnings.append("sentry 未生成状态同步快照，新节点无法从该节点状态同步")
+    return errors, warnings
+
+
+def validate_config(config: Dict, facts: List[HostFacts]) -> Dict[str, Tuple[List[str], List[str]]]:
+    results = {}
+    for f in facts:
+        config_params, app_params = resolve_node_params(config, f.node, f.node_type)
+        results[f.node] = validate_node(f, config_params, app_params)
+    return results
+
+
+def print_validation(results: Dict[str, Tuple[List[str], List[str]]], file=sys.stdout) -> int:
+    """输出校验结果，返回错误数"""
+    total = 0
+    for node, (errors, warnings) in results.items():
+        for message in errors:
+            print(f"  ✗ {node}: {message}", file=file)
+        for message in warnings:
+            print(f"  ⚠ {node}: {message}", file=file)
+        total += len(errors)
+    if total:
+        print(f"✗ 配置校验失败: {total} 个错误", file=file)
+    else:
+        print(f"✓ 配置校验通过（{len(results)} 个节点）", file=file)
+    return total
+
+
+# ---------- 输出 ----------
+
+# 生成器写入 specific_nodes 的参数的行尾注释；没有该注释的 specific_nodes 参数视为手工覆盖
+GENERATED_MARK = "# node_profile 生成"
+
+
+def _split_comment(line: str) -> Tuple[str, str]:
+    """拆分行尾注释（忽略引号内的 #）"""
+    quote = None
+    for i, c in enumerate(line):
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in ('"', "'"):
+            quote = c
+        elif c == '#' and (i == 0 or line[i - 1] in ' \t'):
+            return line[:i].rstrip(), line[i:]
+    return line.rstrip(), ''
+
+
+KEY_LINE_RE = re.compile(r'^( *)([^\s#:][^:]*?):(?:\s|$)')
+
+
+@dataclass
+class KeyLine:
+    index: int
+    indent: int
+    path: Tuple[str, ...]
+    prefix: str      # 缩进 + 键 + 冒号（保持原文的键写法）
+    value: str       # 行内值文本，块的起始行为空
+    comment: str
+
+
+def parse_lines(lines: List[str]) -> List[KeyLine]:
+    """按缩进解析 YAML 映射的键行，返回每个键的路径、值文本和行尾注释"""
+    entries: List[KeyLine] = []
+    stack: List[Tuple[int, str]] = []
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#') or stripped == '---':
+            continue
+        m = KEY_LINE_RE.match(line)
+        if not m:
+            continue
+        indent, key = len(m.group(1)), m.group(2).strip().strip('"\'')
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        stack.append((indent, key))
+        code, comment = _split_comment(line)
+        prefix = f"{m.group(1)}{m.group(2)}:"
+        entries.append(KeyLine(index, indent, tuple(k for _, k in stack), prefix,
+                               code[len(prefix):].strip(), comment))
+    return entries
+
+
+def profile_paths(config: Dict) -> Dict[Tuple, Any]:
+    """配置中的性能参数：键路径 -> 值"""
+    paths = {}
+    sections = [((name,), config.get(name)) for name in ('global', 'validator', 'sentry')]
+    sections += [(('specific_nodes', node), entry)
+                 for node, entry in (config.get('specific_nodes') or {}).items()]
+    for prefix, section in sections:
+        for file_key, keys in PROFILE_KEYS.items():
+            params = (section or {}).get(file_key) or {}
+            for key in keys:
+                if key in params:
+                    paths[prefix + (file_key, key)] = params[key]
+    return paths
+
+
+def generated_paths(text: str) -> Set[Tuple]:
+    """原文件中由生成器写入 specific_nodes 的参数路径"""
+    return {e.path for e in parse_lines(text.splitlines())
+            if e.path[0] == 'specific_nodes' and e.comment == GENERATED_MARK}
+
+
+def _scalar(value: Any) -> str:
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    return yaml.safe_dump(value, default_flow_style=True, allow_unicode=True).strip()
+
+
+def _with_comment(code: str, comment: str, column: int = 0) -> str:
+    """追加行尾注释，尽量保持原来的注释列"""
+    if not comment:
+        return code
+    return code + ' ' * max(1 if column else 2, column - len(code)) + comment
+
+
+def patch_config_text(text: str, old: Dict, new: Dict, marked: Set[Tuple]) -> str:
+    """
+    在原文件上逐行修改性能参数：值变化的行原位替换（保留注释），不再需要的行删除，
+    新参数追加到所属块的末尾（块不存在时一并创建）；其他行保持原样
+    """
+    lines = text.splitlines()
+    before, after = profile_paths(old), profile_paths(new)
+    entries = {e.path: e for e in parse_lines(lines)}
+    # 删除的行尾注释：(文件, 键) -> [(值, 注释)]，插入值相同的参数时移到新位置
+    moved: Dict[Tuple[str, str], List[Tuple[Any, str]]] = {}
+    emptied: Set[Tuple] = set()
+
+    for path in sorted((p for p in before if p in entries), key=lambda p: entries[p].index, reverse=True):
+        entry = entries[path]
+        if path in after:
+            if after[path] != before[path]:
+                code = f"{entry.prefix} {_scalar(after[path])}"
+                column = len(lines[entry.index]) - len(entry.comment) if entry.comment else 0
+                lines[entry.index] = _with_comment(code, entry.comment, column)
+            continue
+        del lines[entry.index]
+        if entry.comment == GENERATED_MARK:
+            emptied.update((path[:2], path[:3]))
+        elif entry.comment:
+            moved.setdefault(path[-2:], []).append((before[path], entry.comment))
+
+    order = {(f, k): (i, j) for i, (f, keys) in enumerate(PROFILE_KEYS.items()) for j, k in enumerate(keys)}
+    present = {e.path for e in parse_lines(lines)}
+    for path in sorted((p for p in after if p not in present),
+                       key=lambda p: (p[:-2], order[p[-2:]])):
+        current = parse_lines(lines)
+        known = {e.path: e for e in current}
+        depth = next(d for d in range(len(path) - 1, -1, -1) if d == 0 or path[:d] in known)
+        if depth:
+            parent = known[path[:depth]]
+            position = max(e.index for e in current if e.path[:depth] == path[:depth]) + 1
+            indent = parent.indent + 2
+        else:
+            position, indent = len(lines), 0
+            while position and not lines[position - 1].strip():
+                position -= 1
+        new_lines = [f"{' ' * (indent + 2 * i)}{key}:" for i, key in enumerate(path[depth:-1])]
+
+        comment = GENERATED_MARK if path in marked else ''
+        for i, (value, text_comment) in enumerate(moved.get(path[-2:], [])):
+            if not comment and value == after[path]:
+                comment = text_comment
+                del moved[path[-2:]][i]
+                break
+        code = f"{' ' * (indent + 2 * (len(path) - 1 - depth))}{path[-1]}: {_scalar(after[path])}"
+        new_lines.append(_with_comment(code, comment))
+        lines[position:position] = new_lines
+
+    # 删除生成的参数后不再有任何值的特定节点配置块（先文件块，再节点）
+    for block in sorted(emptied, key=len, reverse=True):
+        subtree = [e for e in parse_lines(lines) if e.path[:len(block)] == block]
+        if subtree and not any(e.value for e in subtree):
+            del lines[subtree[0].index:subtree[-1].index + 1]
+
+    return '\n'.join(lines) + '\n'
+
+
+def effective_diff(old: Dict, new: Dict, facts: List[HostFacts]) -> Dict[str, List[str]]:
+    """每个节点最终生效参数的变化"""
+    changes = {}
+    for f in facts:
+        old_params = resolve_node_params(old, f.node, f.node_type)
+        new_params = resolve_node_params(new, f.node, f.node_type)
+        lines = []
+        for filename, before, after in zip(('config.toml', 'app.toml'), old_params, new_params):
+            for key in sorted(set(before) | set(after)):
+                if before.get(key) != after.get(key):
+                    lines.append(f"{filename} {key}: {before.get(key, '(未设置)')} → {after.get(key, '(未设置)')}")
+        changes[f.node] = lines
+    return changes
+
+
+def print_facts(facts: List[HostFacts]):
+    print(f"{'节点':<14}{'角色':<11}{'CPU':>5}{'内存(GiB)':>11}  {'磁盘':<6}来源")
+    for f in facts:
+        print(f"{f.node:<16}{f.role:<11}{f.cpus:>5}{f.memory_gb:>11g}  {f.disk:<8}{f.source}")
+
+
+def show_usage():
+    print("用法: node_profile.py [-i inventory.yml] [-c node_config.yml] <command> [options]")
+    print("")
+    print("命令:")
+    print("  facts       显示各节点的角色和主机规格")
+    print("  diff        显示生成的配置与当前配置的差异（按节点最终生效的参数）")
+    print("  generate    生成 node_config.yml（默认输出到标准输出）")
+    print("  validate    校验当前 node_config.yml")
+    print("")
+    print("选项:")
+    print("  --gather              通过 SSH 采集主机规格（默认使用 inventory 主机变量 cpu_cores/memory_gb/disk_type）")
+    print("  --parallel <N>        最大并发主机数（默认 20）")
+    print("  --db-backend <name>   数据库后端（默认 goleveldb，更换后端需要重新同步数据）")
+    print("  --unified             diff: 同时输出文件的 unified diff")
+    print("  -o <file>             generate: 写入指定文件")
+    print("  --write               generate: 覆盖 node_config.yml（原文件备份为 .bak）")
+    print("  --json                facts: 输出 JSON")
+
+
+def main():
+    args = sys.argv[1:]
+    inventory_file = None
+    config_file = DEFAULT_CONFIG
+    gather = False
+    parallel = 20
+    db_backend = 'goleveldb'
+    unified = False
+    output: Optional[Path] = None
+    write = False
+    as_json = False
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-i', '--inventory'):
+                inventory_file = args[i + 1]
+                i += 1
+            elif arg in ('-c', '--config'):
+                config_file = Path(args[i + 1])
+                i += 1
+            elif arg == '--gather':
+                gather = True
+            elif arg == '--parallel':
+                parallel = int(args[i + 1])
+                i += 1
+            elif arg == '--db-backend':
+                db_backend = args[i + 1]
+                i += 1
+            elif arg == '--unified':
+                unified = True
+            elif arg == '-o':
+                output = Path(args[i + 1])
+                i += 1
+            elif arg == '--write':
+                write = True
+            elif arg == '--json':
+                as_json = True
+            elif arg.startswith('-'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"错误: 选项 {args[i]} 需要有效的参数值", file=sys.stderr)
+        sys.exit(1)
+
+    if len(positional) != 1 or positional[0] not in ('facts', 'diff', 'generate', 'validate'):
+        show_usage()
+        sys.exit(1)
+    command = positional[0]
+
+    try:
+        inv = load_inventory(inventory_file)
+        original_text = config_file.read_text(encoding='utf-8')
+        config = load_node_config(str(config_file))
+    except OSError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    nodes = inv.hosts('nodes')
+    if gather:
+        facts = gather_facts(nodes, inv, config, parallel)
+    else:
+        facts = [inventory_facts(n, inv, config) for n in nodes]
+
+    if command == 'facts':
+        if as_json:
+            print(json.dumps([asdict(f) for f in facts], ensure_ascii=False, indent=2))
+        else:
+            print_facts(facts)
+        return
+
+    if command == 'validate':
+        sys.exit(1 if print_validation(validate_config(config, facts)) else 0)
+
+    built, marked = build_config(config, facts, db_backend, generated_paths(original_text))
+    new_text = patch_config_text(original_text, config, built, marked)
+    new_config = yaml.safe_load(new_text) or {}
+
+    if command == 'diff':
+        changes = effective_diff(config, new_config, facts)
+        for node, lines in changes.items():
+            print(f"{node}（{next(f.role for f in facts if f.node == node)}）:"
+                  + ('' if lines else ' 无变化'))
+            for line in lines:
+                print(f"  {line}")
+        if unified:
+            sys.stdout.writelines(difflib.unified_diff(
+                original_text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+                str(config_file), f"{config_file} (生成)"))
+        print("")
+        print(f"变化: {sum(1 for lines in changes.values() if lines)}/{len(changes)} 个节点，"
+              f"{sum(len(lines) for lines in changes.values())} 个参数")
+        print_validation(validate_config(new_config, facts))
+        return
+
+    # generate：校验通过才写入（输出到标准输出时校验结果写入标准错误）
+    report = sys.stderr if not write and output is None else sys.stdout
+    if print_validation(validate_config(new_config, facts), report):
+        sys.exit(1)
+    if write:
+        shutil.copy2(config_file, f"{config_file}.bak")
+        config_file.write_text(new_text, encoding='utf-8')
+        print(f"✓ 已写入 {config_file}（原文件: {config_file}.bak）")
+    elif output is not None:
+        output.write_text(new_text, encoding='utf-8')
+        print(f"✓ 已写入 {output}")
+    else:
+        sys.stdout.write(new_text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
 """
 解析 Ansible inventory.yml 文件
-提取 validator 和 sentry 节点信息
+提取 validator 和 sentry 节点信息（基于 inventory.py 的缓存索引）
 """
 
-import yaml
 import sys
 from pathlib import Path
 
+from inventory import load_inventory
+
 
 def parse_inventory(inventory_file: str, output_format: str = "bash") -> None:
     """
@@ -22,26 +23,13 @@ def parse_inventory(inventory_file: str, output_format: str = "bash") -> None:
         sys.exit(1)
     
     try:
-        with open(inventory_file, 'r', encoding='utf-8') as f:
-            inv = yaml.safe_load(f)
+        inv = load_inventory(inventory_file)
     except Exception as e:
         print(f"错误: 无法解析 inventory 文件: {e}", file=sys.stderr)
         sys.exit(1)
     
-    hosts = inv.get('all', {}).get('hosts', {})
-    
-    validators = {}
-    sentries = {}
-    
-    for name, config in sorted(hosts.items()):
-        if name.startswith('validator-'):
-            ip = config.get('ansible_host', '')
-            if ip:
-                validators[name] = ip
-        elif name.startswith('sentry-'):
-            ip = config.get('ansible_host', '')
-            if ip:
-                sentries[name] = ip
+    validators = dict(sorted(inv.validators().items()))
+    sentries = dict(sorted(inv.sentries().items()))
     
     if output_format == "bash":
         # Bash 可解析的格式：TYPE:NAME:IP
@@ -59,6 +47,7 @@ def parse_inventory(inventory_file: str, output_format: str = "bash") -> None:
         print(json.dumps(result, indent=2))
     
     elif output_format == "yaml":
+        import yaml
         result = {
             "validators": validators,
             "sentries": sentries
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+P2P 拓扑规划
+根据 inventory 中的节点角色和 region/zone 主机变量生成有界度数的 peer 图：
+- Validator 只连接分配给自己的 Sentry 和私有 validator 环
+- Sentry 之间组成有界度数的环形网格（circulant graph），保证连通性和直径上界
+- max_degree 和 max_diameter 是硬约束：sentry 剩余容量不足时减少 sentries_per_validator，
+  直径超限时加宽 validator 环和 sentry 网格的偏移量，仍无法满足时报告原因
+- 输出对应的 persistent_peers / private_peer_ids / unconditional_peer_ids
+  以及 max_num_inbound_peers / max_num_outbound_peers 设置
+"""
+
+import json
+import math
+import sys
+import yaml
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from inventory import Inventory, load_inventory
+
+
+# 拓扑参数默认值（可在 node_config.yml 的 topology 段覆盖）
+DEFAULT_OPTIONS = {
+    'max_degree': 12,              # 任一节点的 persistent peer 上限
+    'sentries_per_validator': 2,   # 每个 validator 连接的 sentry 数量
+    'validator_ring_degree': 4,    # validator 私有环的度数
+    'sentry_mesh_degree': 4,       # sentry 之间网格的度数
+    'max_diameter': 6,             # 图直径上限
+    'sentry_max_inbound': 40,      # sentry 的公网入站连接上限
+    'sentry_max_outbound': 10,     # sentry 的公网出站连接上限
+}
+
+
+@dataclass
+class Node:
+    name: str
+    ip: str
+    role: str
+    region: str = ''
+    zone: str = ''
+
+
+@dataclass
+class TopologyPlan:
+    nodes: Dict[str, Node]
+    graph: Dict[str, Set[str]]
+    sentries_of: Dict[str, List[str]] = field(default_factory=dict)
+    options: Dict = field(default_factory=dict)
+    # 为满足约束对配置参数所做的调整（如 "sentries_per_validator 2 → 1"）
+    adjustments: List[str] = field(default_factory=list)
+    # 没有满足约束的方案时的原因
+    error: str = ''
+
+
+def load_topology_options(node_config_file: Optional[str]) -> Dict:
+    """读取 node_config.yml 中的 topology 段并与默认值合并"""
+    options = dict(DEFAULT_OPTIONS)
+    if node_config_file and Path(node_config_file).exists():
+        with open(node_config_file, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        options.update(config.get('topology') or {})
+    return options
+
+
+def nodes_from_inventory(inv: Inventory) -> List[Node]:
+    """从 inventory 索引中提取 validator 和 sentry 节点（含 region/zone）"""
+    nodes = []
+    for name in inv.hosts('nodes'):
+        nodes.append(Node(
+            name=name,
+            ip=inv.ip(name),
+            role=inv.node_type(name),
+            region=str(inv.var(name, 'region', '')),
+            zone=str(inv.var(name, 'zone', '')),
+        ))
+    return nodes
+
+
+def _node_sort_key(node: Node) -> Tuple:
+    """按 region/zone 排序，使环上相邻节点尽量在同一区域"""
+    prefix, _, index = node.name.rpartition('-')
+    return (node.region, node.zone, prefix, int(index) if index.isdigit() else 0, node.name)
+
+
+def circulant_offsets(n: int, degree: int) -> List[int]:
+    """
+    为 n 个节点的环选择跳跃偏移量
+    偏移量按几何级数分布（1, n^(1/d), n^(2/d) ...），在度数受限时压低直径
+    """
+    if n <= 1 or degree <= 0:
+        return []
+    if degree >= n - 1:
+        return list(range(1, n // 2 + 1))
+
+    count = max(1, degree // 2)
+    offsets = []
+    for j in range(count):
+        offset = max(1, round(n ** (j / count)))
+        if offsets and offset <= offsets[-1]:
+            offset = offsets[-1] + 1
+        if offset > n // 2:
+            break
+        offsets.append(offset)
+    return offsets
+
+
+def add_circulant(graph: Dict[str, Set[str]], members: List[str], degree: int):
+    """在 members 上添加环形网格边"""
+    n = len(members)
+    for offset in circulant_offsets(n, degree):
+        for i, name in enumerate(members):
+            peer = members[(i + offset) % n]
+            if peer != name:
+                graph[name].add(peer)
+                graph[peer].add(name)
+
+
+def assign_sentries(validators: List[Node], sentries: List[Node],
+                    per_validator: int, capacity: int) -> Dict[str, List[str]]:
+    """
+    为每个 validator 分配 sentry，每个 sentry 最多分配 capacity 个 validator
+    优先同 zone、其次同 region，同等条件下选择负载最低的 sentry；
+    剩余容量不足时分配到的 sentry 少于 per_validator
+    """
+    load = {s.name: 0 for s in sentries}
+    assignment = {}
+    per_validator = min(per_validator, len(sentries))
+
+    for validator in validators:
+        def score(sentry: Node) -> Tuple:
+            if validator.zone and sentry.zone == validator.zone:
+                locality = 0
+            elif validator.region and sentry.region == validator.region:
+                locality = 1
+            else:
+                locality = 2
+            return (locality, load[sentry.name], _node_sort_key(sentry))
+
+        available = [s for s in sentries if load[s.name] < capacity]
+        chosen = sorted(available, key=score)[:per_validator]
+        for sentry in chosen:
+            load[sentry.name] += 1
+        assignment[validator.name] = [s.name for s in chosen]
+
+    return assignment
+
+
+def build_graph(validators: List[Node], sentries: List[Node], max_degree: int,
+                per_validator: int, ring_degree: int, mesh_degree: int) -> Tuple[Dict[str, Set[str]], Dict]:
+    """按给定参数生成 peer 图，返回 (图, validator -> sentry 分配)"""
+    graph: Dict[str, Set[str]] = {n.name: set() for n in validators + sentries}
+    sentries_of = {}
+    if sentries:
+        # sentry 网格
+        add_circulant(graph, [s.name for s in sentries], mesh_degree)
+        mesh_used = max((len(graph[s.name]) for s in sentries), default=0)
+
+        # validator -> sentry，sentry 剩余容量是硬上限
+        sentries_of = assign_sentries(validators, sentries, per_validator, max(0, max_degree - mesh_used))
+        for validator, assigned in sentries_of.items():
+            for sentry in assigned:
+                graph[validator].add(sentry)
+                graph[sentry].add(validator)
+
+    # validator 私有环（没有 sentry 时即为 validator 之间的全部连接）
+    add_circulant(graph, [v.name for v in validators], ring_degree)
+    return graph, sentries_of
+
+
+def _candidates(opts: Dict, validators: int, sentries: int) -> List[Tuple[int, int, int]]:
+    """
+    候选参数 (sentries_per_validator, validator 环度数, sentry 网格度数)，按偏离配置的程度排序：
+    先保持网格度数不低于配置值，其次保持 sentries_per_validator，最后尽量少加宽环和网格
+    """
+    max_degree = int(opts['max_degree'])
+    per0 = max(1, min(int(opts['sentries_per_validator']), sentries)) if sentries else 0
+    ring0 = min(int(opts['validator_ring_degree']), max_degree)
+    mesh0 = min(int(opts['sentry_mesh_degree']), max_degree) if sentries else 0
+
+    candidates = []
+    for per in range(per0, 0 if sentries else -1, -1):
+        for ring in sorted({ring0, *range(ring0 + 2, max_degree - per + 1, 2)}):
+            if ring + per > max_degree and ring != ring0:
+                continue
+            meshes = {mesh0, *range(2, max_degree + 1, 2)} if sentries > 1 else {mesh0}
+            for mesh in sorted(meshes):
+                widen = max(0, ring - ring0) + max(0, mesh - mesh0)
+                candidates.append(((max(0, mesh0 - mesh), per0 - per, widen), (per, ring, mesh)))
+    return [c for _, c in sorted(candidates)]
+
+
+def _infeasible_reason(opts: Dict, validators: int, sentries: int) -> str:
+    max_degree = int(opts['max_degree'])
+    min_mesh = min(2, sentries - 1) if sentries else 0
+    if sentries and sentries * (max_degree - min_mesh) < validators:
+        need_sentries = math.ceil(validators / max(1, max_degree - min_mesh))
+        need_degree = math.ceil(validators / sentries) + min_mesh
+        return (f"{sentries} 个 sentry 在 max_degree {max_degree} 下最多接入 "
+                f"{sentries * max(0, max_degree - min_mesh)} 个 validator（共 {validators} 个），"
+                f"需要至少 {need_sentries} 个 sentry 或 max_degree ≥ {need_degree}")
+    return (f"max_degree {max_degree} 下没有直径不超过 {opts['max_diameter']} 的连通拓扑，"
+            f"需要提高 max_degree 或 max_diameter")
+
+
+def plan_topology(nodes: List[Node], options: Optional[Dict] = None) -> TopologyPlan:
+    """
+    生成满足 max_degree / max_diameter 的 peer 图（按 _candidates 的顺序取第一个可行方案）
+    没有可行方案时返回按配置参数生成的图，plan.error 说明原因
+    """
+    opts = dict(DEFAULT_OPTIONS)
+    opts.update(options or {})
+
+    validators = sorted((n for n in nodes if n.role == 'validator'), key=_node_sort_key)
+    sentries = sorted((n for n in nodes if n.role == 'sentry'), key=_node_sort_key)
+    max_degree = int(opts['max_degree'])
+    max_diameter = int(opts['max_diameter'])
+
+    chosen, error = None, ''
+    candidates = _candidates(opts, len(validators), len(sentries))
+    for per, ring, mesh in candidates:
+        graph, sentries_of = build_graph(validators, sentries, max_degree, per, ring, mesh)
+        if any(len(peers) > max_degree for peers in graph.values()):
+            continue
+        if any(len(assigned) < per for assigned in sentries_of.values()):
+            continue
+        diameter, connected = graph_diameter(graph, max_diameter)
+        if connected and diameter <= max_diameter:
+            chosen = (graph, sentries_of, (per, ring, mesh))
+            break
+    if chosen is None:
+        error = _infeasible_reason(opts, len(validators), len(sentries))
+        per, ring, mesh = candidates[0]
+        chosen = (*build_graph(validators, sentries, max_degree, per, ring, mesh), candidates[0])
+
+    graph, sentries_of, (per, ring, mesh) = chosen
+    effective = dict(opts, sentries_per_validator=per, validator_ring_degree=ring, sentry_mesh_degree=mesh)
+    configured = dict(zip(('sentries_per_validator', 'validator_ring_degree', 'sentry_mesh_degree'),
+                          candidates[0]))
+    keys = ('sentries_per_validator', 'validator_ring_degree', 'sentry_mesh_degree') if sentries \
+        else ('validator_ring_degree',)
+    adjustments = [] if error else [f"{key} {configured[key]} → {effective[key]}"
+                                    for key in keys if configured[key] != effective[key]]
+
+    return TopologyPlan(
+        nodes={n.name: n for n in nodes},
+        graph=graph,
+        sentries_of=sentries_of,
+        options=effective,
+        adjustments=adjustments,
+        error=error,
+    )
+
+
+def graph_diameter(graph: Dict[str, Set[str]], limit: Optional[int] = None) -> Tuple[int, bool]:
+    """
+    计算图直径，返回 (直径, 是否连通)
+    每个节点的可达集合用位图表示，逐跳合并邻居的集合（每跳 O(边数) 次整数或运算）；
+    给定 limit 时超过 limit 跳即停止，直径记为 limit + 1
+    """
+    names = list(graph)
+    if not names:
+        return 0, True
+    index = {name: i for i, name in enumerate(names)}
+    neighbors = [[index[p] for p in graph[name]] for name in names]
+    full = (1 << len(names)) - 1
+    reach = [1 << i for i in range(len(names))]
+
+    hops = 0
+    while any(r != full for r in reach):
+        if limit is not None and hops > limit:
+            return limit + 1, True
+        expanded = [r | _union(reach, neighbors[i]) for i, r in enumerate(reach)]
+        if expanded == reach:
+            return -1, False
+        reach = expanded
+        hops += 1
+    return hops, True
+
+
+def _union(reach: List[int], members: List[int]) -> int:
+    result = 0
+    for i in members:
+        result |= reach[i]
+    return result
+
+
+def topology_report(plan: TopologyPlan) -> Dict:
+    """生成拓扑报告：度数、直径、边数以及违反的约束"""
+    degrees = {name: len(peers) for name, peers in sorted(plan.graph.items())}
+    edges = sum(degrees.values()) // 2
+    diameter, connected = graph_diameter(plan.graph) if plan.graph else (0, True)
+    n = len(plan.graph)
+
+    violations = []
+    if plan.error:
+        violations.append(f"没有满足约束的拓扑: {plan.error}")
+    if not connected:
+        violations.append("图不连通")
+    max_degree = int(plan.options['max_degree'])
+    for name, degree in degrees.items():
+        if degree > max_degree:
+            violations.append(f"{name} 度数 {degree} 超过上限 {max_degree}")
+    if connected and diameter > int(plan.options['max_diameter']):
+        violations.append(f"直径 {diameter} 超过上限 {plan.options['max_diameter']}")
+    for validator, assigned in plan.sentries_of.items():
+        if not assigned:
+            violations.append(f"{validator} 未分配 sentry")
+
+    return {
+        'nodes': n,
+        'edges': edges,
+        'full_mesh_edges': n * (n - 1) // 2,
+        'diameter': diameter,
+        'connected': connected,
+        'min_degree': min(degrees.values(), default=0),
+        'max_degree': max(degrees.values(), default=0),
+        'avg_degree': round(sum(degrees.values()) / n, 2) if n else 0,
+        'degrees': degrees,
+        'sentries_of': plan.sentries_of,
+        'adjustments': plan.adjustments,
+        'violations': violations,
+    }
+
+
+def p2p_settings(plan: TopologyPlan, node_ids: Dict[str, str], p2p_port: str) -> Dict[str, Dict]:
+    """
+    生成每个节点的 config.toml p2p 参数
+    缺少 node_id 的 peer 会被跳过
+    """
+    opts = plan.options
+    shielded = bool(plan.sentries_of)
+    settings = {}
+
+    def addr(name: str) -> Optional[str]:
+        node_id = node_ids.get(name)
+        return f"{node_id}@{plan.nodes[name].ip}:{p2p_port}" if node_id else None
+
+    def ids(names) -> str:
+        return ','.join(node_ids[n] for n in sorted(names) if n in node_ids)
+
+    for name, peers in sorted(plan.graph.items()):
+        node = plan.nodes[name]
+        persistent = ','.join(a for a in (addr(p) for p in sorted(peers)) if a)
+
+        if node.role == 'validator':
+            params = {
+                'p2p.persistent_peers': persistent,
+                'p2p.unconditional_peer_ids': ids(peers),
+                'p2p.private_peer_ids': ids(p for p in peers if plan.nodes[p].role == 'validator'),
+                'p2p.max_num_inbound_peers': len(peers),
+                'p2p.max_num_outbound_peers': len(peers),
+            }
+            if shielded:
+                # validator 只与指定 peer 通信，不参与地址交换
+                params['p2p.pex'] = False
+        else:
+            own_validators = [p for p in peers if plan.nodes[p].role == 'validator']
+            mesh = [p for p in peers if plan.nodes[p].role != 'validator']
+            params = {
+                'p2p.persistent_peers': persistent,
+                'p2p.unconditional_peer_ids': ids(own_validators),
+                'p2p.private_peer_ids': ids(own_validators),
+                'p2p.max_num_inbound_peers': int(opts['sentry_max_inbound']),
+                'p2p.max_num_outbound_peers': max(int(opts['sentry_max_outbound']), len(mesh)),
+            }
+        settings[name] = params
+
+    return settings
+
+
+def print_report(report: Dict):
+    """打印拓扑报告"""
+    print(f"节点数: {report['nodes']}")
+    print(f"边数: {report['edges']}（全连接: {report['full_mesh_edges']}）")
+    print(f"度数: 最小 {report['min_degree']}, 最大 {report['max_degree']}, 平均 {report['avg_degree']}")
+    print(f"直径: {report['diameter'] if report['connected'] else '∞（不连通）'}")
+    if report['adjustments']:
+        print(f"参数调整（为满足度数/直径上限）: {', '.join(report['adjustments'])}")
+    print("")
+    for name, degree in report['degrees'].items():
+        sentries = report['sentries_of'].get(name)
+        suffix = f"  sentries: {', '.join(sentries)}" if sentries else ""
+        print(f"  {name}: {degree}{suffix}")
+
+    if report['violations']:
+        print("")
+        for violation in report['violations']:
+            print(f"  ✗ {violation}", file=sys.stderr)
+    else:
+        print("\n✓ 拓扑满足所有约束")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    as_json = '--json' in sys.argv[1:]
+
+    if not args or len(args) > 2:
+        print("用法: peer_topology.py <inventory.yml> [node_config.yml] [--json]")
+        print("说明: 离线预览拓扑（度数、直径、边数），不修改任何文件")
+        sys.exit(1)
+
+    inventory_file = args[0]
+    node_config_file = args[1] if len(args) > 1 else None
+
+    if not Path(inventory_file).exists():
+        print(f"错误: Inventory 文件不存在: {inventory_file}", file=sys.stderr)
+        sys.exit(1)
+
+    plan = plan_topology(nodes_from_inventory(load_inventory(inventory_file)),
+                         load_topology_options(node_config_file))
+    report = topology_report(plan)
+
+    if as_json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+
+    sys.exit(1 if report['violations'] else 0)
+
+
+if __name__ == "__main__":
+    main()
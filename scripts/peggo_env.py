@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+生成 Peggo .env 配置文件
+generate-peggo-env.sh 和 config_pipeline.py 的 peggo-env 任务共用这里的模板和默认值
+
+- 读取每个 validator 节点目录下的 peggo_evm_key.json（由 generate_config.sh 生成）
+- 读取 inventory.yml 的 peggo_* 变量，未设置的使用 PEGGO_ENV_DEFAULTS
+- 写入节点目录下的 .env，权限 600
+
+命令行:
+    python3 scripts/peggo_env.py <base_dir> <inventory.yml>
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+from inventory import load_inventory
+
+
+# inventory 中的 Peggo 配置参数及默认值
+PEGGO_ENV_DEFAULTS = {
+    'peggo_cosmos_chain_id': 'biyachain-888',
+    'peggo_cosmos_grpc': 'tcp://127.0.0.1:10000',
+    'peggo_tendermint_rpc': 'http://127.0.0.1:26757',
+    'peggo_cosmos_fee_denom': 'inj',
+    'peggo_cosmos_gas_prices': '1600000000inj',
+    'peggo_eth_gas_price_adjustment': '1.3',
+    'peggo_eth_max_gas_price': '500gwei',
+    'peggo_eth_chain_id': '11155111',
+    'peggo_eth_rpc': 'https://ethereum-sepolia.publicnode.com',
+    'peggo_eth_alchemy_ws': '',
+    'peggo_relay_valsets': 'true',
+    'peggo_relay_valset_offset_dur': '3m',
+    'peggo_relay_batches': 'true',
+    'peggo_relay_batch_offset_dur': '3m',
+    'peggo_relay_pending_tx_wait_duration': '20m',
+    'peggo_min_batch_fee_usd': '0',
+}
+
+PEGGO_ENV_TEMPLATE = '''PEGGO_ENV="local"
+PEGGO_LOG_LEVEL="info"
+
+PEGGO_COSMOS_CHAIN_ID="{peggo_cosmos_chain_id}"
+PEGGO_COSMOS_GRPC="{peggo_cosmos_grpc}"
+PEGGO_TENDERMINT_RPC="{peggo_tendermint_rpc}"
+
+PEGGO_COSMOS_FEE_DENOM="{peggo_cosmos_fee_denom}"
+PEGGO_COSMOS_GAS_PRICES="{peggo_cosmos_gas_prices}"
+
+# 不使用 keyring，直接使用私钥
+PEGGO_COSMOS_KEYRING=""
+PEGGO_COSMOS_KEYRING_DIR=""
+PEGGO_COSMOS_KEYRING_APP=""
+PEGGO_COSMOS_FROM=""
+PEGGO_COSMOS_FROM_PASSPHRASE=""
+PEGGO_COSMOS_PK="{cosmos_pk}"
+
+PEGGO_COSMOS_USE_LEDGER="false"
+
+# 不使用 keystore，直接使用私钥
+PEGGO_ETH_KEYSTORE_DIR=""
+PEGGO_ETH_FROM=""
+PEGGO_ETH_PASSPHRASE=""
+PEGGO_ETH_PK="{eth_pk}"
+
+PEGGO_ETH_GAS_PRICE_ADJUSTMENT="{peggo_eth_gas_price_adjustment}"
+PEGGO_ETH_MAX_GAS_PRICE="{peggo_eth_max_gas_price}"
+PEGGO_ETH_CHAIN_ID="{peggo_eth_chain_id}"
+PEGGO_ETH_RPC="{peggo_eth_rpc}"
+PEGGO_ETH_ALCHEMY_WS="{peggo_eth_alchemy_ws}"
+PEGGO_ETH_USE_LEDGER="false"
+PEGGO_COINGECKO_API="https://api.coingecko.com/api/v3"
+
+PEGGO_RELAY_VALSETS="{peggo_relay_valsets}"
+PEGGO_RELAY_VALSET_OFFSET_DUR="{peggo_relay_valset_offset_dur}"
+PEGGO_RELAY_BATCHES="{peggo_relay_batches}"
+PEGGO_RELAY_BATCH_OFFSET_DUR="{peggo_relay_batch_offset_dur}"
+PEGGO_RELAY_PENDING_TX_WAIT_DURATION="{peggo_relay_pending_tx_wait_duration}"
+
+PEGGO_MIN_BATCH_FEE_USD="{peggo_min_batch_fee_usd}"
+
+PEGGO_STATSD_PREFIX="peggo."
+PEGGO_STATSD_ADDR="localhost:8125"
+PEGGO_STATSD_STUCK_DUR="5m"
+PEGGO_STATSD_MOCKING="false"
+PEGGO_STATSD_DISABLED="true"
+
+PEGGO_ETH_PERSONAL_SIGN="false"
+PEGGO_ETH_SIGN_MODE="raw"
+'''
+
+
+def peggo_values(group_vars: Dict) -> Dict[str, str]:
+    """inventory 的 peggo_* 变量，未设置的使用默认值"""
+    return {key: group_vars.get(key, default) for key, default in PEGGO_ENV_DEFAULTS.items()}
+
+
+def render_peggo_env(group_vars: Dict, key_info: Dict) -> str:
+    return PEGGO_ENV_TEMPLATE.format(
+        cosmos_pk=key_info.get('cosmos_private_key') or key_info['evm_private_key'],
+        eth_pk=key_info['evm_private_key'], **peggo_values(group_vars))
+
+
+def write_peggo_env(node_home: Path, group_vars: Dict):
+    """读取 peggo_evm_key.json，写入 .env（权限 600）"""
+    key_info = json.loads(Path(node_home, 'peggo_evm_key.json').read_text(encoding='utf-8'))
+    if not key_info.get('evm_private_key'):
+        raise ValueError("无法读取私钥")
+    env_file = Path(node_home, '.env')
+    env_file.write_text(render_peggo_env(group_vars, key_info), encoding='utf-8')
+    env_file.chmod(0o600)
+
+
+def generate_all(base_dir: Path, group_vars: Dict) -> List[str]:
+    """为所有 validator 节点目录生成 .env，返回失败的节点"""
+    failed = []
+    for node_home in sorted(p for p in base_dir.glob('validator-*') if p.is_dir()):
+        if not (node_home / 'peggo_evm_key.json').is_file():
+            print(f"⚠ {node_home.name}: peggo_evm_key.json 不存在，跳过")
+            failed.append(node_home.name)
+            continue
+        try:
+            write_peggo_env(node_home, group_vars)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"✗ {node_home.name}: {e}")
+            failed.append(node_home.name)
+            continue
+        print(f"✓ {node_home.name}")
+    return failed
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] in ('-h', '--help'):
+        print(__doc__.strip())
+        sys.exit(0 if len(sys.argv) == 2 else 1)
+
+    base_dir, inventory_file = Path(sys.argv[1]), sys.argv[2]
+    try:
+        group_vars = load_inventory(inventory_file).group_vars
+    except Exception as e:
+        print(f"错误: 读取 inventory.yml 配置失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    values = peggo_values(group_vars)
+    print("✓ Peggo 配置参数已读取")
+    print(f"  Chain ID: {values['peggo_cosmos_chain_id']}")
+    print(f"  ETH Chain ID: {values['peggo_eth_chain_id']}")
+    print(f"  ETH RPC: {values['peggo_eth_rpc']}")
+    print("")
+
+    if not any(p.is_dir() for p in base_dir.glob('validator-*')):
+        print("错误: 未找到任何 validator 节点目录", file=sys.stderr)
+        sys.exit(1)
+
+    print("生成 .env 文件...")
+    failed = generate_all(base_dir, group_vars)
+    total = sum(1 for p in base_dir.glob('validator-*') if p.is_dir())
+    print(f"成功: {total - len(failed)} 个节点")
+    if failed:
+        print(f"失败: {len(failed)} 个节点: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+并发注册 Orchestrator 地址
+- 一次查询 peggy module_state 的 delegate_keys，跳过已注册的 validator
+- 各 validator 账户并发离线签名（按账户分配 sequence，同一账户的多笔交易依次递增）
+- 所有交易通过一次 JSON-RPC 批量请求 broadcast_tx_sync 广播；sequence 不匹配时按链上
+  期望值重新签名并重发一次
+- 单个轮询循环按指数退避批量查询交易是否上链，不再为每个 validator 固定等待；
+  validator 未启用交易索引（tx_index.indexer: "null"）时改为扫描广播后的新区块
+- 输出每个 validator 的签名耗时、上链耗时和总耗时
+
+命令行:
+    register_orchestrators.py <config_dir> --rpc http://host:26757 [--rest http://host:10437]
+                              [--binary build/bin/biyachaind] [--chain-id biyachain-888]
+                              [--gas-prices 1600000000inj] [--gas 200000] [--timeout 60] [--json]
+
+测试：test/fleet/mock-chain.py 模拟 REST/RPC，test/fleet/fake-biyachaind.py 模拟签名
+"""
+
+import base64
+import hashlib
+import json
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from keyring_reader import read_address
+from table import display_width, pad
+import tracing
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BINARY = ROOT_DIR / "build" / "bin" / "biyachaind"
+DEFAULT_CHAIN_ID = "biyachain-888"
+DEFAULT_GAS_PRICES = "1600000000inj"
+DEFAULT_GAS = 200000
+DEFAULT_REST_PORT = 10337
+
+# sdkerrors.ErrWrongSequence
+CODE_WRONG_SEQUENCE = 32
+EXPECTED_SEQUENCE_RE = re.compile(r'expected (\d+)')
+
+# 轮询退避：首次间隔、倍数、最大间隔（秒）
+POLL_INITIAL = 0.5
+POLL_FACTOR = 2.0
+POLL_MAX = 8.0
+
+
+class ChainError(Exception):
+    """REST/RPC 请求失败"""
+
+
+@dataclass
+class Registration:
+    name: str
+    home: str
+    validator_address: str
+    orchestrator_address: str
+    evm_address: str
+    status: str = '待注册'
+    account_number: Optional[int] = None
+    sequence: Optional[int] = None
+    tx_hash: str = ''
+    height: Optional[int] = None
+    sign_seconds: Optional[float] = None
+    inclusion_seconds: Optional[float] = None
+    total_seconds: Optional[float] = None
+    message: str = ''
+    started: float = field(default=0.0, repr=False)
+    broadcast_at: float = field(default=0.0, repr=False)
+    tx_bytes: str = field(default='', repr=False)
+
+
+# ---------- HTTP ----------
+
+def http_get(url: str, timeout: float = 10) -> Dict:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise ChainError(f"{url}: {e}")
+
+
+def rpc_batch(rpc: str, calls: List[Tuple[str, Dict]], timeout: float = 30) -> List[Dict]:
+    """一次 HTTP 请求发送多个 JSON-RPC 调用，按请求顺序返回各调用的响应"""
+    payload = [{'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params}
+               for i, (method, params) in enumerate(calls)]
+    request = urllib.request.Request(rpc, data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            data = json.loads(response.read())
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise ChainError(f"{rpc}: {e}")
+    if isinstance(data, dict):
+        data = [data]
+    by_id = {item.get('id'): item for item in data}
+    return [by_id.get(i, {'error': {'message': '缺少响应'}}) for i in range(len(calls))]
+
+
+# ---------- 链上查询（REST 优先，失败时回退到链二进制） ----------
+
+def run_binary(args: List[str], timeout: int = 60) -> str:
+    result = tracing.run(args, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        detail = (result.stderr or result.stdout).strip().splitlines()
+        raise ChainError(detail[-1] if detail else f"退出码 {result.returncode}")
+    return result.stdout
+
+
+def query_delegate_keys(rest: Optional[str], binary: str, rpc: str, chain_id: str) -> Dict[str, Dict]:
+    """一次查询所有 delegate_keys，按小写 EVM 地址索引"""
+    try:
+        if not rest:
+            raise ChainError("未指定 REST 地址")
+        state = http_get(f"{rest}/peggy/v1/module_state")['state']
+    except (ChainError, KeyError) as e:
+        print(f"  ⚠ REST 查询失败（{e}），使用链二进制查询", file=sys.stderr)
+        output = run_binary([binary, 'q', 'peggy', 'module-state', f'--chain-id={chain_id}',
+                             f'--node={rpc}', '-o', 'json'])
+        state = json.loads(output).get('state') or {}
+    return {str(k.get('eth_address', '')).lower(): k for k in state.get('delegate_keys') or []}
+
+
+def query_account(rest: Optional[str], binary: str, rpc: str, address: str) -> Tuple[int, int]:
+    """(account_number, sequence)；EthAccount 的字段在 base_account 下"""
+    try:
+        if not rest:
+            raise ChainError("未指定 REST 地址")
+        account = http_get(f"{rest}/cosmos/auth/v1beta1/accounts/{address}")['account']
+    except (ChainError, KeyError):
+        account = json.loads(run_binary([binary, 'q', 'auth', 'account', address,
+                                         f'--node={rpc}', '-o', 'json']))
+        account = account.get('account', account)
+    base = account.get('base_account', account)
+    return int(base.get('account_number', 0)), int(base.get('sequence', 0))
+
+
+# ---------- 签名 ----------
+
+def load_registrations(config_dir: Path, binary: str) -> List[Registration]:
+    """读取各 validator 目录的 peggo_evm_key.json 和 keyring 中的 validator 地址"""
+    registrations = []
+    for home in sorted(config_dir.glob("validator-*")):
+        key_file = home / "peggo_evm_key.json"
+        if not key_file.is_file():
+            continue
+        key = json.loads(key_file.read_text(encoding='utf-8'))
+        evm = str(key['evm_address']).lower()
+        address = read_address(str(home), home.name)
+        if address is None:
+            address = run_binary([binary, 'keys', 'show', home.name, '-a',
+                                  '--keyring-backend=test', f'--home={home}']).strip()
+        registrations.append(Registration(
+            name=home.name, home=str(home), validator_address=address,
+            orchestrator_address=key['cosmos_address'],
+            evm_address=evm if evm.startswith('0x') else f"0x{evm}",
+        ))
+    return registrations
+
+
+def sign(r: Registration, binary: str, chain_id: str, gas: int, gas_prices: str):
+    """离线生成、签名并编码交易（显式指定 account_number/sequence，不查询链上账户）"""
+    started = time.monotonic()
+    common = [f'--chain-id={chain_id}', '--keyring-backend=test', f'--home={r.home}']
+    with tempfile.TemporaryDirectory(prefix="register-") as tmp:
+        unsigned, signed = Path(tmp) / "unsigned.json", Path(tmp) / "signed.json"
+        unsigned.write_text(run_binary(
+            [binary, 'tx', 'peggy', 'set-orchestrator-address', r.validator_address,
+             r.orchestrator_address, r.evm_address, f'--from={r.name}', '--generate-only',
+             f'--gas={gas}', f'--gas-prices={gas_prices}'] + common))
+        signed.write_text(run_binary(
+            [binary, 'tx', 'sign', str(unsigned), f'--from={r.name}', '--offline',
+             f'--account-number={r.account_number}', f'--sequence={r.sequence}'] + common))
+        r.tx_bytes = run_binary([binary, 'tx', 'encode', str(signed)]).strip()
+    r.sign_seconds = round(time.monotonic() - started, 3)
+
+
+def assign_sequences(pending: List[Registration], accounts: Dict[str, Tuple[int, int]]):
+    """同一签名账户的多笔交易按顺序递增 sequence"""
+    offsets: Dict[str, int] = {}
+    for r in pending:
+        number, sequence = accounts[r.validator_address]
+        r.account_number = number
+        r.sequence = sequence + offsets.get(r.validator_address, 0)
+        offsets[r.validator_address] = offsets.get(r.validator_address, 0) + 1
+
+
+def sign_all(pending: List[Registration], binary: str, chain_id: str, gas: int,
+             gas_prices: str, parallel: int) -> List[Registration]:
+    """并发签名，返回签名成功的注册"""
+    def work(r: Registration) -> Registration:
+        try:
+            sign(r, binary, chain_id, gas, gas_prices)
+        except (ChainError, OSError, subprocess.TimeoutExpired) as e:
+            r.status, r.message = '✗ 签名失败', str(e)
+        return r
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+        return [r for r in pool.map(work, pending) if r.tx_bytes]
+
+
+# ---------- 广播与上链确认 ----------
+
+def broadcast(rpc: str, batch: List[Registration]) -> List[Registration]:
+    """批量广播，返回 sequence 不匹配、需要重新签名的注册"""
+    now = time.monotonic()
+    try:
+        responses = rpc_batch(rpc, [('broadcast_tx_sync', {'tx': r.tx_bytes}) for r in batch])
+    except ChainError as e:
+        for r in batch:
+            r.status, r.message = '✗ 广播失败', str(e)
+        return []
+
+    retry = []
+    for r, response in zip(batch, responses):
+        result = response.get('result') or {}
+        if response.get('error'):
+            r.status, r.message = '✗ 广播失败', str(response['error'].get('data') or response['error'])
+            continue
+        code = int(result.get('code', 0))
+        log = str(result.get('log', ''))
+        if code == CODE_WRONG_SEQUENCE:
+            match = EXPECTED_SEQUENCE_RE.search(log)
+            if match:
+                r.sequence = int(match.group(1))
+                retry.append(r)
+                continue
+        if code != 0:
+            r.status, r.message = '✗ 交易被拒绝', f"code {code}: {log}"
+            continue
+        r.tx_hash = str(result.get('hash', '')).upper()
+        r.broadcast_at = now
+        r.status = '已广播'
+    return retry
+
+
+def latest_height(rpc: str) -> int:
+    response = rpc_batch(rpc, [('status', {})])[0]
+    if response.get('error'):
+        raise ChainError(f"{rpc}: {response['error']}")
+    return int(response['result']['sync_info']['latest_block_height'])
+
+
+def scan_blocks(rpc: str, start: int, end: int) -> Dict[str, Dict]:
+    """批量读取 [start, end] 区块的交易和执行结果，按交易哈希索引
+
+    validator 的 tx_index.indexer 为 "null" 时无法按哈希查询交易，只能扫描区块
+    """
+    heights = list(range(start, end + 1))
+    responses = rpc_batch(rpc, [(method, {'height': str(h)}) for h in heights
+                                for method in ('block', 'block_results')])
+    found = {}
+    for index, height in enumerate(heights):
+        block, results = responses[2 * index], responses[2 * index + 1]
+        if block.get('error') or results.get('error'):
+            raise ChainError(f"高度 {height}: {block.get('error') or results.get('error')}")
+        txs = ((block['result'].get('block') or {}).get('data') or {}).get('txs') or []
+        tx_results = results['result'].get('txs_results') or []
+        for position, tx in enumerate(txs):
+            tx_hash = hashlib.sha256(base64.b64decode(tx)).hexdigest().upper()
+            result = tx_results[position] if position < len(tx_results) else {}
+            found[tx_hash] = {'height': str(height), 'tx_result': result}
+    return found
+
+
+def wait_inclusion(rpc: str, submitted: List[Registration], timeout: float, start_height: int):
+    """单个循环批量查询所有未确认交易，间隔按指数退避增长
+
+    节点禁用了交易索引时改为从 start_height 起扫描新区块
+    """
+    pending = [r for r in submitted if r.status == '已广播']
+    deadline = time.monotonic() + timeout
+    delay = POLL_INITIAL
+    scan_from = None
+    while pending and time.monotonic() < deadline:
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * POLL_FACTOR, POLL_MAX)
+        try:
+            if scan_from is None:
+                responses = rpc_batch(rpc, [('tx', {'hash': base64.b64encode(bytes.fromhex(r.tx_hash)).decode(),
+                                                    'prove': False}) for r in pending])
+                if any('indexing is disabled' in str(response.get('error', {}).get('data', ''))
+                       for response in responses):
+                    print("  ⚠ 节点未启用交易索引，改为扫描区块", file=sys.stderr)
+                    scan_from = start_height
+                    delay = POLL_INITIAL
+                    continue
+                found = {r.tx_hash: response['result'] for r, response in zip(pending, responses)
+                         if response.get('result')}
+            else:
+                end = latest_height(rpc)
+                found = scan_blocks(rpc, scan_from, end) if end >= scan_from else {}
+                scan_from = end + 1
+        except (ChainError, KeyError, ValueError) as e:
+            print(f"  ⚠ 查询交易失败: {e}", file=sys.stderr)
+            continue
+        now = time.monotonic()
+        still = []
+        for r in pending:
+            result = found.get(r.tx_hash)
+            if not result:
+                still.append(r)
+                continue
+            tx_result = result.get('tx_result') or {}
+            r.height = int(result.get('height', 0))
+            r.inclusion_seconds = round(now - r.broadcast_at, 3)
+            if int(tx_result.get('code', 0)) == 0:
+                r.status = '✓ 注册成功'
+            else:
+                r.status, r.message = '✗ 执行失败', str(tx_result.get('log', ''))
+        pending = still
+    for r in pending:
+        r.status, r.message = '✗ 未上链', f"{timeout:g}s 内未查询到交易"
+
+
+def register_all(registrations: List[Registration], rpc: str, rest: Optional[str], binary: str,
+                 chain_id: str, gas: int, gas_prices: str, parallel: int, timeout: float):
+    started = time.monotonic()
+    for r in registrations:
+        r.started = started
+
+    registered = query_delegate_keys(rest, binary, rpc, chain_id)
+    pending = []
+    for r in registrations:
+        if r.evm_address.lower() in registered:
+            r.status = '已注册（跳过）'
+        else:
+            pending.append(r)
+    if not pending:
+        return
+
+    signers = sorted({r.validator_address for r in pending})
+    accounts: Dict[str, Tuple[int, int]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(signers)))) as pool:
+        for address, result in zip(signers, pool.map(
+                lambda a: _safe_account(rest, binary, rpc, a), signers)):
+            if isinstance(result, Exception):
+                for r in pending:
+                    if r.validator_address == address:
+                        r.status, r.message = '✗ 查询账户失败', str(result)
+            else:
+                accounts[address] = result
+    pending = [r for r in pending if r.validator_address in accounts]
+    assign_sequences(pending, accounts)
+
+    signed = sign_all(pending, binary, chain_id, gas, gas_prices, parallel)
+    start_height = latest_height(rpc)
+    retry = broadcast(rpc, signed)
+    if retry:
+        # 按链上期望的 sequence 重新签名后再广播一次
+        print(f"  ⚠ {len(retry)} 笔交易 sequence 不匹配，重新签名", file=sys.stderr)
+        for r in retry:
+            r.tx_bytes = ''
+        resigned = sign_all(retry, binary, chain_id, gas, gas_prices, parallel)
+        for r in broadcast(rpc, resigned):
+            r.status, r.message = '✗ 交易被拒绝', f"sequence 不匹配（期望 {r.sequence}）"
+    wait_inclusion(rpc, signed, timeout, start_height)
+
+    # 上链后再查询一次 delegate_keys 确认
+    if any(r.status == '✓ 注册成功' for r in pending):
+        try:
+            registered = query_delegate_keys(rest, binary, rpc, chain_id)
+            for r in pending:
+                if r.status == '✓ 注册成功' and r.evm_address.lower() not in registered:
+                    r.status, r.message = '✗ 未生效', "交易已上链但 delegate_keys 中没有该地址"
+        except (ChainError, ValueError) as e:
+            print(f"  ⚠ 无法确认 delegate_keys: {e}", file=sys.stderr)
+
+    for r in pending:
+        r.total_seconds = round(time.monotonic() - r.started, 3)
+
+
+def _safe_account(rest, binary, rpc, address):
+    try:
+        return query_account(rest, binary, rpc, address)
+    except (ChainError, ValueError, KeyError, OSError, subprocess.TimeoutExpired) as e:
+        return e
+
+
+# ---------- 输出 ----------
+
+def _seconds(value: Optional[float]) -> str:
+    return '-' if value is None else f"{value:.1f}s"
+
+
+def print_report(registrations: List[Registration], total: float):
+    headers = ["Validator", "EVM 地址", "状态", "高度", "签名", "上链", "总耗时", "说明"]
+    rows = [[r.name, r.evm_address, r.status, '' if r.height is None else str(r.height),
+             _seconds(r.sign_seconds), _seconds(r.inclusion_seconds), _seconds(r.total_seconds),
+             r.message[:60]] for r in registrations]
+    widths = [max(display_width(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    line = "━" * (sum(widths) + 2 * (len(widths) - 1))
+
+    print("")
+    print(line)
+    print("Orchestrator 注册")
+    print(line)
+    print("  ".join(pad(h, w) for h, w in zip(headers, widths)).rstrip())
+    for row in rows:
+        print("  ".join(pad(c, w) for c, w in zip(row, widths)).rstrip())
+    print(line)
+    done = sum(1 for r in registrations if r.status.startswith('✓'))
+    skipped = sum(1 for r in registrations if r.status.startswith('已注册'))
+    failed = sum(1 for r in registrations if r.status.startswith('✗'))
+    print(f"注册成功 {done}，已注册 {skipped}，失败 {failed}，总耗时 {total:.1f}s")
+    print(line)
+
+
+def rest_from_rpc(rpc: str) -> str:
+    """RPC 主机 + node_config.yml 中 api.address 的端口"""
+    port = DEFAULT_REST_PORT
+    try:
+        with open(ROOT_DIR / "node_config.yml", 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        port = int(str(config['global']['app_toml']['api.address']).rsplit(':', 1)[1])
+    except (OSError, KeyError, TypeError, ValueError, IndexError):
+        pass
+    host = rpc.split('://', 1)[-1].rsplit(':', 1)[0]
+    return f"http://{host}:{port}"
+
+
+def show_usage():
+    print("用法: register_orchestrators.py <config_dir> --rpc <url> [options]")
+    print("")
+    print("选项:")
+    print("  --rpc <url>            节点 RPC（如 http://10.8.21.50:26757）")
+    print("  --rest <url>           REST API（默认 RPC 主机 + node_config.yml 的 api.address 端口；")
+    print("                         不可用时回退到链二进制查询）")
+    print(f"  --binary <path>        链二进制（默认 {DEFAULT_BINARY.relative_to(ROOT_DIR)}）")
+    print(f"  --chain-id <id>        链 ID（默认 {DEFAULT_CHAIN_ID}）")
+    print(f"  --gas-prices <value>   Gas 价格（默认 {DEFAULT_GAS_PRICES}）")
+    print(f"  --gas <N>              Gas 上限（默认 {DEFAULT_GAS}）")
+    print("  --parallel <N>         最大并发签名数（默认 8）")
+    print("  --timeout <seconds>    等待上链的最长时间（默认 60）")
+    print("  --json                 输出 JSON")
+
+
+def main():
+    args = sys.argv[1:]
+    rpc = None
+    rest = None
+    binary = str(DEFAULT_BINARY)
+    chain_id = DEFAULT_CHAIN_ID
+    gas_prices = DEFAULT_GAS_PRICES
+    gas = DEFAULT_GAS
+    parallel = 8
+    timeout = 60.0
+    as_json = False
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg == '--rpc':
+                rpc = args[i + 1].rstrip('/')
+                i += 1
+            elif arg == '--rest':
+                rest = args[i + 1].rstrip('/')
+                i += 1
+            elif arg == '--binary':
+                binary = args[i + 1]
+                i += 1
+            elif arg == '--chain-id':
+                chain_id = args[i + 1]
+                i += 1
+            elif arg == '--gas-prices':
+                gas_prices = args[i + 1]
+                i += 1
+            elif arg == '--gas':
+                gas = int(args[i + 1])
+                i += 1
+            elif arg == '--parallel':
+                parallel = int(args[i + 1])
+                i += 1
+            elif arg == '--timeout':
+                timeout = float(args[i + 1])
+                i += 1
+            elif arg == '--json':
+                as_json = True
+            elif arg.startswith('-'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"错误: 选项 {args[i]} 需要有效的参数值", file=sys.stderr)
+        sys.exit(1)
+
+    if len(positional) != 1 or not rpc:
+        show_usage()
+        sys.exit(1)
+    if '://' not in rpc:
+        rpc = f"http://{rpc}"
+    rest = rest or rest_from_rpc(rpc)
+
+    config_dir = Path(positional[0])
+    try:
+        registrations = load_registrations(config_dir, binary)
+    except (ChainError, OSError, ValueError, KeyError, subprocess.TimeoutExpired) as e:
+        print(f"错误: 无法读取 validator 密钥: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not registrations:
+        print(f"错误: {config_dir} 下没有包含 peggo_evm_key.json 的 validator 目录", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"注册 {len(registrations)} 个 validator 的 Orchestrator 地址（RPC: {rpc}）", flush=True)
+    started = time.monotonic()
+    try:
+        register_all(registrations, rpc, rest, binary, chain_id, gas, gas_prices, parallel, timeout)
+    except (ChainError, ValueError, OSError, subprocess.TimeoutExpired) as e:
+        print(f"✗ 无法查询注册状态: {e}", file=sys.stderr)
+        sys.exit(1)
+    total = time.monotonic() - started
+
+    if as_json:
+        print(json.dumps({'total_seconds': round(total, 3),
+                          'validators': [{k: v for k, v in asdict(r).items()
+                                          if k not in ('started', 'broadcast_at', 'tx_bytes')}
+                                         for r in registrations]},
+                         ensure_ascii=False, indent=2))
+    else:
+        print_report(registrations, total)
+    sys.exit(1 if any(r.status.startswith('✗') for r in registrations) else 0)
+
+
+if __name__ == "__main__":
+    main()
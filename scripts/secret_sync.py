@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+私钥与配置文件批量同步
+- 为每个主机生成文件清单（本地路径、远程路径、属主、权限、SHA-256）
+- 一次远程调用读取远程文件的哈希/权限/属主并比较
+- 只将有变化的文件打包为一个 tar 流发送，远程先暂存全部文件，再逐个原子替换
+- 多个主机并发执行；无变化时只有一次往返
+- 启动服务后不删除远程文件（与 deploy-node 相同），再次启动时哈希一致即不发送
+
+同步内容：
+- node:  node_key.json（644）、priv_validator_key.json（600，仅 validator）
+- peggo: Peggo .env（600，仅 validator）
+"""
+
+import hashlib
+import io
+import shlex
+import sys
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from inventory import Inventory, load_inventory
+from ssh_session import RemoteError, SSHSession, control_directory
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_CONFIG_DIR = SCRIPT_DIR.parent / "chain-deploy-config"
+
+REMOTE_CONFIG_DIR = "/data/biyachain/config"
+PEGGO_HOME = "/home/ubuntu/.peggo"
+
+SCOPES = ('node', 'peggo')
+
+
+@dataclass
+class SyncFile:
+    local: Path
+    remote: str
+    mode: str
+    owner: str
+    group: str
+    sha256: str = ''
+
+    def state(self) -> str:
+        """与远程状态行格式一致：<sha256> <mode> <owner> <group>"""
+        return f"{self.sha256} {self.mode} {self.owner} {self.group}"
+
+
+def build_manifest(node: str, inv: Inventory, config_dir: Path,
+                   scopes: Sequence[str] = SCOPES) -> List[SyncFile]:
+    """生成主机的同步清单；本地文件缺失时抛出 FileNotFoundError"""
+    node_dir = Path(config_dir) / node
+    is_validator = inv.node_type(node) == 'validator'
+    owner = str(inv.var(node, 'deploy_user', 'ubuntu'))
+    group = str(inv.var(node, 'deploy_group', owner))
+
+    entries: List[Tuple[Path, str, str]] = []
+    if 'node' in scopes:
+        entries.append((node_dir / "config" / "node_key.json",
+                        f"{REMOTE_CONFIG_DIR}/node_key.json", "644"))
+        if is_validator:
+            entries.append((node_dir / "config" / "priv_validator_key.json",
+                            f"{REMOTE_CONFIG_DIR}/priv_validator_key.json", "600"))
+    if 'peggo' in scopes and is_validator:
+        entries.append((node_dir / ".env", f"{PEGGO_HOME}/.env", "600"))
+
+    files = []
+    for local, remote, mode in entries:
+        if not local.exists():
+            raise FileNotFoundError(f"{local.name} 不存在: {local}")
+        files.append(SyncFile(local=local, remote=remote, mode=mode, owner=owner, group=group,
+                              sha256=hashlib.sha256(local.read_bytes()).hexdigest()))
+    return files
+
+
+def remote_state(session: SSHSession, files: List[SyncFile]) -> Dict[str, str]:
+    """一次往返读取所有远程文件的状态，缺失的文件返回 "-" """
+    paths = ' '.join(shlex.quote(f.remote) for f in files)
+    output = session.check(
+        f"for f in {paths}; do "
+        f"if sudo test -f \"$f\"; then "
+        f"echo \"$(sudo sha256sum \"$f\" | cut -d' ' -f1) $(sudo stat -c '%a %U %G' \"$f\")\"; "
+        f"else echo -; fi; done",
+        "读取远程文件状态失败")
+    lines = output.strip().splitlines()
+    return {f.remote: (lines[i].strip() if i < len(lines) else '-') for i, f in enumerate(files)}
+
+
+def build_archive(files: List[SyncFile]) -> bytes:
+    """将文件打包为 tar 流（按序号命名，远程按清单顺序安装）"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as tar:
+        for index, f in enumerate(files):
+            data = f.local.read_bytes()
+            info = tarfile.TarInfo(name=str(index))
+            info.size = len(data)
+            info.mode = 0o600
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def install_command(files: List[SyncFile]) -> str:
+    """
+    远程解包脚本：
+    1. 解包到临时目录
+    2. 全部安装为目标目录下的 .sync-tmp 文件（设置属主和权限）
+    3. 全部就绪后再逐个 mv 覆盖目标文件
+    """
+    lines = [
+        "set -e",
+        "stage=$(mktemp -d)",
+        "trap 'rm -rf \"$stage\"' EXIT",
+        "tar -xf - -C \"$stage\"",
+    ]
+    for directory in sorted({str(Path(f.remote).parent) for f in files}):
+        owner = next(f.owner for f in files if str(Path(f.remote).parent) == directory)
+        lines.append(f"sudo -u {owner} mkdir -p {shlex.quote(directory)}")
+    for index, f in enumerate(files):
+        lines.append(f"sudo install -o {f.owner} -g {f.group} -m {f.mode} "
+                     f"\"$stage/{index}\" {shlex.quote(f.remote + '.sync-tmp')}")
+    for f in files:
+        lines.append(f"sudo mv -f {shlex.quote(f.remote + '.sync-tmp')} {shlex.quote(f.remote)}")
+    return '\n'.join(lines)
+
+
+def sync_files(session: SSHSession, files: List[SyncFile], check_only: bool = False) -> List[SyncFile]:
+    """同步文件，返回有变化（已发送）的文件列表"""
+    if not files:
+        return []
+    state = remote_state(session, files)
+    changed = [f for f in files if state.get(f.remote) != f.state()]
+    if changed and not check_only:
+        session.check(install_command(changed), "同步文件失败", stdin=build_archive(changed))
+    return changed
+
+
+def sync_host(node: str, inv: Inventory, config_dir: Path, scopes: Sequence[str],
+              control_dir: str, check_only: bool = False) -> Tuple[bool, str]:
+    """同步单个主机，返回 (是否成功, 说明)"""
+    try:
+        files = build_manifest(node, inv, config_dir, scopes)
+    except FileNotFoundError as e:
+        return False, str(e)
+    if not files:
+        return True, "无需同步"
+
+    session = SSHSession(inv.ip(node), str(inv.var(node, 'ansible_user', 'ubuntu')), control_dir)
+    try:
+        changed = sync_files(session, files, check_only)
+    except RemoteError as e:
+        return False, str(e)
+    finally:
+        session.close()
+
+    if not changed:
+        return True, f"无变化（{len(files)} 个文件）"
+    names = ', '.join(f.local.name for f in changed)
+    verb = "需要同步" if check_only else "已同步"
+    return True, f"{verb} {len(changed)}/{len(files)} 个文件: {names}"
+
+
+def show_usage():
+    print("用法: secret_sync.py [options] <node|all|node1,node2>")
+    print("")
+    print("选项:")
+    print("  -i <inventory>      inventory 文件（默认 ansible/inventory.yml）")
+    print("  --config-dir <dir>  本地配置目录（默认 chain-deploy-config）")
+    print("  --only <scope>      只同步 node 或 peggo 文件")
+    print("  --parallel <N>      最大并发主机数（默认 10）")
+    print("  --check             只比较哈希，不发送文件")
+
+
+def main():
+    args = sys.argv[1:]
+    inventory_file: Optional[str] = None
+    config_dir = DEFAULT_CONFIG_DIR
+    scopes: Sequence[str] = SCOPES
+    parallel = 10
+    check_only = False
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-i', '--inventory'):
+                inventory_file = args[i + 1]
+                i += 1
+            elif arg == '--config-dir':
+                config_dir = Path(args[i + 1])
+                i += 1
+            elif arg == '--only':
+                if args[i + 1] not in SCOPES:
+                    raise ValueError(args[i + 1])
+                scopes = (args[i + 1],)
+                i += 1
+            elif arg == '--parallel':
+                parallel = int(args[i + 1])
+                i += 1
+            elif arg == '--check':
+                check_only = True
+            elif arg.startswith('--'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"错误: 选项 {args[i]} 需要有效的参数值", file=sys.stderr)
+        sys.exit(1)
+
+    if len(positional) != 1:
+        show_usage()
+        sys.exit(1)
+
+    try:
+        inv = load_inventory(inventory_file)
+    except Exception as e:
+        print(f"错误: 无法加载 inventory: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    nodes = inv.hosts('nodes') if positional[0] == 'all' else positional[0].split(',')
+    unknown = [n for n in nodes if inv.node_type(n) is None]
+    if unknown or not nodes:
+        print(f"错误: 无效的节点名称: {', '.join(unknown) or positional[0]}", file=sys.stderr)
+        sys.exit(1)
+
+    with control_directory() as control_dir:
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+            results = list(pool.map(
+                lambda n: sync_host(n, inv, config_dir, scopes, control_dir, check_only), nodes))
+
+    failed = 0
+    for node, (ok, message) in zip(nodes, results):
+        if ok:
+            print(f"✓ {node}: {message}")
+        else:
+            failed += 1
+            print(f"✗ {node}: {message}", file=sys.stderr)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+复用 SSH 会话
+- 每个主机一条主连接（ControlMaster/ControlPersist），后续命令共用
+- ssh 命令可通过 FLEET_SSH 环境变量替换（例如 test/fleet/fake-ssh.sh）
+"""
+
+import contextlib
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+from typing import Iterator, List, Optional
+
+import tracing
+
+
+SSH_OPTIONS = [
+    "-o", "StrictHostKeyChecking=no",
+    "-o", "UserKnownHostsFile=/dev/null",
+    "-o", "LogLevel=ERROR",
+    "-o", "ConnectTimeout=10",
+]
+
+
+class RemoteError(Exception):
+    """远程命令执行失败"""
+
+
+def ssh_command() -> List[str]:
+    """ssh 可执行文件及其参数（FLEET_SSH 覆盖）"""
+    return shlex.split(os.environ.get('FLEET_SSH', 'ssh'))
+
+
+@contextlib.contextmanager
+def control_directory() -> Iterator[str]:
+    """存放 ControlPath 套接字的临时目录"""
+    path = tempfile.mkdtemp(prefix="fleet-ssh-")
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class SSHSession:
+    """
+    单个主机的复用 SSH 会话
+    首条命令建立主连接（ControlPersist 保持后台），后续命令复用该连接
+    """
+
+    def __init__(self, ip: str, user: str, control_dir: str,
+                 command: Optional[List[str]] = None):
+        self.ip = ip
+        self.target = f"{user}@{ip}"
+        self.ssh_command = command or ssh_command()
+        self.control_options = [
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={control_dir}/%C",
+            "-o", "ControlPersist=120",
+        ]
+
+    def args(self, command: str) -> List[str]:
+        """完整的 ssh 命令行（供异步/流式调用方自行启动进程）"""
+        return self.ssh_command + SSH_OPTIONS + self.control_options + [self.target, command]
+
+    def run(self, command: str, stdin: Optional[bytes] = None,
+            timeout: int = 300) -> subprocess.CompletedProcess:
+        args = self.args(command)
+        try:
+            return tracing.run(args, name="ssh", host=self.ip, input=stdin, capture_output=True,
+                               timeout=timeout, attrs={'command': command[:80]})
+        except subprocess.TimeoutExpired:
+            raise RemoteError(f"命令超时（{timeout}s）")
+
+    def check(self, command: str, error: str, **kwargs) -> str:
+        """执行命令，失败时抛出 RemoteError，返回 stdout"""
+        result = self.run(command, **kwargs)
+        if result.returncode != 0:
+            detail = result.stderr.decode(errors='replace').strip().splitlines()
+            raise RemoteError(f"{error}: {detail[-1]}" if detail else error)
+        return result.stdout.decode(errors='replace')
+
+    def close(self):
+        """关闭主连接"""
+        try:
+            subprocess.run(self.ssh_command + self.control_options + ["-O", "exit", self.target],
+                           capture_output=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
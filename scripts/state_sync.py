@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+新节点状态同步引导
+- 从提供快照的 sentry（node_config.yml 的 state_sync.snapshot_nodes）RPC 并发查询最新高度
+- trust_height = 各 RPC 共同可用的最新高度 - trust_offset，从每个 RPC 读取 /block 和 /commit，
+  区块哈希全部一致时才作为 trust_hash（防止单个节点分叉或返回错误数据）
+- 通过 apply_node_config_fast 的节点配置路径把 statesync 段写入新节点的 config.toml，
+  新节点数据目录为空时 CometBFT 从快照同步，不再从创世区块重放
+
+快照由 apply_node_config_fast 按 state_sync 段为 snapshot_nodes 设置
+state-sync.snapshot-interval / snapshot-keep-recent
+
+命令行:
+    state_sync.py [-i inventory.yml] [-c node_config.yml] trust [--rpc host:port ...] [--offset N] [--json]
+    state_sync.py [-i inventory.yml] [-c node_config.yml] bootstrap <base_dir> <node> [<node> ...]
+                  [--rpc host:port ...] [--offset N]
+
+测试：test/fleet/mock-rpc.py 提供 /status、/block、/commit，配合 --rpc 使用
+"""
+
+import asyncio
+import json
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from apply_node_config_fast import apply_node_config
+from chain_status import DEFAULT_RPC_PORT, DEFAULT_TIMEOUT, RPCClient, RPCError
+from inventory import Inventory, load_inventory
+
+
+DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "node_config.yml"
+
+# 状态同步参数默认值（可在 node_config.yml 的 state_sync 段覆盖）
+DEFAULT_OPTIONS = {
+    'snapshot_nodes': [],         # 生成快照的节点（为空时不设置快照，引导时使用所有 sentry 的 RPC）
+    'snapshot_interval': 1000,    # 快照间隔（区块）
+    'snapshot_keep_recent': 2,    # 保留的快照数
+    'trust_offset': 1000,         # trust_height = 最新高度 - trust_offset
+    'trust_period': '168h0m0s',   # 信任期，必须小于 unbonding 时间
+}
+
+# CometBFT 要求 rpc_servers 至少两个（可以重复）
+MIN_RPC_SERVERS = 2
+
+
+@dataclass
+class TrustPoint:
+    height: int
+    hash: str
+    latest_height: int
+    rpc_servers: List[str]
+    trust_period: str
+
+
+class StateSyncError(Exception):
+    """无法确定可信的高度和哈希"""
+
+
+def load_state_sync_options(node_config_file: Optional[str]) -> Dict:
+    """读取 node_config.yml 中的 state_sync 段并与默认值合并"""
+    options = dict(DEFAULT_OPTIONS)
+    if node_config_file and Path(node_config_file).exists():
+        with open(node_config_file, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        options.update(config.get('state_sync') or {})
+    return options
+
+
+def rpc_port_from_config(node_config_file: Optional[str]) -> int:
+    """从 node_config.yml 的 rpc.laddr 读取 RPC 端口"""
+    try:
+        with open(node_config_file, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        laddr = (config.get('global') or {}).get('config_toml', {}).get('rpc.laddr', '')
+        return int(laddr.rsplit(':', 1)[1])
+    except (OSError, TypeError, ValueError, IndexError, AttributeError):
+        return DEFAULT_RPC_PORT
+
+
+def rpc_endpoints(inv: Inventory, options: Dict, rpc_port: int,
+                  exclude: List[str]) -> List[Tuple[str, int]]:
+    """快照节点的 RPC 地址（排除正在引导的节点）；未指定快照节点时使用所有 sentry"""
+    names = [n for n in options.get('snapshot_nodes') or [] if inv.has_host(n)]
+    if not names:
+        names = inv.hosts('sentry')
+    return [(inv.ip(n), rpc_port) for n in names if n not in exclude]
+
+
+def parse_rpc(value: str) -> Tuple[str, int]:
+    """host:port（可带 http:// 前缀）"""
+    value = value.split('://', 1)[-1].rstrip('/')
+    host, _, port = value.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"无效的 RPC 地址: {value}（应为 host:port）")
+    return host, int(port)
+
+
+async def _latest_height(client: RPCClient) -> int:
+    status = await client.get('/status')
+    return int(status['sync_info']['latest_block_height'])
+
+
+async def _block_hash(client: RPCClient, height: int) -> Tuple[str, str]:
+    """(/block 的区块哈希, /commit 中签名的区块哈希)"""
+    block = await client.get(f'/block?height={height}')
+    commit = await client.get(f'/commit?height={height}')
+    return (block['block_id']['hash'],
+            commit['signed_header']['commit']['block_id']['hash'])
+
+
+async def find_trust_point(endpoints: List[Tuple[str, int]], offset: int, trust_period: str,
+                           timeout: float = DEFAULT_TIMEOUT) -> TrustPoint:
+    """
+    并发查询所有 RPC：取可用 RPC 中最低的最新高度减去 offset 作为 trust_height，
+    要求每个可用 RPC 的 /block 与 /commit 哈希一致、各 RPC 之间也一致
+    """
+    if not endpoints:
+        raise StateSyncError("没有可用的快照节点 RPC")
+    clients = [RPCClient(host, port, timeout) for host, port in endpoints]
+    try:
+        results = await asyncio.gather(*(_latest_height(c) for c in clients), return_exceptions=True)
+        alive = []
+        for client, result in zip(clients, results):
+            if isinstance(result, (RPCError, KeyError, TypeError, ValueError)):
+                print(f"  ⚠ {client.label}: {result}", file=sys.stderr)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                alive.append((client, result))
+        if not alive:
+            raise StateSyncError("所有快照节点 RPC 均不可用")
+
+        latest = min(height for _, height in alive)
+        height = latest - offset
+        if height < 1:
+            raise StateSyncError(f"链高度 {latest} 不足 trust_offset {offset}，请从创世区块同步")
+
+        hashes = await asyncio.gather(*(_block_hash(c, height) for c, _ in alive), return_exceptions=True)
+        seen: Dict[str, List[str]] = {}
+        servers = []
+        for (client, _), result in zip(alive, hashes):
+            if isinstance(result, (RPCError, KeyError, TypeError, ValueError)):
+                print(f"  ⚠ {client.label}: 无法读取高度 {height}: {result}", file=sys.stderr)
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            block_hash, commit_hash = result
+            if block_hash != commit_hash:
+                raise StateSyncError(f"{client.label}: 高度 {height} 的 /block 与 /commit 哈希不一致")
+            seen.setdefault(block_hash, []).append(client.label)
+            servers.append(f"http://{client.label}")
+    finally:
+        await asyncio.gather(*(c.close() for c in clients))
+
+    if not seen:
+        raise StateSyncError(f"没有 RPC 返回高度 {height} 的区块")
+    if len(seen) > 1:
+        detail = '; '.join(f"{h[:16]}…: {', '.join(labels)}" for h, labels in seen.items())
+        raise StateSyncError(f"各 RPC 在高度 {height} 的区块哈希不一致: {detail}")
+    if len(servers) < MIN_RPC_SERVERS:
+        print(f"  ⚠ 只有 {len(servers)} 个 RPC 可用，light client 无法交叉验证", file=sys.stderr)
+        servers = (servers * MIN_RPC_SERVERS)[:MIN_RPC_SERVERS]
+
+    return TrustPoint(height=height, hash=next(iter(seen)), latest_height=latest,
+                      rpc_servers=servers, trust_period=trust_period)
+
+
+def statesync_params(trust: TrustPoint) -> Dict:
+    """config.toml 的 statesync 段参数"""
+    return {
+        'statesync.enable': True,
+        'statesync.rpc_servers': ','.join(trust.rpc_servers),
+        'statesync.trust_height': trust.height,
+        'statesync.trust_hash': trust.hash,
+        'statesync.trust_period': trust.trust_period,
+    }
+
+
+def bootstrap_nodes(base_dir: Path, nodes: List[Tuple[str, str]], trust: TrustPoint) -> int:
+    """以 specific_nodes 覆盖层的形式写入各节点 config.toml，返回失败节点数"""
+    params = statesync_params(trust)
+    overlay = {'specific_nodes': {name: {'config_toml': params} for name, _ in nodes}}
+    failed = 0
+    for name, node_type in nodes:
+        node_dir = base_dir / name
+        if not (node_dir / "config" / "config.toml").is_file():
+            print(f"  ✗ {name}: 配置文件不存在: {node_dir}/config/config.toml", file=sys.stderr)
+            failed += 1
+            continue
+        missing = apply_node_config(overlay, str(node_dir), name, node_type)
+        if missing:
+            print(f"  ✗ {name}: 未找到参数 {', '.join(missing)}", file=sys.stderr)
+            failed += 1
+            continue
+        # 状态同步只在数据目录为空时执行
+        data_dir = node_dir / "data"
+        if data_dir.is_dir() and any(p.name != 'priv_validator_state.json' for p in data_dir.iterdir()):
+            print(f"  ⚠ {name}: 本地 data 目录非空，部署时需要清空数据（deploy-node.sh 默认清空）",
+                  file=sys.stderr)
+        print(f"  ✓ {name}")
+    return failed
+
+
+def show_usage():
+    print("用法: state_sync.py [-i inventory.yml] [-c node_config.yml] <command> [args] [options]")
+    print("")
+    print("命令:")
+    print("  trust                               查询可信的 trust_height / trust_hash")
+    print("  bootstrap <base_dir> <node> ...     把 statesync 段写入新节点的 config.toml")
+    print("")
+    print("选项:")
+    print("  --rpc <host:port>     快照 RPC 地址（可重复，默认使用 state_sync.snapshot_nodes）")
+    print("  --offset <N>          trust_height = 最新高度 - N（默认 state_sync.trust_offset）")
+    print("  --json                trust: 输出 JSON")
+    print("")
+    print("示例:")
+    print("  state_sync.py bootstrap chain-deploy-config sentry-2")
+    print("  state_sync.py trust --rpc 127.0.0.1:36761 --rpc 127.0.0.1:36762")
+
+
+def main():
+    args = sys.argv[1:]
+    inventory_file = None
+    config_file = str(DEFAULT_CONFIG)
+    rpcs: List[Tuple[str, int]] = []
+    offset: Optional[int] = None
+    as_json = False
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-i', '--inventory'):
+                inventory_file = args[i + 1]
+                i += 1
+            elif arg in ('-c', '--config'):
+                config_file = args[i + 1]
+                i += 1
+            elif arg == '--rpc':
+                rpcs.append(parse_rpc(args[i + 1]))
+                i += 1
+            elif arg == '--offset':
+                offset = int(args[i + 1])
+                i += 1
+            elif arg == '--json':
+                as_json = True
+            elif arg.startswith('-'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError) as e:
+        print(f"错误: 选项 {args[i]} 需要有效的参数值: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if not positional or positional[0] not in ('trust', 'bootstrap') or \
+            (positional[0] == 'bootstrap' and len(positional) < 3):
+        show_usage()
+        sys.exit(1)
+    command = positional[0]
+
+    options = load_state_sync_options(config_file)
+    if offset is None:
+        offset = int(options['trust_offset'])
+    if offset < int(options['snapshot_interval']):
+        print(f"⚠ trust_offset {offset} 小于快照间隔 {options['snapshot_interval']}，"
+              f"trust_height 可能高于最新快照", file=sys.stderr)
+
+    inv = None
+    nodes: List[Tuple[str, str]] = []
+    if command == 'bootstrap' or not rpcs:
+        try:
+            inv = load_inventory(inventory_file)
+        except Exception as e:
+            print(f"错误: 无法加载 inventory: {e}", file=sys.stderr)
+            sys.exit(1)
+    if command == 'bootstrap':
+        names = [n for arg in positional[2:] for n in arg.split(',') if n]
+        unknown = [n for n in names if inv.node_type(n) is None]
+        if unknown:
+            print(f"错误: 无效的节点名称: {', '.join(unknown)}", file=sys.stderr)
+            sys.exit(1)
+        nodes = [(n, inv.node_type(n)) for n in names]
+    if not rpcs:
+        rpcs = rpc_endpoints(inv, options, rpc_port_from_config(config_file), [n for n, _ in nodes])
+
+    try:
+        trust = asyncio.run(find_trust_point(rpcs, offset, str(options['trust_period'])))
+    except StateSyncError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if command == 'trust':
+        if as_json:
+            print(json.dumps(asdict(trust), ensure_ascii=False, indent=2))
+        else:
+            print(f"trust_height: {trust.height}（最新高度 {trust.latest_height}）")
+            print(f"trust_hash:   {trust.hash}")
+            print(f"trust_period: {trust.trust_period}")
+            print(f"rpc_servers:  {','.join(trust.rpc_servers)}")
+        return
+
+    print(f"配置状态同步: trust_height {trust.height}，trust_hash {trust.hash[:16]}…，"
+          f"RPC {len(set(trust.rpc_servers))} 个")
+    base_dir = Path(positional[1])
+    failed = bootstrap_nodes(base_dir, nodes, trust)
+    with open(base_dir / "state_sync.json", 'w', encoding='utf-8') as f:
+        json.dump({'nodes': [n for n, _ in nodes], **asdict(trust)}, f, ensure_ascii=False, indent=2)
+    if failed:
+        print(f"✗ {failed}/{len(nodes)} 个节点配置失败")
+        sys.exit(1)
+    print(f"✓ 已为 {len(nodes)} 个节点启用状态同步")
+
+
+if __name__ == "__main__":
+    main()
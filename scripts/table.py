@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+终端表格输出
+- 按显示宽度对齐（中文等全角字符占两列）
+- 字节数格式化为 B/KB/MB/GB
+"""
+
+import unicodedata
+from typing import List
+
+
+def display_width(text: str) -> int:
+    return sum(2 if unicodedata.east_asian_width(c) in ('W', 'F') else 1 for c in text)
+
+
+def pad(text: str, width: int) -> str:
+    return text + ' ' * (width - display_width(text))
+
+
+def format_bytes(n: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f"{n:.0f}{unit}" if unit == 'B' else f"{n:.1f}{unit}"
+        n /= 1024
+    return str(n)
+
+
+def print_rows(title: str, rows: List[List[str]]):
+    """输出带标题的表格，第一行为表头，按显示宽度对齐（中文字符占两列）"""
+    widths = [max(display_width(row[i]) for row in rows) for i in range(len(rows[0]))]
+    line = "━" * max(40, sum(widths) + 2 * (len(widths) - 1))
+    print("")
+    print(line)
+    print(title)
+    print(line)
+    for row in rows:
+        print("  ".join(pad(c, w) for c, w in zip(row, widths)).rstrip())
+    print(line)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+行级 TOML 补丁引擎
+一次扫描建立 段/键 -> 值位置 的索引，再一次性写回所有修改
+保留注释、空行和原有格式，只替换值本身
+"""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# 行首键名：裸键（允许 - _ . 数字字母）或带引号的键
+KEY_RE = re.compile(r'[ \t]*([A-Za-z0-9_\-\.]+|"[^"\n]*"|\'[^\'\n]*\')[ \t]*=[ \t]*')
+
+Span = Tuple[int, int]
+
+
+def _unquote(name: str) -> str:
+    """去掉键名两侧的引号"""
+    name = name.strip()
+    if len(name) >= 2 and name[0] == name[-1] and name[0] in ('"', "'"):
+        return name[1:-1]
+    return name
+
+
+def _parse_header(line: str) -> str:
+    """解析段标记 [section] / [[section]]，返回段名"""
+    body = line.strip()
+    if body.startswith('[['):
+        end = body.find(']]')
+        body = body[2:end] if end != -1 else body[2:]
+    else:
+        end = body.find(']')
+        body = body[1:end] if end != -1 else body[1:]
+    return '.'.join(_unquote(part) for part in body.split('.'))
+
+
+def _skip_comment(text: str, i: int) -> int:
+    """跳过 # 注释到行尾"""
+    end = text.find('\n', i)
+    return len(text) if end == -1 else end
+
+
+def _scan_basic_string(text: str, i: int) -> int:
+    """扫描 "..." 字符串，i 指向开引号，返回闭引号之后的位置"""
+    n = len(text)
+    i += 1
+    while i < n:
+        c = text[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '"' or c == '\n':
+            return i + 1
+        i += 1
+    return n
+
+
+def _scan_value(text: str, i: int) -> int:
+    """
+    从值的起始位置扫描到值的结束位置（不含尾随空白和注释）
+    支持多行数组、内联表、三引号字符串
+    """
+    n = len(text)
+    if i >= n:
+        return i
+
+    if text.startswith('"""', i) or text.startswith("'''", i):
+        quote = text[i:i + 3]
+        j = i + 3
+        while True:
+            end = text.find(quote, j)
+            if end == -1:
+                return n
+            if quote == '"""' and text[end - 1] == '\\' and text[end - 2] != '\\':
+                j = end + 1
+                continue
+            # 允许 """" 这种在结束处多出的引号
+            while text.startswith(quote[0], end + 3):
+                end += 1
+            return end + 3
+
+    c = text[i]
+    if c == '"':
+        return _scan_basic_string(text, i)
+    if c == "'":
+        end = text.find("'", i + 1)
+        line_end = text.find('\n', i)
+        if end == -1 or (line_end != -1 and end > line_end):
+            return line_end if line_end != -1 else n
+        return end + 1
+
+    if c in '[{':
+        depth = 0
+        j = i
+        while j < n:
+            ch = text[j]
+            if ch in '[{':
+                depth += 1
+            elif ch in ']}':
+                depth -= 1
+                if depth == 0:
+                    return j + 1
+            elif ch == '"':
+                j = _scan_basic_string(text, j)
+                continue
+            elif ch == "'":
+                end = text.find("'", j + 1)
+                j = n if end == -1 else end + 1
+                continue
+            elif ch == '#':
+                j = _skip_comment(text, j)
+                continue
+            j += 1
+        return n
+
+    # 裸值：数字、布尔、日期等，到注释或行尾为止
+    j = i
+    while j < n and text[j] not in '#\n':
+        j += 1
+    while j > i and text[j - 1] in ' \t\r':
+        j -= 1
+    return j
+
+
+def format_value(value: Any) -> str:
+    """将 Python 值格式化为 TOML 值"""
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(format_value(v) for v in value) + ']'
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+
+class TomlDocument:
+    """
+    TOML 文档索引
+    扫描一次后记录每个 (段, 键) 对应的值区间，用于批量替换
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.index: Dict[Tuple[str, str], List[Span]] = {}
+        self.by_key: Dict[str, List[Tuple[str, Span]]] = {}
+        self._scan()
+
+    @classmethod
+    def load(cls, file_path: str) -> 'TomlDocument':
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return cls(f.read())
+
+    def _scan(self):
+        text = self.text
+        n = len(text)
+        pos = 0
+        section = ''
+
+        while pos < n:
+            line_end = text.find('\n', pos)
+            if line_end == -1:
+                line_end = n
+            stripped = text[pos:line_end].lstrip()
+
+            if not stripped or stripped.startswith('#'):
+                pos = line_end + 1
+                continue
+
+            if stripped.startswith('['):
+                section = _parse_header(stripped.split('#', 1)[0])
+                pos = line_end + 1
+                continue
+
+            m = KEY_RE.match(text, pos)
+            if not m or m.end() > line_end:
+                pos = line_end + 1
+                continue
+
+            key = _unquote(m.group(1))
+            value_start = m.end()
+            value_end = _scan_value(text, value_start)
+            span = (value_start, value_end)
+            self.index.setdefault((section, key), []).append(span)
+            self.by_key.setdefault(key, []).append((section, span))
+
+            # 值可能跨越多行，从值结束位置所在行的下一行继续
+            next_line = text.find('\n', value_end)
+            pos = n if next_line == -1 else next_line + 1
+
+    def locate(self, key: str) -> List[Span]:
+        """
+        查找参数对应的值区间
+        - 优先按顶层键匹配（如 proxy_app）
+        - 带点的键按 段.参数 匹配（如 rpc.laddr、json-rpc.address）
+        - 不带点且顶层不存在时，匹配所有段中的同名键（如 timeout_commit）
+        """
+        spans = self.index.get(('', key))
+        if spans:
+            return spans
+        if '.' in key:
+            section, param = key.rsplit('.', 1)
+            return self.index.get((section, param), [])
+        return [span for _, span in self.by_key.get(key, [])]
+
+    def get(self, key: str) -> Optional[str]:
+        """返回参数的原始 TOML 值文本（第一个匹配）"""
+        spans = self.locate(key)
+        if not spans:
+            return None
+        start, end = spans[0]
+        return self.text[start:end]
+
+    def items(self) -> Iterator[Tuple[str, str, str]]:
+        """按文档顺序遍历 (段, 键, 原始值)"""
+        entries = []
+        for (section, key), spans in self.index.items():
+            for start, end in spans:
+                entries.append((start, section, key, self.text[start:end]))
+        for _, section, key, raw in sorted(entries):
+            yield section, key, raw
+
+    def patch(self, params: Dict[str, Any], raw: bool = False) -> Tuple[str, List[str]]:
+        """
+        一次性应用所有参数（raw=True 时参数值为原始 TOML 值文本，原样写入）
+        返回 (新文本, 未找到的参数列表)
+        """
+        edits: Dict[Span, str] = {}
+        missing = []
+
+        for key, value in params.items():
+            spans = self.locate(key)
+            if not spans:
+                missing.append(key)
+                continue
+            new_value = value if raw else format_value(value)
+            for span in spans:
+                edits[span] = new_value
+
+        if not edits:
+            return self.text, missing
+
+        parts = []
+        cursor = 0
+        for (start, end), new_value in sorted(edits.items()):
+            parts.append(self.text[cursor:start])
+            parts.append(new_value)
+            cursor = end
+        parts.append(self.text[cursor:])
+        return ''.join(parts), missing
+
+
+def patch_toml_text(text: str, params: Dict[str, Any]) -> Tuple[str, List[str]]:
+    """对 TOML 文本应用参数，返回 (新文本, 未找到的参数列表)"""
+    return TomlDocument(text).patch(params)
+
+
+def patch_toml_file(file_path: str, params: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    对 TOML 文件应用参数（文件不存在时返回 None）
+    仅在内容变化时写回，返回未找到的参数列表
+    """
+    path = Path(file_path)
+    if not path.exists():
+        return None
+
+    content = path.read_text(encoding='utf-8')
+    new_content, missing = patch_toml_text(content, params)
+
+    if new_content != content:
+        path.write_text(new_content, encoding='utf-8')
+
+    return missing
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+结构化计时（JSON lines span）
+设置 DEPLOY_TRACE=<文件> 后，脚本、链二进制调用、SSH 命令和 Ansible 任务都会把 span 追加到该文件：
+
+    {"id": "...", "parent": "...", "name": "gentx:validator-0", "host": "validator-0", "pid": 123,
+     "start": 1700000000.123456, "duration": 0.412, "exit": 0,
+     "bytes_in": 0, "bytes_out": 1532, "spawn": 0.0021, "source": "python", "attrs": {...}}
+
+- start 为 Unix 时间戳（秒），duration / spawn 为秒；spawn 是子进程 fork+exec 的耗时
+- 父子关系在进程内通过 contextvars 传递，跨进程通过 DEPLOY_TRACE_PARENT 环境变量传递
+  （shell 脚本见 scripts/tracing.sh，Ansible 见 ansible/callback_plugins/trace_spans.py）
+- 每个 span 一次 O_APPEND 写入，多进程同时写同一文件不会交错
+- 未设置 DEPLOY_TRACE 时 span() / run() 不做任何记录
+
+命令行:
+    tracing.py report <trace.jsonl> [--top N]            最慢的 span、按名称和主机汇总
+    tracing.py folded <trace.jsonl> [-o out.folded] [--by-host]
+                                                         火焰图折叠栈（自身耗时，单位微秒），
+                                                         可用 flamegraph.pl / speedscope 打开
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from table import format_bytes, print_rows
+
+
+TRACE_ENV = "DEPLOY_TRACE"
+PARENT_ENV = "DEPLOY_TRACE_PARENT"
+LOCAL_HOST = "local"
+
+_current: contextvars.ContextVar = contextvars.ContextVar('trace_span', default=None)
+
+
+def enabled() -> bool:
+    return bool(os.environ.get(TRACE_ENV))
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_parent() -> Optional[str]:
+    """当前 span id（进程内没有时使用环境变量传入的父 span）"""
+    current = _current.get()
+    return current.id if current else os.environ.get(PARENT_ENV) or None
+
+
+def emit(record: Dict):
+    """追加一条 span（单次 write，O_APPEND）"""
+    path = os.environ.get(TRACE_ENV)
+    if not path:
+        return
+    line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError:
+        # 计时不影响业务流程
+        pass
+
+
+class Span:
+    def __init__(self, name: str, host: Optional[str] = None, parent: Optional[str] = None, **attrs):
+        self.id = new_id()
+        self.parent = parent or current_parent()
+        self.name = name
+        # 未指定主机时沿用进程内父 span 的主机（节点任务中的链二进制调用归到该节点）
+        current = _current.get()
+        self.host = host or (current.host if current else LOCAL_HOST)
+        self.exit: Optional[int] = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.spawn: Optional[float] = None
+        self.attrs = {k: v for k, v in attrs.items() if v is not None}
+        self.start = 0.0
+
+    def set(self, **attrs):
+        for key, value in attrs.items():
+            if key in ('exit', 'bytes_in', 'bytes_out', 'spawn'):
+                setattr(self, key, value)
+            else:
+                self.attrs[key] = value
+
+    def record(self, duration: float) -> Dict:
+        record = {
+            'id': self.id, 'parent': self.parent, 'name': self.name, 'host': self.host,
+            'pid': os.getpid(), 'start': round(self.start, 6), 'duration': round(duration, 6),
+            'exit': self.exit, 'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out,
+            'source': 'python',
+        }
+        if self.spawn is not None:
+            record['spawn'] = round(self.spawn, 6)
+        if self.attrs:
+            record['attrs'] = self.attrs
+        return record
+
+
+@contextlib.contextmanager
+def span(name: str, host: Optional[str] = None, parent: Optional[str] = None, **attrs) -> Iterator[Span]:
+    """
+    记录一个 span；异常时 exit 记为 1（SystemExit 记为其退出码）
+    未启用时仍返回 Span 对象，调用方无需判断
+    """
+    current = Span(name, host, parent, **attrs)
+    if not enabled():
+        yield current
+        return
+
+    token = _current.set(current)
+    current.start = time.time()
+    clock = time.perf_counter()
+    try:
+        yield current
+        if current.exit is None:
+            current.exit = 0
+    except SystemExit as e:
+        current.exit = e.code if isinstance(e.code, int) else 1
+        raise
+    except BaseException:
+        current.exit = 1
+        raise
+    finally:
+        _current.reset(token)
+        emit(current.record(time.perf_counter() - clock))
+
+
+def _size(data) -> int:
+    if data is None:
+        return 0
+    return len(data.encode('utf-8', errors='replace')) if isinstance(data, str) else len(data)
+
+
+def run(args: List[str], name: Optional[str] = None, host: Optional[str] = None, input=None,
+        timeout: Optional[float] = None, check: bool = False, attrs: Optional[Dict] = None,
+        **kwargs) -> subprocess.CompletedProcess:
+    """
+    与 subprocess.run 相同，启用时额外记录 span：
+    spawn（Popen 返回即 exec 完成）、退出码、输入/输出字节数；子进程通过环境变量继承父 span
+    attrs 默认记录前两个参数（子命令）
+    """
+    if not enabled():
+        return subprocess.run(args, input=input, timeout=timeout, check=check, **kwargs)
+
+    if kwargs.pop('capture_output', False):
+        kwargs['stdout'] = kwargs['stderr'] = subprocess.PIPE
+    if input is not None:
+        kwargs['stdin'] = subprocess.PIPE
+
+    if attrs is None:
+        attrs = {'argv': ' '.join(str(a) for a in args[1:3])}
+    with span(name or Path(str(args[0])).name, host, **attrs) as sp:
+        env = dict(kwargs.pop('env', None) or os.environ)
+        env[PARENT_ENV] = sp.id
+        clock = time.perf_counter()
+        with subprocess.Popen(args, env=env, **kwargs) as process:
+            sp.spawn = time.perf_counter() - clock
+            try:
+                stdout, stderr = process.communicate(input, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                sp.set(exit=-9, timeout=timeout)
+                raise
+            except BaseException:
+                process.kill()
+                raise
+            retcode = process.poll()
+        sp.set(exit=retcode, bytes_in=_size(input), bytes_out=_size(stdout) + _size(stderr))
+
+    if check and retcode:
+        raise subprocess.CalledProcessError(retcode, args, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(args, retcode, stdout, stderr)
+
+
+# ---------- 分析 ----------
+
+def load_spans(path: str) -> List[Dict]:
+    spans = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"⚠ 第 {number} 行不是有效的 JSON，已跳过", file=sys.stderr)
+                continue
+            if record.get('id') and record.get('name'):
+                spans.append(record)
+    return spans
+
+
+def build_tree(spans: List[Dict]) -> Dict[Optional[str], List[Dict]]:
+    """父 span id -> 子 span；父 span 不在文件中时视为根"""
+    ids = {s['id'] for s in spans}
+    children: Dict[Optional[str], List[Dict]] = {}
+    for s in spans:
+        parent = s.get('parent') if s.get('parent') in ids else None
+        children.setdefault(parent, []).append(s)
+    return children
+
+
+def self_time(s: Dict, children: Dict[Optional[str], List[Dict]]) -> float:
+    """span 自身耗时（扣除子 span；并行的子 span 合计可能超过父 span，此时记为 0）"""
+    return max(0.0, s['duration'] - sum(c['duration'] for c in children.get(s['id'], [])))
+
+
+def folded_stacks(spans: List[Dict], by_host: bool = False) -> Dict[str, int]:
+    """火焰图折叠栈：根到 span 的名称路径 -> 自身耗时（微秒）"""
+    children = build_tree(spans)
+    stacks: Dict[str, int] = {}
+
+    def frame(s: Dict) -> str:
+        name = s['name'].replace(';', ':').replace('\n', ' ')
+        if by_host and s.get('host') and s['host'] != LOCAL_HOST:
+            name = f"{name} [{s['host']}]"
+        return name
+
+    def visit(s: Dict, prefix: str):
+        path = f"{prefix};{frame(s)}" if prefix else frame(s)
+        micros = int(round(self_time(s, children) * 1e6))
+        if micros > 0:
+            stacks[path] = stacks.get(path, 0) + micros
+        for child in children.get(s['id'], []):
+            visit(child, path)
+
+    for root in children.get(None, []):
+        visit(root, "")
+    return stacks
+
+
+def report(spans: List[Dict], top: int = 20):
+    """最慢的 span、按名称和主机汇总"""
+    origin = min(s['start'] for s in spans)
+    wall = max(s['start'] + s['duration'] for s in spans) - origin
+    children = build_tree(spans)
+
+    rows = [["名称", "主机", "开始(+s)", "耗时(s)", "自身(s)", "退出码", "字节"]]
+    for s in sorted(spans, key=lambda s: -s['duration'])[:top]:
+        moved = (s.get('bytes_in') or 0) + (s.get('bytes_out') or 0)
+        rows.append([s['name'], s.get('host') or '-', f"{s['start'] - origin:.2f}", f"{s['duration']:.3f}",
+                     f"{self_time(s, children):.3f}", '-' if s.get('exit') is None else str(s['exit']),
+                     format_bytes(moved) if moved else '-'])
+    print_rows(f"最慢的 {len(rows) - 1} 个 span", rows)
+
+    by_name: Dict[str, List[Dict]] = {}
+    for s in spans:
+        by_name.setdefault(s['name'], []).append(s)
+    rows = [["名称", "次数", "合计(s)", "自身合计(s)", "平均(s)", "最大(s)", "失败"]]
+    ranked = sorted(by_name.items(), key=lambda kv: -sum(self_time(s, children) for s in kv[1]))
+    for name, items in ranked[:top]:
+        total = sum(s['duration'] for s in items)
+        rows.append([name, str(len(items)), f"{total:.2f}",
+                     f"{sum(self_time(s, children) for s in items):.2f}", f"{total / len(items):.3f}",
+                     f"{max(s['duration'] for s in items):.3f}",
+                     str(sum(1 for s in items if s.get('exit') not in (None, 0)))])
+    print_rows("按名称汇总（按自身耗时排序）", rows)
+
+    hosts: Dict[str, List[Dict]] = {}
+    for s in spans:
+        hosts.setdefault(s.get('host') or LOCAL_HOST, []).append(s)
+    if len(hosts) > 1:
+        rows = [["主机", "span 数", "自身合计(s)", "字节"]]
+        ranked = sorted(hosts.items(), key=lambda kv: -sum(self_time(s, children) for s in kv[1]))
+        for host, items in ranked[:top]:
+            moved = sum((s.get('bytes_in') or 0) + (s.get('bytes_out') or 0) for s in items)
+            rows.append([host, str(len(items)), f"{sum(self_time(s, children) for s in items):.2f}",
+                         format_bytes(moved) if moved else '-'])
+        print_rows("按主机汇总", rows)
+
+    spawned = [s for s in spans if s.get('spawn') is not None]
+    failed = sum(1 for s in spans if s.get('exit') not in (None, 0))
+    print(f"共 {len(spans)} 个 span，墙钟 {wall:.2f}s，失败 {failed} 个")
+    if spawned:
+        total = sum(s['spawn'] for s in spawned)
+        print(f"子进程 {len(spawned)} 次，启动耗时合计 {total:.3f}s（平均 {total / len(spawned) * 1000:.1f}ms）")
+
+
+def show_usage():
+    print("用法: tracing.py report <trace.jsonl> [--top N]")
+    print("      tracing.py folded <trace.jsonl> [-o out.folded] [--by-host]")
+    print("")
+    print("记录: DEPLOY_TRACE=build/trace.jsonl ./generate_config.sh")
+    print("      DEPLOY_TRACE=build/trace.jsonl ./node-control.sh restart node all")
+    print("")
+    print("示例:")
+    print("  tracing.py report build/trace.jsonl --top 10")
+    print("  tracing.py folded build/trace.jsonl -o build/trace.folded && flamegraph.pl build/trace.folded > trace.svg")
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ('report', 'folded'):
+        show_usage()
+        sys.exit(0 if args[:1] in (['-h'], ['--help']) else 1)
+
+    command, path, rest = args[0], args[1], args[2:]
+    top = 20
+    output = None
+    by_host = False
+    i = 0
+    try:
+        while i < len(rest):
+            if rest[i] == '--top':
+                top = int(rest[i + 1])
+                i += 1
+            elif rest[i] in ('-o', '--output'):
+                output = rest[i + 1]
+                i += 1
+            elif rest[i] == '--by-host':
+                by_host = True
+            else:
+                print(f"未知参数: {rest[i]}", file=sys.stderr)
+                sys.exit(1)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"参数错误: {' '.join(rest[i:i + 2])}", file=sys.stderr)
+        sys.exit(1)
+
+    if not Path(path).exists():
+        print(f"错误: 文件不存在: {path}", file=sys.stderr)
+        sys.exit(1)
+    spans = load_spans(path)
+    if not spans:
+        print("trace 文件中没有 span", file=sys.stderr)
+        sys.exit(1)
+
+    if command == 'report':
+        report(spans, top)
+        return
+
+    lines = [f"{stack} {micros}" for stack, micros in sorted(folded_stacks(spans, by_host).items())]
+    content = "\n".join(lines) + "\n"
+    if output:
+        Path(output).write_text(content, encoding='utf-8')
+        print(f"✓ 已写入 {len(lines)} 条折叠栈: {output}")
+    else:
+        sys.stdout.write(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/bin/bash
+# 结构化计时（shell 端），与 scripts/tracing.py 写入相同格式的 JSON lines span
+#
+# 用法（在脚本中 source 后）：
+#   trace_span [-H <主机>] <名称> <命令或函数> [参数...]
+#
+# - 设置 DEPLOY_TRACE=<文件> 时记录 span，未设置时直接执行命令
+# - 命令在当前 shell 中执行（函数对变量的修改保留），退出码原样返回
+# - 子进程通过 DEPLOY_TRACE_PARENT 继承父 span（Python 脚本、Ansible 回调插件会读取）
+# - set -e 导致脚本中途退出时，EXIT trap 以退出码补记所有未结束的 span
+
+_TRACE_STACK=()
+
+# 当前时间（微秒）
+_trace_now() {
+    if [ -n "$EPOCHREALTIME" ]; then
+        local now="${EPOCHREALTIME/,/.}"
+        _TRACE_NOW="${now/./}"
+    else
+        # bash < 5：秒级精度
+        _TRACE_NOW="$(date +%s)000000"
+    fi
+}
+
+# _trace_emit <id> <parent> <name> <host> <start_us> <exit>
+_trace_emit() {
+    _trace_now
+    local duration=$((_TRACE_NOW - $5))
+    local parent="null"
+    [ -n "$2" ] && parent="\"$2\""
+    printf '{"id":"%s","parent":%s,"name":"%s","host":"%s","pid":%d,"start":%d.%06d,"duration":%d.%06d,"exit":%d,"bytes_in":0,"bytes_out":0,"source":"bash"}\n' \
+        "$1" "$parent" "${3//\"/}" "${4//\"/}" "$$" $(($5 / 1000000)) $(($5 % 1000000)) \
+        $((duration / 1000000)) $((duration % 1000000)) "$6" >> "$DEPLOY_TRACE"
+}
+
+# 脚本退出时补记未结束的 span（从内到外）
+_trace_exit() {
+    local rc=$?
+    local i entry id parent name host start
+    for ((i = ${#_TRACE_STACK[@]} - 1; i >= 0; i--)); do
+        entry="${_TRACE_STACK[$i]}"
+        IFS='|' read -r id parent name host start <<< "$entry"
+        _trace_emit "$id" "$parent" "$name" "$host" "$start" "$rc"
+    done
+    _TRACE_STACK=()
+}
+
+trace_span() {
+    # 局部变量加前缀：bash 动态作用域下，被调用的函数会看到并可能修改同名变量（如 for name in ...）
+    local _ts_host="local"
+    if [ "$1" == "-H" ]; then
+        _ts_host="${2:-local}"
+        shift 2
+    fi
+    local _ts_name="$1"
+    shift
+
+    if [ -z "$DEPLOY_TRACE" ]; then
+        "$@"
+        return
+    fi
+
+    local _ts_id _ts_parent="${DEPLOY_TRACE_PARENT:-}" _ts_start _ts_rc
+    printf -v _ts_id '%04x%04x%04x%04x' $RANDOM $RANDOM $RANDOM $RANDOM
+    _trace_now
+    _ts_start=$_TRACE_NOW
+    if [ ${#_TRACE_STACK[@]} -eq 0 ]; then
+        trap _trace_exit EXIT
+    fi
+    _TRACE_STACK+=("$_ts_id|$_ts_parent|$_ts_name|$_ts_host|$_ts_start")
+
+    export DEPLOY_TRACE_PARENT="$_ts_id"
+    "$@"
+    _ts_rc=$?
+    DEPLOY_TRACE_PARENT="$_ts_parent"
+
+    unset "_TRACE_STACK[${#_TRACE_STACK[@]}-1]"
+    _trace_emit "$_ts_id" "$_ts_parent" "$_ts_name" "$_ts_host" "$_ts_start" "$_ts_rc"
+    return $_ts_rc
+}
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+树形二进制文件分发
+- 控制机只把文件上传到少数种子主机（--seeds），其余主机按扇出树（--fanout）
+  从已完成的上级主机经内网拉取，控制机上行带宽不再随主机数增长
+- 每个主机在激活前校验 SHA-256，校验失败的暂存文件立即删除，不会继续向下游分发
+- 上级主机失败时，下游主机改从最近的成功祖先（或控制机）拉取
+- 目标文件哈希已一致的主机不参与分发
+- 输出每个主机的来源、层级和传输耗时
+
+文件规格: <本地文件>:<远程路径>[:权限]，远程路径中的 {变量} 按主机的 inventory 变量展开，例如
+    build/bin/biyachaind:{node_home_base}/cosmovisor/genesis/bin/biyachaind:755
+
+主机之间的拉取通过 ssh 完成（控制机会话开启 agent 转发），需要各主机之间可以互相登录；
+SSH 命令可通过 FLEET_SSH 环境变量替换（例如 test/fleet/fake-ssh.sh），便于本地测试
+"""
+
+import shlex
+import subprocess
+import sys
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from artifact_store import file_sha256
+from inventory import Inventory, load_inventory
+from ssh_session import RemoteError, SSHSession, control_directory, ssh_command
+from table import display_width, pad
+
+
+# 远程暂存目录：文件以 SHA-256 命名，供下游主机拉取
+STAGE_DIR = "/tmp/biyachain-dist"
+CONTROL = "控制机"
+
+PEER_SSH = ("ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null "
+            "-o LogLevel=ERROR -o BatchMode=yes -o ConnectTimeout=10")
+
+_print_lock = threading.Lock()
+
+
+def log(node: str, message: str):
+    """带节点前缀的线程安全输出"""
+    with _print_lock:
+        print(f"  [{node}] {message}", flush=True)
+
+
+@dataclass
+class Artifact:
+    local: Path
+    remote: str
+    mode: str
+    sha256: str = ''
+
+    @property
+    def name(self) -> str:
+        return self.local.name
+
+    @property
+    def size(self) -> int:
+        return self.local.stat().st_size
+
+
+@dataclass
+class HostResult:
+    node: str
+    ip: str
+    ok: bool = True
+    source: str = ''
+    depth: int = 0
+    changed: int = 0
+    elapsed: float = 0.0
+    message: str = ''
+    skipped: bool = False
+
+
+def parse_spec(spec: str) -> Artifact:
+    """解析 <本地文件>:<远程路径>[:权限]"""
+    parts = spec.split(':')
+    if len(parts) not in (2, 3) or not parts[0] or not parts[1]:
+        raise ValueError(f"无效的文件规格: {spec}")
+    local = Path(parts[0])
+    if not local.is_file():
+        raise ValueError(f"文件不存在: {local}")
+    return Artifact(local=local, remote=parts[1], mode=parts[2] if len(parts) == 3 else '755',
+                    sha256=file_sha256(local))
+
+
+def plan_tree(nodes: List[str], seeds: int, fanout: int) -> Dict[str, Optional[str]]:
+    """
+    生成分发树，返回 {主机: 上级主机}（None 表示由控制机上传）
+    前 seeds 个主机为种子，其余主机按广度优先依次挂到已有主机下，每个主机最多 fanout 个下游
+    """
+    seeds = max(1, seeds)
+    fanout = max(1, fanout)
+    parents: Dict[str, Optional[str]] = {}
+    for i, node in enumerate(nodes):
+        parents[node] = None if i < seeds else nodes[(i - seeds) // fanout]
+    return parents
+
+
+def tree_depth(parents: Dict[str, Optional[str]], node: str) -> int:
+    depth = 1
+    while parents[node] is not None:
+        node = parents[node]
+        depth += 1
+    return depth
+
+
+class Distributor:
+    """按分发树执行传输"""
+
+    def __init__(self, inv: Inventory, artifacts: List[Artifact], control_dir: str,
+                 peer_ssh: str = PEER_SSH, keep_stage: bool = False):
+        self.inv = inv
+        self.artifacts = artifacts
+        self.control_dir = control_dir
+        self.peer_ssh = peer_ssh
+        self.keep_stage = keep_stage
+        self.command = ssh_command() + ["-A"]
+        self.sessions: Dict[str, SSHSession] = {}
+
+    def session(self, node: str) -> SSHSession:
+        if node not in self.sessions:
+            self.sessions[node] = SSHSession(
+                self.inv.ip(node), str(self.inv.var(node, 'ansible_user', 'ubuntu')),
+                self.control_dir, command=self.command)
+        return self.sessions[node]
+
+    def close(self):
+        for session in self.sessions.values():
+            session.close()
+
+    def remote_path(self, node: str, artifact: Artifact) -> str:
+        return artifact.remote.format_map(self.inv.host_vars(node))
+
+    # ---------- 远程状态 ----------
+
+    def pending(self, node: str) -> List[Artifact]:
+        """一次往返读取目标文件哈希，返回需要更新的文件"""
+        paths = ' '.join(shlex.quote(self.remote_path(node, a)) for a in self.artifacts)
+        output = self.session(node).check(
+            f"for f in {paths}; do "
+            f"if sudo test -f \"$f\"; then sudo sha256sum \"$f\" | cut -d' ' -f1; "
+            f"else echo -; fi; done",
+            "读取远程文件哈希失败")
+        lines = output.strip().splitlines()
+        return [a for i, a in enumerate(self.artifacts)
+                if (lines[i].strip() if i < len(lines) else '-') != a.sha256]
+
+    # ---------- 传输 ----------
+
+    def upload(self, node: str):
+        """控制机 -> 种子主机：单个 tar 流上传到暂存目录"""
+        session = self.session(node)
+        command = f"set -e; mkdir -p {STAGE_DIR}; tar -xf - -C {STAGE_DIR}"
+        process = subprocess.Popen(session.args(command), stdin=subprocess.PIPE,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            with tarfile.open(fileobj=process.stdin, mode='w|') as tar:
+                for a in self.artifacts:
+                    tar.add(str(a.local), arcname=a.sha256)
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        stderr = process.stderr.read().decode(errors='replace').strip()
+        if process.wait() != 0:
+            detail = stderr.splitlines()
+            raise RemoteError(f"上传失败: {detail[-1]}" if detail else "上传失败")
+
+    def pull(self, node: str, parent: str):
+        """上级主机 -> 当前主机：当前主机通过 ssh 从上级主机的暂存目录拉取 tar 流"""
+        parent_user = str(self.inv.var(parent, 'ansible_user', 'ubuntu'))
+        parent_addr = str(self.inv.var(parent, 'private_ip', '') or self.inv.ip(parent))
+        names = ' '.join(a.sha256 for a in self.artifacts)
+        remote = shlex.quote(f"tar -cf - -C {STAGE_DIR} {names}")
+        self.session(node).check(
+            f"set -e -o pipefail; mkdir -p {STAGE_DIR}; "
+            f"{self.peer_ssh} {parent_user}@{parent_addr} {remote} | tar -xf - -C {STAGE_DIR}",
+            f"从 {parent} 拉取失败")
+
+    def activate(self, node: str, changed: List[Artifact]):
+        """校验暂存文件的 SHA-256，全部通过后原子替换目标文件；校验失败时删除暂存文件"""
+        owner = str(self.inv.var(node, 'deploy_user', 'ubuntu'))
+        group = str(self.inv.var(node, 'deploy_group', owner))
+        lines = ["set -e"]
+        for a in self.artifacts:
+            staged = f"{STAGE_DIR}/{a.sha256}"
+            lines.append(f"if [ \"$(sha256sum {staged} | cut -d' ' -f1)\" != {a.sha256} ]; then "
+                         f"rm -f {staged}; echo '校验失败: {a.name}' >&2; exit 1; fi")
+        for a in changed:
+            target = self.remote_path(node, a)
+            tmp = shlex.quote(target + '.dist-tmp')
+            lines.append(f"sudo mkdir -p {shlex.quote(str(Path(target).parent))}")
+            lines.append(f"sudo install -o {owner} -g {group} -m {a.mode} "
+                         f"{STAGE_DIR}/{a.sha256} {tmp}")
+        for a in changed:
+            target = self.remote_path(node, a)
+            lines.append(f"sudo mv -f {shlex.quote(target + '.dist-tmp')} {shlex.quote(target)}")
+        self.session(node).check('\n'.join(lines), "校验或安装失败")
+
+    def cleanup(self, node: str):
+        if not self.keep_stage:
+            self.session(node).run(f"rm -rf {STAGE_DIR}", timeout=30)
+
+    def transfer(self, node: str, source: Optional[str], changed: List[Artifact]):
+        if source is None:
+            self.upload(node)
+        else:
+            self.pull(node, source)
+        self.activate(node, changed)
+
+
+def distribute(nodes: List[str], inv: Inventory, artifacts: List[Artifact],
+               seeds: int = 2, fanout: int = 3, parallel: int = 20,
+               peer_ssh: str = PEER_SSH, keep_stage: bool = False) -> List[HostResult]:
+    """按分发树分发文件，返回每个主机的结果（与 nodes 顺序一致）"""
+    results: Dict[str, HostResult] = {n: HostResult(node=n, ip=inv.ip(n)) for n in nodes}
+
+    with control_directory() as control_dir:
+        dist = Distributor(inv, artifacts, control_dir, peer_ssh, keep_stage)
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+                pending: Dict[str, List[Artifact]] = {}
+
+                def check(node: str):
+                    try:
+                        pending[node] = dist.pending(node)
+                    except RemoteError as e:
+                        results[node].ok = False
+                        results[node].message = str(e)
+
+                list(pool.map(check, nodes))
+                targets = [n for n in nodes if pending.get(n)]
+                for node in nodes:
+                    if node in pending and not pending[node]:
+                        results[node].skipped = True
+                        results[node].message = f"无变化（{len(artifacts)} 个文件）"
+
+                parents = plan_tree(targets, seeds, fanout)
+                children: Dict[str, List[str]] = {n: [] for n in targets}
+                for node, parent in parents.items():
+                    if parent is not None:
+                        children[parent].append(node)
+
+                remaining = len(targets)
+                all_done = threading.Event()
+                lock = threading.Lock()
+                if not targets:
+                    all_done.set()
+
+                def run(node: str, source: Optional[str]):
+                    nonlocal remaining
+                    r = results[node]
+                    r.source = source or CONTROL
+                    r.depth = tree_depth(parents, node)
+                    started = time.monotonic()
+                    try:
+                        dist.transfer(node, source, pending[node])
+                        r.changed = len(pending[node])
+                        r.message = f"已更新 {r.changed}/{len(artifacts)} 个文件"
+                        log(node, f"✓ 来自 {r.source}（{time.monotonic() - started:.1f}s）")
+                    except (RemoteError, OSError) as e:
+                        r.ok = False
+                        r.message = str(e)
+                        log(node, f"✗ {e}")
+                    r.elapsed = time.monotonic() - started
+                    # 下游主机从最近的成功祖先拉取
+                    next_source = node if r.ok else source
+                    for child in children[node]:
+                        pool.submit(run, child, next_source)
+                    with lock:
+                        remaining -= 1
+                        if remaining == 0:
+                            all_done.set()
+
+                for node in targets:
+                    if parents[node] is None:
+                        pool.submit(run, node, None)
+                all_done.wait()
+
+                list(pool.map(dist.cleanup, targets))
+        finally:
+            dist.close()
+
+    return [results[n] for n in nodes]
+
+
+def print_results(results: List[HostResult], artifacts: List[Artifact], total: float):
+    """打印每个主机的来源和传输耗时"""
+    headers = ["节点", "IP", "结果", "来源", "层级", "耗时", "说明"]
+    rows = []
+    for r in results:
+        if r.skipped:
+            rows.append([r.node, r.ip, "跳过", "", "", "", r.message])
+            continue
+        outcome = "✓ 成功" if r.ok else "✗ 失败"
+        depth = str(r.depth) if r.depth else ""
+        elapsed = f"{r.elapsed:.1f}s" if r.source else ""
+        rows.append([r.node, r.ip, outcome, r.source, depth, elapsed, r.message])
+
+    widths = [max(display_width(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    line = "━" * (sum(widths) + 2 * (len(widths) - 1))
+
+    size = sum(a.size for a in artifacts)
+    uploads = sum(1 for r in results if r.source == CONTROL)
+    print("")
+    print(line)
+    print(f"分发文件: {', '.join(a.name for a in artifacts)}（{size / 1024 / 1024:.1f} MiB）")
+    print(line)
+    print("  ".join(pad(h, w) for h, w in zip(headers, widths)).rstrip())
+    for row in rows:
+        print("  ".join(pad(c, w) for c, w in zip(row, widths)).rstrip())
+    print(line)
+
+    success = sum(1 for r in results if r.ok and not r.skipped)
+    failed = sum(1 for r in results if not r.ok)
+    skipped = sum(1 for r in results if r.skipped)
+    print(f"分发完成: 成功 {success}, 失败 {failed}, 无变化 {skipped}, "
+          f"控制机上传 {uploads} 次, 总耗时 {total:.1f}s")
+    print(line)
+
+
+def show_usage():
+    print("用法: tree_distribute.py [options] <node|all|node1,node2> <本地文件>:<远程路径>[:权限] ...")
+    print("")
+    print("选项:")
+    print("  -i <inventory>      inventory 文件（默认 ansible/inventory.yml）")
+    print("  --seeds <N>         控制机直接上传的种子主机数（默认 2）")
+    print("  --fanout <N>        每个主机最多向多少个下游主机分发（默认 3）")
+    print("  --parallel <N>      最大并发传输数（默认 20）")
+    print("  --peer-ssh <cmd>    主机之间拉取使用的 ssh 命令")
+    print("  --keep-stage        保留远程暂存目录 " + STAGE_DIR)
+    print("  --plan              只显示分发树，不传输")
+    print("")
+    print("示例:")
+    print("  tree_distribute.py all 'build/bin/biyachaind:{node_home_base}/cosmovisor/genesis/bin/biyachaind:755'")
+    print("")
+    print("环境变量:")
+    print("  FLEET_SSH           替换 ssh 命令（如 test/fleet/fake-ssh.sh）")
+
+
+def main():
+    args = sys.argv[1:]
+    inventory_file: Optional[str] = None
+    seeds, fanout, parallel = 2, 3, 20
+    peer_ssh = PEER_SSH
+    keep_stage = False
+    plan_only = False
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-i', '--inventory'):
+                inventory_file = args[i + 1]
+                i += 1
+            elif arg == '--seeds':
+                seeds = int(args[i + 1])
+                i += 1
+            elif arg == '--fanout':
+                fanout = int(args[i + 1])
+                i += 1
+            elif arg == '--parallel':
+                parallel = int(args[i + 1])
+                i += 1
+            elif arg == '--peer-ssh':
+                peer_ssh = args[i + 1]
+                i += 1
+            elif arg == '--keep-stage':
+                keep_stage = True
+            elif arg == '--plan':
+                plan_only = True
+            elif arg.startswith('--'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"错误: 选项 {args[i]} 需要有效的参数值", file=sys.stderr)
+        sys.exit(1)
+
+    if len(positional) < 2:
+        show_usage()
+        sys.exit(1)
+
+    try:
+        inv = load_inventory(inventory_file)
+    except Exception as e:
+        print(f"错误: 无法加载 inventory: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    nodes = inv.hosts('nodes') if positional[0] == 'all' else positional[0].split(',')
+    unknown = [n for n in nodes if inv.node_type(n) is None]
+    if unknown or not nodes:
+        print(f"错误: 无效的节点名称: {', '.join(unknown) or positional[0]}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        artifacts = [parse_spec(spec) for spec in positional[1:]]
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if plan_only:
+        parents = plan_tree(nodes, seeds, fanout)
+        for node in nodes:
+            print(f"{node}  层级 {tree_depth(parents, node)}  来源 {parents[node] or CONTROL}")
+        return
+
+    print(f"分发 {len(artifacts)} 个文件到 {len(nodes)} 个节点"
+          f"（种子 {seeds}，扇出 {fanout}）", flush=True)
+    started = time.monotonic()
+    results = distribute(nodes, inv, artifacts, seeds, fanout, parallel, peer_ssh, keep_stage)
+    print_results(results, artifacts, time.monotonic() - started)
+
+    sys.exit(0 if all(r.ok for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
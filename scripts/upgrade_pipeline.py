@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Cosmovisor 升级流水线
+- stage:  在升级高度之前把 biyachaind 和 WASM 库树形分发到各节点的
+          cosmovisor/upgrades/<name>/bin（见 tree_distribute.py），然后执行 check；
+          任一主机（包括 sentry）分发失败或未就绪时退出码非 0，报告的 pending 列出这些主机
+- check:  各主机并发校验 SHA-256 并执行 `biyachaind version`，输出就绪报告；
+          任一 validator 未就绪时退出码非 0（提交升级提案前的门禁），
+          --strict 时任一主机未就绪即非 0（sentry 没有新二进制会在升级高度停止同步）
+- watch:  升级高度到达后轮询各节点 RPC，记录每个节点从停止（高度 H-1 出块）
+          到恢复出块（高度 >= H）的耗时，以及链上 H-1 与 H 两个区块的时间差
+
+升级高度的停机时间因此只包含 cosmovisor 切换二进制文件的时间，不包含下载和复制时间
+
+命令行:
+    upgrade_pipeline.py stage <name> <bin_dir> [node|all|node1,node2] [--seeds N] [--fanout N]
+    upgrade_pipeline.py check <name> <bin_dir> [node|all|node1,node2] [--height H] [--strict] [--json]
+                              [--report <file>]
+    upgrade_pipeline.py watch <name> --height H [node|all|node1,node2] [--endpoint name=host:port ...]
+                              [--ssh-tunnel] [--interval 1] [--timeout 900] [--json]
+"""
+
+import asyncio
+import json
+import shlex
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from artifact_store import file_sha256
+from chain_status import (DEFAULT_RPC_PORT, DEFAULT_TIMEOUT, RPCError, StatusEngine,
+                          parse_endpoint, parse_time)
+from fleet_control import RPC_STATUS_URL
+from inventory import Inventory, load_inventory
+from ssh_session import RemoteError, SSHSession, control_directory
+from table import display_width, pad
+from tree_distribute import Artifact, distribute, print_results
+
+
+BINARY = "biyachaind"
+WASM_LIB = "libwasmvm.x86_64.so"
+UPGRADE_FILES = ((BINARY, '755'), (WASM_LIB, '644'))
+
+
+def upgrade_bin_dir(name: str) -> str:
+    """远程升级目录（{node_home_base} 按主机变量展开）"""
+    return f"{{node_home_base}}/cosmovisor/upgrades/{name}/bin"
+
+
+def local_artifacts(name: str, bin_dir: Path) -> List[Artifact]:
+    """本地升级文件；缺失时抛出 FileNotFoundError"""
+    artifacts = []
+    for filename, mode in UPGRADE_FILES:
+        local = bin_dir / filename
+        if not local.is_file():
+            raise FileNotFoundError(f"文件不存在: {local}")
+        artifacts.append(Artifact(local=local, remote=f"{upgrade_bin_dir(name)}/{filename}",
+                                  mode=mode, sha256=file_sha256(local)))
+    return artifacts
+
+
+# ---------- 就绪检查 ----------
+
+@dataclass
+class Readiness:
+    node: str
+    ip: str
+    role: str
+    ready: bool = False
+    binary: str = ''
+    wasm: str = ''
+    version: str = ''
+    height: Optional[int] = None
+    message: str = ''
+
+
+def check_command(remote_dir: str) -> str:
+    """一次往返：两个文件的哈希、biyachaind version 的结果、当前区块高度"""
+    d = shlex.quote(remote_dir)
+    return (f"for f in {d}/{BINARY} {d}/{WASM_LIB}; do "
+            f"if sudo test -f \"$f\"; then sudo sha256sum \"$f\" | cut -d' ' -f1; else echo -; fi; done; "
+            f"out=$(env LD_LIBRARY_PATH={d} {d}/{BINARY} version 2>&1); rc=$?; "
+            f"echo \"rc=$rc $(echo \"$out\" | tail -1)\"; "
+            f"curl -s --max-time 5 {RPC_STATUS_URL} 2>/dev/null | tr -d '\\n' || true; echo")
+
+
+def parse_check(output: str, artifacts: List[Artifact], r: Readiness):
+    lines = output.splitlines() + [''] * 4
+    expected = {a.name: a.sha256 for a in artifacts}
+    r.binary = 'ok' if lines[0].strip() == expected[BINARY] else ('缺失' if lines[0].strip() == '-' else '不一致')
+    r.wasm = 'ok' if lines[1].strip() == expected[WASM_LIB] else ('缺失' if lines[1].strip() == '-' else '不一致')
+    rc, _, version = lines[2].strip().partition(' ')
+    version_ok = rc == 'rc=0'
+    r.version = version.strip() if version_ok else ''
+    try:
+        r.height = int(json.loads(lines[3])['result']['sync_info']['latest_block_height'])
+    except (ValueError, KeyError, TypeError):
+        r.height = None
+
+    problems = []
+    if r.binary != 'ok':
+        problems.append(f"{BINARY} {r.binary}")
+    if r.wasm != 'ok':
+        problems.append(f"WASM 库 {r.wasm}")
+    if not version_ok and r.binary == 'ok':
+        problems.append(f"version 执行失败: {version.strip()[:60]}")
+    r.ready = not problems
+    r.message = ', '.join(problems)
+
+
+def check_host(node: str, inv: Inventory, name: str, artifacts: List[Artifact],
+               control_dir: str) -> Readiness:
+    r = Readiness(node=node, ip=inv.ip(node), role=inv.node_type(node) or '')
+    remote_dir = upgrade_bin_dir(name).format_map(inv.host_vars(node))
+    session = SSHSession(r.ip, str(inv.var(node, 'ansible_user', 'ubuntu')), control_dir)
+    try:
+        parse_check(session.check(check_command(remote_dir), "检查失败", timeout=60), artifacts, r)
+    except (RemoteError, OSError) as e:
+        r.message = str(e)
+    finally:
+        session.close()
+    return r
+
+
+def check_fleet(nodes: List[str], inv: Inventory, name: str, artifacts: List[Artifact],
+                parallel: int = 20) -> List[Readiness]:
+    with control_directory() as control_dir:
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+            return list(pool.map(lambda n: check_host(n, inv, name, artifacts, control_dir), nodes))
+
+
+def readiness_summary(name: str, results: List[Readiness], halt_height: Optional[int],
+                      failed: Optional[List[str]] = None) -> Dict:
+    """
+    blocking: 阻止提交升级提案的原因（未就绪的 validator、已到达升级高度）
+    pending:  分发失败（failed）或未就绪的所有主机，包括 sentry
+    """
+    heights = [r.height for r in results if r.height is not None]
+    current = max(heights) if heights else None
+    blocking = [r.node for r in results if r.role == 'validator' and not r.ready]
+    failed = failed or []
+    pending = [r.node for r in results if not r.ready or r.node in failed]
+    remaining = halt_height - current if halt_height and current is not None else None
+    if remaining is not None and remaining <= 0:
+        blocking.append(f"当前高度 {current} 已达到升级高度 {halt_height}")
+    return {
+        'upgrade': name,
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'halt_height': halt_height,
+        'current_height': current,
+        'blocks_remaining': remaining,
+        'ready': not blocking,
+        'blocking': blocking,
+        'distribution_failed': failed,
+        'pending': pending,
+        'nodes': [asdict(r) for r in results],
+    }
+
+
+def print_readiness(info: Dict):
+    headers = ["节点", "IP", "角色", "就绪", BINARY, "WASM 库", "版本", "高度", "说明"]
+    rows = []
+    for n in info['nodes']:
+        rows.append([n['node'], n['ip'], n['role'], "✓" if n['ready'] else "✗",
+                     n['binary'], n['wasm'], n['version'],
+                     '' if n['height'] is None else str(n['height']), n['message']])
+    widths = [max(display_width(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    line = "━" * (sum(widths) + 2 * (len(widths) - 1))
+
+    print("")
+    print(line)
+    print(f"升级就绪报告: {info['upgrade']}")
+    print(line)
+    print("  ".join(pad(h, w) for h, w in zip(headers, widths)).rstrip())
+    for row in rows:
+        print("  ".join(pad(c, w) for c, w in zip(row, widths)).rstrip())
+    print(line)
+    ready = sum(1 for n in info['nodes'] if n['ready'])
+    text = f"就绪 {ready}/{len(info['nodes'])}"
+    if info['halt_height']:
+        text += f"，升级高度 {info['halt_height']}，当前高度 {info['current_height'] or 'N/A'}"
+        if info['blocks_remaining'] is not None:
+            text += f"，剩余 {info['blocks_remaining']} 个区块"
+    print(text)
+    if info['ready']:
+        print("✓ 所有 validator 已就绪，可以提交升级提案")
+    else:
+        print(f"✗ 未就绪，禁止提交升级提案: {', '.join(info['blocking'])}")
+    if info['distribution_failed']:
+        print(f"✗ 分发失败: {', '.join(info['distribution_failed'])}")
+    others = [n for n in info['pending'] if n not in info['blocking']]
+    if others:
+        print(f"⚠️  以下主机未就绪，升级高度后将停止同步: {', '.join(others)}")
+    print(line)
+
+
+# ---------- 升级后恢复时间 ----------
+
+@dataclass
+class Recovery:
+    node: str
+    halted: bool = False
+    resumed: bool = False
+    halted_at: Optional[float] = None
+    resumed_at: Optional[float] = None
+    downtime: Optional[float] = None
+    height: int = 0
+    state: str = ''
+
+
+async def watch_upgrade(engine: StatusEngine, halt_height: int, interval: float,
+                        timeout: float, failed: Dict[str, str]) -> Tuple[List[Recovery], Dict]:
+    """
+    轮询直到所有节点恢复出块或超时
+    节点恢复耗时 = 观测到高度 >= H 的时刻 - 区块 H-1 的链上时间（未取到时用观测到停止的时刻）
+    """
+    nodes = {name: Recovery(node=name, state=f"✗ {error}") for name, error in failed.items()}
+    for name in engine.clients:
+        nodes[name] = Recovery(node=name)
+    chain: Dict = {'halt_height': halt_height, 'halt_block_time': None,
+                   'resume_block_time': None, 'network_downtime': None}
+    deadline = time.monotonic() + timeout
+    last_print = 0.0
+
+    try:
+        while time.monotonic() < deadline:
+            statuses, _ = await engine.poll()
+            now = time.time()
+            for s in statuses:
+                r = nodes[s.name]
+                if not s.ok:
+                    r.state = "切换中" if r.halted and not r.resumed else f"✗ {s.error}"
+                    continue
+                r.height = s.height
+                if s.height >= halt_height - 1 and not r.halted:
+                    r.halted, r.halted_at = True, now
+                if s.height >= halt_height and not r.resumed:
+                    r.resumed, r.resumed_at = True, now
+                    if not r.halted:
+                        r.halted, r.halted_at = True, now
+                r.state = "✓ 已恢复" if r.resumed else ("已停止" if r.halted else "运行中")
+
+            # 链上停机时间：区块 H-1 与 H 的时间差
+            leader = next((s for s in statuses if s.ok and s.height >= halt_height), None)
+            if leader is not None and chain['resume_block_time'] is None:
+                try:
+                    result = await engine.clients[leader.name].get(
+                        f'/blockchain?minHeight={halt_height - 1}&maxHeight={halt_height}')
+                    times = {int(m['header']['height']): parse_time(m['header']['time'])
+                             for m in result.get('block_metas') or []}
+                except (RPCError, KeyError, ValueError, TypeError):
+                    times = {}
+                if times.get(halt_height - 1) and times.get(halt_height):
+                    chain['halt_block_time'] = times[halt_height - 1].timestamp()
+                    chain['resume_block_time'] = times[halt_height].timestamp()
+                    chain['network_downtime'] = round(
+                        chain['resume_block_time'] - chain['halt_block_time'], 3)
+
+            if time.monotonic() - last_print >= 10:
+                last_print = time.monotonic()
+                done = sum(1 for r in nodes.values() if r.resumed)
+                print(f"  [{datetime.now().strftime('%H:%M:%S')}] 已恢复 {done}/{len(nodes)}，"
+                      f"最高高度 {max((r.height for r in nodes.values()), default=0)}", flush=True)
+
+            if all(r.resumed for r in nodes.values()):
+                break
+            await asyncio.sleep(interval)
+    finally:
+        await engine.close()
+
+    for r in nodes.values():
+        if r.resumed:
+            start = chain['halt_block_time'] or r.halted_at
+            r.downtime = round(max(0.0, r.resumed_at - start), 3)
+        elif not r.state.startswith("✗"):
+            r.state = "✗ 未恢复"
+    return list(nodes.values()), chain
+
+
+def print_recovery(name: str, recoveries: List[Recovery], chain: Dict):
+    headers = ["节点", "状态", "高度", "恢复耗时"]
+    rows = [[r.node, r.state, str(r.height), f"{r.downtime:.1f}s" if r.downtime is not None else "-"]
+            for r in recoveries]
+    widths = [max(display_width(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    line = "━" * (sum(widths) + 2 * (len(widths) - 1))
+
+    print("")
+    print(line)
+    print(f"升级恢复: {name}（升级高度 {chain['halt_height']}）")
+    print(line)
+    print("  ".join(pad(h, w) for h, w in zip(headers, widths)).rstrip())
+    for row in rows:
+        print("  ".join(pad(c, w) for c, w in zip(row, widths)).rstrip())
+    print(line)
+    resumed = [r.downtime for r in recoveries if r.downtime is not None]
+    network = f"{chain['network_downtime']:.1f}s" if chain['network_downtime'] is not None else "N/A"
+    slowest = f"{max(resumed):.1f}s" if resumed else "N/A"
+    print(f"网络停机（区块 {chain['halt_height'] - 1} → {chain['halt_height']}）: {network}，"
+          f"已恢复 {len(resumed)}/{len(recoveries)}，最慢节点 {slowest}")
+    print(line)
+
+
+# ---------- 命令行 ----------
+
+def show_usage():
+    print("用法: upgrade_pipeline.py stage <name> <bin_dir> [node|all|node1,node2] [options]")
+    print("      upgrade_pipeline.py check <name> <bin_dir> [node|all|node1,node2] [options]")
+    print("      upgrade_pipeline.py watch <name> --height <H> [node|all|node1,node2] [options]")
+    print("")
+    print("选项:")
+    print("  -i <inventory>        inventory 文件（默认 ansible/inventory.yml）")
+    print("  --height <H>          升级高度（check 时显示剩余区块数；watch 必需）")
+    print("  --seeds <N>           stage: 控制机直接上传的种子主机数（默认 2）")
+    print("  --fanout <N>          stage: 每个主机最多向多少个下游主机分发（默认 3）")
+    print("  --parallel <N>        最大并发主机数（默认 20）")
+    print("  --report <file>       check/stage: 就绪报告写入 JSON 文件")
+    print("  --strict              check: 任一主机（包括 sentry）未就绪时退出码非 0（stage 总是如此）")
+    print("  --json                输出 JSON")
+    print("  --endpoint name=host:port  watch: 直接指定 RPC 地址（可重复，忽略 inventory）")
+    print("  --ssh-tunnel          watch: 通过 SSH 端口转发访问 RPC")
+    print(f"  --rpc-port <port>     watch: RPC 端口（默认 {DEFAULT_RPC_PORT}）")
+    print("  --interval <seconds>  watch: 轮询间隔（默认 1）")
+    print("  --timeout <seconds>   watch: 最长等待时间（默认 900）")
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ('stage', 'check', 'watch'):
+        show_usage()
+        sys.exit(1)
+    command, args = args[0], args[1:]
+
+    inventory_file = None
+    height: Optional[int] = None
+    seeds, fanout, parallel = 2, 3, 20
+    report: Optional[Path] = None
+    as_json = False
+    strict = False
+    endpoints: Dict[str, Tuple[str, int]] = {}
+    tunnel = False
+    rpc_port = DEFAULT_RPC_PORT
+    interval, timeout = 1.0, 900.0
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-i', '--inventory'):
+                inventory_file = args[i + 1]
+                i += 1
+            elif arg == '--height':
+                height = int(args[i + 1])
+                i += 1
+            elif arg == '--seeds':
+                seeds = int(args[i + 1])
+                i += 1
+            elif arg == '--fanout':
+                fanout = int(args[i + 1])
+                i += 1
+            elif arg == '--parallel':
+                parallel = int(args[i + 1])
+                i += 1
+            elif arg == '--report':
+                report = Path(args[i + 1])
+                i += 1
+            elif arg == '--json':
+                as_json = True
+            elif arg == '--strict':
+                strict = True
+            elif arg == '--endpoint':
+                name, address = parse_endpoint(args[i + 1])
+                endpoints[name] = address
+                i += 1
+            elif arg == '--ssh-tunnel':
+                tunnel = True
+            elif arg == '--rpc-port':
+                rpc_port = int(args[i + 1])
+                i += 1
+            elif arg == '--interval':
+                interval = float(args[i + 1])
+                i += 1
+            elif arg == '--timeout':
+                timeout = float(args[i + 1])
+                i += 1
+            elif arg.startswith('--'):
+                print(f"错误: 未知选项: {arg}", file=sys.stderr)
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"错误: 选项 {args[i]} 需要有效的参数值", file=sys.stderr)
+        sys.exit(1)
+
+    min_args = 1 if command == 'watch' else 2
+    if len(positional) < min_args or len(positional) > min_args + 1:
+        show_usage()
+        sys.exit(1)
+    upgrade_name = positional[0]
+    selection = positional[min_args] if len(positional) > min_args else 'all'
+
+    inv = None
+    nodes: List[str] = []
+    if not (command == 'watch' and endpoints):
+        try:
+            inv = load_inventory(inventory_file)
+        except Exception as e:
+            print(f"错误: 无法加载 inventory: {e}", file=sys.stderr)
+            sys.exit(1)
+        nodes = inv.hosts('nodes') if selection == 'all' else selection.split(',')
+        unknown = [n for n in nodes if inv.node_type(n) is None]
+        if unknown or not nodes:
+            print(f"错误: 无效的节点名称: {', '.join(unknown) or selection}", file=sys.stderr)
+            sys.exit(1)
+
+    if command == 'watch':
+        if height is None:
+            print("错误: watch 需要 --height", file=sys.stderr)
+            sys.exit(1)
+        targets = {}
+        if not endpoints:
+            for node in nodes:
+                endpoints[node] = (inv.ip(node), rpc_port)
+                targets[node] = f"{inv.var(node, 'ansible_user', 'ubuntu')}@{inv.ip(node)}"
+
+        async def start():
+            failed: Dict[str, str] = {}
+            if tunnel and targets:
+                engine, failed = await StatusEngine.with_tunnels(targets, rpc_port, DEFAULT_TIMEOUT, 2)
+            else:
+                engine = StatusEngine(endpoints, DEFAULT_TIMEOUT, 2)
+            return await watch_upgrade(engine, height, interval, timeout, failed)
+
+        print(f"等待升级 {upgrade_name}（高度 {height}）后各节点恢复出块...", flush=True)
+        try:
+            recoveries, chain = asyncio.run(start())
+        except KeyboardInterrupt:
+            sys.exit(1)
+        if as_json:
+            print(json.dumps({'upgrade': upgrade_name, **chain,
+                              'nodes': [asdict(r) for r in recoveries]}, ensure_ascii=False, indent=2))
+        else:
+            print_recovery(upgrade_name, recoveries, chain)
+        sys.exit(0 if all(r.resumed for r in recoveries) else 1)
+
+    try:
+        artifacts = local_artifacts(upgrade_name, Path(positional[1]))
+    except FileNotFoundError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    failed: List[str] = []
+    if command == 'stage':
+        print(f"预置升级文件 {upgrade_name} 到 {len(nodes)} 个节点（种子 {seeds}，扇出 {fanout}）", flush=True)
+        started = time.monotonic()
+        results = distribute(nodes, inv, artifacts, seeds, fanout, parallel)
+        print_results(results, artifacts, time.monotonic() - started)
+        failed = [r.node for r in results if not r.ok]
+        strict = True
+
+    info = readiness_summary(upgrade_name, check_fleet(nodes, inv, upgrade_name, artifacts, parallel),
+                             height, failed)
+    if report is not None:
+        report.parent.mkdir(parents=True, exist_ok=True)
+        report.write_text(json.dumps(info, ensure_ascii=False, indent=2))
+    if as_json:
+        print(json.dumps(info, ensure_ascii=False, indent=2))
+    else:
+        print_readiness(info)
+    sys.exit(0 if info['ready'] and not (strict and info['pending']) else 1)
+
+
+if __name__ == "__main__":
+    main()
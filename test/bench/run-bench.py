@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+配置生成流水线的规模基准测试（完全离线）
+
+用合成 inventory（N 个 validator + N/2 个 sentry）和 stub-injectived.py 存根二进制驱动
+generate_config.sh，逐阶段 source 脚本并调用对应函数，分别记录墙钟时间、CPU 时间
+（用户态 + 内核态，含所有子进程）和峰值 RSS（单个进程的最大值）
+
+阶段:
+    keygen             节点 init、keys add、add-genesis-account、gentx（generate_node_configs）
+    genesis_merge      主节点 init + merge_genesis.py（prepare_master_genesis）
+    genesis_accounts   汇总钱包和 gentx + add_genesis_accounts.py（add_master_genesis_accounts）
+    collect_gentxs     genesis collect-gentxs + validate（collect_gentxs）
+    orchestrator_keys  generate_orchestrator_keys.py
+    genesis_share      artifact_store.py share（copy_genesis）
+    peers              configure_peers.py（configure_persistent_peers）
+    toml               apply_node_config_fast.py --batch（apply_node_configs）
+
+结果写入 JSON；与基线对比时，任一阶段的墙钟/CPU/RSS 超过基线 (1 + threshold) 倍
+且绝对差值超过噪声下限（时间 0.1s，RSS 4MB）即视为退化，退出码为 1
+
+命令行:
+    python3 test/bench/run-bench.py run [--sizes 4,32,128,512] [--repeat 1] [--threshold 0.25]
+                                        [--baseline build/bench/baseline.json] [--update-baseline]
+    python3 test/bench/run-bench.py compare <baseline.json> <result.json> [--threshold 0.25]
+    python3 test/bench/run-bench.py inventory <N> <inventory.yml>
+"""
+
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parents[1]
+sys.path.insert(0, str(ROOT_DIR / 'scripts'))
+
+from inventory import load_inventory
+from peer_topology import load_topology_options, nodes_from_inventory, plan_topology, topology_report
+from table import print_rows
+
+
+GENERATE_SCRIPT = ROOT_DIR / "generate_config.sh"
+STUB_BINARY = BENCH_DIR / "stub-injectived.py"
+OUTPUT_DIR = ROOT_DIR / "build" / "bench"
+DEFAULT_BASELINE = OUTPUT_DIR / "baseline.json"
+DEFAULT_SIZES = [4, 32, 128, 512]
+DEFAULT_THRESHOLD = 0.25
+
+# 退化判定的绝对噪声下限
+TIME_FLOOR = 0.1
+RSS_FLOOR_MB = 4.0
+
+REGIONS = ["ap-east", "eu-west", "us-east"]
+
+
+# ---------- 合成 inventory ----------
+
+def write_inventory(path: Path, validators: int, sentries: int):
+    """与 ansible/inventory.yml 相同的结构，节点按 region/zone 轮流分布"""
+    lines = [
+        "all:",
+        "  vars:",
+        "    ansible_user: ubuntu",
+        "    deploy_user: ubuntu",
+        "    deploy_group: ubuntu",
+        "    node_home_base: /data/biyachain",
+        "  hosts:",
+    ]
+    nodes = [('validator', i) for i in range(validators)] + [('sentry', i) for i in range(sentries)]
+    for seq, (node_type, index) in enumerate(nodes):
+        region = REGIONS[seq % len(REGIONS)]
+        lines += [
+            f"    {node_type}-{index}:",
+            f"      ansible_host: 10.{100 + (seq + 1) // 65536}.{(seq + 1) // 256 % 256}.{(seq + 1) % 256}",
+            f"      node_type: {node_type}",
+            f"      node_index: {index}",
+            f"      region: {region}",
+            f"      zone: {region}-{'abc'[seq // len(REGIONS) % 3]}",
+        ]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+
+def check_topology(inventory_file: Path, node_config_file: Path):
+    """
+    使用 node_config.yml 的默认拓扑约束，规划失败时在计时前直接报错
+    （基准测试覆盖的是实际发布的拓扑，不放宽约束）
+    """
+    plan = plan_topology(nodes_from_inventory(load_inventory(str(inventory_file))),
+                         load_topology_options(str(node_config_file)))
+    violations = topology_report(plan)['violations']
+    if violations:
+        raise StageFailed(f"拓扑规划不满足 node_config.yml 的约束: {'; '.join(violations[:3])}")
+
+
+def sentry_count(validators: int) -> int:
+    return max(2, validators // 2)
+
+
+# ---------- 阶段输出校验 ----------
+
+def _json(path: Path) -> Dict:
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def _toml_value(path: Path, key: str) -> Optional[str]:
+    for line in path.read_text(encoding='utf-8').splitlines():
+        if line.split('=', 1)[0].strip() == key:
+            return line.split('=', 1)[1].strip().strip('"')
+    return None
+
+
+def check_keygen(base: Path, validators: List[str], sentries: List[str]) -> Optional[str]:
+    missing = [n for n in validators if not list((base / n / "config" / "gentx").glob("gentx-*.json"))]
+    missing += [n for n in sentries if not (base / n / "config" / "config.toml").exists()]
+    return f"缺少节点输出: {', '.join(missing[:5])}" if missing else None
+
+
+def check_genesis_merge(base: Path, validators: List[str], sentries: List[str]) -> Optional[str]:
+    genesis = _json(base / "master" / "config" / "genesis.json")
+    if genesis['app_state']['staking']['params']['bond_denom'] != 'inj':
+        return "genesis_config.yml 未合并到 master genesis.json"
+    return None
+
+
+def check_genesis_accounts(base: Path, validators: List[str], sentries: List[str]) -> Optional[str]:
+    accounts = _json(base / "master" / "config" / "genesis.json")['app_state']['auth']['accounts']
+    expected = 2 * len(validators) + 1
+    return None if len(accounts) == expected else f"genesis 账户数 {len(accounts)}，应为 {expected}"
+
+
+def check_collect_gentxs(base: Path, validators: List[str], sentries: List[str]) -> Optional[str]:
+    gen_txs = _json(base / "master" / "config" / "genesis.json")['app_state']['genutil']['gen_txs']
+    return None if len(gen_txs) == len(validators) else f"gen_txs {len(gen_txs)} 个，应为 {len(validators)}"
+
+
+def check_orchestrator_keys(base: Path, validators: List[str], sentries: List[str]) -> Optional[str]:
+    missing = [n for n in validators if not (base / n / "peggo_evm_key.json").exists()]
+    return f"缺少 peggo_evm_key.json: {', '.join(missing[:5])}" if missing else None
+
+
+def check_genesis_share(base: Path, validators: List[str], sentries: List[str]) -> Optional[str]:
+    missing = [n for n in validators + sentries if not (base / n / "config" / "genesis.json").exists()]
+    return f"genesis.json 未分发: {', '.join(missing[:5])}" if missing else None
+
+
+def check_peers(base: Path, validators: List[str], sentries: List[str]) -> Optional[str]:
+    empty = [n for n in validators + sentries
+             if not _toml_value(base / n / "config" / "config.toml", "persistent_peers")]
+    return f"persistent_peers 为空: {', '.join(empty[:5])}" if empty else None
+
+
+def check_toml(base: Path, validators: List[str], sentries: List[str]) -> Optional[str]:
+    wrong = [n for n in validators if _toml_value(base / n / "config" / "config.toml", "indexer") != "null"]
+    return f"node_config.yml 未应用: {', '.join(wrong[:5])}" if wrong else None
+
+
+# (名称, 说明, generate_config.sh 中的调用, 输出校验)
+STAGES = [
+    ('keygen', "节点初始化与密钥生成", "clean_old_data; generate_node_configs", check_keygen),
+    ('genesis_merge', "Genesis 合并", "prepare_master_genesis", check_genesis_merge),
+    ('genesis_accounts', "Genesis 账户", "add_master_genesis_accounts", check_genesis_accounts),
+    ('collect_gentxs', "collect-gentxs", "collect_gentxs", check_collect_gentxs),
+    ('orchestrator_keys', "Orchestrator 密钥导出", "generate_orchestrator_keys", check_orchestrator_keys),
+    ('genesis_share', "Genesis 分发", "copy_genesis", check_genesis_share),
+    ('peers', "P2P 连接配置", "configure_persistent_peers", check_peers),
+    ('toml', "TOML 配置应用", "apply_node_configs", check_toml),
+]
+STAGE_TITLES = {name: title for name, title, _, _ in STAGES}
+
+
+# ---------- 计时 ----------
+
+class StageFailed(Exception):
+    pass
+
+
+def run_stage(command: str, env: Dict[str, str], log_file: Path) -> Dict:
+    """在子 shell 中 source generate_config.sh 并执行阶段函数，返回资源占用"""
+    script = f'source "{GENERATE_SCRIPT}"; load_inventory > /dev/null; {command}'
+    with open(log_file, 'w', encoding='utf-8') as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(['bash', '-c', script], stdout=log, stderr=subprocess.STDOUT,
+                                env=env, cwd=str(ROOT_DIR))
+        # wait4 返回的 rusage 包含该进程已回收的全部子进程
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        tail = log_file.read_text(encoding='utf-8', errors='replace').strip().splitlines()[-10:]
+        raise StageFailed(f"退出码 {proc.returncode}（日志 {log_file}）\n    " + "\n    ".join(tail))
+
+    # ru_maxrss: Linux 为 KB，macOS 为字节
+    rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return {'wall': round(wall, 3), 'cpu': round(usage.ru_utime + usage.ru_stime, 3),
+            'rss_mb': round(rss, 1)}
+
+
+def bench_size(validators: int, work_dir: Path, repeat: int) -> Dict:
+    sentries = sentry_count(validators)
+    size_dir = work_dir / f"n{validators}"
+    inventory_file = size_dir / "inventory.yml"
+    node_config_file = size_dir / "node_config.yml"
+    base_dir = size_dir / "chain-deploy-config"
+    log_dir = size_dir / "logs"
+
+    if size_dir.exists():
+        shutil.rmtree(size_dir)
+    log_dir.mkdir(parents=True)
+    write_inventory(inventory_file, validators, sentries)
+    shutil.copy(ROOT_DIR / "node_config.yml", node_config_file)
+    try:
+        check_topology(inventory_file, node_config_file)
+    except StageFailed as e:
+        raise StageFailed(f"{validators} 个 validator: {e}")
+
+    env = dict(os.environ, CHAIN_BINARY=str(STUB_BINARY), BASE_DIR=str(base_dir),
+               INVENTORY_FILE=str(inventory_file), NODE_CONFIG_FILE=str(node_config_file))
+    validator_names = [f"validator-{i}" for i in range(validators)]
+    sentry_names = [f"sentry-{i}" for i in range(sentries)]
+
+    stages: Dict[str, Dict] = {}
+    for attempt in range(repeat):
+        for name, title, command, check in STAGES:
+            try:
+                result = run_stage(command, env, log_dir / f"{name}.log")
+            except StageFailed as e:
+                raise StageFailed(f"{validators} 个 validator / {title}: {e}")
+            error = check(base_dir, validator_names, sentry_names)
+            if error:
+                raise StageFailed(f"{validators} 个 validator / {title}: {error}")
+            # 多次运行取最小值（排除偶发抖动）
+            best = stages.setdefault(name, result)
+            for metric, value in result.items():
+                best[metric] = min(best[metric], value)
+        print(f"  ✓ {validators} validator + {sentries} sentry"
+              f"{f'（第 {attempt + 1}/{repeat} 轮）' if repeat > 1 else ''}", flush=True)
+
+    return {'validators': validators, 'sentries': sentries, 'stages': stages,
+            'total_wall': round(sum(s['wall'] for s in stages.values()), 3)}
+
+
+# ---------- 对比 ----------
+
+def find_regressions(base: Dict, new: Dict, threshold: float) -> List[Dict]:
+    regressions = []
+    for size, result in new['sizes'].items():
+        base_size = base['sizes'].get(size)
+        if not base_size:
+            continue
+        for stage, metrics in result['stages'].items():
+            old = base_size['stages'].get(stage)
+            if not old:
+                continue
+            for metric, floor in (('wall', TIME_FLOOR), ('cpu', TIME_FLOOR), ('rss_mb', RSS_FLOOR_MB)):
+                a, b = old.get(metric), metrics.get(metric)
+                if a is None or b is None:
+                    continue
+                if b > a * (1 + threshold) and b - a > floor:
+                    regressions.append({'size': size, 'stage': stage, 'metric': metric,
+                                        'base': a, 'new': b})
+    return regressions
+
+
+def _change(a: float, b: float) -> str:
+    return f"{a:g} → {b:g} ({(b - a) / a * 100:+.0f}%)" if a else f"{a:g} → {b:g}"
+
+
+def print_result(result: Dict):
+    for size, data in result['sizes'].items():
+        nodes = data['validators'] + data['sentries']
+        rows = [["阶段", "墙钟(s)", "CPU(s)", "峰值 RSS(MB)", "每节点(ms)"]]
+        for name, title, _, _ in STAGES:
+            stage = data['stages'].get(name)
+            if stage:
+                rows.append([title, f"{stage['wall']:.3f}", f"{stage['cpu']:.3f}",
+                             f"{stage['rss_mb']:.1f}", f"{stage['wall'] / nodes * 1000:.1f}"])
+        rows.append(["合计", f"{data['total_wall']:.3f}", "", "", f"{data['total_wall'] / nodes * 1000:.1f}"])
+        print_rows(f"{data['validators']} validator + {data['sentries']} sentry", rows)
+
+    if len(result['sizes']) > 1:
+        sizes = list(result['sizes'])
+        rows = [["阶段（墙钟 s）"] + [f"n={s}" for s in sizes]]
+        for name, title, _, _ in STAGES:
+            rows.append([title] + [f"{result['sizes'][s]['stages'][name]['wall']:.3f}"
+                                   if name in result['sizes'][s]['stages'] else '-' for s in sizes])
+        print_rows("规模扩展", rows)
+
+
+def print_comparison(base: Dict, new: Dict, threshold: float) -> List[Dict]:
+    regressions = find_regressions(base, new, threshold)
+    flagged = {(r['size'], r['stage']) for r in regressions}
+    rows = [["规模", "阶段", "墙钟(s)", "CPU(s)", "峰值 RSS(MB)", "状态"]]
+    for size, result in new['sizes'].items():
+        base_size = base['sizes'].get(size)
+        if not base_size:
+            continue
+        for name, title, _, _ in STAGES:
+            old, cur = base_size['stages'].get(name), result['stages'].get(name)
+            if not old or not cur:
+                continue
+            rows.append([f"n={size}", title, _change(old['wall'], cur['wall']),
+                         _change(old['cpu'], cur['cpu']), _change(old['rss_mb'], cur['rss_mb']),
+                         "✗ 退化" if (size, name) in flagged else "✓"])
+    if len(rows) == 1:
+        print("⚠️  基线中没有相同规模的结果，无法对比")
+        return []
+    print_rows(f"与基线对比（阈值 +{threshold * 100:.0f}%）", rows)
+    return regressions
+
+
+# ---------- 命令 ----------
+
+def cmd_run(sizes: List[int], repeat: int, threshold: float, baseline: Path,
+            update_baseline: bool, output: Optional[Path]) -> int:
+    if not shutil.which('bash'):
+        print("✗ 未找到 bash", file=sys.stderr)
+        return 1
+
+    stamp = datetime.now()
+    work_dir = OUTPUT_DIR / "work"
+    result = {
+        'generated_at': stamp.isoformat(timespec='seconds'),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(),
+                 'cpus': os.cpu_count()},
+        'repeat': repeat,
+        'sizes': {},
+    }
+
+    print(f"基准测试: {', '.join(map(str, sizes))} 个 validator（工作目录 {work_dir}）")
+    try:
+        for size in sizes:
+            result['sizes'][str(size)] = bench_size(size, work_dir, repeat)
+    except StageFailed as e:
+        print(f"✗ 阶段失败: {e}", file=sys.stderr)
+        return 1
+
+    print_result(result)
+
+    output = output or OUTPUT_DIR / f"result-{stamp.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2), encoding='utf-8')
+    print(f"\n结果: {output}")
+
+    if update_baseline or not baseline.exists():
+        baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline.write_text(json.dumps(result, indent=2), encoding='utf-8')
+        print(f"✓ 已写入基线: {baseline}")
+        return 0
+
+    return report_regressions(print_comparison(json.loads(baseline.read_text(encoding='utf-8')),
+                                               result, threshold))
+
+
+def report_regressions(regressions: List[Dict]) -> int:
+    if not regressions:
+        print("✓ 未发现性能退化")
+        return 0
+    names = {'wall': '墙钟', 'cpu': 'CPU', 'rss_mb': '峰值 RSS'}
+    print(f"✗ {len(regressions)} 项性能退化:", file=sys.stderr)
+    for r in regressions:
+        print(f"  n={r['size']} {STAGE_TITLES.get(r['stage'], r['stage'])} {names[r['metric']]}: "
+              f"{_change(r['base'], r['new'])}", file=sys.stderr)
+    return 1
+
+
+def show_usage():
+    print("用法: run-bench.py <run|compare|inventory> [options]")
+    print("")
+    print("命令:")
+    print("  run                                   按规模运行配置生成流水线并记录各阶段耗时")
+    print("  compare <baseline.json> <result.json> 对比两次结果，退化时退出码为 1")
+    print("  inventory <N> <inventory.yml>         生成 N 个 validator + N/2 个 sentry 的合成 inventory")
+    print("")
+    print("选项:")
+    print(f"  --sizes <list>        validator 数量列表（默认 {','.join(map(str, DEFAULT_SIZES))}）")
+    print("  --repeat <N>          每个规模运行 N 次，取各项最小值（默认 1）")
+    print(f"  --threshold <ratio>   退化阈值（默认 {DEFAULT_THRESHOLD}，即 +{DEFAULT_THRESHOLD * 100:.0f}%）")
+    print(f"  --baseline <file>     基线文件（默认 {DEFAULT_BASELINE.relative_to(ROOT_DIR)}，不存在时写入本次结果）")
+    print("  --update-baseline     用本次结果覆盖基线")
+    print("  --output <file>       结果文件（默认 build/bench/result-<时间>.json）")
+    print("")
+    print("示例:")
+    print("  run-bench.py run --sizes 4,32")
+    print("  run-bench.py run --repeat 3 --update-baseline")
+    print("  run-bench.py compare build/bench/baseline.json build/bench/result-20250101-120000.json")
+
+
+def main():
+    args = sys.argv[1:]
+    sizes = list(DEFAULT_SIZES)
+    repeat = 1
+    threshold = DEFAULT_THRESHOLD
+    baseline = DEFAULT_BASELINE
+    update_baseline = False
+    output = None
+    positional = []
+
+    i = 0
+    try:
+        while i < len(args):
+            arg = args[i]
+            if arg in ('-h', '--help'):
+                show_usage()
+                sys.exit(0)
+            elif arg == '--sizes':
+                sizes = [int(s) for s in args[i + 1].split(',') if s.strip()]
+                i += 1
+            elif arg == '--repeat':
+                repeat = max(1, int(args[i + 1]))
+                i += 1
+            elif arg == '--threshold':
+                threshold = float(args[i + 1])
+                i += 1
+            elif arg == '--baseline':
+                baseline = Path(args[i + 1])
+                i += 1
+            elif arg == '--update-baseline':
+                update_baseline = True
+            elif arg == '--output':
+                output = Path(args[i + 1])
+                i += 1
+            elif arg.startswith('-'):
+                print(f"未知选项: {arg}", file=sys.stderr)
+                show_usage()
+                sys.exit(1)
+            else:
+                positional.append(arg)
+            i += 1
+    except (IndexError, ValueError):
+        print(f"参数错误: {' '.join(args[i:i + 2])}", file=sys.stderr)
+        sys.exit(1)
+
+    if not positional:
+        show_usage()
+        sys.exit(1)
+
+    command = positional[0]
+    if command == 'run':
+        if not sizes or min(sizes) < 1:
+            print("--sizes 必须是正整数列表", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(cmd_run(sizes, repeat, threshold, baseline, update_baseline, output))
+    elif command == 'compare' and len(positional) == 3:
+        base, new = (json.loads(Path(p).read_text(encoding='utf-8')) for p in positional[1:3])
+        sys.exit(report_regressions(print_comparison(base, new, threshold)))
+    elif command == 'inventory' and len(positional) == 3:
+        validators = int(positional[1])
+        write_inventory(Path(positional[2]), validators, sentry_count(validators))
+        print(f"✓ {positional[2]}: {validators} validator + {sentry_count(validators)} sentry")
+    else:
+        show_usage()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,740 @@
+#!/usr/bin/env python3
+"""
+injectived 的快速存根，供 test/bench/run-bench.py 离线驱动 generate_config.sh
+
+模仿真实二进制的输出和目录结构（config.toml、app.toml、genesis.json、node_key.json、
+priv_validator_key.json、keyring-test/*.info、config/gentx/gentx-*.json），
+keyring 文件与真实后端格式相同（JWE 加密的 keyring.Item JSON），scripts/keyring_reader.py 可以直接解密
+
+支持的命令:
+    init <moniker> --chain-id <id> --home <dir>
+    keys add <name> --home <dir> --keyring-backend test        eth_secp256k1 密钥
+    keys show <name> [-a] --home <dir> --keyring-backend test
+    keys unsafe-export-eth-key <name> --home <dir> --keyring-backend test
+    add-genesis-account <address|name> <coins> --chain-id <id> --home <dir>
+    genesis gentx <name> <coins> --chain-id <id> --home <dir> --keyring-backend test
+    genesis collect-gentxs --home <dir>
+    genesis validate --home <dir>
+    tendermint show-node-id --home <dir>
+    version                                                     输出 stub
+
+与真实二进制的差异：node_key / priv_validator_key 的 ed25519 公钥是随机字节（不做曲线运算），
+gentx 的签名是占位值；其余开销（进程启动、keyring 加解密、genesis 读写）与真实流程同量级
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'scripts'))
+
+import bech32
+from keyring_reader import KeyringError, keccak256, read_key
+
+
+HRP = 'inj'
+ETH_PUBKEY_TYPE = '/injective.crypto.v1beta1.ethsecp256k1.PubKey'
+ETH_PRIVKEY_TYPE = '/injective.crypto.v1beta1.ethsecp256k1.PrivKey'
+CODE_HASH = 'xdJGAYb3IzySfn2y3McDwOUAtlPKgic7e/rYBF2FpHA='
+
+# 与 99designs/keyring file 后端默认的 PBES2 迭代次数一致
+PBES2_ITERATIONS = 8192
+
+_P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+_G = (0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+      0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8)
+
+
+def fail(message: str):
+    print(f"Error: {message}", file=sys.stderr)
+    sys.exit(1)
+
+
+def option(args, name, default=None):
+    for i, arg in enumerate(args):
+        if arg == name and i + 1 < len(args):
+            return args[i + 1]
+        if arg.startswith(name + '='):
+            return arg.split('=', 1)[1]
+    return default
+
+
+def positional(args):
+    values, skip = [], False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg.startswith('--'):
+            skip = '=' not in arg and arg not in ('--overwrite', '--no-backup')
+        elif arg != '-a':
+            values.append(arg)
+    return values
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+# ======================
+# secp256k1 / keyring
+# ======================
+
+def _double(point):
+    x, y, z = point
+    if not y:
+        return (0, 0, 0)
+    s = 4 * x * y * y % _P
+    m = 3 * x * x % _P
+    nx = (m * m - 2 * s) % _P
+    return nx, (m * (s - nx) - 8 * pow(y, 4, _P)) % _P, 2 * y * z % _P
+
+
+def _add(p, q):
+    if not p[1]:
+        return q
+    if not q[1]:
+        return p
+    u1, u2 = p[0] * q[2] ** 2 % _P, q[0] * p[2] ** 2 % _P
+    s1, s2 = p[1] * q[2] ** 3 % _P, q[1] * p[2] ** 3 % _P
+    if u1 == u2:
+        return _double(p) if s1 == s2 else (0, 0, 1)
+    h, r = u2 - u1, s2 - s1
+    h2 = h * h % _P
+    h3 = h * h2 % _P
+    nx = (r * r - h3 - 2 * u1 * h2) % _P
+    return nx, (r * (u1 * h2 - nx) - s1 * h3) % _P, h * p[2] * q[2] % _P
+
+
+def public_key(secret: int) -> bytes:
+    """secp256k1 压缩公钥（33 字节）"""
+    result, addend = (0, 0, 1), (_G[0], _G[1], 1)
+    while secret:
+        if secret & 1:
+            result = _add(result, addend)
+        addend = _double(addend)
+        secret >>= 1
+    z = pow(result[2], -1, _P)
+    x, y = result[0] * z * z % _P, result[1] * z * z * z % _P
+    return bytes([2 + (y & 1)]) + x.to_bytes(32, 'big')
+
+
+def _field(number: int, data: bytes) -> bytes:
+    """protobuf 长度前缀字段（长度均小于 2^14）"""
+    length = len(data)
+    prefix = bytes([length]) if length < 0x80 else bytes([length & 0x7f | 0x80, length >> 7])
+    return bytes([number << 3 | 2]) + prefix + data
+
+
+def _any(type_url: str, key: bytes) -> bytes:
+    return _field(1, type_url.encode()) + _field(2, _field(1, key))
+
+
+def _aes_key_wrap(kek: bytes, key: bytes) -> bytes:
+    """RFC 3394 AES Key Wrap"""
+    from Crypto.Cipher import AES
+
+    cipher = AES.new(kek, AES.MODE_ECB)
+    a, r = b'\xa6' * 8, [key[i:i + 8] for i in range(0, len(key), 8)]
+    n = len(r)
+    for j in range(6):
+        for i in range(n):
+            b = cipher.encrypt(a + r[i])
+            t = (n * j + i + 1).to_bytes(8, 'big')
+            a, r[i] = bytes(x ^ y for x, y in zip(b[:8], t)), b[8:]
+    return a + b''.join(r)
+
+
+def encrypt_jwe(payload: bytes, password: str = 'test') -> str:
+    """PBES2-HS256+A128KW / A256GCM，与 keyring_reader.decrypt_jwe 对应"""
+    from Crypto.Cipher import AES
+
+    alg = 'PBES2-HS256+A128KW'
+    salt = os.urandom(16)
+    header = b64url(json.dumps({'alg': alg, 'enc': 'A256GCM', 'p2c': PBES2_ITERATIONS,
+                                'p2s': b64url(salt)}, separators=(',', ':')).encode())
+    kek = hashlib.pbkdf2_hmac('sha256', password.encode(), alg.encode() + b'\x00' + salt,
+                              PBES2_ITERATIONS, 16)
+    cek, iv = os.urandom(32), os.urandom(12)
+    cipher = AES.new(cek, AES.MODE_GCM, nonce=iv)
+    cipher.update(header.encode('ascii'))
+    ciphertext, tag = cipher.encrypt_and_digest(payload)
+    return '.'.join([header, b64url(_aes_key_wrap(kek, cek)), b64url(iv),
+                     b64url(ciphertext), b64url(tag)])
+
+
+def write_item(directory: Path, key: str, data: bytes):
+    """与 99designs/keyring file 后端相同：加密 json.Marshal(keyring.Item)，文件名为 Item.Key"""
+    item = json.dumps({
+        'Key': key,
+        'Data': base64.b64encode(data).decode(),
+        'Label': '',
+        'Description': '',
+        'KeychainNotTrustApplication': False,
+        'KeychainNotSynchronizable': False,
+    }, separators=(',', ':'))
+    (directory / key).write_text(encrypt_jwe(item.encode()))
+
+
+def keyring_dir(args) -> Path:
+    backend = option(args, '--keyring-backend', 'test')
+    if backend != 'test':
+        fail(f"stub only supports the test keyring backend: {backend}")
+    return Path(option(args, '--home', '.')) / 'keyring-test'
+
+
+def load_key(args, name: str) -> dict:
+    try:
+        return read_key(option(args, '--home', '.'), name)
+    except KeyringError as e:
+        fail(f"{name}.info: key not found ({e})")
+
+
+def keys_add(args, name: str):
+    directory = keyring_dir(args)
+    if (directory / f"{name}.info").exists():
+        fail(f"duplicated key name: {name}")
+    secret = int.from_bytes(os.urandom(32), 'big') % (_N - 1) + 1
+    pub = public_key(secret)
+    record = (_field(1, name.encode()) + _field(2, _any(ETH_PUBKEY_TYPE, pub))
+              + _field(3, _field(1, _any(ETH_PRIVKEY_TYPE, secret.to_bytes(32, 'big')))))
+    x = int.from_bytes(pub[1:], 'big')
+    y = pow((pow(x, 3, _P) + 7) % _P, (_P + 1) // 4, _P)
+    if (y & 1) != (pub[0] & 1):
+        y = _P - y
+    address = keccak256(pub[1:] + y.to_bytes(32, 'big'))[12:]
+
+    directory.mkdir(parents=True, exist_ok=True)
+    write_item(directory, f"{name}.info", record)
+    write_item(directory, f"{address.hex()}.address", f"{name}.info".encode())
+    print(f"- address: {bech32.encode(HRP, address)}\n  name: {name}\n"
+          f"  pubkey: '{{\"@type\":\"{ETH_PUBKEY_TYPE}\",\"key\":\"{base64.b64encode(pub).decode()}\"}}'\n"
+          f"  type: local")
+
+
+# ======================
+# 节点配置
+# ======================
+
+CONFIG_TOML = '''# This is a TOML config file.
+# For more information, see https://github.com/toml-lang/toml
+
+version = "0.38.12"
+
+#######################################################################
+###                   Main Base Config Options                      ###
+#######################################################################
+
+proxy_app = "tcp://127.0.0.1:26658"
+moniker = "{moniker}"
+db_backend = "goleveldb"
+db_dir = "data"
+log_level = "info"
+log_format = "plain"
+genesis_file = "config/genesis.json"
+priv_validator_key_file = "config/priv_validator_key.json"
+priv_validator_state_file = "data/priv_validator_state.json"
+priv_validator_laddr = ""
+node_key_file = "config/node_key.json"
+abci = "socket"
+filter_peers = false
+
+#######################################################################
+###                 Advanced Configuration Options                  ###
+#######################################################################
+
+[rpc]
+laddr = "tcp://127.0.0.1:26657"
+cors_allowed_origins = []
+cors_allowed_methods = ["HEAD", "GET", "POST", ]
+cors_allowed_headers = ["Origin", "Accept", "Content-Type", "X-Requested-With", "X-Server-Time", ]
+grpc_laddr = ""
+grpc_max_open_connections = 900
+unsafe = false
+max_open_connections = 900
+max_subscription_clients = 100
+max_subscriptions_per_client = 5
+experimental_subscription_buffer_size = 200
+experimental_websocket_write_buffer_size = 200
+experimental_close_on_slow_client = false
+timeout_broadcast_tx_commit = "10s"
+max_request_batch_size = 10
+max_body_bytes = 1000000
+max_header_bytes = 1048576
+tls_cert_file = ""
+tls_key_file = ""
+pprof_laddr = "localhost:6060"
+
+[p2p]
+laddr = "tcp://0.0.0.0:26656"
+external_address = ""
+seeds = ""
+persistent_peers = ""
+addr_book_file = "config/addrbook.json"
+addr_book_strict = true
+max_num_inbound_peers = 40
+max_num_outbound_peers = 10
+unconditional_peer_ids = ""
+persistent_peers_max_dial_period = "0s"
+flush_throttle_timeout = "100ms"
+max_packet_msg_payload_size = 1024
+send_rate = 5120000
+recv_rate = 5120000
+pex = true
+seed_mode = false
+private_peer_ids = ""
+allow_duplicate_ip = false
+handshake_timeout = "20s"
+dial_timeout = "3s"
+
+[mempool]
+type = "flood"
+recheck = true
+recheck_timeout = "1s"
+broadcast = true
+wal_dir = ""
+size = 5000
+max_txs_bytes = 1073741824
+cache_size = 10000
+keep-invalid-txs-in-cache = false
+max_tx_bytes = 1048576
+max_batch_bytes = 0
+experimental_max_gossip_connections_to_persistent_peers = 0
+experimental_max_gossip_connections_to_non_persistent_peers = 0
+
+[statesync]
+enable = false
+rpc_servers = ""
+trust_height = 0
+trust_hash = ""
+trust_period = "168h0m0s"
+discovery_time = "15s"
+temp_dir = ""
+chunk_request_timeout = "10s"
+chunk_fetchers = "4"
+
+[blocksync]
+version = "v0"
+
+[consensus]
+wal_file = "data/cs.wal/wal"
+timeout_propose = "3s"
+timeout_propose_delta = "500ms"
+timeout_prevote = "1s"
+timeout_prevote_delta = "500ms"
+timeout_precommit = "1s"
+timeout_precommit_delta = "500ms"
+timeout_commit = "5s"
+double_sign_check_height = 0
+skip_timeout_commit = false
+create_empty_blocks = true
+create_empty_blocks_interval = "0s"
+peer_gossip_sleep_duration = "100ms"
+peer_query_maj23_sleep_duration = "2s"
+
+[storage]
+discard_abci_responses = false
+
+[tx_index]
+indexer = "kv"
+psql-conn = ""
+
+[instrumentation]
+prometheus = false
+prometheus_listen_addr = ":26660"
+max_open_connections = 3
+namespace = "cometbft"
+'''
+
+APP_TOML = '''# This is a TOML config file.
+# For more information, see https://github.com/toml-lang/toml
+
+###############################################################################
+###                           Base Configuration                            ###
+###############################################################################
+
+minimum-gas-prices = ""
+query-gas-limit = "0"
+pruning = "default"
+pruning-keep-recent = "0"
+pruning-interval = "0"
+halt-height = 0
+halt-time = 0
+min-retain-blocks = 0
+inter-block-cache = true
+index-events = []
+iavl-cache-size = 781250
+iavl-disable-fastnode = false
+app-db-backend = ""
+
+[telemetry]
+service-name = ""
+enabled = false
+enable-hostname = false
+enable-hostname-label = false
+enable-service-label = false
+prometheus-retention-time = 0
+global-labels = [
+]
+metrics-sink = ""
+statsd-addr = ""
+datadog-hostname = ""
+
+[api]
+enable = false
+swagger = false
+address = "tcp://localhost:1317"
+max-open-connections = 1000
+rpc-read-timeout = 10
+rpc-write-timeout = 0
+rpc-max-body-bytes = 1000000
+enabled-unsafe-cors = false
+
+[grpc]
+enable = true
+address = "localhost:9090"
+max-recv-msg-size = "10485760"
+max-send-msg-size = "2147483647"
+
+[grpc-web]
+enable = true
+
+[state-sync]
+snapshot-interval = 0
+snapshot-keep-recent = 2
+
+[streaming]
+
+[streaming.abci]
+keys = []
+plugin = ""
+stop-node-on-err = true
+
+[mempool]
+max-txs = -1
+
+[json-rpc]
+enable = true
+address = "127.0.0.1:8545"
+ws-address = "127.0.0.1:8546"
+api = "eth,net,web3"
+gas-cap = 25000000
+allow-insecure-unlock = true
+evm-timeout = "5s"
+txfee-cap = 1
+filter-cap = 200
+feehistory-cap = 100
+logs-cap = 10000
+block-range-cap = 10000
+http-timeout = "30s"
+http-idle-timeout = "2m0s"
+allow-unprotected-txs = false
+max-open-connections = 0
+enable-indexer = false
+metrics-address = "127.0.0.1:6065"
+fix-revert-gas-refund-height = 0
+'''
+
+
+def genesis_skeleton(chain_id: str) -> dict:
+    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    inj = lambda amount: [{'denom': 'inj', 'amount': amount}]
+    return {
+        'app_name': 'injectived',
+        'app_version': 'v1.17.0',
+        'genesis_time': now,
+        'chain_id': chain_id,
+        'initial_height': 1,
+        'app_hash': None,
+        'app_state': {
+            'auth': {'params': {'max_memo_characters': '256', 'tx_sig_limit': '7',
+                                'tx_size_cost_per_byte': '10', 'sig_verify_cost_ed25519': '590',
+                                'sig_verify_cost_secp256k1': '1000'}, 'accounts': []},
+            'bank': {'params': {'send_enabled': [], 'default_send_enabled': True},
+                     'balances': [], 'supply': [], 'denom_metadata': [], 'send_enabled': []},
+            'staking': {'params': {'unbonding_time': '1814400s', 'max_validators': 100,
+                                   'max_entries': 7, 'historical_entries': 10000,
+                                   'bond_denom': 'stake', 'min_commission_rate': '0.000000000000000000'},
+                        'last_total_power': '0', 'last_validator_powers': [], 'validators': [],
+                        'delegations': [], 'unbonding_delegations': [], 'redelegations': [],
+                        'exported': False},
+            'genutil': {'gen_txs': []},
+            'gov': {'starting_proposal_id': '1', 'deposits': [], 'votes': [], 'proposals': [],
+                    'params': {'min_deposit': [{'denom': 'stake', 'amount': '10000000'}],
+                               'max_deposit_period': '172800s', 'voting_period': '172800s',
+                               'quorum': '0.334000000000000000', 'threshold': '0.500000000000000000',
+                               'veto_threshold': '0.334000000000000000',
+                               'min_initial_deposit_ratio': '0.000000000000000000',
+                               'expedited_voting_period': '86400s',
+                               'expedited_min_deposit': [{'denom': 'stake', 'amount': '50000000'}]}},
+            'mint': {'minter': {'inflation': '0.130000000000000000',
+                                'annual_provisions': '0.000000000000000000'},
+                     'params': {'mint_denom': 'stake', 'inflation_rate_change': '0.130000000000000000',
+                                'inflation_max': '0.200000000000000000',
+                                'inflation_min': '0.070000000000000000',
+                                'goal_bonded': '0.670000000000000000', 'blocks_per_year': '6311520'}},
+            'distribution': {'params': {'community_tax': '0.020000000000000000',
+                                        'withdraw_addr_enabled': True},
+                             'fee_pool': {'community_pool': []}, 'delegator_withdraw_infos': [],
+                             'outstanding_rewards': [], 'validator_accumulated_commissions': [],
+                             'validator_historical_rewards': [], 'validator_current_rewards': [],
+                             'delegator_starting_infos': [], 'validator_slash_events': []},
+            'slashing': {'params': {'signed_blocks_window': '100',
+                                    'min_signed_per_window': '0.500000000000000000',
+                                    'downtime_jail_duration': '600s',
+                                    'slash_fraction_double_sign': '0.050000000000000000',
+                                    'slash_fraction_downtime': '0.010000000000000000'},
+                         'signing_infos': [], 'missed_blocks': []},
+            'crisis': {'constant_fee': {'denom': 'stake', 'amount': '1000'}},
+            'auction': {'params': {'auction_period': '604800', 'min_next_bid_increment_rate': '0.002500000000000000'},
+                        'highest_bid': None, 'auction_round': '0', 'auction_ending_timestamp': '0'},
+            'exchange': {'params': {'spot_market_instant_listing_fee': inj('1000000000000000000000'),
+                                    'derivative_market_instant_listing_fee': inj('1000000000000000000000'),
+                                    'default_spot_maker_fee_rate': '-0.000100000000000000',
+                                    'default_spot_taker_fee_rate': '0.001000000000000000',
+                                    'relayer_fee_share_rate': '0.400000000000000000',
+                                    'funding_interval': '3600'},
+                         'spot_markets': [], 'derivative_markets': [],
+                         'auction_exchange_transfer_denom_decimals': []},
+            'ocr': {'params': {'link_denom': 'peggy0x514910771AF9Ca656af840dff83E8264EcF986CA',
+                               'payout_block_interval': '100000', 'module_admin': ''}},
+            'peggy': {'params': {'peggy_id': 'injective-peggyid', 'signed_valsets_window': '25000',
+                                 'signed_batches_window': '25000', 'signed_claims_window': '25000',
+                                 'target_batch_timeout': '43200000', 'average_block_time': '5000',
+                                 'average_ethereum_block_time': '15000', 'bridge_chain_id': '11155111',
+                                 'bridge_ethereum_address': '0x0000000000000000000000000000000000000000'},
+                      'last_observed_nonce': '0', 'valsets': [], 'valset_confirms': [],
+                      'batches': [], 'batch_confirms': [], 'attestations': [],
+                      'delegate_keys': []},
+            'evm': {'accounts': [], 'params': {'evm_denom': 'inj', 'enable_create': True,
+                                                'enable_call': True,
+                                                'chain_config': {'homestead_block': '0',
+                                                                 'london_block': '0',
+                                                                 'shanghai_time': '0',
+                                                                 'cancun_time': None,
+                                                                 'prague_time': None}}},
+            'txfees': {'params': {'mempool1559_enabled': True,
+                                  'min_gas_price': '160000000.000000000000000000'}},
+        },
+        'consensus': {'params': {'block': {'max_bytes': '22020096', 'max_gas': '-1'},
+                                 'evidence': {'max_age_num_blocks': '100000',
+                                              'max_age_duration': '172800000000000',
+                                              'max_bytes': '1048576'},
+                                 'validator': {'pub_key_types': ['ed25519']},
+                                 'version': {'app': '0'},
+                                 'abci': {'vote_extensions_enable_height': '0'}}},
+    }
+
+
+def ed25519_key(key_type: str) -> dict:
+    """64 字节私钥值（seed + 公钥）；公钥为随机字节，node_id 推导与 configure_peers.py 一致"""
+    raw = os.urandom(64)
+    return {'type': key_type, 'value': base64.b64encode(raw).decode()}
+
+
+def node_id(home: str) -> str:
+    node_key = json.loads((Path(home) / 'config' / 'node_key.json').read_text())
+    raw = base64.b64decode(node_key['priv_key']['value'])
+    return hashlib.sha256(raw[32:]).digest()[:20].hex()
+
+
+def init(args, moniker: str):
+    home = Path(option(args, '--home', '.'))
+    chain_id = option(args, '--chain-id') or 'injective-1'
+    config, data = home / 'config', home / 'data'
+    genesis_file = config / 'genesis.json'
+    if genesis_file.exists() and '--overwrite' not in args:
+        fail(f"genesis.json file already exists: {genesis_file}")
+    config.mkdir(parents=True, exist_ok=True)
+    data.mkdir(parents=True, exist_ok=True)
+
+    (config / 'config.toml').write_text(CONFIG_TOML.replace('{moniker}', moniker))
+    (config / 'app.toml').write_text(APP_TOML)
+    (config / 'client.toml').write_text(
+        f'chain-id = "{chain_id}"\nkeyring-backend = "os"\noutput = "text"\n'
+        f'node = "tcp://localhost:26657"\nbroadcast-mode = "sync"\n')
+    (config / 'node_key.json').write_text(json.dumps(
+        {'priv_key': ed25519_key('tendermint/PrivKeyEd25519')}))
+    validator_key = ed25519_key('tendermint/PrivKeyEd25519')
+    raw = base64.b64decode(validator_key['value'])
+    (config / 'priv_validator_key.json').write_text(json.dumps({
+        'address': hashlib.sha256(raw[32:]).digest()[:20].hex().upper(),
+        'pub_key': {'type': 'tendermint/PubKeyEd25519', 'value': base64.b64encode(raw[32:]).decode()},
+        'priv_key': validator_key,
+    }, indent=2))
+    (data / 'priv_validator_state.json').write_text(
+        json.dumps({'height': '0', 'round': 0, 'step': 0}, indent=2))
+    genesis_file.write_text(json.dumps(genesis_skeleton(chain_id), indent=2))
+
+    print(json.dumps({'moniker': moniker, 'chain_id': chain_id, 'node_id': node_id(str(home)),
+                      'gentxs_dir': '', 'app_message': {}}), file=sys.stderr)
+
+
+# ======================
+# genesis
+# ======================
+
+def genesis_path(args) -> Path:
+    return Path(option(args, '--home', '.')) / 'config' / 'genesis.json'
+
+
+def load_genesis(args) -> dict:
+    try:
+        return json.loads(genesis_path(args).read_text())
+    except (OSError, ValueError) as e:
+        fail(f"failed to read genesis doc: {e}")
+
+
+def save_genesis(args, genesis: dict):
+    genesis_path(args).write_text(json.dumps(genesis, indent=2))
+
+
+def parse_coin(amount: str) -> tuple:
+    digits = len(amount) - len(amount.lstrip('0123456789'))
+    if not digits or digits == len(amount):
+        fail(f"invalid coin expression: {amount}")
+    return int(amount[:digits]), amount[digits:]
+
+
+def balance_of(genesis: dict, address: str, denom: str) -> int:
+    for balance in genesis['app_state']['bank']['balances']:
+        if balance['address'] == address:
+            return sum(int(c['amount']) for c in balance['coins'] if c['denom'] == denom)
+    return 0
+
+
+def add_genesis_account(args, target: str, amount: str):
+    address = target if target.startswith(HRP + '1') else load_key(args, target)['cosmos_address']
+    value, denom = parse_coin(amount)
+    genesis = load_genesis(args)
+    auth, bank = genesis['app_state']['auth'], genesis['app_state']['bank']
+    if any(a.get('base_account', a).get('address') == address for a in auth['accounts']):
+        fail(f"cannot add account at existing address {address}")
+
+    auth['accounts'].append({'@type': '/injective.types.v1beta1.EthAccount',
+                             'base_account': {'address': address, 'pub_key': None,
+                                              'account_number': '0', 'sequence': '0'},
+                             'code_hash': CODE_HASH})
+    bank['balances'].append({'address': address, 'coins': [{'denom': denom, 'amount': str(value)}]})
+    supply = {c['denom']: int(c['amount']) for c in bank['supply']}
+    supply[denom] = supply.get(denom, 0) + value
+    bank['supply'] = [{'denom': d, 'amount': str(supply[d])} for d in sorted(supply)]
+    save_genesis(args, genesis)
+
+
+def gentx(args, name: str, amount: str):
+    home = Path(option(args, '--home', '.'))
+    key = load_key(args, name)
+    value, denom = parse_coin(amount)
+    genesis = load_genesis(args)
+    if balance_of(genesis, key['cosmos_address'], denom) < value:
+        fail(f"account {key['cosmos_address']} has a balance in genesis, but it only has "
+             f"{balance_of(genesis, key['cosmos_address'], denom)}{denom} available to stake, not {amount}")
+
+    _, raw_address = bech32.decode(key['cosmos_address'])
+    validator_key = json.loads((home / 'config' / 'priv_validator_key.json').read_text())
+    moniker = next((line.split('=', 1)[1].strip().strip('"')
+                    for line in (home / 'config' / 'config.toml').read_text().splitlines()
+                    if line.startswith('moniker')), name)
+    tx = {
+        'body': {'messages': [{
+            '@type': '/cosmos.staking.v1beta1.MsgCreateValidator',
+            'description': {'moniker': moniker, 'identity': '', 'website': '',
+                            'security_contact': '', 'details': ''},
+            'commission': {'rate': '0.100000000000000000', 'max_rate': '0.200000000000000000',
+                           'max_change_rate': '0.010000000000000000'},
+            'min_self_delegation': '1',
+            'delegator_address': '',
+            'validator_address': bech32.encode(HRP + 'valoper', raw_address),
+            'pubkey': {'@type': '/cosmos.crypto.ed25519.PubKey',
+                       'key': validator_key['pub_key']['value']},
+            'value': {'denom': denom, 'amount': str(value)},
+        }], 'memo': f"{node_id(str(home))}@127.0.0.1:26656", 'timeout_height': '0',
+            'extension_options': [], 'non_critical_extension_options': []},
+        'auth_info': {'signer_infos': [{'public_key': {'@type': ETH_PUBKEY_TYPE, 'key': ''},
+                                        'mode_info': {'single': {'mode': 'SIGN_MODE_DIRECT'}},
+                                        'sequence': '0'}],
+                      'fee': {'amount': [], 'gas_limit': '200000', 'payer': '', 'granter': ''},
+                      'tip': None},
+        'signatures': [base64.b64encode(os.urandom(65)).decode()],
+    }
+    directory = home / 'config' / 'gentx'
+    directory.mkdir(parents=True, exist_ok=True)
+    output = directory / f"gentx-{node_id(str(home))}.json"
+    output.write_text(json.dumps(tx))
+    print(f"Genesis transaction written to \"{output}\"", file=sys.stderr)
+
+
+def collect_gentxs(args):
+    genesis = load_genesis(args)
+    directory = Path(option(args, '--home', '.')) / 'config' / 'gentx'
+    gen_txs = []
+    for path in sorted(directory.glob('*.json')):
+        tx = json.loads(path.read_text())
+        message = tx['body']['messages'][0]
+        _, raw_address = bech32.decode(message['validator_address'])
+        account = bech32.encode(HRP, raw_address)
+        value = message['value']
+        if balance_of(genesis, account, value['denom']) < int(value['amount']):
+            fail(f"account {account} has insufficient funds for gentx {path.name}")
+        gen_txs.append(tx)
+    genesis['app_state']['genutil']['gen_txs'] = gen_txs
+    save_genesis(args, genesis)
+    print(json.dumps({'moniker': '', 'chain_id': genesis['chain_id'],
+                      'gentxs_dir': str(directory), 'app_message': {}}), file=sys.stderr)
+
+
+def validate(args):
+    genesis = load_genesis(args)
+    if not genesis.get('chain_id'):
+        fail("genesis doc must include non-empty chain_id")
+    seen = set()
+    for account in genesis['app_state']['auth']['accounts']:
+        address = account.get('base_account', account).get('address')
+        if address in seen:
+            fail(f"duplicate account found in genesis state; address: {address}")
+        seen.add(address)
+    validators = set()
+    for tx in genesis['app_state']['genutil']['gen_txs']:
+        message = tx['body']['messages'][0]
+        if message['validator_address'] in validators:
+            fail(f"duplicate validator in gentxs: {message['validator_address']}")
+        validators.add(message['validator_address'])
+    print(f"File at {genesis_path(args)} is a valid genesis file")
+
+
+def main():
+    args = sys.argv[1:]
+    words = positional(args)
+
+    if words[:1] == ['init'] and len(words) >= 2:
+        init(args, words[1])
+    elif words[:2] == ['keys', 'add'] and len(words) >= 3:
+        keys_add(args, words[2])
+    elif words[:2] == ['keys', 'show'] and len(words) >= 3:
+        address = load_key(args, words[2])['cosmos_address']
+        print(address if '-a' in args else f"- address: {address}\n  name: {words[2]}\n  type: local")
+    elif words[:2] == ['keys', 'unsafe-export-eth-key'] and len(words) >= 3:
+        print(load_key(args, words[2])['private_key'].upper())
+    elif words[:1] == ['add-genesis-account'] and len(words) >= 3:
+        add_genesis_account(args, words[1], words[2])
+    elif words[:2] == ['genesis', 'gentx'] and len(words) >= 4:
+        gentx(args, words[2], words[3])
+    elif words[:2] == ['genesis', 'collect-gentxs']:
+        collect_gentxs(args)
+    elif words[:2] == ['genesis', 'validate']:
+        validate(args)
+    elif words[:1] in (['tendermint'], ['comet']) and words[1:2] == ['show-node-id']:
+        print(node_id(option(args, '--home', '.')))
+    elif words[:1] == ['version']:
+        print("stub")
+    else:
+        fail(f"unknown command: {' '.join(args)}")
+
+
+if __name__ == "__main__":
+    main()
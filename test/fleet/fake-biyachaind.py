@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+模拟链二进制的离线交易命令，配合 test/fleet/mock-chain.py 测试
+scripts/register_orchestrators.py、load_test.py
+
+支持的命令:
+    keys show <name> -a --home <dir>                 确定性的 inj1 地址（由 home 和 name 计算）
+    keys add <name> --home <dir> --output json        {"name", "address"}（地址同 keys show）
+    tx peggy set-orchestrator-address <val> <orch> <evm> --generate-only ...   未签名交易 JSON
+    tx bank send <from> <to> <amount> --generate-only ...                     未签名交易 JSON
+    tx bank multi-send <from> <to> [<to> ...] <amount> --generate-only ...    未签名交易 JSON
+    tx sign <file> --from <name> --offline --account-number N --sequence S ...  写入 sequence 和签名
+    tx sign-batch <file> --from <name> --offline --account-number N --sequence S ...
+                                                      每行一笔交易，sequence 依次递增
+    tx encode <file>                                  base64 编码的交易
+
+环境变量 FAKE_SIGN_DELAY 模拟每次签名的耗时（秒），用于观察并发签名的效果
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sys
+import time
+
+
+def option(args, name, default=None):
+    for i, arg in enumerate(args):
+        if arg == name and i + 1 < len(args):
+            return args[i + 1]
+        if arg.startswith(name + '='):
+            return arg.split('=', 1)[1]
+    return default
+
+
+def positional(args):
+    values, skip = [], False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg.startswith('--'):
+            skip = '=' not in arg and arg not in ('--generate-only', '--offline')
+        elif arg.startswith('-') and arg not in ('-a',):
+            skip = True
+        elif arg != '-a':
+            values.append(arg)
+    return values
+
+
+def address_of(args, name: str) -> str:
+    if name.startswith('inj1'):
+        return name
+    home = os.path.abspath(option(args, '--home', '.'))
+    return "inj1" + hashlib.sha256(f"{home}:{name}".encode()).hexdigest()[:38]
+
+
+def unsigned(args, message: dict) -> dict:
+    return {
+        'body': {'messages': [message], 'memo': ''},
+        'auth_info': {'signer_infos': [],
+                      'fee': {'gas_limit': option(args, '--gas', '200000'), 'amount': []}},
+        'signatures': [],
+    }
+
+
+def signed(args, tx: dict, sequence: int) -> dict:
+    tx['auth_info']['signer_infos'] = [{'sequence': str(sequence)}]
+    tx['signatures'] = [base64.b64encode(hashlib.sha256(
+        f"{option(args, '--from')}:{option(args, '--chain-id')}:{sequence}".encode()).digest()).decode()]
+    return tx
+
+
+def fail(message: str):
+    print(f"Error: {message}", file=sys.stderr)
+    sys.exit(1)
+
+
+def main():
+    args = sys.argv[1:]
+    words = positional(args)
+
+    if words[:2] == ['keys', 'show']:
+        print(address_of(args, words[2]))
+    elif words[:2] == ['keys', 'add']:
+        print(json.dumps({'name': words[2], 'type': 'local', 'address': address_of(args, words[2])}))
+    elif words[:3] == ['tx', 'peggy', 'set-orchestrator-address'] and '--generate-only' in args:
+        validator, orchestrator, evm = words[3:6]
+        print(json.dumps(unsigned(args, {'@type': '/injective.peggy.v1.MsgSetOrchestratorAddresses',
+                                         'sender': validator, 'orchestrator': orchestrator,
+                                         'eth_address': evm})))
+    elif words[:3] == ['tx', 'bank', 'send'] and '--generate-only' in args:
+        sender, receiver, amount = words[3:6]
+        print(json.dumps(unsigned(args, {'@type': '/cosmos.bank.v1beta1.MsgSend',
+                                         'from_address': address_of(args, sender),
+                                         'to_address': receiver, 'amount': amount})))
+    elif words[:3] == ['tx', 'bank', 'multi-send'] and '--generate-only' in args:
+        sender, receivers, amount = words[3], words[4:-1], words[-1]
+        print(json.dumps(unsigned(args, {'@type': '/cosmos.bank.v1beta1.MsgMultiSend',
+                                         'inputs': [{'address': address_of(args, sender)}],
+                                         'outputs': [{'address': r, 'coins': amount} for r in receivers]})))
+    elif words[:2] in (['tx', 'sign'], ['tx', 'sign-batch']) and '--offline' in args:
+        delay = float(os.environ.get('FAKE_SIGN_DELAY', '0'))
+        if delay:
+            time.sleep(delay)
+        sequence = option(args, '--sequence')
+        if sequence is None or option(args, '--account-number') is None:
+            fail("--account-number and --sequence are required in offline mode")
+        with open(words[2], 'r', encoding='utf-8') as f:
+            if words[1] == 'sign':
+                print(json.dumps(signed(args, json.load(f), int(sequence))))
+            else:
+                for offset, line in enumerate(l for l in f if l.strip()):
+                    print(json.dumps(signed(args, json.loads(line), int(sequence) + offset)))
+    elif words[:2] == ['tx', 'encode']:
+        with open(words[2], 'r', encoding='utf-8') as f:
+            tx = json.load(f)
+        print(base64.b64encode(json.dumps(tx, separators=(',', ':')).encode()).decode())
+    else:
+        fail(f"unsupported command: {' '.join(args)}")
+
+
+if __name__ == "__main__":
+    main()
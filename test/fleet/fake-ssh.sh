@@ -0,0 +1,216 @@
+#!/bin/bash
+# 本地 fake-ssh：模拟远程主机，用于测试 scripts/fleet_control.py
+#
+# 用法:
+#   FLEET_SSH=test/fleet/fake-ssh.sh python3 scripts/fleet_control.py restart node all
+#
+# 环境变量:
+#   FAKE_SSH_ROOT         模拟主机的根目录（默认 /tmp/fake-ssh），每个主机一个子目录
+#   FAKE_SSH_HANDSHAKE    新建连接的握手耗时秒数（默认 0.5，复用连接时不计）
+#   FAKE_SSH_SLEEP_SCALE  远程 sleep 的缩放系数（默认 1）
+#   FAKE_SSH_BLOCK_TIME   模拟出块间隔秒数（默认 1）
+#   FAKE_SSH_FAIL_HOSTS   启动服务会失败的 IP 列表（空格分隔）
+#   FAKE_SSH_LOG_INTERVAL 模拟日志的行间隔秒数（默认 0.2）
+#
+# 所有连接记录写入 $FAKE_SSH_ROOT/ssh.log（connect = 新建连接，reuse = 复用连接）
+
+FAKE_SSH_ROOT="${FAKE_SSH_ROOT:-/tmp/fake-ssh}"
+FAKE_SSH_HANDSHAKE="${FAKE_SSH_HANDSHAKE:-0.5}"
+FAKE_SSH_SLEEP_SCALE="${FAKE_SSH_SLEEP_SCALE:-1}"
+FAKE_SSH_BLOCK_TIME="${FAKE_SSH_BLOCK_TIME:-1}"
+
+CONTROL_PATH=""
+CONTROL_OP=""
+
+# 解析 ssh 参数
+while [[ $# -gt 0 ]]; do
+    case $1 in
+        -o)
+            [[ $2 == ControlPath=* ]] && CONTROL_PATH="${2#ControlPath=}"
+            shift 2
+            ;;
+        -O)
+            CONTROL_OP=$2
+            shift 2
+            ;;
+        -p|-i|-l|-F)
+            shift 2
+            ;;
+        -*)
+            shift
+            ;;
+        *)
+            break
+            ;;
+    esac
+done
+
+TARGET=$1
+shift
+HOST="${TARGET#*@}"
+COMMAND="$*"
+ROOT="$FAKE_SSH_ROOT/$HOST"
+mkdir -p "$ROOT/state" "$ROOT/tmp" "$ROOT/data/biyachain/config"
+
+SOCKET=""
+[ -n "$CONTROL_PATH" ] && SOCKET="${CONTROL_PATH//%C/$HOST}"
+
+# 控制命令（-O exit / -O check）
+if [ -n "$CONTROL_OP" ]; then
+    if [ "$CONTROL_OP" == "exit" ] && [ -n "$SOCKET" ]; then
+        rm -f "$SOCKET"
+    fi
+    exit 0
+fi
+
+# 模拟连接握手：复用已有主连接时跳过
+if [ -n "$SOCKET" ] && [ -e "$SOCKET" ]; then
+    echo "$(date +%s.%N) $HOST reuse" >> "$FAKE_SSH_ROOT/ssh.log"
+else
+    sleep "$FAKE_SSH_HANDSHAKE"
+    [ -n "$SOCKET" ] && touch "$SOCKET"
+    echo "$(date +%s.%N) $HOST connect" >> "$FAKE_SSH_ROOT/ssh.log"
+fi
+
+# 远程命令桩函数
+_path() {
+    local arg
+    for arg in "$@"; do
+        # printf 而不是 echo：echo 会吞掉 -e / -E / -n 这类参数
+        if [[ $arg == /* ]] && [[ $arg != /dev/* ]]; then
+            printf '%s\n' "$ROOT$arg"
+        else
+            printf '%s\n' "$arg"
+        fi
+    done
+}
+
+_run() {
+    local cmd=$1
+    shift
+    local args=()
+    while IFS= read -r line; do
+        args+=("$line")
+    done < <(_path "$@")
+    command "$cmd" "${args[@]}"
+}
+
+sudo() {
+    [ "$1" == "-u" ] && shift 2
+    "$@"
+}
+mv() { _run mv "$@"; }
+rm() { _run rm "$@"; }
+chmod() { _run chmod "$@"; }
+mkdir() { _run mkdir "$@"; }
+tee() { _run tee "$@"; }
+ls() { _run ls "$@"; }
+test() { _run test "$@"; }
+tar() { _run tar "$@"; }
+sha256sum() { _run sha256sum "$@"; }
+grep() { _run grep "$@"; }
+python3() { _run python3 "$@"; }
+env() { _run env "$@"; }
+mktemp() { local dir; dir=$(command mktemp -d "$ROOT/tmp/tmp.XXXXXX"); echo "${dir#$ROOT}"; }
+
+# 模拟主机上没有其他系统用户：install 忽略属主参数，stat 将本地用户报告为 ubuntu
+stat() { _run stat "$@" | sed "s/ $(id -un) $(id -gn)\$/ ubuntu ubuntu/"; }
+install() {
+    local args=()
+    while [[ $# -gt 0 ]]; do
+        case $1 in
+            -o|-g) shift 2 ;;
+            *) args+=("$1"); shift ;;
+        esac
+    done
+    _run install "${args[@]}"
+}
+sleep() { command sleep "$(awk "BEGIN {print $1 * $FAKE_SSH_SLEEP_SCALE}")"; }
+pkill() { return 0; }
+
+# 主机之间的 ssh（树形分发时下游主机从上级主机拉取）：再次调用 fake-ssh，进入上级主机的目录
+ssh() { "$0" "$@"; }
+
+# 模拟 journalctl -o short-iso-precise 输出（cosmos 风格的节点日志 / logrus 风格的 Peggo 日志）
+journalctl() {
+    local service="" lines=10 follow=0
+    while [[ $# -gt 0 ]]; do
+        case $1 in
+            -u) service=$2; shift 2 ;;
+            -n) lines=$2; shift 2 ;;
+            -f) follow=1; shift ;;
+            -o|--since) shift 2 ;;
+            *) shift ;;
+        esac
+    done
+    python3 - "$HOST" "$service" "$lines" "$follow" "${FAKE_SSH_LOG_INTERVAL:-0.2}" <<'PY'
+import sys, time, zlib
+from datetime import datetime, timezone
+host, service, lines, follow, interval = sys.argv[1], sys.argv[2], int(sys.argv[3]), sys.argv[4] == '1', float(sys.argv[5])
+offset = (zlib.crc32(host.encode()) % 100) / 1000.0
+if service == 'peggo':
+    messages = ['level=info msg="scanning for events"', 'level=debug msg="no new valsets"',
+                'level=warn msg="eth rpc slow"', 'level=error msg="failed to relay batch"']
+else:
+    messages = ['INF committed state module=state', 'INF received proposal module=consensus',
+                'DBG send message module=p2p', 'ERR failed to verify vote module=consensus']
+
+def emit(n, ts):
+    stamp = datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f') + '+0000'
+    message = messages[n % len(messages)] if n % 10 else messages[-1]
+    print(f"{stamp} {host} {service}[1234]: {message} height={n}", flush=True)
+
+now = time.time()
+for i in range(lines):
+    emit(i, now - (lines - i) * interval + offset)
+n = lines
+try:
+    while follow:
+        time.sleep(interval)
+        emit(n, time.time())
+        n += 1
+except (BrokenPipeError, KeyboardInterrupt):
+    pass
+PY
+}
+
+systemctl() {
+    local quiet=false
+    [[ " $* " == *" --quiet "* ]] && quiet=true
+    set -- ${@/--quiet/}
+    local op=$1 service=$2
+    local state_file="$ROOT/state/$service"
+    case $op in
+        start)
+            if [[ " $FAKE_SSH_FAIL_HOSTS " == *" $HOST "* ]]; then
+                echo "failed" > "$state_file"
+                return 1
+            fi
+            echo "active $(date +%s.%N)" > "$state_file"
+            ;;
+        stop)
+            echo "inactive" > "$state_file"
+            ;;
+        is-active|status)
+            local state
+            state=$(cut -d' ' -f1 "$state_file" 2>/dev/null || echo inactive)
+            [ "$quiet" == true ] || echo "$state"
+            [ "$state" == "active" ]
+            ;;
+    esac
+}
+
+pgrep() {
+    local service="${*: -1}"
+    [ "$(cut -d' ' -f1 "$ROOT/state/$service" 2>/dev/null)" == "active" ]
+}
+
+curl() {
+    local state since height
+    read -r state since < "$ROOT/state/biyachaind" 2>/dev/null
+    [ "$state" == "active" ] || return 7
+    height=$(awk "BEGIN {print int(($(date +%s.%N) - $since) / $FAKE_SSH_BLOCK_TIME) + 1}")
+    echo "{\"result\":{\"sync_info\":{\"latest_block_height\":\"$height\",\"catching_up\":false}}}"
+}
+
+eval "$COMMAND"
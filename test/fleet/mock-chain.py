@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+本地模拟链的 REST/RPC 交易接口，用于测试 scripts/register_orchestrators.py、load_test.py
+
+REST:  /peggy/v1/module_state、/cosmos/auth/v1beta1/accounts/<address>
+RPC:   JSON-RPC（POST，支持批量；也支持 GET /<method>?参数）
+       status、broadcast_tx_sync、tx、block、block_results
+
+交易为 test/fleet/fake-biyachaind.py 编码的 base64 JSON。广播时校验签名账户的 sequence
+（CheckTx），每个出块间隔从 mempool 按顺序打包交易；peggy 注册交易执行成功后将
+orchestrator 加入 delegate_keys。
+
+用法:
+    python3 test/fleet/mock-chain.py [--rpc-port 36857] [--rest-port 36858] [--block-time 1]
+                                     [--block-txs 0] [--mempool-size 5000] [--no-index]
+                                     [--registered 0xabc...] [--stale-sequence inj1...]
+                                     [--reject inj1...]
+
+--block-txs    每个区块最多打包的交易数（0 不限制），用于模拟吞吐上限
+--mempool-size mempool 容量，满时 broadcast_tx_sync 返回 "mempool is full" 错误
+--no-index     禁用交易索引（与 validator 的 tx_index.indexer: "null" 一致），tx 查询返回错误
+--registered   预先注册的 EVM 地址（可重复）
+--stale-sequence  REST 返回的该账户 sequence 比链上实际值小 1，用于测试 sequence 不匹配后重新签名
+--reject       该账户的交易上链后执行失败（code 5）
+"""
+
+import base64
+import hashlib
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+CHAIN_ID = 'biyachain-888'
+START_HEIGHT = 100
+
+
+class RPCFailure(Exception):
+    def __init__(self, message: str, data: str):
+        super().__init__(data)
+        self.message = message
+        self.data = data
+
+
+def signer_of(message: dict) -> str:
+    if 'inputs' in message:
+        return message['inputs'][0]['address']
+    return message.get('sender') or message.get('from_address', '')
+
+
+class Chain:
+    def __init__(self, options: dict):
+        self.options = options
+        self.lock = threading.Lock()
+        # --stale-sequence 的账户已有一笔 REST 尚未反映的交易
+        self.sequences = {address: 1 for address in options['stale_sequence']}
+        self.delegate_keys = [{'validator': '', 'orchestrator': '', 'eth_address': evm}
+                              for evm in options['registered']]
+        # [(hash, base64 交易, 交易)]
+        self.mempool = []
+        self.pending = set()
+        self.included = {}
+        self.height = START_HEIGHT
+        self.blocks = {START_HEIGHT: {'time': self.now(), 'txs': [], 'results': []}}
+
+    @staticmethod
+    def now() -> str:
+        return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f') + '000Z'
+
+    def produce(self):
+        """每个出块间隔打包一个区块"""
+        while True:
+            time.sleep(self.options['block_time'])
+            with self.lock:
+                limit = self.options['block_txs'] or len(self.mempool)
+                batch, self.mempool = self.mempool[:limit], self.mempool[limit:]
+                self.height += 1
+                block = {'time': self.now(), 'txs': [], 'results': []}
+                for index, (tx_hash, raw, tx) in enumerate(batch):
+                    self.pending.discard(tx_hash)
+                    result = self.execute(tx)
+                    block['txs'].append(raw)
+                    block['results'].append(result)
+                    self.included[tx_hash] = {'hash': tx_hash, 'height': str(self.height),
+                                              'index': index, 'tx_result': result}
+                self.blocks[self.height] = block
+
+    def execute(self, tx: dict) -> dict:
+        message = tx['body']['messages'][0]
+        if signer_of(message) in self.options['reject']:
+            return {'code': 5, 'log': 'insufficient funds', 'gas_used': '0'}
+        if 'eth_address' in message:
+            self.delegate_keys.append({'validator': message['sender'],
+                                       'orchestrator': message['orchestrator'],
+                                       'eth_address': message['eth_address']})
+        return {'code': 0, 'log': '', 'gas_used': '80000'}
+
+    def sequence(self, address: str) -> int:
+        return self.sequences.get(address, 0)
+
+    def account(self, address: str) -> dict:
+        sequence = self.sequence(address)
+        if address in self.options['stale_sequence']:
+            sequence = max(0, sequence - 1)
+        number = int(hashlib.sha256(address.encode()).hexdigest()[:4], 16)
+        return {'@type': '/injective.types.v1beta1.EthAccount',
+                'base_account': {'address': address, 'account_number': str(number),
+                                 'sequence': str(sequence)}}
+
+    def broadcast_tx_sync(self, params: dict) -> dict:
+        raw = params['tx']
+        data = base64.b64decode(raw)
+        tx_hash = hashlib.sha256(data).hexdigest().upper()
+        tx = json.loads(data)
+        signer = signer_of(tx['body']['messages'][0])
+        sequence = int(tx['auth_info']['signer_infos'][0]['sequence'])
+        with self.lock:
+            if tx_hash in self.pending or tx_hash in self.included:
+                raise RPCFailure('Internal error', 'tx already exists in cache')
+            if len(self.mempool) >= self.options['mempool_size']:
+                raise RPCFailure('Internal error',
+                                 f"mempool is full: number of txs {len(self.mempool)} "
+                                 f"(max: {self.options['mempool_size']})")
+            expected = self.sequence(signer)
+            if sequence != expected:
+                return {'code': 32, 'hash': tx_hash, 'codespace': 'sdk',
+                        'log': f"account sequence mismatch, expected {expected}, got {sequence}: incorrect account sequence"}
+            self.sequences[signer] = expected + 1
+            self.mempool.append((tx_hash, raw, tx))
+            self.pending.add(tx_hash)
+        return {'code': 0, 'hash': tx_hash, 'log': '[]', 'codespace': ''}
+
+    def tx(self, params: dict) -> dict:
+        if self.options['no_index']:
+            raise RPCFailure('Internal error', 'transaction indexing is disabled')
+        tx_hash = base64.b64decode(params['hash']).hex().upper()
+        with self.lock:
+            if tx_hash not in self.included:
+                raise RPCFailure('Internal error', f"tx ({tx_hash}) not found")
+            return self.included[tx_hash]
+
+    def status(self, params: dict) -> dict:
+        with self.lock:
+            return {'node_info': {'network': CHAIN_ID},
+                    'sync_info': {'latest_block_height': str(self.height),
+                                  'latest_block_time': self.blocks[self.height]['time'],
+                                  'catching_up': False}}
+
+    def _block(self, params: dict) -> tuple:
+        with self.lock:
+            height = int(params.get('height') or self.height)
+            if height not in self.blocks:
+                raise RPCFailure('Internal error',
+                                 f"height {height} must be less than or equal to the current blockchain height {self.height}")
+            return height, self.blocks[height]
+
+    def block(self, params: dict) -> dict:
+        height, block = self._block(params)
+        return {'block_id': {'hash': hashlib.sha256(f"{CHAIN_ID}:{height}".encode()).hexdigest().upper()},
+                'block': {'header': {'chain_id': CHAIN_ID, 'height': str(height), 'time': block['time']},
+                          'data': {'txs': list(block['txs'])}}}
+
+    def block_results(self, params: dict) -> dict:
+        height, block = self._block(params)
+        return {'height': str(height), 'txs_results': list(block['results']) or None}
+
+    def call(self, request: dict) -> dict:
+        response = {'jsonrpc': '2.0', 'id': request.get('id', -1)}
+        method, params = request.get('method'), request.get('params') or {}
+        handler = getattr(self, method, None) if method in (
+            'status', 'broadcast_tx_sync', 'tx', 'block', 'block_results') else None
+        if handler is None:
+            response['error'] = {'code': -32601, 'message': 'Method not found'}
+            return response
+        try:
+            response['result'] = handler(params)
+        except RPCFailure as e:
+            response['error'] = {'code': -32603, 'message': e.message, 'data': e.data}
+        except (KeyError, IndexError, ValueError) as e:
+            response['error'] = {'code': -32602, 'message': 'Invalid params', 'data': str(e)}
+        return response
+
+
+def make_handler(chain: Chain, rest: bool):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            path = url.path
+            if rest and path == '/peggy/v1/module_state':
+                with chain.lock:
+                    self.send_json({'state': {'delegate_keys': list(chain.delegate_keys)}})
+            elif rest and path.startswith('/cosmos/auth/v1beta1/accounts/'):
+                with chain.lock:
+                    self.send_json({'account': chain.account(path.rsplit('/', 1)[1])})
+            elif not rest and path.strip('/'):
+                params = {k: v[0].strip('"') for k, v in parse_qs(url.query).items()}
+                self.send_json(chain.call({'id': -1, 'method': path.strip('/'), 'params': params}))
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            if rest:
+                self.send_error(405)
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                request = json.loads(self.rfile.read(length))
+            except ValueError:
+                self.send_json({'jsonrpc': '2.0', 'id': -1,
+                                'error': {'code': -32700, 'message': 'Parse error'}})
+                return
+            if isinstance(request, list):
+                self.send_json([chain.call(r) for r in request])
+            else:
+                self.send_json(chain.call(request))
+
+        def send_json(self, data):
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def main():
+    args = sys.argv[1:]
+    options = {'rpc_port': 36857, 'rest_port': 36858, 'block_time': 1.0, 'block_txs': 0,
+               'mempool_size': 5000, 'no_index': False,
+               'registered': [], 'stale_sequence': set(), 'reject': set()}
+
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('--rpc-port', '--rest-port', '--block-txs', '--mempool-size'):
+            options[arg[2:].replace('-', '_')] = int(args[i + 1])
+        elif arg == '--block-time':
+            options['block_time'] = float(args[i + 1])
+        elif arg == '--registered':
+            options['registered'].append(args[i + 1].lower())
+        elif arg == '--stale-sequence':
+            options['stale_sequence'].add(args[i + 1])
+        elif arg == '--reject':
+            options['reject'].add(args[i + 1])
+        elif arg == '--no-index':
+            options['no_index'] = True
+            i += 1
+            continue
+        else:
+            i += 1
+            continue
+        i += 2
+
+    chain = Chain(options)
+    threading.Thread(target=chain.produce, daemon=True).start()
+    servers = []
+    for port, rest in ((options['rpc_port'], False), (options['rest_port'], True)):
+        server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(chain, rest))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        print(f"✓ {'REST' if rest else 'RPC'}: http://127.0.0.1:{port}", flush=True)
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+本地模拟 Tendermint RPC，用于测试 scripts/chain_status.py、upgrade_pipeline.py、state_sync.py、
+metrics_collector.py
+
+每个模拟节点监听一个端口，区块高度随时间增长，支持：
+/status、/net_info、/dump_consensus_state、/blockchain、/block、/commit，
+以及 Prometheus 文本格式的 /metrics（--lag 的 validator 轮次耗时更长，且每 10 个区块漏签一次）
+
+用法:
+    python3 test/fleet/mock-rpc.py [--validators 4] [--sentries 2] [--base-port 36757] [--block-time 1]
+                                   [--lag validator-2:5] [--down sentry-0] [--catching-up sentry-1]
+                                   [--halt-at 130 --resume-after 5 --slow sentry-1:8] [--fork sentry-1]
+
+--halt-at 模拟升级：所有节点在高度 H-1 停止，--resume-after 秒后恢复出块（升级切换耗时），
+--slow 为指定节点额外增加恢复时间（切换期间该节点 RPC 不可用），用于测试 upgrade_pipeline.py watch
+--fork 指定节点的 /block、/commit 返回不同的区块哈希，用于测试 state_sync.py 的哈希交叉校验
+
+启动后输出每个节点的 --endpoint 参数，例如：
+    python3 scripts/chain_status.py $(python3 test/fleet/mock-rpc.py --print-endpoints)
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+START = time.time()
+
+
+def node_names(validators: int, sentries: int):
+    return [f"validator-{i}" for i in range(validators)] + [f"sentry-{i}" for i in range(sentries)]
+
+
+def make_handler(name: str, options: dict):
+    lag = options['lag'].get(name, 0)
+    block_time = options['block_time']
+
+    halt_at = options['halt_at']
+    # 高度 halt_at 本应产生的时刻；之后链停止 resume_after 秒
+    halt_wall = START + (halt_at - 100) * block_time if halt_at else None
+    resume_after = options['resume_after']
+    node_resume = resume_after + options['slow'].get(name, 0)
+
+    def height() -> int:
+        now = time.time()
+        if halt_wall is not None and now >= halt_wall:
+            if now < halt_wall + node_resume:
+                return halt_at - 1
+            return halt_at + int((now - halt_wall - resume_after) / block_time)
+        return max(1, int((now - START) / block_time) + 100 - lag)
+
+    def switching() -> bool:
+        # 切换二进制文件期间（停止后，本节点额外的恢复时间内）RPC 不可用
+        now = time.time()
+        return (halt_wall is not None and halt_wall + resume_after <= now < halt_wall + node_resume)
+
+    def block_time_at(h: int) -> str:
+        seconds = (h - 100) * block_time
+        if halt_at and h >= halt_at:
+            seconds += resume_after
+        t = datetime.fromtimestamp(START, timezone.utc) + timedelta(seconds=seconds)
+        return t.strftime('%Y-%m-%dT%H:%M:%S.%f') + '123Z'
+
+    def block_hash(h: int) -> str:
+        chain = 'fork' if name in options['fork'] else 'biyachain-888'
+        return hashlib.sha256(f"{chain}:{h}".encode()).hexdigest().upper()
+
+    def metrics(h: int) -> str:
+        blocks = h - 100
+        labels = 'chain_id="biyachain-888"'
+        slow = 1.4 if lag else 1.0
+        lines = [
+            '# HELP cometbft_consensus_height Height of the chain.',
+            '# TYPE cometbft_consensus_height gauge',
+            f'cometbft_consensus_height{{{labels}}} {h + 1}',
+            f'cometbft_consensus_rounds{{{labels}}} {1 if lag and h % 10 == 0 else 0}',
+            '# TYPE cometbft_consensus_round_duration_seconds histogram',
+            f'cometbft_consensus_round_duration_seconds_bucket{{{labels},le="+Inf"}} {blocks}',
+            f'cometbft_consensus_round_duration_seconds_sum{{{labels}}} {blocks * block_time * slow:.3f}',
+            f'cometbft_consensus_round_duration_seconds_count{{{labels}}} {blocks}',
+            f'cometbft_consensus_block_interval_seconds_sum{{{labels}}} {blocks * block_time:.3f}',
+            f'cometbft_consensus_block_interval_seconds_count{{{labels}}} {blocks}',
+            f'cometbft_mempool_size{{{labels}}} {(h * 7) % 50}',
+            f'cometbft_p2p_peers{{{labels}}} 3',
+            f'cometbft_consensus_missing_validators{{{labels}}} {len(options["lag"])}',
+        ]
+        if name.startswith('validator'):
+            address = hashlib.sha256(name.encode()).hexdigest()[:40].upper()
+            missed = max(0, blocks) // 10 if lag else 0
+            signed = h - 1 if lag and h % 10 == 0 else h
+            lines += [f'cometbft_consensus_validator_missed_blocks{{{labels},validator_address="{address}"}} {missed}',
+                      f'cometbft_consensus_validator_last_signed_height{{{labels},validator_address="{address}"}} {signed}']
+        return '\n'.join(lines) + '\n'
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if switching():
+                self.send_error(503)
+                return
+            url = urlparse(self.path)
+            h = height()
+            if url.path == '/status':
+                result = {
+                    'node_info': {'id': name, 'moniker': name, 'network': 'biyachain-888'},
+                    'sync_info': {
+                        'latest_block_height': str(h),
+                        'latest_block_time': block_time_at(h),
+                        'catching_up': name in options['catching_up'],
+                    },
+                    'validator_info': {'voting_power': '100' if name.startswith('validator') else '0'},
+                }
+            elif url.path == '/net_info':
+                peers = [{'node_info': {'moniker': f'peer-{i}'}, 'is_outbound': i % 2 == 0}
+                         for i in range(3)]
+                result = {'listening': True, 'n_peers': str(len(peers)), 'peers': peers}
+            elif url.path == '/dump_consensus_state':
+                result = {'round_state': {'height': str(h + 1), 'round': 0, 'step': 3}, 'peers': []}
+            elif url.path == '/blockchain':
+                query = parse_qs(url.query)
+                high = min(h, int(query.get('maxHeight', [h])[0]))
+                low = max(1, int(query.get('minHeight', [high - 19])[0]), high - 19)
+                metas = [{'header': {'height': str(x), 'time': block_time_at(x)}}
+                         for x in range(high, low - 1, -1)]
+                result = {'last_height': str(h), 'block_metas': metas}
+            elif url.path in ('/block', '/commit'):
+                query = parse_qs(url.query)
+                target = int(query.get('height', [h])[0])
+                if target > h or target < 1:
+                    error = {'code': -32603, 'message': 'Internal error',
+                             'data': f"height {target} must be less than or equal to the current blockchain height {h}"}
+                    self.send_json({'jsonrpc': '2.0', 'id': -1, 'error': error})
+                    return
+                header = {'chain_id': 'biyachain-888', 'height': str(target), 'time': block_time_at(target)}
+                block_id = {'hash': block_hash(target)}
+                if url.path == '/block':
+                    result = {'block_id': block_id, 'block': {'header': header}}
+                else:
+                    result = {'signed_header': {'header': header,
+                                                'commit': {'height': str(target), 'block_id': block_id}},
+                              'canonical': True}
+            elif url.path == '/metrics':
+                self.send_text(metrics(h))
+                return
+            else:
+                self.send_error(404)
+                return
+
+            self.send_json({'jsonrpc': '2.0', 'id': -1, 'result': result})
+
+        def send_text(self, text: str):
+            body = text.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, data: dict):
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def main():
+    args = sys.argv[1:]
+    options = {'validators': 4, 'sentries': 2, 'base_port': 36757, 'block_time': 1.0,
+               'lag': {}, 'down': set(), 'catching_up': set(),
+               'halt_at': 0, 'resume_after': 5.0, 'slow': {}, 'fork': set()}
+    print_only = '--print-endpoints' in args
+
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('--validators', '--sentries'):
+            options[arg[2:]] = int(args[i + 1])
+        elif arg == '--base-port':
+            options['base_port'] = int(args[i + 1])
+        elif arg == '--block-time':
+            options['block_time'] = float(args[i + 1])
+        elif arg == '--lag':
+            name, _, blocks = args[i + 1].partition(':')
+            options['lag'][name] = int(blocks)
+        elif arg == '--down':
+            options['down'].add(args[i + 1])
+        elif arg == '--catching-up':
+            options['catching_up'].add(args[i + 1])
+        elif arg == '--fork':
+            options['fork'].add(args[i + 1])
+        elif arg == '--halt-at':
+            options['halt_at'] = int(args[i + 1])
+        elif arg == '--resume-after':
+            options['resume_after'] = float(args[i + 1])
+        elif arg == '--slow':
+            name, _, seconds = args[i + 1].partition(':')
+            options['slow'][name] = float(seconds)
+        else:
+            i += 1
+            continue
+        i += 2
+
+    endpoints = [(name, options['base_port'] + index)
+                 for index, name in enumerate(node_names(options['validators'], options['sentries']))]
+    if print_only:
+        print(' '.join(f"--endpoint {name}=127.0.0.1:{port}" for name, port in endpoints))
+        return
+
+    servers = []
+    for name, port in endpoints:
+        if name in options['down']:
+            continue
+        server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(name, options))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        print(f"✓ {name}: http://127.0.0.1:{port}", flush=True)
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+检查 scripts/keyring_reader.py 能否解析链二进制 keyring-test 后端写入的文件
+
+- 默认检查 fixture/keyring-test：由 --record 用真实链二进制 keys add 生成，
+  期望值（keys show -a、keys unsafe-export-eth-key 的输出）和二进制版本记录在 fixture/expected.json
+- --record 用指定二进制在 fixture/ 下重新生成密钥 "fixture" 并记录期望值和版本
+  （只应使用真实的 biyachaind/injectived；存根写入的文件不能证明与真实格式兼容）
+- --binary 用二进制在临时目录执行 keys add --keyring-backend test，
+  再把进程内解析的结果与 keys show -a、keys unsafe-export-eth-key 的输出对比
+
+命令行:
+    python3 test/keyring/check-keyring.py [--binary <biyachaind|injectived>]
+    python3 test/keyring/check-keyring.py --record <biyachaind|injectived>
+"""
+
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+KEYRING_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(KEYRING_DIR.parents[1] / 'scripts'))
+
+from keyring_reader import KeyringError, read_key, read_key_name
+
+
+FIXTURE_HOME = KEYRING_DIR / "fixture"
+FIXTURE_EXPECTED = FIXTURE_HOME / "expected.json"
+FIXTURE_KEY = "fixture"
+EXPECTED_FIELDS = ('cosmos_address', 'private_key')
+
+
+def show_usage():
+    print(__doc__.strip())
+
+
+def run_keys(binary: str, home: str, *args) -> str:
+    result = subprocess.run([binary, 'keys'] + list(args) + ['--home', home, '--keyring-backend', 'test'],
+                            capture_output=True, text=True, stdin=subprocess.DEVNULL)
+    if result.returncode != 0:
+        raise RuntimeError(f"keys {' '.join(args)}: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def binary_version(binary: str) -> str:
+    result = subprocess.run([binary, 'version'], capture_output=True, text=True, stdin=subprocess.DEVNULL)
+    # cosmos-sdk 的 version 命令输出到 stdout，部分旧版本输出到 stderr
+    return (result.stdout.strip() or result.stderr.strip()).splitlines()[0] if result.returncode == 0 else ""
+
+
+def add_key(binary: str, home: str, key_name: str) -> dict:
+    """keys add 生成密钥，返回二进制自己输出的地址和私钥"""
+    run_keys(binary, home, 'add', key_name)
+    return {
+        'cosmos_address': run_keys(binary, home, 'show', key_name, '-a'),
+        'private_key': run_keys(binary, home, 'unsafe-export-eth-key', key_name).splitlines()[-1].strip(),
+    }
+
+
+def check(label: str, expected: dict, home: str, key_name: str) -> bool:
+    try:
+        key = read_key(home, key_name)
+        name = read_key_name(home, bytes.fromhex(key['evm_address']))
+    except KeyringError as e:
+        print(f"✗ {label}: {e}")
+        return False
+
+    ok = True
+    for field in EXPECTED_FIELDS:
+        if key[field].lower() != expected[field].lower():
+            print(f"✗ {label}: {field} = {key[field]}，期望 {expected[field]}")
+            ok = False
+    if name != key_name:
+        print(f"✗ {label}: .address 条目指向 {name}，期望 {key_name}")
+        ok = False
+    if ok:
+        print(f"✓ {label}: {key['cosmos_address']} (0x{key['evm_address']})")
+    return ok
+
+
+def check_fixture() -> bool:
+    if not FIXTURE_EXPECTED.is_file():
+        print(f"✗ fixture: 尚未录制 {FIXTURE_EXPECTED.relative_to(KEYRING_DIR)}，"
+              f"用真实链二进制执行 check-keyring.py --record <biyachaind>")
+        return False
+    expected = json.loads(FIXTURE_EXPECTED.read_text(encoding='utf-8'))
+    label = f"fixture（{expected['binary']} {expected['version']}）"
+    return check(label, expected, str(FIXTURE_HOME), expected['key_name'])
+
+
+def record(binary: str) -> bool:
+    """用二进制重新生成 fixture，记录期望值和版本"""
+    version = binary_version(binary)
+    if not version:
+        print(f"✗ {binary}: 无法读取版本（version 命令失败）")
+        return False
+    with tempfile.TemporaryDirectory(prefix="keyring-record-") as home:
+        try:
+            expected = add_key(binary, home, FIXTURE_KEY)
+        except (OSError, RuntimeError) as e:
+            print(f"✗ {binary}: {e}")
+            return False
+        shutil.rmtree(FIXTURE_HOME, ignore_errors=True)
+        shutil.copytree(Path(home, 'keyring-test'), FIXTURE_HOME / 'keyring-test')
+
+    expected = dict(binary=Path(binary).name, version=version, recorded=date.today().isoformat(),
+                    key_name=FIXTURE_KEY, **expected)
+    FIXTURE_EXPECTED.write_text(json.dumps(expected, indent=2, ensure_ascii=False) + "\n", encoding='utf-8')
+    print(f"✓ 已录制 fixture: {Path(binary).name} {version}")
+    return check_fixture()
+
+
+def check_binary(binary: str) -> bool:
+    """用二进制生成密钥，对比进程内解析结果"""
+    with tempfile.TemporaryDirectory(prefix="keyring-check-") as home:
+        try:
+            expected = add_key(binary, home, 'check')
+        except (OSError, RuntimeError) as e:
+            print(f"✗ {binary}: {e}")
+            return False
+        return check(f"{Path(binary).name} keys add", expected, home, 'check')
+
+
+def option_value(args, name: str) -> str:
+    index = args.index(name)
+    if index + 1 >= len(args):
+        show_usage()
+        sys.exit(1)
+    return args[index + 1]
+
+
+def main():
+    args = sys.argv[1:]
+    if '-h' in args or '--help' in args:
+        show_usage()
+        return
+
+    if '--record' in args:
+        sys.exit(0 if record(option_value(args, '--record')) else 1)
+
+    ok = check_fixture()
+    if '--binary' in args:
+        ok = check_binary(option_value(args, '--binary')) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+检查 scripts/peer_topology.py 在不同规模下是否满足 node_config.yml 的默认约束
+（max_degree 12、max_diameter 6）
+
+- 可行的规模：规划结果没有违反的约束（度数、直径、连通性、每个 validator 都有 sentry）
+- 不可行的规模（sentry 容量不足）：必须报告"没有满足约束的拓扑"及原因，而不是输出超限的图
+
+命令行:
+    python3 test/topology/check-topology.py [<validators>:<sentries> ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT_DIR / 'scripts'))
+
+from peer_topology import Node, load_topology_options, plan_topology, topology_report
+
+
+# 其中 100:20、50:3、512:128 曾输出度数或直径超限的图
+DEFAULT_SIZES = ['4:2', '7:2', '32:16', '50:3', '100:20', '128:64', '512:128', '512:256']
+REGIONS = ('ap-east', 'eu-west', 'us-east')
+
+
+def synthetic_nodes(validators: int, sentries: int):
+    """与 test/bench/run-bench.py inventory 相同的命名，region/zone 轮流分配"""
+    nodes = []
+    for role, count, subnet in (('validator', validators, 10), ('sentry', sentries, 20)):
+        for i in range(count):
+            region = REGIONS[i % len(REGIONS)]
+            nodes.append(Node(name=f"{role}-{i}", ip=f"10.{subnet}.{i // 250}.{i % 250 + 1}", role=role,
+                              region=region, zone=f"{region}-{'abc'[i // len(REGIONS) % 3]}"))
+    return nodes
+
+
+def check(validators: int, sentries: int, options) -> bool:
+    started = time.monotonic()
+    plan = plan_topology(synthetic_nodes(validators, sentries), options)
+    report = topology_report(plan)
+    elapsed = time.monotonic() - started
+    label = f"{validators}:{sentries}"
+
+    min_mesh = min(2, sentries - 1) if sentries else 0
+    feasible = not sentries or sentries * (int(options['max_degree']) - min_mesh) >= validators
+    if feasible:
+        ok = not report['violations']
+        detail = (f"最大度数 {report['max_degree']}，直径 {report['diameter']}"
+                  + (f"，调整 {', '.join(report['adjustments'])}" if report['adjustments'] else ""))
+        if not ok:
+            detail = '; '.join(report['violations'][:3])
+    else:
+        ok = bool(plan.error)
+        detail = plan.error or "未报告不可行（期望报告 sentry 容量不足）"
+    print(f"{'✓' if ok else '✗'} {label:<9} {elapsed:5.2f}s  {detail}")
+    return ok
+
+
+def main():
+    args = sys.argv[1:]
+    if '-h' in args or '--help' in args:
+        print(__doc__.strip())
+        return
+
+    options = load_topology_options(str(ROOT_DIR / 'node_config.yml'))
+    print(f"约束: max_degree {options['max_degree']}, max_diameter {options['max_diameter']}, "
+          f"sentries_per_validator {options['sentries_per_validator']}")
+    ok = True
+    for size in args or DEFAULT_SIZES:
+        try:
+            validators, sentries = (int(x) for x in size.split(':'))
+        except ValueError:
+            print(f"错误: 无效的规模: {size}（格式 <validators>:<sentries>）", file=sys.stderr)
+            sys.exit(1)
+        ok = check(validators, sentries, options) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,11 @@ KEYRING_BACKEND="test"
 BINARY="/usr/local/biyachain/bin/biyachaind"
 DEPLOY_DIR="../../ansible/chain-stresser-deploy"
 
+# 就绪门禁：提交前确认所有 validator 已预置升级文件（upgrade-node.sh 的输出目录）
+# FORCE_SUBMIT=true 跳过门禁
+UPGRADE_BIN_DIR="../../ansible/build/upgrade/$UPGRADE_NAME"
+FORCE_SUBMIT="${FORCE_SUBMIT:-false}"
+
 VALIDATORS=(
     "validator-0:0:10.8.21.50"
     "validator-1:1:10.8.45.209"
@@ -52,6 +57,19 @@ if [ "$CURRENT_HEIGHT" != "0" ] && [ "$CURRENT_HEIGHT" != "null" ]; then
     echo "当前高度: $CURRENT_HEIGHT, 距离升级: $BLOCKS_UNTIL 区块"
 fi
 
+# 就绪检查：各 validator 的 cosmovisor/upgrades/$UPGRADE_NAME/bin 校验和一致且 version 可执行
+if [ "$FORCE_SUBMIT" != true ]; then
+    if [ ! -d "$UPGRADE_BIN_DIR" ]; then
+        echo "✗ 升级文件目录不存在: $UPGRADE_BIN_DIR（先执行 ansible/bin/upgrade-node.sh，或设置 FORCE_SUBMIT=true）"
+        exit 1
+    fi
+    if ! python3 ../../scripts/upgrade_pipeline.py check "$UPGRADE_NAME" "$UPGRADE_BIN_DIR" all \
+        --height "$UPGRADE_HEIGHT" --report "$UPGRADE_BIN_DIR/readiness.json"; then
+        echo "✗ 升级未就绪，已停止提交（FORCE_SUBMIT=true 可跳过检查）"
+        exit 1
+    fi
+fi
+
 # 构建提案（info 必须是 JSON 字符串，不是对象）
 INFO_JSON=$(cat <<EOF
 {
@@ -128,5 +146,6 @@ done
 echo ""
 echo "✓ 完成 - 提案 ID: $PROPOSAL_ID"
 echo "监控: sudo journalctl -u biyachaind -f"
+echo "恢复耗时: python3 scripts/upgrade_pipeline.py watch $UPGRADE_NAME --height $UPGRADE_HEIGHT"
 
 